@@ -7,8 +7,24 @@ from datetime import datetime
 from enum import Enum
 from typing import Dict, List, Tuple, Optional, Callable, Any
 import copy
+import threading
+from collections import deque
 from hardware_adapter import HardwareAdapter
 from high_power_keep import HighPowerKeepMode  # 导入新的高功率保持模式模块
+from settle_detector import get_default_settle_config
+from evaluation_scheduler import EvaluationScheduler
+from fitness_cache import FitnessCache
+from surrogate_model import GaussianProcessSurrogate
+from local_refinement import PatternSearch
+from dither_tracker import DitherTracker, get_default_dither_config
+from light_search import FirstLightScanner, get_default_first_light_config
+from fly_scan import FlyScanner, get_default_fly_scan_config
+from history_store import EvaluationHistory, create_generation_history
+from run_journal import RunJournal, get_default_run_journal_config, load_journal
+from timing_spans import SpanRecorder, format_span_summary, get_span_recorder
+from metrics_exporter import get_default_metrics_config, get_metrics_registry, start_metrics_exporter
+from population_operators import (get_bounds, uniform_population, tournament_selection, blend_crossover,
+                                  gaussian_mutation, gaussian_perturbation, generate_offspring)
 
 # 设置中文字体，解决中文显示问题
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
@@ -29,6 +45,9 @@ class OptimizationPhase(Enum):
 
 class DualEndGeneticAlgorithmOptimizer:
     """双端光纤耦合对准优化器 - 管理A、B两端的协同优化"""
+
+    # 代理模型预筛选只作用于遗传算法的子代生成，自行生成候选的引擎子类设为False（不创建代理模型）
+    SURROGATE_SCREENING = True
     
     def __init__(self, config: dict, hardware_adapter: HardwareAdapter):
         """
@@ -55,6 +74,10 @@ class DualEndGeneticAlgorithmOptimizer:
         self.elite_size = config.get('elite_size', 4)
         self.tournament_size = config.get('tournament_size', 3)
         
+        # 随机数生成器（固定random_seed可复现整个优化过程）
+        self.random_seed = config.get('random_seed', None)
+        self.rng = np.random.default_rng(self.random_seed)
+        
         # 从GUI获取自适应参数
         self.adaptive_mutation_rate = config.get('adaptive_mutation_rate', True)
         self.adaptive_crossover_rate = config.get('adaptive_crossover_rate', True)
@@ -75,6 +98,15 @@ class DualEndGeneticAlgorithmOptimizer:
         self.high_power_search_range_percent = config.get('high_power_search_range_percent', 0.05)  # 5%的搜索范围
         self.high_power_perturbation_strength = config.get('high_power_perturbation_strength', 0.01)  # 克隆扰动强度
         
+        # 高功率保持方式：'population' 种群小范围搜索 / 'dither' 抖动锁相连续跟踪
+        self.high_power_keep_method = config.get('high_power_keep_method', 'population')
+        self.dither_config = config.get('dither_config', {})
+        self.dither_tracker = None
+        # 优化线程运行期间GUI请求的抖动跟踪，等优化线程停止下发位置指令后再启动
+        self._run_active = False
+        self._pending_dither_request = None
+        self._keep_request_lock = threading.Lock()
+        
         # 位置锁定参数
         self.lock_mode_threshold = config.get('lock_mode_threshold', 0.001)  # 修改为0.1% = 0.001
         self.lock_mode_activated = False
@@ -92,6 +124,18 @@ class DualEndGeneticAlgorithmOptimizer:
         # 从GUI获取其他参数
         self.light_threshold = config.get('light_threshold', 0.2)
         
+        # 自适应稳定检测参数（传递给硬件适配器）
+        if config.get('settle_config') and hasattr(hardware_adapter, 'set_settle_config'):
+            hardware_adapter.set_settle_config(config['settle_config'])
+        
+        # 功率计块采集参数（传递给硬件适配器）
+        if config.get('power_acquisition') and hasattr(hardware_adapter, 'configure_power_acquisition'):
+            hardware_adapter.configure_power_acquisition(config['power_acquisition'])
+        
+        # 并行移动参数（传递给硬件适配器）
+        if config.get('move_config') and hasattr(hardware_adapter, 'set_move_config'):
+            hardware_adapter.set_move_config(config['move_config'])
+        
         # 收敛状态跟踪
         self.convergence_counter = 0
         self.local_convergence_count = 0  # 局部收敛计数器
@@ -116,6 +160,82 @@ class DualEndGeneticAlgorithmOptimizer:
         self.search_range_B = config.get('search_range_B', {
             'x': (0, 30), 'y': (0, 30), 'z': (0, 30), 'rx': (0.0, 0.03), 'ry': (0.0, 0.03), 'rz': (0.0, 0.03)
         })
+        self.bounds_A = get_bounds(self.selected_variables_A, self.search_range_A)
+        self.bounds_B = get_bounds(self.selected_variables_B, self.search_range_B)
+        self._update_normalization()
+        
+        # 评估顺序调度（减少压电行程）
+        self.evaluation_ordering = config.get('evaluation_ordering', True)
+        self.settle_cost_weights_A = config.get('settle_cost_weights_A', {})
+        self.settle_cost_weights_B = config.get('settle_cost_weights_B', {})
+        self.evaluation_scheduler = self._create_evaluation_scheduler()
+        self.last_schedule_info = None
+        self.elite_rows = 0  # 当前种群前elite_rows行为已测量过的精英
+        self.stage_position_A = None  # 平台当前所在位置（最近一次评估的个体）
+        self.stage_position_B = None
+        
+        # 适应度缓存（跳过精英个体和重复个体的重复测量）
+        self.fitness_cache_enabled = config.get('fitness_cache', True)
+        self.fitness_cache_ttl = config.get('fitness_cache_ttl', 60.0)
+        self.fitness_cache_drift_check_rate = config.get('fitness_cache_drift_check_rate', 0.1)
+        self.fitness_cache_drift_tolerance = config.get('fitness_cache_drift_tolerance', 0.05)
+        self.fitness_cache_drift_tolerance_absolute = config.get('fitness_cache_drift_tolerance_absolute', 1e-6)
+        self.fitness_cache_resolution_A = config.get('fitness_cache_resolution_A', {})
+        self.fitness_cache_resolution_B = config.get('fitness_cache_resolution_B', {})
+        self.fitness_cache = self._create_fitness_cache() if self.fitness_cache_enabled else None
+        self.last_cache_stats = None
+        self.last_evaluation_failed = False
+        
+        # 代理模型预筛选（每代生成大量候选子代，只把预测最好的一部分送去硬件测量）
+        self.surrogate_screening = config.get('surrogate_screening', True) and self.SURROGATE_SCREENING
+        self.surrogate_ratio = config.get('surrogate_ratio', 0.5)  # 子代中由代理模型挑选的比例，其余从候选池随机抽取
+        self.surrogate_pool_factor = config.get('surrogate_pool_factor', 10)  # 候选池大小 = 子代数 × 该系数
+        self.surrogate_acquisition = config.get('surrogate_acquisition', 'ei')  # 'ei' 期望改进 / 'mean' 预测功率
+        self.surrogate_min_points = config.get('surrogate_min_points', 20)
+        self.surrogate_max_points = config.get('surrogate_max_points', 400)
+        self.surrogate = self._create_surrogate() if self.surrogate_screening else None
+        self._surrogate_synced = 0  # 已同步到代理模型的search_history条数
+        self.surrogate_predictions = {}  # 种群行索引 -> (预测功率, 预测标准差, 是否由代理模型挑选)
+        self.last_surrogate_stats = None
+        
+        # 全局收敛后的局部精细搜索（坐标模式搜索），结果作为位置锁定的参考
+        self.local_refinement_enabled = config.get('local_refinement', True)
+        self.local_refinement_initial_step = config.get('local_refinement_initial_step', 0.02)  # 占量程比例
+        self.local_refinement_min_step = config.get('local_refinement_min_step', 5e-4)  # 占量程比例
+        self.local_refinement_tolerance = config.get('local_refinement_tolerance', 0.005)  # 一轮功率相对变化
+        self.local_refinement_max_evaluations = config.get('local_refinement_max_evaluations', 200)
+        # 'pattern' 逐点模式搜索 / 'fly_scan' 逐轴飞行扫描（硬件不支持时退回模式搜索）
+        self.local_refinement_method = config.get('local_refinement_method', 'pattern')
+        self.fly_scan_config = get_default_fly_scan_config()
+        self.fly_scan_config.update(config.get('fly_scan_config', {}) or {})
+        self.local_refinement_result = None
+        
+        # 首次通光扫描：未通光时先连续扫描找光，再把以命中位置为中心的小范围交给优化
+        self.first_light_scan = config.get('first_light_scan', False)
+        self.first_light_threshold = config.get('first_light_threshold', None)  # None表示按light_threshold推算
+        self.first_light_config = get_default_first_light_config()
+        self.first_light_config.update(config.get('first_light_config', {}) or {})
+        self.first_light_result = None
+        
+        # 运行日志：每次评估、每代结束时追加写盘，中途崩溃后可用resume_from_journal()继续（未配置时不记录）
+        self.run_journal_config = get_default_run_journal_config()
+        self.run_journal_config.update(config.get('run_journal', {'enabled': False}) or {})
+        self.run_journal = None
+        self._resume_generation = 0  # 从日志恢复时已完成的代数（只用于下一次run()）
+        self._resume_journal_path = None
+        
+        # 评估耗时分段（指令、稳定、测量、历史记录、GUI回调），每代汇总p50/p95/最大值
+        # 使用本优化器自己的记录器，不改动进程内共享记录器的开关（见 _attach_span_recorder）
+        self.span_recorder = SpanRecorder(enabled=config.get('timing_spans', True))
+        
+        # 指标导出（Prometheus）：评估、功率、稳定时间等写入进程内注册表，由后台线程导出（未配置时不导出）
+        self.metrics_config = get_default_metrics_config()
+        self.metrics_config.update(config.get('metrics', {'enabled': False}) or {})
+        self.metrics = get_metrics_registry()
+        self._metrics_start_time = time.time()
+        self._metrics_evaluation_times = deque(maxlen=10000)
+        self._metrics_holding_power = deque(maxlen=10000)  # 保持功率期间的 (时间, 功率)，用于漂移率
+        self._metrics_lock = threading.Lock()  # 两个窗口由优化线程/跟踪线程写入，导出线程（HTTP模式下每次抓取）读取
         
         # 优化状态
         self.is_running = False
@@ -129,22 +249,33 @@ class DualEndGeneticAlgorithmOptimizer:
         self.best_individual_B = None
         self.best_fitness = -np.inf
         
-        # 历史记录
+        # 历史记录：每次评估和每代一项的数据按列存储在可增长数组中（见history_store.py），
+        # 下标、切片、len()与原来的列表用法一致
+        generation_history = create_generation_history(len(self.selected_variables_A), len(self.selected_variables_B))
+        self._generation_history_keys = tuple(generation_history)
         self.history = {
-            'generations': [],
-            'best_fitness': [],
-            'avg_fitness': [],
-            'best_individual_A': [],
-            'best_individual_B': [],
-            'optimization_phase': [],
+            'generations': generation_history['generations'],
+            'best_fitness': generation_history['best_fitness'],
+            'avg_fitness': generation_history['avg_fitness'],
+            'best_individual_A': generation_history['best_individual_A'],
+            'best_individual_B': generation_history['best_individual_B'],
+            'optimization_phase': generation_history['optimization_phase'],
             'evaluation_count': 0,
-            'search_history': [],
-            'population_diversity_A': [],
-            'population_diversity_B': [],
+            'search_history': EvaluationHistory(self.selected_variables_A, self.selected_variables_B),
+            'population_diversity_A': generation_history['population_diversity_A'],
+            'population_diversity_B': generation_history['population_diversity_B'],
             'convergence_status': [],
-            'mutation_rate_history': [],
+            'mutation_rate_history': generation_history['mutation_rate_history'],
             'enhanced_exploration_events': [],
             'lock_events': [],
+            'local_refinement': [],
+            'first_light': None,
+            'timing_spans': [],
+            'evaluation_path_length': generation_history['evaluation_path_length'],
+            'cache_hit_rate': generation_history['cache_hit_rate'],
+            'optimizer_engine': 'ga',
+            'surrogate_rmse': generation_history['surrogate_rmse'],
+            'surrogate_prediction_log': self.surrogate.prediction_log if self.surrogate is not None else [],
             'selected_variables_A': self.selected_variables_A,
             'selected_variables_B': self.selected_variables_B,
         }
@@ -611,7 +742,8 @@ class DualEndGeneticAlgorithmOptimizer:
             self.selected_variables_A,
             self.selected_variables_B,
             self.search_range_A,
-            self.search_range_B
+            self.search_range_B,
+            rng=self.rng
         )
         
         # 初始化高功率保持模式
@@ -668,6 +800,145 @@ class DualEndGeneticAlgorithmOptimizer:
         print(f"变异率: {self.gene_mutation_rate}")
         print(f"交叉率: {self.gene_crossover_rate}")
 
+    # =============================================================================
+    # 局部精细搜索
+    # =============================================================================
+
+    def run_local_refinement(self, generation: int) -> Optional[Dict]:
+        """
+        以当前最佳个体为起点，在硬件上进行坐标模式搜索
+        起点先重新测量一次（历史最大值带有噪声偏高），搜索结果作为位置锁定的参考
+        """
+        if self.best_individual_A is None or self.best_individual_B is None:
+            return None
+        
+        dimension_A = len(self.selected_variables_A)
+        pattern_search = PatternSearch(
+            np.concatenate([self.bounds_A[0], self.bounds_B[0]]),
+            np.concatenate([self.bounds_A[1], self.bounds_B[1]]),
+            initial_step=self.local_refinement_initial_step,
+            min_step=self.local_refinement_min_step,
+            power_tolerance=self.local_refinement_tolerance,
+            max_evaluations=self.local_refinement_max_evaluations
+        )
+        
+        def evaluate(point):
+            return self.evaluate_dual_fitness(point[:dimension_A], point[dimension_A:])
+        
+        print(f"第{generation}代: 开始局部精细搜索，起点功率 {self.best_fitness:.6f}mW")
+        center = np.concatenate([self.best_individual_A, self.best_individual_B])
+        center_fitness = evaluate(center)
+        result = None
+        if self.local_refinement_method == 'fly_scan':
+            result = self._run_fly_scan_refinement(evaluate, center, center_fitness)
+        if result is None:
+            result = pattern_search.run(evaluate, center, center_fitness, lambda: self.is_running)
+        result['evaluations'] += 1  # 含起点复测
+        
+        refined_A = result['best_point'][:dimension_A].copy()
+        refined_B = result['best_point'][dimension_A:].copy()
+        if result['best_fitness'] > self.best_fitness:
+            self.best_fitness = result['best_fitness']
+            self.best_individual_A = refined_A.copy()
+            self.best_individual_B = refined_B.copy()
+        
+        self.local_refinement_result = {
+            'generation': generation,
+            'initial_fitness': result['initial_fitness'],
+            'refined_fitness': result['best_fitness'],
+            'refined_individual_A': refined_A,
+            'refined_individual_B': refined_B,
+            'refined_position_A': {f'A_{var}': refined_A[i] for i, var in enumerate(self.selected_variables_A)},
+            'refined_position_B': {f'B_{var}': refined_B[i] for i, var in enumerate(self.selected_variables_B)},
+            'evaluations': result['evaluations'],
+            'sweeps': result['sweeps'],
+            'improvements': result['improvements'],
+            'stop_reason': result['stop_reason'],
+            'duration': result['duration'],
+            'method': 'fly_scan' if 'fly_scan' in result else 'pattern',
+            'fly_scan': result.get('fly_scan'),
+            # 锁定模式下剩余代数的评估预算；精细搜索后直接锁定时，节省的评估次数以此为上限
+            'remaining_generation_evaluations': max(0, self.generations - generation) * self.population_size,
+            'locked': False,
+            'evaluations_saved': 0,
+            'timestamp': datetime.now().isoformat()
+        }
+        print(f"局部精细搜索完成: {result['initial_fitness']:.6f}mW -> {result['best_fitness']:.6f}mW，"
+              f"{result['evaluations']} 次评估，{result['sweeps']} 轮，停止原因: {result['stop_reason']}")
+        return self.local_refinement_result
+
+    def _run_fly_scan_refinement(self, evaluate, center: np.ndarray, center_fitness: float) -> Optional[Dict]:
+        """
+        以飞行扫描逐轴对准，对准位置按评估结果与起点比较
+        返回与PatternSearch.run相同的结果字典（另含fly_scan扫描摘要）；硬件不支持或没有功率流时返回None
+        """
+        scanner = FlyScanner(self.hardware_adapter, self.fly_scan_config,
+                             should_continue=lambda: self.is_running, progress_callback=self.progress_callback)
+        if not scanner.is_supported():
+            print("硬件不支持飞行扫描，改用模式搜索")
+            return None
+        
+        dimension_A = len(self.selected_variables_A)
+        keys = [f'A_{var}' for var in self.selected_variables_A] + [f'B_{var}' for var in self.selected_variables_B]
+        lower = np.concatenate([self.bounds_A[0], self.bounds_B[0]])
+        upper = np.concatenate([self.bounds_A[1], self.bounds_B[1]])
+        ranges = {key: (lower[i], upper[i]) for i, key in enumerate(keys)}
+        
+        scan = scanner.refine(self.get_full_position_dict(center[:dimension_A], center[dimension_A:]), ranges)
+        if scan['sweeps'] == 0:
+            print(f"飞行扫描未完成（{scan['stop_reason']}），改用模式搜索")
+            return None
+        
+        point = np.clip([scan['position'][key] for key in keys], lower, upper)
+        fitness = evaluate(point)
+        improved = fitness > center_fitness
+        print(f"飞行扫描: {scan['sweeps']} 次扫描，{scan['samples']} 个样本"
+              f"（{scan['sample_rate']:.0f} 样本/秒），估计滞后 "
+              + (f"{scan['estimated_lag']*1000:.1f}ms" if scan['estimated_lag'] is not None else "未知"))
+        return {
+            'best_point': point if improved else center,
+            'best_fitness': fitness if improved else center_fitness,
+            'initial_fitness': center_fitness,
+            'evaluations': 1,
+            'sweeps': scan['sweeps'],
+            'improvements': int(improved),
+            'stop_reason': scan['stop_reason'],
+            'duration': scan['duration'],
+            'fly_scan': {k: v for k, v in scan.items() if k != 'position'},
+        }
+
+    def confirm_refined_position(self) -> bool:
+        """
+        复测精细搜索得到的位置：锁定模式已激活，evaluate_dual_fitness内部按锁定阈值判断是否锁定
+        返回: 是否已锁定
+        """
+        refinement = self.local_refinement_result
+        if refinement is None or not self.is_running:
+            return False
+        
+        self.evaluate_dual_fitness(refinement['refined_individual_A'], refinement['refined_individual_B'])
+        refinement['evaluations'] += 1
+        refinement['locked'] = self.lock_position_A is not None
+        if refinement['locked']:
+            refinement['evaluations_saved'] = max(
+                0, refinement['remaining_generation_evaluations'] - refinement['evaluations'])
+        
+        record = {k: v for k, v in refinement.items()
+                  if k not in ('refined_individual_A', 'refined_individual_B')}
+        self.history['local_refinement'].append(record)
+        
+        if self.progress_callback:
+            self.progress_callback({
+                'type': 'local_refinement_completed',
+                'refinement': record,
+                'timestamp': datetime.now().isoformat(),
+                'message': (f"局部精细搜索: {refinement['evaluations']} 次评估，"
+                            f"功率 {refinement['refined_fitness']:.6f}mW，"
+                            + (f"已锁定，最多节省 {refinement['evaluations_saved']} 次评估（相对剩余代数预算）"
+                               if refinement['locked'] else "未满足锁定条件，继续锁定模式优化"))
+            })
+        return refinement['locked']
+
     # =============================================================================
     # 位置锁定模式功能
     # =============================================================================
@@ -700,15 +971,18 @@ class DualEndGeneticAlgorithmOptimizer:
             })
     def start_high_power_keep_mode_from_gui(self, center_individual_A: np.ndarray = None, 
                                         center_individual_B: np.ndarray = None,
-                                        current_fitness: float = None):
+                                        current_fitness: float = None,
+                                        keep_method: str = None):
         """
         从GUI启动高功率保持模式
-        以当前坐标为中心点，使用较小的搜索范围和扰动生成种群
+        'population'：以当前坐标为中心点，使用较小的搜索范围和扰动生成种群
+        'dither'：以当前坐标为中心启动抖动锁相跟踪（见 dither_tracker.py）
         
         参数:
             center_individual_A: A端中心个体（如为None则使用当前最佳个体）
             center_individual_B: B端中心个体（如为None则使用当前最佳个体）
             current_fitness: 当前适应度（如为None则使用当前最佳适应度）
+            keep_method: 保持方式（如为None则使用配置high_power_keep_method）
         """
         # 确定中心点和适应度
         if center_individual_A is None and self.best_individual_A is not None:
@@ -729,6 +1003,15 @@ class DualEndGeneticAlgorithmOptimizer:
         # 停止当前优化
         self.is_running = False
         
+        if (keep_method or self.high_power_keep_method) == 'dither':
+            with self._keep_request_lock:
+                if self._run_active:
+                    # 优化线程可能正在评估，两个线程不能同时指挥PZT：由run()退出评估循环后启动
+                    self._pending_dither_request = (center_individual_A, center_individual_B, current_fitness)
+                    print("等待当前评估结束后启动抖动锁相跟踪")
+                    return True
+            return self.start_dither_tracking(center_individual_A, center_individual_B, current_fitness)
+        
         # 设置高功率保持模式参数
         self.high_power_keep_mode = True
         self.optimization_phase = OptimizationPhase.BOTH_FIXED
@@ -741,7 +1024,8 @@ class DualEndGeneticAlgorithmOptimizer:
         self.gene_crossover_rate = self.high_power_crossover_rate
         self.chromosome_crossover_rate = 0.1  # 高功率模式下降低染色体交叉率
         
-        # 创建以中心点为基础的小范围种群
+        # 创建以中心点为基础的小范围种群（均为新位置，无已测量精英）
+        self.elite_rows = 0
         self.population_A = self._create_population_around_center(
             center_individual_A, 
             self.selected_variables_A, 
@@ -790,6 +1074,56 @@ class DualEndGeneticAlgorithmOptimizer:
         
         return True
 
+    def start_dither_tracking(self, center_individual_A: np.ndarray, center_individual_B: np.ndarray,
+                              current_fitness: float = None) -> bool:
+        """以给定中心启动抖动锁相跟踪（在后台线程中连续运行，直到stop）"""
+        if self.dither_tracker is not None:
+            self.dither_tracker.stop()
+        
+        self.high_power_keep_mode = True
+        self.optimization_phase = OptimizationPhase.BOTH_FIXED
+        self.dither_tracker = DitherTracker(
+            self.hardware_adapter,
+            self.selected_variables_A,
+            self.selected_variables_B,
+            self.search_range_A,
+            self.search_range_B,
+            center_individual_A,
+            center_individual_B,
+            config=self.dither_config,
+            progress_callback=self._on_dither_progress,
+            fixed_position=self.get_full_position_dict(center_individual_A, center_individual_B)
+        )
+        self.dither_tracker.start()
+        
+        tracker_status = self.dither_tracker.get_status()
+        self.history['enhanced_exploration_events'].append({
+            'event_type': 'dither_tracking_started_from_gui',
+            'timestamp': datetime.now().isoformat(),
+            'center_individual_A': np.asarray(center_individual_A).tolist(),
+            'center_individual_B': np.asarray(center_individual_B).tolist(),
+            'current_fitness': current_fitness,
+            'dither_amplitude': tracker_status['amplitude'],
+            'dither_frequencies': tracker_status['frequencies']
+        })
+        
+        if self.progress_callback:
+            self.progress_callback({
+                'type': 'high_power_mode_started',
+                'keep_method': 'dither',
+                'center_position_A': {f'A_{var}': center_individual_A[i] for i, var in enumerate(self.selected_variables_A)},
+                'center_position_B': {f'B_{var}': center_individual_B[i] for i, var in enumerate(self.selected_variables_B)},
+                'current_fitness': current_fitness,
+                'timestamp': datetime.now().isoformat(),
+                'message': f"从GUI启动抖动锁相跟踪，抖动幅度: ±{tracker_status['amplitude']*100:.2f}%量程"
+            })
+        return True
+
+    def is_dither_tracking_pending(self) -> bool:
+        """抖动跟踪请求是否在等待优化线程结束当前评估（尚未启动）"""
+        with self._keep_request_lock:
+            return self._pending_dither_request is not None
+
     def _create_population_around_center(self, center_individual: np.ndarray, 
                                     selected_variables: List[str], 
                                     search_range: Dict,
@@ -806,29 +1140,13 @@ class DualEndGeneticAlgorithmOptimizer:
         返回:
             population: 新种群
         """
-        population = np.zeros((self.population_size, len(selected_variables)))
+        lower_bounds, upper_bounds = get_bounds(selected_variables, search_range)
+        population = np.tile(np.asarray(center_individual, dtype=float), (self.population_size, 1))
         
-        for i in range(self.population_size):
-            if i == 0:
-                # 第一个个体就是中心点（不加扰动）
-                population[i] = center_individual.copy()
-            else:
-                # 其他个体添加小范围扰动
-                perturbed_individual = center_individual.copy()
-                
-                for j, var in enumerate(selected_variables):
-                    lower, upper = search_range[var]
-                    range_size = upper - lower
-                    
-                    # 计算扰动幅度
-                    perturbation_range = range_size * self.high_power_perturbation_strength
-                    perturbation = np.random.normal(0, perturbation_range)
-                    perturbed_individual[j] += perturbation
-                    
-                    # 确保在搜索范围内
-                    perturbed_individual[j] = np.clip(perturbed_individual[j], lower, upper)
-                
-                population[i] = perturbed_individual
+        # 第一个个体就是中心点（不加扰动），其他个体添加小范围扰动并裁剪到搜索范围内
+        population[1:] = gaussian_perturbation(
+            self.rng, population[1:], lower_bounds, upper_bounds, self.high_power_perturbation_strength
+        )
         
         return population
     def check_lock_mode_condition(self, current_fitness: float, current_individual_A: np.ndarray, 
@@ -930,24 +1248,142 @@ class DualEndGeneticAlgorithmOptimizer:
 
         return position_dict
 
+    def _create_evaluation_scheduler(self) -> EvaluationScheduler:
+        """根据搜索范围和稳定代价权重创建评估顺序调度器"""
+        lower_bounds = []
+        upper_bounds = []
+        weights = []
+        for variables, search_range, cost_weights in (
+                (self.selected_variables_A, self.search_range_A, self.settle_cost_weights_A),
+                (self.selected_variables_B, self.search_range_B, self.settle_cost_weights_B)):
+            for var in variables:
+                lower, upper = search_range[var]
+                lower_bounds.append(lower)
+                upper_bounds.append(upper)
+                weights.append(cost_weights.get(var, 1.0))
+        return EvaluationScheduler(np.array(lower_bounds), np.array(upper_bounds), np.array(weights))
+
+    def _update_normalization(self):
+        """按当前搜索范围计算A端与B端变量拼接后的归一化下界和量程"""
+        lower_A, upper_A = self.bounds_A
+        lower_B, upper_B = self.bounds_B
+        self.lower_bounds = np.concatenate([lower_A, lower_B])
+        span = np.concatenate([upper_A, upper_B]) - self.lower_bounds
+        self.span = np.where(span > 0, span, 1.0)
+
+    def _normalize(self, points: np.ndarray) -> np.ndarray:
+        """绝对坐标 -> 归一化坐标（搜索范围映射到[0,1]）"""
+        return (points - self.lower_bounds) / self.span
+
+    def _denormalize(self, points: np.ndarray) -> np.ndarray:
+        """归一化坐标 -> 绝对坐标"""
+        return points * self.span + self.lower_bounds
+
+    def set_search_ranges(self, search_range_A: Dict, search_range_B: Dict):
+        """更新搜索范围，并重建依赖范围的边界、归一化、评估顺序调度、适应度缓存和代理模型"""
+        self.search_range_A = dict(search_range_A)
+        self.search_range_B = dict(search_range_B)
+        self.bounds_A = get_bounds(self.selected_variables_A, self.search_range_A)
+        self.bounds_B = get_bounds(self.selected_variables_B, self.search_range_B)
+        self._update_normalization()
+        self.evaluation_scheduler = self._create_evaluation_scheduler()
+        if self.fitness_cache is not None:
+            self.fitness_cache = self._create_fitness_cache()
+        if self.surrogate is not None:
+            self.surrogate = self._create_surrogate()
+            self._surrogate_synced = 0
+            # 历史中的预测记录指向新代理模型（旧模型的记录属于缩小范围之前）
+            self.history['surrogate_prediction_log'] = self.surrogate.prediction_log
+        print(f"搜索范围已更新: A端 { {var: self.search_range_A[var] for var in self.selected_variables_A} }, "
+              f"B端 { {var: self.search_range_B[var] for var in self.selected_variables_B} }")
+    
+    def _create_fitness_cache(self) -> FitnessCache:
+        """根据搜索范围创建适应度缓存，量化分辨率缺省为量程/2^16（执行器DAC分辨率）"""
+        lower_bounds = []
+        resolution = []
+        for variables, search_range, custom_resolution in (
+                (self.selected_variables_A, self.search_range_A, self.fitness_cache_resolution_A),
+                (self.selected_variables_B, self.search_range_B, self.fitness_cache_resolution_B)):
+            for var in variables:
+                lower, upper = search_range[var]
+                lower_bounds.append(lower)
+                default_resolution = (upper - lower) / 2 ** 16 if upper > lower else 1.0
+                resolution.append(custom_resolution.get(var, default_resolution))
+        return FitnessCache(
+            np.array(lower_bounds), np.array(resolution),
+            ttl=self.fitness_cache_ttl,
+            drift_check_rate=self.fitness_cache_drift_check_rate,
+            drift_tolerance=self.fitness_cache_drift_tolerance,
+            drift_tolerance_absolute=self.fitness_cache_drift_tolerance_absolute,
+            rng=self.rng
+        )
+
+    def _create_surrogate(self) -> GaussianProcessSurrogate:
+        """根据搜索范围创建代理模型"""
+        lower_A, upper_A = self.bounds_A
+        lower_B, upper_B = self.bounds_B
+        return GaussianProcessSurrogate(
+            np.concatenate([lower_A, lower_B]), np.concatenate([upper_A, upper_B]),
+            max_points=self.surrogate_max_points,
+            min_points=self.surrogate_min_points
+        )
+
+    def _sync_surrogate(self) -> bool:
+        """把search_history中新增的测量记录加入代理模型并重新拟合，返回模型是否可用"""
+        columns = self.history['search_history'].columns(self._surrogate_synced)
+        self._surrogate_synced = len(self.history['search_history'])
+        if len(columns['power']):
+            self.surrogate.add(columns['points'], columns['power'].copy())
+        return self.surrogate.fit()
+
+    def _generate_children(self, population_A: np.ndarray, population_B: np.ndarray, fitness: np.ndarray,
+                           child_count: int, row_offset: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        生成子代：代理模型可用时先生成候选池，按采集函数挑选surrogate_ratio比例的子代，
+        其余从候选池中随机抽取；同时记录每个子代的预测值用于评估后对比
+        """
+        self.surrogate_predictions = {}
+        if self.surrogate is None or not self._sync_surrogate():
+            return generate_offspring(
+                self.rng, population_A, population_B, fitness, child_count,
+                self.tournament_size, self.chromosome_crossover_rate,
+                self.gene_crossover_rate, self.gene_mutation_rate,
+                self.bounds_A, self.bounds_B
+            )
+        
+        pool_size = child_count * max(1, int(self.surrogate_pool_factor))
+        pool_A, pool_B = generate_offspring(
+            self.rng, population_A, population_B, fitness, pool_size,
+            self.tournament_size, self.chromosome_crossover_rate,
+            self.gene_crossover_rate, self.gene_mutation_rate,
+            self.bounds_A, self.bounds_B
+        )
+        pool = np.hstack([pool_A, pool_B])
+        screened_count = int(round(child_count * min(max(self.surrogate_ratio, 0.0), 1.0)))
+        screened, _, _ = self.surrogate.select(pool, screened_count, self.surrogate_acquisition)
+        remaining = np.setdiff1d(np.arange(pool_size), screened)
+        random_picks = self.rng.choice(remaining, child_count - len(screened), replace=False)
+        chosen = np.concatenate([screened, random_picks]).astype(int)
+        
+        mean, std = self.surrogate.predict(pool[chosen])
+        for k in range(child_count):
+            self.surrogate_predictions[row_offset + k] = (mean[k], std[k], k < len(screened))
+        return pool_A[chosen], pool_B[chosen]
+
     def initialize_populations(self):
         """初始化A、B两端的种群"""
         # 正常模式：随机初始化
         self.population_A = self._initialize_single_population(self.selected_variables_A, self.search_range_A)
         self.population_B = self._initialize_single_population(self.selected_variables_B, self.search_range_B)
+        self.elite_rows = 0
         
         print(f"A端种群初始化完成，维度: {self.population_A.shape}")
         print(f"B端种群初始化完成，维度: {self.population_B.shape}")
 
     def _initialize_single_population(self, selected_variables: List[str], search_range: Dict) -> np.ndarray:
         """初始化单个种群"""
-        population = np.zeros((self.population_size, len(selected_variables)))
-        
-        for i, var in enumerate(selected_variables):
-            lower, upper = search_range[var]
-            population[:, i] = np.random.uniform(lower, upper, self.population_size)
-            
-        return population
+        lower_bounds, upper_bounds = get_bounds(selected_variables, search_range)
+        return uniform_population(self.rng, self.population_size, lower_bounds, upper_bounds)
 
     def get_power_value(self, power_result):
         """
@@ -976,7 +1412,9 @@ class DualEndGeneticAlgorithmOptimizer:
         """
         评估A、B两端组合的适应度
         """
+        evaluation_start = time.perf_counter()
         position_dict = self.get_full_position_dict(individual_A, individual_B)
+        self.last_evaluation_failed = False
         
         try:
             # 使用硬件适配器测量功率
@@ -985,6 +1423,14 @@ class DualEndGeneticAlgorithmOptimizer:
             # 从功率结果中提取功率值
             power = self.get_power_value(power_result)
             
+            # 本次评估的实际稳定时间
+            settle_info = getattr(self.hardware_adapter, 'last_settle_info', None)
+            settle_time = settle_info['settle_time'] if settle_info else None
+            self._record_evaluation_metrics(power, settle_time)
+            
+            self.stage_position_A = np.array(individual_A, dtype=float)
+            self.stage_position_B = np.array(individual_B, dtype=float)
+            
             # 检测通光
             if not self.light_detected and power >= self.light_threshold:
                 self.light_detected = True
@@ -996,64 +1442,187 @@ class DualEndGeneticAlgorithmOptimizer:
                     # 位置锁定条件满足，停止当前评估
                     return power
             
-            # 记录评估历史
+            # 记录评估历史（列式存储，不再为每次评估保存嵌套字典）
+            bookkeeping_start = time.perf_counter()
             self.history['evaluation_count'] += 1
-            evaluation_record = {
-                'position_A': {f'A_{var}': individual_A[i] for i, var in enumerate(self.selected_variables_A)},
-                'position_B': {f'B_{var}': individual_B[i] for i, var in enumerate(self.selected_variables_B)},
-                'power': power,
-                'power_result': power_result if isinstance(power_result, dict) else {'power': power},
-                'timestamp': datetime.now().isoformat(),
-                'evaluation_index': self.history['evaluation_count'],
-                'optimization_phase': self.optimization_phase.value,
-                'light_detected': self.light_detected
-            }
-            self.history['search_history'].append(evaluation_record)
+            self.history['search_history'].append_evaluation(
+                individual_A, individual_B, power,
+                evaluation_index=self.history['evaluation_count'],
+                optimization_phase=self.optimization_phase.value,
+                light_detected=self.light_detected,
+                settle_time=settle_time,
+                power_result=power_result if isinstance(power_result, dict) else None
+            )
+            if self.run_journal is not None:
+                self.run_journal.write_evaluation(
+                    individual_A, individual_B, power, self.history['evaluation_count'],
+                    self.optimization_phase.value, self.light_detected, settle_time
+                )
+            self.span_recorder.add('bookkeeping', bookkeeping_start)
             
             # 发送评估数据到GUI
-            if self.progress_callback:
-                self.progress_callback({
-                    'type': 'evaluation',
-                    'evaluation_data': {
-                        'evaluation_count': self.history['evaluation_count'],
-                        'power': power,
-                        'position_A': evaluation_record['position_A'],
-                        'position_B': evaluation_record['position_B'],
-                        'individual_A': individual_A.tolist(),
-                        'individual_B': individual_B.tolist(),
-                        'timestamp': datetime.now().isoformat(),
-                        'optimization_phase': self.optimization_phase.value,
-                        'light_detected': self.light_detected
-                    }
-                })
+            self._send_evaluation_callback(individual_A, individual_B, power, settle_time,
+                                           settle_info['method'] if settle_info else None)
             
+            self.span_recorder.add('evaluation', evaluation_start)
             return power
             
         except Exception as e:
             print(f"评估失败: {e}")
+            self.last_evaluation_failed = True
+            self.metrics.inc('measurement_failures_total', labels={'stage': 'evaluation'})
             return 0.0
 
+    def _send_evaluation_callback(self, individual_A: np.ndarray, individual_B: np.ndarray, power: float,
+                                  settle_time: Optional[float] = None, settle_method: Optional[str] = None,
+                                  cached: bool = False):
+        """发送单次评估的进度消息（cached=True表示适应度来自缓存或本代重复个体，未实际测量）"""
+        if not self.progress_callback:
+            return
+        callback_start = time.perf_counter()
+        self.progress_callback({
+            'type': 'evaluation',
+            'evaluation_data': {
+                'evaluation_count': self.history['evaluation_count'],
+                'power': power,
+                'position_A': {f'A_{var}': individual_A[i] for i, var in enumerate(self.selected_variables_A)},
+                'position_B': {f'B_{var}': individual_B[i] for i, var in enumerate(self.selected_variables_B)},
+                'individual_A': individual_A.tolist(),
+                'individual_B': individual_B.tolist(),
+                'timestamp': datetime.now().isoformat(),
+                'optimization_phase': self.optimization_phase.value,
+                'light_detected': self.light_detected,
+                'settle_time': settle_time,
+                'settle_method': settle_method,
+                'cached': cached
+            }
+        })
+        self.span_recorder.add('callback', callback_start)
+
     def evaluate_population_pair(self, population_A: np.ndarray, population_B: np.ndarray) -> np.ndarray:
         """
         评估种群对的适应度
+        先用适应度缓存解析命中的个体，只对未命中的个体规划行程最短的顺序并测量，
+        适应度按原始索引返回
         """
         fitness = np.zeros(len(population_A))
+        pending = np.arange(len(population_A))
+        duplicates = {}    # 本代重复个体索引 -> 首个同位置个体索引
+        drift_checks = {}  # 抽样复测个体索引 -> 缓存适应度
+        cache_hits = []    # 缓存命中的个体索引
+        resolved = set()   # 已得到适应度（测量成功或缓存命中）的个体索引
+        
+        if self.fitness_cache is not None:
+            self.fitness_cache.start_generation()
+            points = np.hstack([population_A, population_B])
+            first_index = {}
+            pending = []
+            for i, point in enumerate(points):
+                key = self.fitness_cache.make_key(point)
+                if key in first_index:
+                    duplicates[i] = first_index[key]
+                    continue
+                first_index[key] = i
+                status, cached_fitness = self.fitness_cache.lookup(point)
+                if status == 'hit':
+                    fitness[i] = cached_fitness
+                    cache_hits.append(i)
+                    resolved.add(i)
+                    continue
+                if status == 'drift_check':
+                    drift_checks[i] = cached_fitness
+                pending.append(i)
+            pending = np.array(pending, dtype=int)
+        
+        # 缓存命中不测量，但与测量一样检查位置锁定条件并通知GUI
+        for i in cache_hits:
+            if not self.is_running:
+                break
+            if self.lock_mode_activated:
+                self.check_lock_mode_condition(fitness[i], population_A[i], population_B[i])
+            self._send_evaluation_callback(population_A[i], population_B[i], fitness[i], cached=True)
+        
+        elite_indices = [k for k, i in enumerate(pending) if i < self.elite_rows]
+        order = pending[self._plan_evaluation_order(population_A[pending], population_B[pending], elite_indices)]
         
-        for i in range(len(population_A)):
+        for i in order:
             if not self.is_running:
                 break
                 
             individual_A = population_A[i]
             individual_B = population_B[i]
+            eval_start = time.perf_counter()
             fitness[i] = self.evaluate_dual_fitness(individual_A, individual_B)
             
+            if i in self.surrogate_predictions and not self.last_evaluation_failed:
+                predicted, predicted_std, screened = self.surrogate_predictions[i]
+                self.surrogate.record_prediction(predicted, predicted_std, fitness[i],
+                                                 len(self.history['generations']) + 1, screened)
+            
+            if not self.last_evaluation_failed:
+                resolved.add(i)
+            
+            if self.fitness_cache is not None and not self.last_evaluation_failed:
+                if i in drift_checks:
+                    self.fitness_cache.check_drift(drift_checks[i], fitness[i])
+                self.fitness_cache.store(np.concatenate([individual_A, individual_B]), fitness[i],
+                                         time.perf_counter() - eval_start)
+        
+        # 重复个体只复用已得到的适应度（评估循环提前结束或测量失败时保持未评估）
+        for i, source in duplicates.items():
+            if source not in resolved:
+                continue
+            fitness[i] = fitness[source]
+            self.fitness_cache.record_duplicate()
+            self._send_evaluation_callback(population_A[i], population_B[i], fitness[i], cached=True)
+        
+        if self.fitness_cache is not None:
+            self.last_cache_stats = self.fitness_cache.get_statistics()
+            generation_stats = self.last_cache_stats['generation']
+            print(f"适应度缓存: 命中 {generation_stats['hits']}/{len(population_A)} "
+                  f"(命中率 {generation_stats['hit_rate']*100:.1f}%), 节省约 {generation_stats['saved_seconds']:.2f}s")
+        
+        self.last_surrogate_stats = None
+        if self.surrogate is not None and self.surrogate_predictions:
+            self.last_surrogate_stats = self.surrogate.get_prediction_statistics(len(self.history['generations']) + 1)
+            if self.last_surrogate_stats:
+                correlation = self.last_surrogate_stats['correlation']
+                print(f"代理模型: 预测RMSE {self.last_surrogate_stats['rmse']:.6g}, "
+                      f"2σ内 {self.last_surrogate_stats['within_2_sigma']*100:.0f}%, "
+                      f"相关系数 {correlation if correlation is not None else float('nan'):.3f}")
+        self.surrogate_predictions = {}
+            
         return fitness
 
+    def _plan_evaluation_order(self, population_A: np.ndarray, population_B: np.ndarray,
+                               elite_indices=None) -> np.ndarray:
+        """规划本代的评估顺序并记录路径长度"""
+        if not self.evaluation_ordering or len(population_A) < 3:
+            self.last_schedule_info = None
+            return np.arange(len(population_A))
+        
+        if elite_indices is None:
+            elite_indices = range(min(self.elite_rows, len(population_A)))
+        
+        start_point = None
+        if self.stage_position_A is not None and self.stage_position_B is not None:
+            start_point = np.concatenate([self.stage_position_A, self.stage_position_B])
+        
+        order, self.last_schedule_info = self.evaluation_scheduler.plan(
+            np.hstack([population_A, population_B]),
+            start_point,
+            elite_indices
+        )
+        print(f"评估路径长度: {self.last_schedule_info['path_length']:.3f} "
+              f"(原顺序: {self.last_schedule_info['naive_path_length']:.3f}, "
+              f"节省 {self.last_schedule_info['path_saving_percent']:.1f}%)")
+        return order
+
     def create_new_population_enhanced(self, population_A: np.ndarray, population_B: np.ndarray, 
                                  fitness: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
         增强的种群生成机制
-        包含染色体交叉操作（A端和B端染色体交叉）
+        包含染色体交叉操作（A端和B端染色体交叉），整代子代以数组运算一次生成
         """
         new_population_A = np.zeros_like(population_A)
         new_population_B = np.zeros_like(population_B)
@@ -1065,124 +1634,129 @@ class DualEndGeneticAlgorithmOptimizer:
             new_population_A[:elite_count] = population_A[elite_indices]
             new_population_B[:elite_count] = population_B[elite_indices]
         
-        # 2. 锦标赛选择和遗传操作
-        current_idx = elite_count
-        while current_idx < len(new_population_A):
-            # 选择父母
-            parent1_idx = self._tournament_selection(fitness, self.tournament_size)
-            parent2_idx = self._tournament_selection(fitness, self.tournament_size)
-            
-            parent1_A = population_A[parent1_idx]
-            parent1_B = population_B[parent1_idx]
-            parent2_A = population_A[parent2_idx]
-            parent2_B = population_B[parent2_idx]
-            
-            # 决定是否进行染色体交叉
-            if np.random.random() < self.chromosome_crossover_rate:
-                # 染色体交叉：交换A端和B端染色体，并进行基因操作
-                # 个体1的A端与个体2的B端结合形成新个体1
-                child1_A = parent1_A.copy()
-                child1_B = parent2_B.copy()
-                
-                # 个体1的B端与个体2的A端结合形成新个体2
-                child2_A = parent2_A.copy()
-                child2_B = parent1_B.copy()
-                
-                # 对染色体交叉后的个体进行基因交叉（如果进行染色体交叉）
-                if np.random.random() < self.gene_crossover_rate:
-                    child1_A, child2_A = self._gene_crossover(child1_A, child2_A)
-                    child1_B, child2_B = self._gene_crossover(child1_B, child2_B)
-                
-                # 对染色体交叉后的个体进行基因变异
-                child1_A = self._mutate_genes(child1_A, self.selected_variables_A, self.search_range_A)
-                child1_B = self._mutate_genes(child1_B, self.selected_variables_B, self.search_range_B)
-                child2_A = self._mutate_genes(child2_A, self.selected_variables_A, self.search_range_A)
-                child2_B = self._mutate_genes(child2_B, self.selected_variables_B, self.search_range_B)
-            else:
-                # 正常基因交叉和变异
-                if np.random.random() < self.gene_crossover_rate:
-                    child1_A, child2_A = self._gene_crossover(parent1_A, parent2_A)
-                    child1_B, child2_B = self._gene_crossover(parent1_B, parent2_B)
-                else:
-                    child1_A, child2_A = parent1_A.copy(), parent2_A.copy()
-                    child1_B, child2_B = parent1_B.copy(), parent2_B.copy()
-                
-                # 基因变异
-                child1_A = self._mutate_genes(child1_A, self.selected_variables_A, self.search_range_A)
-                child2_A = self._mutate_genes(child2_A, self.selected_variables_A, self.search_range_A)
-                child1_B = self._mutate_genes(child1_B, self.selected_variables_B, self.search_range_B)
-                child2_B = self._mutate_genes(child2_B, self.selected_variables_B, self.search_range_B)
-            
-            # 添加到新种群
-            if current_idx < len(new_population_A):
-                new_population_A[current_idx] = child1_A
-                new_population_B[current_idx] = child1_B
-                current_idx += 1
-            if current_idx < len(new_population_A):
-                new_population_A[current_idx] = child2_A
-                new_population_B[current_idx] = child2_B
-                current_idx += 1
+        # 2. 锦标赛选择和遗传操作（批量，代理模型可用时先预筛选）
+        child_count = len(new_population_A) - elite_count
+        if child_count > 0:
+            new_population_A[elite_count:], new_population_B[elite_count:] = self._generate_children(
+                population_A, population_B, fitness, child_count, elite_count
+            )
         
+        self.elite_rows = elite_count
         return new_population_A, new_population_B
 
     def _tournament_selection(self, fitness: np.ndarray, tournament_size: int) -> int:
         """锦标赛选择"""
-        candidates = np.random.choice(len(fitness), tournament_size, replace=False)
-        return candidates[np.argmax(fitness[candidates])]
+        return int(tournament_selection(self.rng, fitness, 1, tournament_size)[0])
 
     def _gene_crossover(self, parent1: np.ndarray, parent2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """基因交叉：模拟二进制交叉"""
-        child1 = parent1.copy()
-        child2 = parent2.copy()
-        
-        for i in range(len(parent1)):
-            if np.random.random() < 0.5:  # 50%概率进行交叉
-                alpha = np.random.random()
-                child1[i] = alpha * parent1[i] + (1 - alpha) * parent2[i]
-                child2[i] = alpha * parent2[i] + (1 - alpha) * parent1[i]
-                
-        return child1, child2
+        """基因交叉：每个基因50%概率进行混合交叉"""
+        child1, child2 = blend_crossover(self.rng, parent1[None, :], parent2[None, :])
+        return child1[0], child2[0]
 
     def _mutate_genes(self, individual: np.ndarray, selected_variables: List[str], 
                      search_range: Dict) -> np.ndarray:
         """基因变异操作"""
-        mutated = individual.copy()
-        
-        for i, var in enumerate(selected_variables):
-            if np.random.random() < self.gene_mutation_rate:
-                lower, upper = search_range[var]
-                mutation_strength = (upper - lower) * 0.1
-                mutation = np.random.normal(0, mutation_strength)
-                mutated[i] += mutation
-                mutated[i] = np.clip(mutated[i], lower, upper)
-                
-        return mutated
+        lower_bounds, upper_bounds = get_bounds(selected_variables, search_range)
+        return gaussian_mutation(self.rng, individual[None, :], self.gene_mutation_rate,
+                                 lower_bounds, upper_bounds)[0]
 
     def _apply_small_perturbation(self, individual: np.ndarray, selected_variables: List[str],
                                  search_range: Dict, perturbation_strength: float = 0.01) -> np.ndarray:
         """应用小范围扰动，用于染色体交叉后的微小变异"""
-        perturbed = individual.copy()
-        
-        for i, var in enumerate(selected_variables):
-            lower, upper = search_range[var]
-            range_size = upper - lower
-            perturbation = np.random.normal(0, range_size * perturbation_strength)
-            perturbed[i] += perturbation
-            perturbed[i] = np.clip(perturbed[i], lower, upper)
-                
-        return perturbed
+        lower_bounds, upper_bounds = get_bounds(selected_variables, search_range)
+        return gaussian_perturbation(self.rng, individual[None, :], lower_bounds, upper_bounds,
+                                     perturbation_strength)[0]
 
     # 修改 run 方法中的收敛处理逻辑
+    def run_first_light_stage(self) -> Optional[Dict]:
+        """
+        首次通光扫描（见 light_search.py）
+        找到光后以命中位置为中心、±first_light_handoff_range 缩小扫描轴的搜索范围，
+        其余轴保持原范围；未找到时不改变搜索范围
+        """
+        ranges = {f'A_{var}': tuple(self.search_range_A[var]) for var in self.selected_variables_A}
+        ranges.update({f'B_{var}': tuple(self.search_range_B[var]) for var in self.selected_variables_B})
+        scan_axes = list(self.first_light_config['first_light_inner_axes']) + \
+            list(self.first_light_config['first_light_outer_axes'])
+        missing = [axis for axis in scan_axes if axis not in ranges]
+        if missing:
+            print(f"首次通光扫描跳过: 扫描轴 {missing} 不在优化变量中")
+            return None
+        
+        # 起点：硬件适配器保存的初始位置，否则为搜索范围中心
+        center_A = (self.bounds_A[0] + self.bounds_A[1]) / 2
+        center_B = (self.bounds_B[0] + self.bounds_B[1]) / 2
+        base_position = self.get_full_position_dict(center_A, center_B)
+        initial_positions = getattr(self.hardware_adapter, 'initial_positions', None) or {}
+        for axis in scan_axes:
+            side, var = axis.split('_', 1)
+            hardware_axis = var if side == 'A' else f'b{var}'
+            if hardware_axis in initial_positions:
+                base_position[axis] = initial_positions[hardware_axis]
+        
+        threshold = self.first_light_threshold
+        if threshold is None:
+            # 只需明显高于本底噪声，远低于判定通光的light_threshold
+            threshold = self.light_threshold * self.first_light_config['first_light_threshold_fraction']
+        scanner = FirstLightScanner(
+            self.hardware_adapter, base_position, ranges, threshold, self.first_light_config,
+            should_continue=lambda: self.is_running,
+            progress_callback=self.progress_callback
+        )
+        result = scanner.run()
+        
+        if result['found']:
+            half_range = self.first_light_config['first_light_handoff_range']
+            search_range_A = dict(self.search_range_A)
+            search_range_B = dict(self.search_range_B)
+            for axis, value in result['hit_position'].items():
+                side, var = axis.split('_', 1)
+                search_range = search_range_A if side == 'A' else search_range_B
+                lower, upper = search_range[var]
+                search_range[var] = (max(lower, value - half_range), min(upper, value + half_range))
+            self.set_search_ranges(search_range_A, search_range_B)
+            result['handoff_range_A'] = {var: self.search_range_A[var] for var in self.selected_variables_A}
+            result['handoff_range_B'] = {var: self.search_range_B[var] for var in self.selected_variables_B}
+        
+        self.first_light_result = result
+        self.history['first_light'] = result
+        if self.progress_callback:
+            self.progress_callback({
+                'type': 'first_light_completed',
+                'first_light_data': dict(result, timestamp=datetime.now().isoformat())
+            })
+        return result
+    
     def run(self):
         """运行双端优化过程"""
         self.is_running = True
+        with self._keep_request_lock:
+            self._run_active = True
         start_time = time.time()
         
-        # 初始化种群
-        self.initialize_populations()
+        resume_generation, self._resume_generation = self._resume_generation, 0
+        resume_journal_path, self._resume_journal_path = self._resume_journal_path, None
+        if resume_generation:
+            # 从运行日志恢复：种群和状态已由resume_from_journal()还原
+            start_generation = resume_generation + 1
+            print(f"从第{start_generation}代继续优化")
+        else:
+            start_generation = 1
+            
+            # 首次通光扫描（找到光后缩小搜索范围，再初始化种群）
+            if self.first_light_scan and not self.light_detected:
+                self.run_first_light_stage()
+            
+            # 初始化种群
+            self.initialize_populations()
+        
+        self._open_run_journal(resume_journal_path, resume_generation)
+        self.span_recorder.reset()
+        self._attach_span_recorder()
+        self._start_metrics()
         
         try:
-            for generation in range(1, self.generations + 1):
+            for generation in range(start_generation, self.generations + 1):
                 if not self.is_running:
                     break
                 
@@ -1212,6 +1786,9 @@ class DualEndGeneticAlgorithmOptimizer:
                 
                 # 评估种群
                 fitness = self.evaluate_population_pair(self.population_A, self.population_B)
+                schedule_info = self.last_schedule_info
+                cache_stats = self.last_cache_stats['generation'] if self.last_cache_stats else None
+                surrogate_stats = self.last_surrogate_stats
                 
                 # 更新最佳解
                 current_best_idx = np.argmax(fitness)
@@ -1238,10 +1815,19 @@ class DualEndGeneticAlgorithmOptimizer:
                         print(f"第{generation}代: 检测到全局收敛，进入位置锁定模式")
                         self.final_convergence = True
                         
-                        # 保存当前最佳个体为锁定参考
+                        # 局部精细搜索（在激活锁定模式之前完成，避免搜索途中被锁定）
+                        refinement = None
+                        if self.local_refinement_enabled:
+                            refinement = self.run_local_refinement(generation)
+                        
+                        # 保存当前最佳个体为锁定参考（有精细搜索结果时以精细搜索位置为参考）
                         self.best_fitness_memory = self.best_fitness
                         self.best_individual_A_memory = self.best_individual_A.copy() if self.best_individual_A is not None else None
                         self.best_individual_B_memory = self.best_individual_B.copy() if self.best_individual_B is not None else None
+                        if refinement is not None:
+                            self.best_fitness_memory = refinement['refined_fitness']
+                            self.best_individual_A_memory = refinement['refined_individual_A'].copy()
+                            self.best_individual_B_memory = refinement['refined_individual_B'].copy()
                         
                         # 激活位置锁定模式，但继续优化
                         self.activate_lock_mode()
@@ -1258,6 +1844,10 @@ class DualEndGeneticAlgorithmOptimizer:
                                 'timestamp': datetime.now().isoformat(),
                                 'message': f"检测到全局收敛，进入位置锁定模式等待锁定条件满足"
                             })
+                        
+                        # 复测精细搜索位置，满足锁定条件时直接停止
+                        if refinement is not None and self.confirm_refined_position():
+                            break
                 
                 # 检查是否已经满足锁定条件（如果已激活锁定模式）
                 if self.lock_mode_activated:
@@ -1277,6 +1867,7 @@ class DualEndGeneticAlgorithmOptimizer:
                     self.population_A, self.population_B = self.high_power_mode.create_new_population(
                         self.population_A, self.population_B, fitness
                     )
+                    self.elite_rows = 1  # 高功率模式保留一个最佳个体
                     
                     # 更新搜索中心
                     best_idx = np.argmax(fitness)
@@ -1300,9 +1891,15 @@ class DualEndGeneticAlgorithmOptimizer:
                 
                 # 记录历史
                 self._update_history(generation, fitness)
+                self._journal_generation(generation, fitness)
+                timing = self._collect_timing_spans(generation)
+                self.metrics.set('generation', generation)
+                if cache_stats:
+                    self.metrics.set('fitness_cache_hit_rate', cache_stats['hit_rate'])
                 
                 # 进度回调到GUI
                 if self.progress_callback:
+                    callback_start = time.perf_counter()
                     # 获取最佳配对
                     if self.best_individual_A is not None and self.best_individual_B is not None:
                         best_individual_A = self.best_individual_A
@@ -1352,9 +1949,17 @@ class DualEndGeneticAlgorithmOptimizer:
                             'population_size': self.population_size,
                             'gene_mutation_rate': self.gene_mutation_rate,
                             'gene_crossover_rate': self.gene_crossover_rate,
-                            'chromosome_crossover_rate': self.chromosome_crossover_rate
+                            'chromosome_crossover_rate': self.chromosome_crossover_rate,
+                            'path_length': schedule_info['path_length'] if schedule_info else None,
+                            'naive_path_length': schedule_info['naive_path_length'] if schedule_info else None,
+                            'cache_hit_rate': cache_stats['hit_rate'] if cache_stats else None,
+                            'cache_saved_seconds': cache_stats['saved_seconds'] if cache_stats else None,
+                            'surrogate_rmse': surrogate_stats['rmse'] if surrogate_stats else None,
+                            'surrogate_correlation': surrogate_stats['correlation'] if surrogate_stats else None,
+                            'timing': timing
                         }
                     })
+                    self.span_recorder.add('callback', callback_start)
             
             # 优化完成
             optimization_time = time.time() - start_time
@@ -1393,6 +1998,9 @@ class DualEndGeneticAlgorithmOptimizer:
                 'final_gene_mutation_rate': self.gene_mutation_rate,
                 'final_gene_crossover_rate': self.gene_crossover_rate,
                 'final_chromosome_crossover_rate': self.chromosome_crossover_rate,
+                'local_refinement': self.history['local_refinement'][-1] if self.history['local_refinement'] else None,
+                'first_light': self.first_light_result,
+                'run_journal': self.run_journal.path if self.run_journal is not None else None,
                 'history': self.history
             }
             
@@ -1408,6 +2016,15 @@ class DualEndGeneticAlgorithmOptimizer:
                 'selected_variables_A': self.selected_variables_A,
                 'selected_variables_B': self.selected_variables_B
             }
+        
+        get_span_recorder().detach(self.span_recorder)
+        
+        # 优化线程已不再下发位置指令，启动运行期间请求的抖动跟踪
+        if self._finish_run_and_start_pending_tracking() and result.get('success'):
+            result['high_power_keep_mode'] = True
+        
+        self._close_run_journal(result)
+        self.metrics.set('optimizer_running', 0)
             
         # 触发完成回调到GUI
         if self.finished_callback:
@@ -1416,6 +2033,96 @@ class DualEndGeneticAlgorithmOptimizer:
         self.is_running = False
         return result
 
+    def _finish_run_and_start_pending_tracking(self) -> bool:
+        """标记优化线程已退出评估循环；GUI在运行期间请求过抖动跟踪时在此启动，返回是否已启动"""
+        with self._keep_request_lock:
+            self._run_active = False
+            pending, self._pending_dither_request = self._pending_dither_request, None
+        if pending is None:
+            return False
+        return self.start_dither_tracking(*pending)
+
+    def _start_metrics(self):
+        """启动指标导出（进程内只有一个导出器），登记本优化器的采集函数"""
+        start_metrics_exporter(self.metrics_config)
+        self._metrics_start_time = time.time()
+        with self._metrics_lock:
+            self._metrics_evaluation_times.clear()
+            self._metrics_holding_power.clear()
+        self.metrics.add_collector('optimizer', self._collect_metrics)
+        self.metrics.set('optimizer_running', 1)
+
+    def _record_evaluation_metrics(self, power: float, settle_time: Optional[float]):
+        """每次评估更新计数器和功率（只做字典更新，导出在后台线程）"""
+        now = time.time()
+        self.metrics.inc('evaluations_total')
+        self.metrics.set('power_current', power)
+        if settle_time is not None:
+            self.metrics.observe('settle_seconds', settle_time)
+        with self._metrics_lock:
+            self._metrics_evaluation_times.append(now)
+            if self.lock_mode_activated or self.high_power_keep_mode:
+                self._metrics_holding_power.append((now, power))
+
+    def _on_dither_progress(self, message: dict):
+        """抖动跟踪的进度回调（在跟踪线程中调用）：锁定后的跟踪不经过评估，在此记录保持功率，再转发给GUI"""
+        power = message['tracking_data']['mean_power']
+        self.metrics.set('power_current', power)
+        with self._metrics_lock:
+            self._metrics_holding_power.append((time.time(), power))
+        if self.progress_callback:
+            self.progress_callback(message)
+
+    def _collect_metrics(self):
+        """导出线程中调用：计算评估速率、功率漂移率等需要窗口统计的指标"""
+        now = time.time()
+        metrics = self.metrics
+        
+        with self._metrics_lock:
+            times = np.array(self._metrics_evaluation_times)
+            holding_power = list(self._metrics_holding_power)
+        
+        rate_window = float(self.metrics_config.get('rate_window', 30.0))
+        elapsed = min(rate_window, now - self._metrics_start_time)
+        recent = int(np.count_nonzero(times >= now - rate_window)) if len(times) else 0
+        metrics.set('evaluations_per_second', recent / elapsed if elapsed > 0 else 0.0)
+        
+        drift_window = float(self.metrics_config.get('drift_window', 60.0))
+        samples = np.array([sample for sample in holding_power if sample[0] >= now - drift_window])
+        if len(samples) >= 3 and np.ptp(samples[:, 0]) > 0:
+            metrics.set('power_drift_rate', np.polyfit(samples[:, 0] - samples[0, 0], samples[:, 1], 1)[0])
+        else:
+            metrics.set('power_drift_rate', None)
+        
+        metrics.set('power_best', self.best_fitness if np.isfinite(self.best_fitness) else None)
+        metrics.set('light_detected', 1 if self.light_detected else 0)
+        metrics.set('lock_mode_active', 1 if self.lock_mode_activated else 0)
+        if self.fitness_cache is not None:
+            metrics.set('fitness_cache_hits_total', self.fitness_cache.stats['hits'])
+            metrics.set('fitness_cache_drift_invalidations_total', self.fitness_cache.stats['drift_invalidations'])
+
+    def _attach_span_recorder(self):
+        """运行期间接收共享记录器中本次运行的耗时段：运行线程及适配器的指令/预取线程"""
+        if not self.span_recorder.enabled:
+            return
+        run_thread = threading.current_thread()
+
+        def from_this_run(thread: threading.Thread) -> bool:
+            return thread is run_thread or thread.name.startswith(('pzt_move', 'pzt_prefetch'))
+
+        get_span_recorder().attach(self.span_recorder, from_this_run)
+
+    def _collect_timing_spans(self, generation: int) -> Optional[Dict]:
+        """取出本代的耗时分段汇总，记入历史并打印（上一代的generation回调计入本代）"""
+        if not self.span_recorder.enabled:
+            return None
+        timing = self.span_recorder.summary()
+        self.history['timing_spans'].append({'generation': generation, 'spans': timing})
+        if timing:
+            print("耗时 p50/p95/max (ms): " + format_span_summary(
+                timing, ['command', 'settle', 'measure', 'bookkeeping', 'callback']))
+        return timing
+
     def _update_history(self, generation: int, fitness: np.ndarray):
         """更新历史记录"""
         self.history['generations'].append(generation)
@@ -1423,16 +2130,178 @@ class DualEndGeneticAlgorithmOptimizer:
         self.history['avg_fitness'].append(np.mean(fitness))
         self.history['optimization_phase'].append(self.optimization_phase.value)
         self.history['mutation_rate_history'].append(self.gene_mutation_rate)
+        self.history['evaluation_path_length'].append(
+            self.last_schedule_info['path_length'] if self.last_schedule_info else None
+        )
+        self.history['cache_hit_rate'].append(
+            self.last_cache_stats['generation']['hit_rate'] if self.last_cache_stats else None
+        )
+        self.history['surrogate_rmse'].append(
+            self.last_surrogate_stats['rmse'] if self.last_surrogate_stats else None
+        )
         
         # 记录最佳个体
         best_idx = np.argmax(fitness)
-        self.history['best_individual_A'].append(self.population_A[best_idx].copy().tolist())
-        self.history['best_individual_B'].append(self.population_B[best_idx].copy().tolist())
+        self.history['best_individual_A'].append(self.population_A[best_idx])
+        self.history['best_individual_B'].append(self.population_B[best_idx])
         
         # 计算种群多样性
         self.history['population_diversity_A'].append(self._calculate_diversity(self.population_A))
         self.history['population_diversity_B'].append(self._calculate_diversity(self.population_B))
 
+    # =============================================================================
+    # 运行日志与恢复
+    # =============================================================================
+
+    # 每代写入日志、恢复时还原的标量状态
+    _JOURNAL_STATE_ATTRIBUTES = (
+        'best_fitness', 'best_fitness_memory', 'light_detected', 'converged', 'final_convergence',
+        'convergence_counter', 'local_convergence_count', 'is_enhanced_exploration', 'enhanced_exploration_counter',
+        'original_mutation_rate', 'gene_mutation_rate', 'gene_crossover_rate', 'chromosome_crossover_rate',
+        'lock_mode_activated', 'lock_fitness', 'elite_rows',
+    )
+    # 每代写入日志、恢复时还原的数组（下一代待评估的种群、最佳个体、锁定参考位置）
+    _JOURNAL_ARRAY_ATTRIBUTES = (
+        'population_A', 'population_B', 'best_individual_A', 'best_individual_B',
+        'best_individual_A_memory', 'best_individual_B_memory', 'lock_position_A', 'lock_position_B',
+    )
+
+    def _open_run_journal(self, resume_path: Optional[str] = None, resume_generation: int = 0):
+        """按run_journal配置打开运行日志（恢复运行时继续追加到原日志）"""
+        if not self.run_journal_config.get('enabled', False) or self.run_journal is not None:
+            return
+        path = resume_path or self.run_journal_config.get('path')
+        if not path:
+            filename = f"{self.history['optimizer_engine']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.journal"
+            path = os.path.join(self.run_journal_config.get('directory', 'run_journals'), filename)
+        header = {
+            'version': 1,
+            'optimizer_engine': self.history['optimizer_engine'],
+            'start_time': datetime.now().isoformat(),
+            'selected_variables_A': self.selected_variables_A,
+            'selected_variables_B': self.selected_variables_B,
+            'config': self.config,
+        }
+        try:
+            self.run_journal = RunJournal(
+                path, self.selected_variables_A, self.selected_variables_B,
+                fsync_policy=self.run_journal_config.get('fsync_policy', 'generation'),
+                fsync_interval=self.run_journal_config.get('fsync_interval', 1.0)
+            ).open(header)
+        except (OSError, ValueError) as e:
+            print(f"无法打开运行日志 {path}: {e}")
+            self.run_journal = None
+            return
+        if resume_generation:
+            self.run_journal.write_event('resumed', {'generation': resume_generation,
+                                                     'evaluation_count': self.history['evaluation_count']})
+        self.history['run_journal'] = path
+        print(f"运行日志: {path} (fsync策略: {self.run_journal.fsync_policy})")
+
+    def _close_run_journal(self, result: dict):
+        """记录运行结束事件并关闭日志（等待后台线程写完）"""
+        if self.run_journal is None:
+            return
+        self.run_journal.write_event('finished', {
+            'success': result.get('success', False),
+            'best_power': result.get('best_power'),
+            'total_evaluations': self.history['evaluation_count'],
+            'total_generations': len(self.history['generations']),
+            'error': result.get('error'),
+        })
+        self.run_journal.close()
+        if self.run_journal.error is not None:
+            print(f"运行日志不完整: {self.run_journal.error}")
+        self.run_journal = None
+
+    def _journal_state(self, generation: int, fitness: np.ndarray) -> Tuple[Dict, Dict]:
+        """一代结束时的可恢复状态，返回(标量状态, 数组)；其他引擎在此基础上追加各自的状态"""
+        state = {name: getattr(self, name) for name in self._JOURNAL_STATE_ATTRIBUTES}
+        state.update({
+            'generation': generation,
+            'evaluation_count': self.history['evaluation_count'],
+            'optimization_phase': self.optimization_phase.value,
+            'search_range_A': self.search_range_A,
+            'search_range_B': self.search_range_B,
+            'rng_state': self.rng.bit_generator.state,
+            # 本代的每代历史（恢复时重建history中的每代列）
+            'history_row': {key: self.history[key][-1] for key in self._generation_history_keys},
+        })
+        arrays = {name: getattr(self, name) for name in self._JOURNAL_ARRAY_ATTRIBUTES}
+        arrays['fitness'] = fitness
+        return state, arrays
+
+    def _restore_journal_state(self, state: Dict, arrays: Dict):
+        """还原_journal_state()保存的状态"""
+        self.set_search_ranges(state['search_range_A'], state['search_range_B'])
+        for name in self._JOURNAL_STATE_ATTRIBUTES:
+            if name in state:
+                setattr(self, name, state[name])
+        self.optimization_phase = OptimizationPhase(state['optimization_phase'])
+        for name in self._JOURNAL_ARRAY_ATTRIBUTES:
+            setattr(self, name, arrays.get(name))
+        self.population_size = len(self.population_A)
+        self.rng.bit_generator.state = state['rng_state']
+
+    def _journal_generation(self, generation: int, fitness: np.ndarray):
+        if self.run_journal is not None:
+            self.run_journal.write_generation(*self._journal_state(generation, fitness))
+
+    def resume_from_journal(self, path: str) -> Dict:
+        """
+        从运行日志恢复中断的运行（在run()之前调用，run()从下一代继续并追加写入同一日志）
+        还原最后一代结束时的待评估种群、最佳个体、收敛/增强探索/锁定计数器、搜索范围和随机数生成器状态，
+        并重建评估历史和每代历史（日志中不含power_result明细）。最后一代之后的评估保留在历史中，
+        对应的种群从头重新评估；高功率保持模式不恢复。
+        
+        返回:
+            {'generation', 'evaluation_count', 'best_fitness', 'truncated'}
+        """
+        journal = load_journal(path)
+        header = journal['header']
+        if header['selected_variables_A'] != list(self.selected_variables_A) \
+                or header['selected_variables_B'] != list(self.selected_variables_B):
+            raise ValueError(f"运行日志的优化变量 (A端 {header['selected_variables_A']}, "
+                             f"B端 {header['selected_variables_B']}) 与当前配置不一致")
+        if journal['last_generation'] is None:
+            raise ValueError(f"运行日志中没有完整的一代，无法恢复: {path}")
+        
+        # 评估历史
+        evaluations = journal['evaluations']
+        for i in range(len(evaluations['power'])):
+            light = int(evaluations['light_detected'][i])
+            settle_time = float(evaluations['settle_time'][i])
+            self.history['search_history'].append_evaluation(
+                evaluations['position_A'][i], evaluations['position_B'][i], evaluations['power'][i],
+                evaluation_index=int(evaluations['evaluation_index'][i]),
+                optimization_phase=evaluations['optimization_phase'][i],
+                light_detected=None if light < 0 else bool(light),
+                settle_time=None if np.isnan(settle_time) else settle_time,
+                timestamp=float(evaluations['timestamp'][i])
+            )
+        self.history['evaluation_count'] = int(evaluations['evaluation_index'][-1]) if len(evaluations['power']) else 0
+        
+        # 每代历史
+        for generation_state in journal['generations']:
+            for key, value in generation_state['history_row'].items():
+                self.history[key].append(value)
+        
+        state, arrays = journal['last_generation']
+        self._restore_journal_state(state, arrays)
+        self._resume_generation = int(state['generation'])
+        self._resume_journal_path = path
+        self.run_journal_config['enabled'] = True  # 恢复的运行继续追加到原日志，再次中断仍可恢复
+        
+        summary = {
+            'generation': self._resume_generation,
+            'evaluation_count': self.history['evaluation_count'],
+            'best_fitness': self.best_fitness,
+            'truncated': journal['truncated'],
+        }
+        print(f"已从运行日志恢复: 第{summary['generation']}代, {summary['evaluation_count']}次评估, "
+              f"最佳功率 {self.best_fitness:.6f}mW" + ("（已丢弃残缺的日志尾部）" if journal['truncated'] else ""))
+        return summary
+
     def _calculate_diversity(self, population: np.ndarray) -> float:
         """计算种群多样性"""
         if len(population) <= 1:
@@ -1442,6 +2311,11 @@ class DualEndGeneticAlgorithmOptimizer:
     def stop(self):
         """停止优化"""
         self.is_running = False
+        with self._keep_request_lock:
+            self._pending_dither_request = None
+        if self.dither_tracker is not None:
+            self.dither_tracker.stop()
+            self.dither_tracker = None
 
     def set_callbacks(self, progress_callback=None, finished_callback=None, 
                      convergence_callback=None, lock_callback=None,
@@ -1460,6 +2334,9 @@ class DualEndGeneticAlgorithmOptimizer:
 def get_dual_end_config():
     """获取双端优化的默认配置"""
     config = {
+        # 优化引擎：'ga' 遗传算法 / 'cma_es' CMA-ES / 'spsa' 快速重新对准 / 'bayes' 批量贝叶斯优化 /
+        # 'steady_state' 稳态异步遗传算法（见 optimizer_engines.py）
+        'optimizer_engine': 'ga',
         'population_size': 30,
         'generations': 200,
         'gene_mutation_rate': 0.15,  # 基因变异率
@@ -1497,6 +2374,96 @@ def get_dual_end_config():
         # 位置锁定参数
         'lock_mode_threshold': 0.001,  # 0.1%的阈值
         
+        # 随机种子：None为每次不同，固定整数可复现优化过程
+        'random_seed': None,
+        
+        # 设备后端：'hardware'（真实设备）或 'simulated'（模拟光学平台，见 simulated_bench.py）
+        'device_backend': 'hardware',
+        
+        # 自适应稳定检测参数（见 settle_detector.py）
+        'settle_config': get_default_settle_config(),
+        
+        # 高功率保持方式：'population' 种群小范围搜索 / 'dither' 抖动锁相连续跟踪
+        'high_power_keep_method': 'population',
+        'dither_config': get_default_dither_config(),
+        
+        # 并行移动参数：四个控制器在常驻线程池中同时下发指令
+        'move_config': {
+            'parallel_move': True,
+            'move_workers': 4,
+            'move_timeout': 10.0,
+            'command_ack_timeout': 0.1,
+        },
+        
+        # 功率计块采集：一次配置设备端平均或快速数组采集，每次评估读取整块样本并剔除异常值
+        # （快速数组不可用时自动回退到设备端平均，见 PowerMeter.configure_block_acquisition）
+        # background_service: 由后台采集服务独占功率计连续采集，评估/稳定检测/GUI监控从环形缓冲区读取样本
+        'power_acquisition': {
+            'enabled': True,
+            'mode': 'fast_array',
+            'block_samples': 200,
+            'average_count': 10,
+            'average_samples': 5,
+            'keep_fraction': 0.6,
+            'background_service': True,
+            'buffer_capacity': 2 ** 20,
+            'evaluation_samples': 200,
+            'evaluation_timeout': 1.0,
+        },
+        
+        # 全局收敛后的局部精细搜索：以最佳个体为起点逐轴试探（步长为量程比例），
+        # 一轮功率相对提高小于local_refinement_tolerance时停止，复测满足锁定阈值即锁定
+        'local_refinement': True,
+        'local_refinement_initial_step': 0.02,
+        'local_refinement_min_step': 5e-4,
+        'local_refinement_tolerance': 0.005,
+        'local_refinement_max_evaluations': 200,
+        # 'fly_scan'：逐轴往返飞行扫描代替逐点试探（连续扫描电压，按时间戳对齐功率流）
+        'local_refinement_method': 'pattern',
+        'fly_scan_config': get_default_fly_scan_config(),
+        
+        # 首次通光扫描：内层轴（A端x-y）螺旋/光栅连续扫描、外层轴（B端x-y）步进，
+        # 第一个超过first_light_threshold的样本出现即停止，命中位置±first_light_handoff_range交给优化
+        'first_light_scan': False,
+        'first_light_threshold': None,  # None表示 light_threshold × first_light_threshold_fraction
+        'first_light_config': get_default_first_light_config(),
+        
+        # 运行日志：每次评估、每代结束时由后台线程追加写入二进制日志（见 run_journal.py），
+        # fsync_policy: 'always' / 'generation' / 'interval' / 'none'；崩溃后用 resume_from_journal(路径) 继续
+        'run_journal': get_default_run_journal_config(),
+        
+        # 评估耗时分段：每代汇总 指令/稳定/测量/历史记录/GUI回调 的p50/p95/最大值，
+        # 附加到generation消息的'timing'字段，保存结果时另存为 <结果文件名>_timing.json
+        'timing_spans': True,
+        
+        # 指标导出：evaluations/s、当前/最佳功率、漂移率、稳定时间、设备重连、测量失败、缓存命中率，
+        # mode 'textfile' 定期写 .prom 文件 / 'http' 本地 /metrics 端点 / 'both'（见 metrics_exporter.py）
+        'metrics': get_default_metrics_config(),
+        
+        # 代理模型预筛选：高斯过程拟合search_history，每代从 子代数×surrogate_pool_factor 个候选中
+        # 按期望改进挑选 surrogate_ratio 比例的子代，其余随机抽取（随机个体同样记录预测误差）
+        'surrogate_screening': True,
+        'surrogate_ratio': 0.5,
+        'surrogate_pool_factor': 10,
+        'surrogate_acquisition': 'ei',
+        'surrogate_min_points': 20,
+        'surrogate_max_points': 400,
+        
+        # 评估顺序调度：按最短行程重排每代评估顺序，权重为各轴稳定代价（缺省为1）
+        'evaluation_ordering': True,
+        'settle_cost_weights_A': {},
+        'settle_cost_weights_B': {},
+        
+        # 适应度缓存：按执行器分辨率量化位置（缺省量程/2^16），存活时间内跳过重复测量，
+        # 命中时按比例抽样复测，偏差超过容差视为漂移并清空缓存
+        'fitness_cache': True,
+        'fitness_cache_ttl': 60.0,  # 秒，<=0表示不过期
+        'fitness_cache_drift_check_rate': 0.1,
+        'fitness_cache_drift_tolerance': 0.05,
+        'fitness_cache_drift_tolerance_absolute': 1e-6,
+        'fitness_cache_resolution_A': {},
+        'fitness_cache_resolution_B': {},
+        
         # 搜索范围
         'search_range_A': {
             'x': (0, 30),
@@ -1559,8 +2526,9 @@ def create_gui_interface():
             # 使用现有优化器
             optimizer = existing_optimizer
         else:
-            # 创建新的优化器
-            optimizer = DualEndGeneticAlgorithmOptimizer(config, hardware_adapter)
+            # 创建新的优化器（按config['optimizer_engine']选择引擎）
+            from optimizer_engines import create_optimizer
+            optimizer = create_optimizer(config, hardware_adapter)
             optimizer.set_callbacks(
                 progress_callback=progress_callback,
                 finished_callback=finished_callback,
@@ -1709,6 +2677,9 @@ def create_gui_interface():
                 return [convert_to_serializable(v) for v in obj]
             elif isinstance(obj, OptimizationPhase):
                 return obj.value
+            elif hasattr(obj, 'to_list'):
+                # 列式历史（EvaluationHistory / HistorySeries）
+                return convert_to_serializable(obj.to_list())
             return obj
         
         serializable_result = convert_to_serializable(result)
@@ -1717,6 +2688,14 @@ def create_gui_interface():
             json.dump(serializable_result, f, indent=2, ensure_ascii=False)
         
         print(f"优化结果已保存到: {filename}")
+        
+        # 评估耗时分段另存一份，便于直接比较不同运行
+        timing_spans = serializable_result.get('history', {}).get('timing_spans')
+        if timing_spans:
+            timing_filename = os.path.splitext(filename)[0] + '_timing.json'
+            with open(timing_filename, 'w', encoding='utf-8') as f:
+                json.dump(timing_spans, f, indent=2, ensure_ascii=False)
+            print(f"耗时分段已保存到: {timing_filename}")
         return filename
     
     # 在返回的字典中添加新函数
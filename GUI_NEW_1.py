@@ -14,7 +14,9 @@ from device_manager_double import GlobalDeviceManager
 from hardware_adapter_double import HardwareAdapter
 from GAtest import GeneticAlgorithmOptimizer
 from GAtest import visualize_ga_results, save_ga_data
-from GA_double_new_1 import DualEndGeneticAlgorithmOptimizer, get_dual_end_config
+from GA_double_new_1 import get_dual_end_config
+from optimizer_engines import create_optimizer
+from record_archive import ARCHIVE_EXTENSION, export_records
 from GA_double_new import  visualize_dual_end_results, save_dual_end_ga_data, create_dual_end_report
 # 假设这些常量和类在其他地方定义
 LARGE_FONT = ('SimHei', 12)
@@ -76,6 +78,7 @@ class DualEndGAOptimizerGUI:
         
         # 修改：优化器自动进入位置锁定模式，高功率模式由GUI按钮触发
         self.high_power_mode_enabled = False  # 新增：高功率模式是否启用
+        self.keep_method = tk.StringVar(value="population")  # 保持方式：'population' 种群小范围搜索 / 'dither' 抖动锁相跟踪
         
         # 双端特定状态（保留优化器阶段记录）
         self.optimization_mode = tk.StringVar(value="single")  # "single" 或 "double"
@@ -289,6 +292,10 @@ class DualEndGAOptimizerGUI:
         self.stop_btn = ttk.Button(btn_frame, text="停止优化", command=self.stop_optimization, state=tk.DISABLED, style='Custom.TButton')
         self.stop_btn.pack(side=tk.LEFT, padx=5)
         
+        # 快速重新对准（SPSA，从上次锁定位置或初始位置出发）
+        self.realign_btn = ttk.Button(btn_frame, text="快速重新对准", command=self.quick_realign, style='Custom.TButton')
+        self.realign_btn.pack(side=tk.LEFT, padx=5)
+        
         self.reset_btn = ttk.Button(btn_frame, text="重置参数", command=self.reset_parameters, style='Custom.TButton')
         self.reset_btn.pack(side=tk.LEFT, padx=5)
         
@@ -1222,6 +1229,11 @@ class DualEndGAOptimizerGUI:
         self.keep_mode_btn = ttk.Button(mode_btn_frame, text="最高功率保持模式", command=self.switch_to_keep_mode, state=tk.DISABLED, style='Custom.TButton')
         self.keep_mode_btn.pack(side=tk.LEFT, padx=5)
         
+        tk.Radiobutton(mode_btn_frame, text="种群搜索", variable=self.keep_method,
+                       value="population", font=LARGE_FONT).pack(side=tk.LEFT, padx=5)
+        tk.Radiobutton(mode_btn_frame, text="抖动跟踪", variable=self.keep_method,
+                       value="dither", font=LARGE_FONT).pack(side=tk.LEFT, padx=5)
+        
         self.lock_mode_btn = ttk.Button(mode_btn_frame, text="位置锁定模式", command=self.switch_to_lock_mode, state=tk.NORMAL, style='Custom.TButton')
         self.lock_mode_btn.pack(side=tk.LEFT, padx=5)
         
@@ -1595,7 +1607,8 @@ class DualEndGAOptimizerGUI:
             # 创建保存对话框
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json"), ("CSV files", "*.csv"), ("All files", "*.*")],
+                filetypes=[("JSON files", "*.json"), ("CSV files", "*.csv"),
+                           ("Columnar binary", f"*{ARCHIVE_EXTENSION}"), ("All files", "*.*")],
                 title="保存功率监测数据"
             )
             
@@ -1613,7 +1626,11 @@ class DualEndGAOptimizerGUI:
                 'power_data': self.gui_data['power_monitoring_records']
             }
             
-            if file_path.endswith('.csv'):
+            if file_path.endswith(ARCHIVE_EXTENSION):
+                # 保存为列式二进制归档（离线分析用 record_archive.load_records 内存映射读取）
+                export_records(file_path, {'power_monitoring_records': self.gui_data['power_monitoring_records']},
+                               power_data['metadata'])
+            elif file_path.endswith('.csv'):
                 # 保存为CSV格式
                 self._save_power_monitoring_csv(file_path, power_data)
             else:
@@ -1861,8 +1878,13 @@ class DualEndGAOptimizerGUI:
     # 修改 start_optimization 方法中的优化器初始化和回调设置部分
 
     # 在 start_optimization 方法中，添加优化器实例的创建代码
-    def start_optimization(self):
-        """开始优化过程 - 添加完整的参数回调支持"""
+    def start_optimization(self, config_overrides=None):
+        """
+        开始优化过程 - 添加完整的参数回调支持
+        
+        参数:
+            config_overrides: 覆盖GUI参数的配置项（例如快速重新对准指定的引擎和起点）
+        """
         if self.is_running:
             messagebox.showinfo("提示", "优化正在进行中")
             return
@@ -1894,6 +1916,8 @@ class DualEndGAOptimizerGUI:
             if not is_valid:
                 messagebox.showerror("参数错误", message)
                 return
+            if config_overrides:
+                params.update(config_overrides)
                 
             self.gui_data['optimization_parameters'] = self._create_serializable_parameters(params)
             self.gui_data['optimization_mode'] = mode
@@ -1929,12 +1953,14 @@ class DualEndGAOptimizerGUI:
                 )
                 self.log("单端遗传算法优化器已创建")
             else:
-                # 双端优化器
-                self.optimizer = DualEndGeneticAlgorithmOptimizer(
-                    hardware_adapter=self.hardware_adapter,
-                    config=params
-                )
-                self.log("双端遗传算法优化器已创建")
+                # 贝叶斯优化引擎用上一次运行的测量记录热启动
+                if params.get('optimizer_engine') == 'bayes' and 'bo_warm_start_history' not in params \
+                        and self.optimizer is not None and hasattr(self.optimizer, 'history'):
+                    params['bo_warm_start_history'] = self.optimizer.history.get('search_history', [])
+                
+                # 双端优化器（按params['optimizer_engine']选择引擎，缺省为遗传算法）
+                self.optimizer = create_optimizer(params, self.hardware_adapter)
+                self.log(f"双端优化器已创建，引擎: {params.get('optimizer_engine', 'ga')}")
             
             # 定义弱引用避免循环引用
             gui_ref = weakref.ref(self)
@@ -1989,6 +2015,7 @@ class DualEndGAOptimizerGUI:
             self.status_labels["operation_mode"]["text"] = "搜索模式"
             self.status_labels["status"]["text"] = "运行中"
             self.start_btn.config(state=tk.DISABLED)
+            self.realign_btn.config(state=tk.DISABLED)
             self.stop_btn.config(state=tk.NORMAL)
             self.init_device_btn.config(state=tk.DISABLED)
             self.set_initial_pos_btn.config(state=tk.DISABLED)
@@ -2033,6 +2060,31 @@ class DualEndGAOptimizerGUI:
             import traceback
             traceback.print_exc()
             return
+    def quick_realign(self):
+        """快速重新对准：用SPSA引擎从上次锁定位置（无锁定位置时为初始位置）爬坡"""
+        if self.is_running:
+            messagebox.showinfo("提示", "优化正在进行中")
+            return
+        
+        if self.optimization_mode.get() != "dual":
+            messagebox.showwarning("警告", "快速重新对准仅支持双端模式")
+            return
+        
+        overrides = {'optimizer_engine': 'spsa'}
+        previous = self.optimizer
+        if previous is not None and getattr(previous, 'lock_position_A', None) is not None \
+                and getattr(previous, 'lock_position_B', None) is not None:
+            # 以变量名为键传递，GUI中更改了优化变量时按名称匹配
+            overrides['spsa_start_A'] = {f'A_{var}': float(previous.lock_position_A[i])
+                                         for i, var in enumerate(previous.selected_variables_A)}
+            overrides['spsa_start_B'] = {f'B_{var}': float(previous.lock_position_B[i])
+                                         for i, var in enumerate(previous.selected_variables_B)}
+            self.log("快速重新对准：从上次锁定位置出发")
+        else:
+            self.log("快速重新对准：无锁定位置，从初始位置出发")
+        
+        self.start_optimization(config_overrides=overrides)
+    
     # 修改 get_optimization_parameters 方法，确保所有参数都被正确获取
 
     def get_optimization_parameters(self):
@@ -2604,10 +2656,12 @@ class DualEndGAOptimizerGUI:
                 return
             
             # 启动高功率保持模式
+            keep_method = self.keep_method.get()
             success = self.optimizer.start_high_power_keep_mode_from_gui(
                 center_individual_A=best_individual_A,
                 center_individual_B=best_individual_B,
-                current_fitness=current_fitness
+                current_fitness=current_fitness,
+                keep_method=keep_method
             )
             
             if success:
@@ -2620,7 +2674,13 @@ class DualEndGAOptimizerGUI:
                 self.power_status_labels["high_power_search_range"]["text"] = f"±{high_power_params['high_power_search_range_percent']*100:.1f}%"
                 self.power_status_labels["high_power_perturbation"]["text"] = f"{high_power_params['high_power_perturbation_strength']:.3f}"
                 
-                self.log(f"高功率保持模式已启动，搜索范围: ±{high_power_params['high_power_search_range_percent']*100}%")
+                if keep_method == 'dither':
+                    if hasattr(self.optimizer, 'is_dither_tracking_pending') and self.optimizer.is_dither_tracking_pending():
+                        self.log("高功率保持模式已启动: 抖动锁相跟踪（当前评估结束后开始）")
+                    else:
+                        self.log("高功率保持模式已启动: 抖动锁相跟踪")
+                else:
+                    self.log(f"高功率保持模式已启动，搜索范围: ±{high_power_params['high_power_search_range_percent']*100}%")
                 messagebox.showinfo("成功", "高功率保持模式已启动")
                 
                 # 更新按钮状态
@@ -2631,6 +2691,7 @@ class DualEndGAOptimizerGUI:
                     'type': 'switch_to_keep_mode_from_gui',
                     'timestamp': datetime.now().isoformat(),
                     'current_mode': self.current_mode,
+                    'keep_method': keep_method,
                     'high_power_params': high_power_params
                 })
             else:
@@ -2814,6 +2875,7 @@ class DualEndGAOptimizerGUI:
                 
                 # 恢复UI状态
                 self.start_btn.config(state=tk.NORMAL)
+                self.realign_btn.config(state=tk.NORMAL)
                 self.stop_btn.config(state=tk.DISABLED)
                 self.init_device_btn.config(state=tk.NORMAL)
                 self.set_initial_pos_btn.config(state=tk.NORMAL)
@@ -2853,6 +2915,7 @@ class DualEndGAOptimizerGUI:
         # 恢复UI状态
         self.is_running = False
         self.start_btn.config(state=tk.NORMAL)
+        self.realign_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.init_device_btn.config(state=tk.NORMAL)
         self.set_initial_pos_btn.config(state=tk.NORMAL)
@@ -3142,7 +3205,7 @@ class DualEndGAOptimizerGUI:
             # 创建保存对话框
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+                filetypes=[("JSON files", "*.json"), ("Columnar binary", f"*{ARCHIVE_EXTENSION}"), ("All files", "*.*")],
                 title="保存优化数据"
             )
             
@@ -3159,8 +3222,15 @@ class DualEndGAOptimizerGUI:
             }
             
             # 保存数据
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.gui_data, f, indent=2, ensure_ascii=False)
+            if file_path.endswith(ARCHIVE_EXTENSION):
+                # 三类记录按列存为二进制归档，其余字段作为元数据
+                tables = {name: self.gui_data[name]
+                          for name in ('evaluation_records', 'generation_records', 'power_monitoring_records')}
+                export_records(file_path, tables,
+                               {key: value for key, value in self.gui_data.items() if key not in tables})
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.gui_data, f, indent=2, ensure_ascii=False)
             
             self.log(f"优化数据已保存到: {file_path}")
             messagebox.showinfo("成功", 
@@ -3978,6 +4048,15 @@ class DualEndGAOptimizerGUI:
                     self.status_labels["operation_mode"]["text"] = "位置锁定模式"
                     self.lock_mode_btn.config(state=tk.DISABLED)  # 锁定模式已激活，按钮禁用
                     
+                elif data_type == 'first_light_completed':
+                    # 首次通光扫描结果
+                    first_light = data.get('first_light_data', {})
+                    if first_light.get('found'):
+                        self.log(f"首次通光: 用时 {first_light['time_to_first_light']:.2f}s, "
+                                 f"功率 {self.format_power_value(first_light['hit_power'])}, 搜索范围已缩小")
+                    else:
+                        self.log(f"首次通光扫描未找到光（{first_light.get('stop_reason')}），使用原搜索范围")
+                    
                 elif data_type == 'position_locked':
                     # 处理位置锁定通知
                     self._handle_position_locked_callback(data.get('lock_position'), data.get('lock_fitness'))
@@ -2,11 +2,46 @@ from datetime import datetime
 from ctypes import c_long, c_uint32, byref, create_string_buffer, c_bool, c_char_p, c_int, c_double
 import time
 from TLPM import TLPM  # 直接导入实际库，不处理模拟情况
-from ctypes import c_int16
+from ctypes import c_int16, c_uint16, c_float
 import numpy as np
+from timing_spans import timed_span
+
+
+def reject_outliers(values, keep_fraction=0.6):
+    """
+    中位数偏差异常值剔除（向量化）：保留与中位数偏差最小的keep_fraction比例样本后求平均
+    5个样本、keep_fraction=0.6时与measure_power中“去除偏离最大的两个值”一致
+    :param values: 样本数组
+    :param keep_fraction: 保留比例
+    :return: (平均值, 保留样本的布尔掩码)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    keep_count = min(count, max(1, int(np.ceil(count * keep_fraction - 1e-9))))
+    deviations = np.abs(values - np.median(values))
+    keep_indices = np.argpartition(deviations, keep_count - 1)[:keep_count]
+    mask = np.zeros(count, dtype=bool)
+    mask[keep_indices] = True
+    return float(np.mean(values[mask])), mask
+
+
+def get_default_acquisition_config():
+    """高吞吐采集的默认配置"""
+    return {
+        'enabled': True,            # 评估时使用块采集（False时使用measure_power逐次采样）
+        'mode': 'fast_array',       # fast_array（快速数组采集）/ average（设备端平均）
+        'block_samples': 200,       # 快速数组模式每次评估的样本数
+        'average_count': 10,        # 设备端平均次数（average模式）
+        'average_time': None,       # 设备端平均时间（秒，设置后优先于average_count）
+        'average_samples': 5,       # average模式每次评估读取的（已平均）样本数
+        'keep_fraction': 0.6,       # 异常值剔除后保留的样本比例
+        'block_timeout': 1.0,       # 单块采集超时（秒）
+    }
+
 
 class PowerMeter:
     DEFAULT_WAVELENGTH = 1560  # 默认波长1550nm（内部以纳米为单位）
+    FAST_ARRAY_MAX_SAMPLES = 200  # getNextFastArrayMeasurement单次最多返回的样本数
     
     def __init__(self, wavelength=DEFAULT_WAVELENGTH):
         """初始化功率计并自动连接设备
@@ -17,6 +52,8 @@ class PowerMeter:
         self.resource_name = None  # 设备资源名称
         self.wavelength = wavelength  # 当前波长（纳米）
         self.current_range = None  # 当前量程
+        self.acquisition_config = get_default_acquisition_config()
+        self.acquisition_mode = None  # 已配置的块采集模式（None表示未配置）
         self._find_device()  # 搜索设备
         self._find_and_connect_device()  # 初始化时自动连接设备
     
@@ -194,6 +231,7 @@ class PowerMeter:
             print(f"设置波长失败: {str(e)}")
             raise
     
+    @timed_span('power_meter.measure_power')
     def measure_power(self, samples=5, interval=0.001):
         """
         测量功率并返回处理后结果，包含量程信息和优化精度
@@ -310,6 +348,7 @@ class PowerMeter:
             return self.measure_power(samples, interval)
                 
     
+    @timed_span('power_meter.measure_power_fast')
     def measure_power_fast(self):
         """
         快速单次功率测量，包含量程信息
@@ -353,6 +392,137 @@ class PowerMeter:
         except Exception as e:
             print(f"快速功率测量失败: {str(e)}")
     
+    def configure_block_acquisition(self, config=None):
+        """
+        配置高吞吐块采集（只需配置一次）：设备端平均或快速数组采集，并预分配缓冲区
+        快速数组采集不可用时回退到设备端平均，设备端平均也不可用时回退到逐次measPower
+        :param config: 采集配置，缺省项使用get_default_acquisition_config()
+        :return: 实际使用的采集模式
+        """
+        if config:
+            self.acquisition_config.update(config)
+        cfg = self.acquisition_config
+        
+        mode = cfg['mode']
+        if mode == 'fast_array':
+            try:
+                self.tlPM.confPowerFastArrayMeasurement()
+            except Exception as e:
+                print(f"快速数组采集不可用，回退到设备端平均: {str(e)}")
+                mode = 'average'
+        if mode == 'average':
+            try:
+                if cfg.get('average_time'):
+                    self.tlPM.setAvgTime(c_double(cfg['average_time']))
+                else:
+                    self.tlPM.setAvgCnt(c_int16(int(cfg['average_count'])))
+            except Exception as e:
+                print(f"设备端平均不可用，回退到逐次采样: {str(e)}")
+                mode = 'single'
+        
+        # 预分配缓冲区
+        block_samples = int(cfg['block_samples']) if mode == 'fast_array' else int(cfg['average_samples'])
+        self._block_values = np.empty(block_samples, dtype=np.float64)
+        self._block_timestamps = np.empty(block_samples, dtype=np.float64)
+        self._fast_count = c_uint16()
+        self._fast_values = (c_float * self.FAST_ARRAY_MAX_SAMPLES)()
+        self._fast_timestamps = (c_uint32 * self.FAST_ARRAY_MAX_SAMPLES)()
+        self._fast_values_view = np.frombuffer(self._fast_values, dtype=np.float32)
+        self._fast_timestamps_view = np.frombuffer(self._fast_timestamps, dtype=np.uint32)
+        
+        self.acquisition_mode = mode
+        print(f"功率计块采集模式: {mode}，每块 {block_samples} 个样本")
+        return mode
+    
+    def acquire_block(self):
+        """
+        采集一块样本到预分配缓冲区
+        :return: (功率数组W, 时间戳数组)，为缓冲区视图，下次采集时会被覆盖；
+                 快速数组模式为设备原始计数（uint32，单位由PowerAcquisitionService按主机时钟标定），
+                 其他模式为主机perf_counter（µs）
+        """
+        if self.acquisition_mode is None:
+            self.configure_block_acquisition()
+        
+        values = self._block_values
+        timestamps = self._block_timestamps
+        filled = 0
+        if self.acquisition_mode == 'fast_array':
+            # 快速数组：每次调用返回最多200个带设备时间戳的样本
+            deadline = time.perf_counter() + self.acquisition_config['block_timeout']
+            while filled < len(values):
+                if time.perf_counter() > deadline:
+                    raise TimeoutError(f"快速数组采集超时，已采集 {filled}/{len(values)} 个样本")
+                self.tlPM.getNextFastArrayMeasurement(byref(self._fast_count), self._fast_timestamps,
+                                                      self._fast_values)
+                count = min(self._fast_count.value, len(values) - filled)
+                if count <= 0:
+                    continue
+                values[filled:filled + count] = self._fast_values_view[:count]
+                timestamps[filled:filled + count] = self._fast_timestamps_view[:count]
+                filled += count
+        else:
+            # 设备端平均（或逐次采样）：每次measPower返回一个样本
+            power = c_double()
+            for i in range(len(values)):
+                self.tlPM.measPower(byref(power))
+                values[i] = power.value
+                timestamps[i] = time.perf_counter() * 1e6
+        return values, timestamps
+    
+    @timed_span('power_meter.measure_power_block')
+    def measure_power_block(self):
+        """
+        高吞吐功率测量：采集一块样本并向量化剔除异常值
+        不逐样本查询波长、量程，也不逐样本打印
+        :return: 与measure_power格式一致的结果字典（不含逐样本原始数据）
+        """
+        try:
+            start = time.perf_counter()
+            values, timestamps = self.acquire_block()
+            final_avg, mask = reject_outliers(values, self.acquisition_config['keep_fraction'])
+            valid_count = int(np.count_nonzero(mask))
+            acquisition_time = time.perf_counter() - start
+            
+            stats = {
+                'mean': final_avg,
+                'median': float(np.median(values)),
+                'std': float(np.std(values)) if len(values) > 1 else 0.0,
+                'min': float(np.min(values)),
+                'max': float(np.max(values)),
+                'range': float(np.ptp(values)) if len(values) > 1 else 0.0,
+                'valid_samples': valid_count,
+                'removed_samples': len(values) - valid_count
+            }
+            
+            display_info = self._get_scientific_display_info(final_avg, self.current_range)
+            return {
+                "power": final_avg,
+                "display_value": display_info['value'],
+                "display_exponent": display_info['exponent'],
+                "display_unit": display_info['unit'],
+                "scientific_notation": display_info['scientific'],
+                "engineering_notation": display_info['engineering'],
+                "power_range": self.current_range,
+                "wavelength_nm": self.wavelength,
+                "statistics": stats,
+                "acquisition_mode": self.acquisition_mode,
+                "sample_count": len(values),
+                "sample_span_us": float(timestamps[-1] - timestamps[0]) if len(values) > 1 else 0.0,
+                "acquisition_time": acquisition_time,
+                "timestamp": datetime.now().isoformat(),
+                "auto_range_enabled": True,
+            }
+        
+        except Exception as e:
+            print(f"块采集功率测量失败: {str(e)}")
+            # 尝试重新连接后回退到逐次采样
+            print("尝试重新连接设备...")
+            self.close()
+            self._find_and_connect_device()
+            self.acquisition_mode = None
+            return self.measure_power(samples=5)
+    
     def set_power_auto_range(self, enabled=True):
         """
         设置功率自动量程
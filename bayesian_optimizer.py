@@ -0,0 +1,303 @@
+# bayesian_optimizer.py
+"""
+贝叶斯优化引擎
+双端每次评估需要数秒的移动和测量，样本效率优先：用ARD高斯过程拟合全部测量，
+每轮按批量期望改进（Kriging believer，见 GaussianProcessSurrogate.select_batch）提出q个点，
+同一批点由评估顺序调度按最短行程访问（evaluate_population_pair）。
+
+与 DualEndGeneticAlgorithmOptimizer 相同的构造参数、回调、进度消息和 run() 结果字典，
+可通过配置 'optimizer_engine': 'bayes' 选择（见 optimizer_engines.py）。
+A端与B端变量拼接后按 search_range_A/B 归一化；高斯耦合在对数功率上近似为二次型，
+因此模型拟合 log(功率 + bo_power_floor)。
+可用配置 'bo_warm_start_history' 传入以前运行的 search_history（记录列表或结果JSON文件路径）作为热启动数据。
+每轮拟合时间和采集时间记录在 history['bo_fit_time'] / history['bo_acquisition_time']，
+并通过 'bo_round' 进度消息发送，fit_fraction 为模型计算时间占本轮总时间的比例。
+"""
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from GA_double_new_1 import DualEndGeneticAlgorithmOptimizer
+from surrogate_model import GaussianProcessSurrogate
+
+
+def load_search_history(source) -> List[dict]:
+    """
+    读取热启动用的search_history
+
+    参数:
+        source: 记录列表、结果字典（含 'search_history' 或 'history'→'search_history'）或JSON文件路径
+    """
+    if source is None:
+        return []
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8') as f:
+            source = json.load(f)
+    if isinstance(source, dict):
+        if 'search_history' in source:
+            source = source['search_history']
+        else:
+            source = source.get('history', {}).get('search_history', [])
+    return list(source)
+
+
+class BayesianOptimizer(DualEndGeneticAlgorithmOptimizer):
+    """双端批量贝叶斯优化器"""
+
+    SURROGATE_SCREENING = False
+
+    def __init__(self, config: dict, hardware_adapter):
+        super().__init__(config, hardware_adapter)
+
+        self.dimension_A = len(self.selected_variables_A)
+        self.dimension = self.dimension_A + len(self.selected_variables_B)
+
+        self.batch_size = int(config.get('bo_batch_size', 5))                      # 每轮提出的点数q
+        self.initial_points = int(config.get('bo_initial_points', 2 * self.dimension + 2))  # 无热启动时的初始设计点数（按批测量）
+        self.candidate_count = int(config.get('bo_candidate_count', 2000))         # 每轮采集函数的候选点数
+        self.local_fraction = config.get('bo_local_fraction', 0.5)                 # 候选中在已测最佳点附近扰动生成的比例
+        self.local_scales = tuple(config.get('bo_local_scales', (0.02, 0.05, 0.1)))  # 局部候选的归一化扰动尺度
+        self.xi = config.get('bo_xi', 0.01)                                        # 期望改进的探索裕量
+        self.power_floor = config.get('bo_power_floor', self.light_threshold * 0.01)  # 对数变换的功率下限
+        self.bo_patience = int(config.get('bo_patience', 12))
+        self.bo_convergence_threshold = config.get('bo_convergence_threshold', 0.005)
+        self.ei_tolerance = config.get('bo_ei_tolerance', 1e-3)  # 最大期望改进（对数功率，约等于相对提高）低于该值时收敛
+        self.population_size = self.batch_size
+        self.normal_population_size = self.batch_size
+
+        self.model = GaussianProcessSurrogate(
+            self.lower_bounds, self.lower_bounds + self.span,
+            max_points=config.get('bo_max_points', 300),
+            min_points=config.get('bo_min_points', 10),
+            hyperparameter_interval=config.get('bo_hyperparameter_interval', 1),
+            ard=True
+        )
+        self._model_synced = 0
+        self._observed = []        # 归一化位置（用于生成局部候选）
+        self._observed_values = []  # 变换后的功率
+        self.pending_predictions = None
+        self.last_max_ei = None
+        self.best_history = []
+        self._round_end = None
+        self._design = None  # 尚未测量的初始设计点
+
+        warm_records = load_search_history(config.get('bo_warm_start_history', None))
+        self.warm_start_points = self._add_records(warm_records)
+
+        self.history['optimizer_engine'] = 'bayes'
+        self.history['bo_warm_start_points'] = self.warm_start_points
+        self.history['bo_fit_time'] = []
+        self.history['bo_acquisition_time'] = []
+        self.history['bo_round_time'] = []
+        self.history['bo_max_ei'] = []
+        self.history['bo_length_scales'] = []
+        self.history['bo_prediction_rmse'] = []  # 对数功率的预测误差
+
+        print(f"贝叶斯优化引擎: 维度 {self.dimension}, 每轮 {self.batch_size} 点, "
+              f"热启动 {self.warm_start_points} 点")
+
+    def set_search_ranges(self, search_range_A, search_range_B):
+        """
+        更新搜索范围后重新归一化候选生成的坐标
+        模型保留原范围的归一化和已有数据，新范围外的测量仍参与拟合
+        """
+        observed = self._denormalize(np.array(self._observed)) if self._observed else None
+        super().set_search_ranges(search_range_A, search_range_B)
+        if observed is not None:
+            self._observed = list(self._normalize(observed))
+
+    def _transform(self, power) -> np.ndarray:
+        return np.log(np.maximum(np.asarray(power, dtype=float), 0.0) + self.power_floor)
+
+    # =============================================================================
+    # 数据
+    # =============================================================================
+
+    def _add_records(self, records: List[dict]) -> int:
+        """把search_history记录加入模型，返回加入的点数（优化变量不匹配的记录跳过）"""
+        points = []
+        values = []
+        for record in records:
+            try:
+                point = [record['position_A'][f'A_{var}'] for var in self.selected_variables_A]
+                point += [record['position_B'][f'B_{var}'] for var in self.selected_variables_B]
+                power = float(record['power'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            points.append(point)
+            values.append(power)
+        return self._add_points(np.array(points, dtype=float), values)
+
+    def _add_points(self, points: np.ndarray, values) -> int:
+        """把测量点（物理坐标，每行A端变量在前）及其功率加入模型，返回加入的点数"""
+        if len(points) == 0:
+            return 0
+        values = self._transform(values)
+        self.model.add(points, values)
+        self._observed.extend(self._normalize(points))
+        self._observed_values.extend(values)
+        return len(points)
+
+    def _sync_model(self):
+        """加入本次运行新增的测量记录（直接读取列式历史，不生成记录字典）"""
+        columns = self.history['search_history'].columns(self._model_synced)
+        self._model_synced = len(self.history['search_history'])
+        self._add_points(columns['points'], columns['power'])
+
+    # =============================================================================
+    # 提出新的一批点
+    # =============================================================================
+
+    def _initial_design(self, count: int) -> np.ndarray:
+        """拉丁超立方初始设计（归一化坐标）"""
+        strata = np.array([self.rng.permutation(count) for _ in range(self.dimension)]).T
+        return (strata + self.rng.random((count, self.dimension))) / count
+
+    def _candidates(self) -> np.ndarray:
+        """候选点：全局均匀采样 + 已测最佳点附近的多尺度扰动"""
+        local_count = int(self.candidate_count * self.local_fraction) if self._observed else 0
+        candidates = [self.rng.random((self.candidate_count - local_count, self.dimension))]
+        if local_count:
+            observed = np.array(self._observed)
+            top = np.argsort(self._observed_values)[::-1][:5]
+            centers = observed[self.rng.choice(top, size=local_count)]
+            scales = self.rng.choice(self.local_scales, size=(local_count, 1))
+            candidates.append(centers + scales * self.rng.standard_normal((local_count, self.dimension)))
+        return np.clip(np.vstack(candidates), 0.0, 1.0)
+
+    def _propose(self, generation: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """拟合模型并按批量期望改进提出下一批点，返回(A端种群, B端种群)"""
+        round_start = time.perf_counter()
+        self._sync_model()
+        fit_start = time.perf_counter()
+        ready = self.model.fit()
+        fit_time = time.perf_counter() - fit_start
+
+        acquisition_start = time.perf_counter()
+        if self._design is not None and len(self._design):
+            batch = self._design[:self.batch_size]
+            self._design = self._design[self.batch_size:]
+            self.pending_predictions = None
+            self.last_max_ei = None
+        elif ready:
+            candidates = self._candidates()
+            indices, mean, std, acquisition = self.model.select_batch(
+                self._denormalize(candidates), self.batch_size, best=max(self._observed_values), xi=self.xi)
+            batch = candidates[indices]
+            self.pending_predictions = list(zip(mean, std))
+            self.last_max_ei = float(acquisition[0])
+        else:
+            batch = self._initial_design(self.batch_size)
+            self.pending_predictions = None
+            self.last_max_ei = None
+        acquisition_time = time.perf_counter() - acquisition_start
+
+        # 本轮总时间：上一批的测量 + 本次模型计算
+        round_time = time.perf_counter() - (self._round_end if self._round_end is not None else round_start)
+        self._round_end = time.perf_counter()
+        fit_fraction = (fit_time + acquisition_time) / round_time if round_time > 0 else 0.0
+
+        statistics = self.model.get_statistics()
+        self.history['bo_fit_time'].append(fit_time)
+        self.history['bo_acquisition_time'].append(acquisition_time)
+        self.history['bo_round_time'].append(round_time)
+        self.history['bo_max_ei'].append(self.last_max_ei)
+        self.history['bo_length_scales'].append(statistics['length_scale'])
+        print(f"贝叶斯优化: 模型 {statistics['points']} 点, 拟合 {fit_time*1000:.1f}ms, "
+              f"采集 {acquisition_time*1000:.1f}ms (占本轮 {fit_fraction*100:.1f}%), "
+              f"最大期望改进 {self.last_max_ei if self.last_max_ei is not None else float('nan'):.4f}")
+
+        if self.progress_callback:
+            self.progress_callback({
+                'type': 'bo_round',
+                'bo_data': {
+                    'generation': generation,
+                    'model_points': statistics['points'],
+                    'fit_time': fit_time,
+                    'acquisition_time': acquisition_time,
+                    'round_time': round_time,
+                    'fit_fraction': fit_fraction,
+                    'max_expected_improvement': self.last_max_ei,
+                    'length_scale': statistics['length_scale'],
+                    'timestamp': datetime.now().isoformat()
+                }
+            })
+
+        points = self._denormalize(batch)
+        self.elite_rows = 0
+        return points[:, :self.dimension_A].copy(), points[:, self.dimension_A:].copy()
+
+    # =============================================================================
+    # 覆盖遗传算法的种群生成与收敛检测
+    # =============================================================================
+
+    def initialize_populations(self):
+        """有足够热启动数据时直接按采集函数提出第一批，否则先按批测量拉丁超立方初始设计"""
+        self._round_end = None
+        self._design = None
+        if self.model.point_count < self.model.min_points:
+            count = max(self.initial_points, self.model.min_points)
+            count = -(-count // self.batch_size) * self.batch_size  # 补齐为整批
+            self._design = self._initial_design(count)
+        self.population_A, self.population_B = self._propose(0)
+        print(f"贝叶斯优化初始批次: A端 {self.population_A.shape}, B端 {self.population_B.shape}")
+
+    def create_new_population_enhanced(self, population_A: np.ndarray, population_B: np.ndarray,
+                                       fitness: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """记录上一批的预测误差，并提出下一批点"""
+        generation = len(self.history['generations']) + 1
+        if self.pending_predictions is not None and len(self.pending_predictions) == len(fitness):
+            measured = self._transform(fitness)
+            for (predicted, std), value in zip(self.pending_predictions, measured):
+                self.model.record_prediction(predicted, std, value, generation)
+            statistics = self.model.get_prediction_statistics(generation)
+            self.history['bo_prediction_rmse'].append(statistics['rmse'] if statistics else None)
+        return self._propose(generation)
+
+    def _journal_state(self, generation: int, fitness: np.ndarray) -> Tuple[Dict, Dict]:
+        """在遗传算法的可恢复状态上追加未测完的初始设计和待评估批次的预测（模型由恢复的评估历史重建）"""
+        state, arrays = super()._journal_state(generation, fitness)
+        state['bo_pending_predictions'] = self.pending_predictions
+        arrays['bo_design'] = self._design
+        return state, arrays
+
+    def _restore_journal_state(self, state: Dict, arrays: Dict):
+        super()._restore_journal_state(state, arrays)
+        predictions = state.get('bo_pending_predictions')
+        self.pending_predictions = [tuple(prediction) for prediction in predictions] if predictions else None
+        self._design = arrays.get('bo_design')
+
+    def enhanced_convergence_check(self, current_best_fitness: float,
+                                   population_A: np.ndarray, population_B: np.ndarray,
+                                   current_fitness: np.ndarray, generation: int) -> Tuple[bool, bool]:
+        """
+        贝叶斯优化收敛检测
+        最近bo_patience轮最佳功率的相对提高小于bo_convergence_threshold，
+        或模型给出的最大期望改进低于bo_ei_tolerance时判定全局收敛
+        返回: (是否检测到收敛, 是否全局收敛)
+        """
+        self.best_history.append(self.best_fitness)
+        improvement = 1.0
+        if len(self.best_history) > self.bo_patience and self.best_fitness > 0:
+            improvement = (self.best_fitness - self.best_history[-self.bo_patience - 1]) / self.best_fitness
+
+        # 未通光时模型是平的，期望改进和最佳功率都不能说明已收敛
+        stagnated = self.light_detected and improvement < self.bo_convergence_threshold
+        exhausted = self.light_detected and self.last_max_ei is not None and self.last_max_ei < self.ei_tolerance
+        self.history['convergence_status'].append({
+            'generation': generation,
+            'improvement_percent': improvement,
+            'max_expected_improvement': self.last_max_ei,
+            'convergence_detected': stagnated or exhausted,
+            'timestamp': datetime.now().isoformat()
+        })
+
+        if stagnated or exhausted:
+            reason = f"最近{self.bo_patience}轮提高 {improvement*100:.2f}%" if stagnated \
+                else f"最大期望改进 {self.last_max_ei:.2e} < {self.ei_tolerance}"
+            print(f"第{generation}代: 贝叶斯优化收敛（{reason}）")
+            return True, True
+        return False, False
@@ -0,0 +1,138 @@
+# benchmark_engines.py
+"""
+优化引擎基准测试
+在模拟光学平台（高斯模场耦合模型，见 simulated_bench.py）上运行各优化引擎，
+统计首次达到峰值功率95%所需的评估次数。
+
+用法:
+    python benchmark_engines.py --engines ga cma_es --runs 5 --generations 60
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import numpy as np
+
+from device_manager_double import GlobalDeviceManager
+from hardware_adapter_double import HardwareAdapter
+from GA_double_new_1 import get_dual_end_config
+from optimizer_engines import get_available_engines, get_engine_class
+
+CONTROLLER_NAMES = ["A端位置控制器", "A端角度控制器", "B端位置控制器", "B端角度控制器"]
+
+
+def create_simulated_adapter(seed: int, noise_relative: float = 0.002) -> HardwareAdapter:
+    """创建无延迟的模拟平台硬件适配器"""
+    device_manager = GlobalDeviceManager()
+    device_manager.disconnect_all()
+    device_manager.configure_backend({
+        'device_backend': 'simulated',
+        'simulation': {
+            'random_seed': seed,
+            'noise_relative': noise_relative,
+            'command_latency': 0.0,
+            'measure_latency': 0.0,
+            'settle_time_constant': 0.0,
+        }
+    })
+    device_manager.initialize_power_meter()
+    for name in CONTROLLER_NAMES:
+        device_manager.initialize_pzt_controller(name, "SIM")
+    return HardwareAdapter(mode="dual")
+
+
+def run_engine(engine: str, seed: int, generations: int, target_fraction: float = 0.95,
+               config_overrides: dict = None) -> dict:
+    """
+    运行一次引擎，返回达到目标功率所需的评估次数等统计
+
+    返回:
+        {'engine', 'seed', 'evaluations_to_target', 'total_evaluations', 'best_fraction', 'time'}
+    """
+    adapter = create_simulated_adapter(seed)
+    peak_power = GlobalDeviceManager().get_simulated_bench().peak_power
+    target = peak_power * target_fraction
+
+    config = get_dual_end_config()
+    config.update({
+        'generations': generations,
+        'random_seed': seed,
+        # 模拟平台瞬时到位：读一次信号即视为稳定
+        'settle_config': {'adaptive_settle': True, 'min_settle_time': 0.0, 'stable_window': 1,
+                          'small_step_max_settle': 0.0, 'full_step_max_settle': 0.0},
+        'power_acquisition': dict(config['power_acquisition'], background_service=False),
+        'run_journal': dict(config['run_journal'], enabled=False),
+        'metrics': dict(config['metrics'], enabled=False),
+    })
+    config.update(config_overrides or {})
+
+    first_hit = {'evaluation': None}
+
+    def on_progress(message):
+        if message.get('type') != 'evaluation' or first_hit['evaluation'] is not None:
+            return
+        data = message['evaluation_data']
+        if data['power'] >= target:
+            first_hit['evaluation'] = data['evaluation_count']
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        optimizer = get_engine_class(engine)(config, adapter)
+        optimizer.set_callbacks(progress_callback=on_progress)
+        start = time.perf_counter()
+        result = optimizer.run()
+        elapsed = time.perf_counter() - start
+
+    return {
+        'engine': engine,
+        'seed': seed,
+        'evaluations_to_target': first_hit['evaluation'],
+        'total_evaluations': result.get('total_evaluations'),
+        'best_fraction': float(result.get('best_power', 0.0) / peak_power),
+        'time': elapsed,
+    }
+
+
+def summarize(results: list) -> dict:
+    """按引擎汇总：成功率、达到目标的评估次数中位数和均值"""
+    summary = {}
+    for engine in sorted({r['engine'] for r in results}):
+        runs = [r for r in results if r['engine'] == engine]
+        hits = [r['evaluations_to_target'] for r in runs if r['evaluations_to_target'] is not None]
+        summary[engine] = {
+            'runs': len(runs),
+            'success_rate': len(hits) / len(runs),
+            'median_evaluations_to_target': float(np.median(hits)) if hits else None,
+            'mean_evaluations_to_target': float(np.mean(hits)) if hits else None,
+            'mean_best_fraction': float(np.mean([r['best_fraction'] for r in runs])),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="优化引擎基准测试（模拟高斯耦合平台）")
+    parser.add_argument('--engines', nargs='+', default=get_available_engines())
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--generations', type=int, default=60)
+    parser.add_argument('--target', type=float, default=0.95, help="目标功率占峰值的比例")
+    parser.add_argument('--output', default=None, help="结果JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    for engine in args.engines:
+        for seed in range(args.runs):
+            result = run_engine(engine, seed, args.generations, args.target)
+            results.append(result)
+            print(f"{engine} seed={seed}: 达到{args.target*100:.0f}%峰值用 {result['evaluations_to_target']} 次评估, "
+                  f"最佳 {result['best_fraction']*100:.1f}%, 耗时 {result['time']:.1f}s")
+
+    summary = summarize(results)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'summary': summary}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+# cma_es_optimizer.py
+"""
+CMA-ES 优化引擎
+与 DualEndGeneticAlgorithmOptimizer 相同的构造参数、回调、进度消息和 run() 结果字典，
+可通过配置 'optimizer_engine': 'cma_es' 替换遗传算法（见 optimizer_engines.py）。
+
+A端与B端变量拼接后按 search_range_A/B 归一化到[0,1]，µm轴与rad轴在同一尺度上搜索；
+采样点超出范围时裁剪到边界内再测量，并以裁剪后的点更新分布。
+评估（适应度缓存、评估顺序调度）、收敛后的位置锁定与GUI通知沿用遗传算法的实现。
+"""
+import math
+from datetime import datetime
+from typing import Dict, Tuple
+
+import numpy as np
+
+from GA_double_new_1 import DualEndGeneticAlgorithmOptimizer
+
+
+class CMAESOptimizer(DualEndGeneticAlgorithmOptimizer):
+    """双端CMA-ES优化器"""
+
+    SURROGATE_SCREENING = False
+
+    def __init__(self, config: dict, hardware_adapter):
+        super().__init__(config, hardware_adapter)
+
+        self.dimension_A = len(self.selected_variables_A)
+        self.dimension = self.dimension_A + len(self.selected_variables_B)
+        n = self.dimension
+
+        # 种群大小：缺省使用CMA-ES推荐值 4 + floor(3 ln n)
+        population_size = config.get('cma_population_size', None)
+        if not population_size:
+            population_size = 4 + int(3 * math.log(n))
+        self.population_size = int(population_size)
+        self.normal_population_size = self.population_size
+        self.initial_sigma = config.get('cma_initial_sigma', 0.3)  # 归一化坐标下的初始步长
+        self.tol_x = config.get('cma_tol_x', 1e-3)  # 归一化步长小于该值时判定全局收敛
+
+        # 重组权重与自适应参数（Hansen, The CMA Evolution Strategy: A Tutorial）
+        self.mu = self.population_size // 2
+        weights = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / np.sum(weights)
+        self.mueff = 1.0 / np.sum(self.weights ** 2)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+
+        self._reset_distribution(config.get('cma_initial_mean', None))
+        self.history['optimizer_engine'] = 'cma_es'
+        self.history['cma_sigma'] = []
+
+        print(f"CMA-ES引擎: 维度 {n}, 种群大小 {self.population_size}, 初始步长 {self.initial_sigma}")
+
+    def _reset_distribution(self, initial_mean=None):
+        """重置搜索分布（均值缺省为搜索范围中心）"""
+        n = self.dimension
+        if initial_mean is None:
+            self.mean = np.full(n, 0.5)
+        else:
+            self.mean = np.clip(self._normalize(np.asarray(initial_mean, dtype=float)), 0.0, 1.0)
+        self.sigma = float(self.initial_sigma)
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.cma_generation = 0
+
+    def set_search_ranges(self, search_range_A, search_range_B):
+        """更新搜索范围后重新归一化，并把分布重置到新范围的中心"""
+        super().set_search_ranges(search_range_A, search_range_B)
+        self._reset_distribution()
+
+    @property
+    def normalized_step(self) -> float:
+        """当前归一化步长（sigma × 最大标准差）"""
+        return float(self.sigma * np.sqrt(np.max(np.diag(self.C))))
+
+    # =============================================================================
+    # ask / tell
+    # =============================================================================
+
+    def _ask(self) -> Tuple[np.ndarray, np.ndarray]:
+        """按当前分布采样一代，返回(A端种群, B端种群)"""
+        z = self.rng.standard_normal((self.population_size, self.dimension))
+        samples = self.mean + self.sigma * (z * self.D) @ self.B.T
+        samples = np.clip(samples, 0.0, 1.0)
+        points = self._denormalize(samples)
+        self.elite_rows = 0
+        return points[:, :self.dimension_A].copy(), points[:, self.dimension_A:].copy()
+
+    def _tell(self, population_A: np.ndarray, population_B: np.ndarray, fitness: np.ndarray):
+        """根据本代适应度（越大越好）更新均值、进化路径、协方差和步长"""
+        n = self.dimension
+        samples = self._normalize(np.hstack([population_A, population_B]))
+        order = np.argsort(fitness)[::-1][:self.mu]
+        steps = (samples[order] - self.mean) / self.sigma
+        step_w = self.weights @ steps
+
+        self.mean = self.mean + self.sigma * step_w
+        self.cma_generation += 1
+
+        inv_sqrt_C = self.B @ np.diag(1.0 / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_C @ step_w
+        ps_norm = np.linalg.norm(self.ps)
+        hsig = ps_norm / math.sqrt(1 - (1 - self.cs) ** (2 * self.cma_generation)) / self.chi_n < 1.4 + 2 / (n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(self.cc * (2 - self.cc) * self.mueff) * step_w
+
+        rank_mu = (steps * self.weights[:, None]).T @ steps
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * rank_mu)
+        self.sigma *= math.exp((self.cs / self.damps) * (ps_norm / self.chi_n - 1))
+        self.sigma = min(self.sigma, 1.0)
+
+        # 协方差特征分解（维度很小，每代分解）
+        self.C = (self.C + self.C.T) / 2
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+    # =============================================================================
+    # 覆盖遗传算法的种群生成与收敛检测
+    # =============================================================================
+
+    def initialize_populations(self):
+        """按初始分布采样第一代"""
+        self.population_A, self.population_B = self._ask()
+        print(f"CMA-ES初始种群: A端 {self.population_A.shape}, B端 {self.population_B.shape}")
+
+    def create_new_population_enhanced(self, population_A: np.ndarray, population_B: np.ndarray,
+                                       fitness: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """用本代适应度更新分布并采样下一代"""
+        self._tell(population_A, population_B, fitness)
+        self.history['cma_sigma'].append(self.normalized_step)
+        return self._ask()
+
+    def enhanced_convergence_check(self, current_best_fitness: float,
+                                   population_A: np.ndarray, population_B: np.ndarray,
+                                   current_fitness: np.ndarray, generation: int) -> Tuple[bool, bool]:
+        """
+        CMA-ES收敛检测
+        归一化步长小于cma_tol_x，或最近convergence_patience代最佳适应度变化小于
+        convergence_threshold时判定全局收敛（CMA-ES自身调节步长，不使用增强探索）
+        返回: (是否检测到收敛, 是否全局收敛)
+        """
+        step = self.normalized_step
+        recent_fitness = self.history['best_fitness'][-self.convergence_patience:]
+        change_percent = 1.0
+        if len(recent_fitness) >= self.convergence_patience and max(recent_fitness) > 0:
+            change_percent = (max(recent_fitness) - min(recent_fitness)) / max(recent_fitness)
+
+        step_converged = step < self.tol_x
+        stagnated = change_percent < self.convergence_threshold_percent
+        self.history['convergence_status'].append({
+            'generation': generation,
+            'recent_fitness': recent_fitness[-3:],
+            'change_percent': change_percent,
+            'normalized_step': step,
+            'convergence_detected': step_converged or stagnated,
+            'timestamp': datetime.now().isoformat()
+        })
+
+        if step_converged or stagnated:
+            reason = f"归一化步长 {step:.2e} < {self.tol_x}" if step_converged \
+                else f"最近{self.convergence_patience}代变化 {change_percent*100:.2f}%"
+            print(f"第{generation}代: CMA-ES收敛（{reason}）")
+            return True, True
+        return False, False
+
+    # =============================================================================
+    # 运行日志状态
+    # =============================================================================
+
+    def _journal_state(self, generation: int, fitness: np.ndarray) -> Tuple[Dict, Dict]:
+        """在遗传算法的可恢复状态上追加搜索分布"""
+        state, arrays = super()._journal_state(generation, fitness)
+        state.update({'cma_sigma': self.sigma, 'cma_generation': self.cma_generation})
+        arrays.update({'cma_mean': self.mean, 'cma_C': self.C, 'cma_B': self.B, 'cma_D': self.D,
+                       'cma_pc': self.pc, 'cma_ps': self.ps})
+        return state, arrays
+
+    def _restore_journal_state(self, state: Dict, arrays: Dict):
+        """还原搜索分布（更新搜索范围时分布被重置，需在其后还原）"""
+        super()._restore_journal_state(state, arrays)
+        self.sigma = float(state['cma_sigma'])
+        self.cma_generation = int(state['cma_generation'])
+        self.mean, self.C, self.B, self.D = arrays['cma_mean'], arrays['cma_C'], arrays['cma_B'], arrays['cma_D']
+        self.pc, self.ps = arrays['cma_pc'], arrays['cma_ps']
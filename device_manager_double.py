@@ -1,7 +1,11 @@
 import threading
 from typing import Dict, Optional, Tuple, List
-from hardware_drivers_pzt import PiezoController
+try:
+    from hardware_drivers_pzt import PiezoController
+except Exception:  # 无Kinesis/.NET环境（如Linux CI）时只能使用模拟后端
+    PiezoController = None
 from PowerMeter import PowerMeter
+from metrics_exporter import get_metrics_registry
 from logger11 import get_logger
 
 logger = get_logger(__name__)
@@ -22,15 +26,82 @@ class GlobalDeviceManager:
     def _init(self):
         """初始化"""
         self._power_meter = None
+        self._power_service = None  # 后台功率采集服务（持有功率计会话）
         self._pzt_controllers = {}
+        self._backend = "hardware"  # 设备后端: hardware / simulated
+        self._simulation_config = {}
+        self._simulated_bench = None
+        self._connected_devices = set()  # 本进程中连接成功过的设备，再次连接成功计为重连
+        get_metrics_registry().add_collector('devices', self._collect_metrics)
+    
+    def _record_connected(self, name: str):
+        """记录设备连接成功（之前连接过的计为重连）"""
+        if name in self._connected_devices:
+            get_metrics_registry().inc('device_reconnects_total', labels={'device': name})
+        self._connected_devices.add(name)
+    
+    def _collect_metrics(self):
+        """导出线程中调用：设备连接状态与后台采集错误计数"""
+        metrics = get_metrics_registry()
+        status = self.check_connection_status()
+        for name in self._connected_devices | set(status):
+            metrics.set('device_connected', 1 if status.get(name) == "已连接" else 0, {'device': name})
+        service = self._power_service
+        if service is not None:
+            metrics.set('power_acquisition_errors_total', service.error_count)
+    
+    def configure_backend(self, config: Dict = None) -> Tuple[bool, str]:
+        """
+        根据配置选择设备后端
+        
+        参数:
+            config: 配置字典，'device_backend' 为 'hardware'（默认）或 'simulated'，
+                    'simulation' 为模拟平台参数（见 simulated_bench.get_default_simulation_config）
+        """
+        if config is None:
+            config = {}
+        
+        backend = config.get('device_backend', 'hardware')
+        if backend not in ("hardware", "simulated"):
+            return False, f"未知设备后端: {backend}"
+        
+        if (self._power_meter or self._pzt_controllers) and backend != self._backend:
+            return False, "设备已初始化，请先断开所有设备再切换后端"
+        
+        self._backend = backend
+        self._simulation_config = dict(config.get('simulation', {}))
+        if not (self._power_meter or self._pzt_controllers):
+            self._simulated_bench = None
+        logger.info(f"设备后端: {backend}")
+        return True, f"设备后端: {backend}"
+    
+    def get_backend(self) -> str:
+        """获取当前设备后端"""
+        return self._backend
+    
+    def get_simulated_bench(self):
+        """获取模拟光学平台（仅模拟后端，按需创建）"""
+        if self._backend != "simulated":
+            return None
+        if self._simulated_bench is None:
+            from simulated_bench import SimulatedOpticalBench
+            self._simulated_bench = SimulatedOpticalBench(self._simulation_config)
+        return self._simulated_bench
     
     def initialize_power_meter(self, wavelength=1550) -> Tuple[bool, str]:
         """初始化功率计"""
         try:
-            self._power_meter = PowerMeter(wavelength=wavelength)
+            self.stop_power_acquisition()
+            if self._backend == "simulated":
+                from simulated_bench import SimulatedPowerMeter
+                self._power_meter = SimulatedPowerMeter(self.get_simulated_bench(), wavelength=wavelength)
+            else:
+                self._power_meter = PowerMeter(wavelength=wavelength)
+            self._record_connected("功率计")
             logger.info("功率计初始化成功")
             return True, "功率计初始化成功"
         except Exception as e:
+            get_metrics_registry().inc('device_connect_failures_total', labels={'device': "功率计"})
             logger.error(f"功率计初始化失败: {e}")
             return False, f"功率计初始化失败: {e}"
     
@@ -45,8 +116,16 @@ class GlobalDeviceManager:
                     return True, f"{name} 已初始化"
 
                 logger.info(f"尝试连接 {name} (尝试 {attempt+1}/{max_retries})...")
+                if attempt > 0:
+                    get_metrics_registry().inc('device_connect_retries_total', labels={'device': name})
 
-                controller = PiezoController(name, serial_no)
+                if self._backend == "simulated":
+                    from simulated_bench import SimulatedPiezoController
+                    controller = SimulatedPiezoController(name, serial_no, self.get_simulated_bench())
+                else:
+                    if PiezoController is None:
+                        raise RuntimeError("Kinesis驱动不可用，无法连接硬件PZT控制器")
+                    controller = PiezoController(name, serial_no)
 
                 # 设置连接超时
                 import threading
@@ -77,6 +156,7 @@ class GlobalDeviceManager:
 
                 if result[0]:
                     self._pzt_controllers[name] = controller
+                    self._record_connected(name)
                     logger.info(f"{name} 初始化成功")
                     return True, f"{name} 初始化成功"
                 else:
@@ -88,6 +168,7 @@ class GlobalDeviceManager:
                 time.sleep(2)
 
         logger.error(f"{name} 所有连接尝试均失败")
+        get_metrics_registry().inc('device_connect_failures_total', labels={'device': name})
         return False, f"{name} 连接失败，所有尝试均未成功"
     
     def initialize_all_pzt_controllers(self, mode: str = "single", config: Dict = None) -> Tuple[bool, str]:
@@ -142,6 +223,35 @@ class GlobalDeviceManager:
         """获取功率计实例"""
         return self._power_meter
     
+    def start_power_acquisition(self, config: Dict = None) -> Tuple[bool, str]:
+        """启动后台功率采集服务（已运行时直接返回）"""
+        if self._power_meter is None:
+            return False, "功率计未连接"
+        if self._power_service is not None and self._power_service.is_running:
+            return True, "后台功率采集服务已在运行"
+        try:
+            from power_acquisition_service import PowerAcquisitionService
+            self._power_service = PowerAcquisitionService(self._power_meter, config)
+            self._power_service.start()
+            logger.info("后台功率采集服务已启动")
+            return True, "后台功率采集服务已启动"
+        except Exception as e:
+            self._power_service = None
+            logger.error(f"后台功率采集服务启动失败: {e}")
+            return False, f"后台功率采集服务启动失败: {e}"
+    
+    def get_power_acquisition_service(self):
+        """获取正在运行的后台功率采集服务（未运行时返回None）"""
+        if self._power_service is not None and self._power_service.is_running:
+            return self._power_service
+        return None
+    
+    def stop_power_acquisition(self):
+        """停止后台功率采集服务"""
+        if self._power_service is not None:
+            self._power_service.stop()
+            self._power_service = None
+    
     def get_pzt_controller(self, name: str) -> Optional[PiezoController]:
         """获取指定名称的PZT控制器"""
         return self._pzt_controllers.get(name)
@@ -172,6 +282,7 @@ class GlobalDeviceManager:
     def disconnect_all(self):
         """断开所有设备连接"""
         try:
+            self.stop_power_acquisition()
             if self._power_meter:
                 self._power_meter.close()
                 self._power_meter = None
@@ -0,0 +1,294 @@
+# dither_tracker.py
+"""
+抖动锁相漂移跟踪
+在当前中心位置上给每个轴叠加不同频率的小幅正弦抖动，对连续读取的功率做同步解调，
+得到各轴的局部梯度，每个解调窗口沿梯度移动一次中心。
+与高功率保持模式（每代约20次整点移动）相比，运动幅度小、校正频率高，用于补偿温漂。
+
+频率取基频的奇数倍 (2i+1)·f0：二阶项产生的 2f_i、f_i±f_j 都是偶数倍，不会泄漏到其他轴的解调结果中。
+坐标按搜索范围归一化，µm轴与rad轴使用相同的相对抖动幅度。
+
+执行机构有响应滞后，功率中的抖动分量相对指令参考有相位差φ（一阶响应 φ=atan(2πfτ)），
+只用正弦参考解调得到的是 G·cosφ，φ超过90°时符号反转，跟踪会朝远离峰值的方向走。
+因此同时用正弦/余弦参考解调得到复数幅值 c=G·e^{iφ}，按 c² 累计在线估计各轴相位（与梯度符号无关），
+取 c 在该相位方向上的分量作为梯度；最高抖动频率按响应时间限制在允许的相位滞后以内。
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from population_operators import get_bounds
+
+
+def get_default_dither_config() -> dict:
+    """获取抖动跟踪的默认配置"""
+    return {
+        'dither_amplitude': 0.005,       # 抖动幅度（占量程比例）
+        'dither_base_frequency': 0.5,    # 基频f0（Hz），第i轴频率为(2i+1)·f0，解调窗口为1/f0
+        'dither_update_interval': 0.025, # 指令周期（秒）
+        'dither_gain': 0.01,             # 校正增益（归一化坐标 / 相对梯度）
+        'dither_max_step': 0.01,         # 单次校正最大步长（占量程比例）
+        'dither_min_power': 0.0,         # 窗口平均功率低于该值时不校正
+        'dither_history_size': 1000,     # 保留的校正记录数
+        'dither_response_time': 0.05,    # 执行机构一阶响应时间常数（秒，估计值），用于限制最高频率和相位初值，0表示未知
+        'dither_max_phase_lag': 60.0,    # 最高抖动频率处允许的响应相位滞后（度），超过时降低基频
+        'dither_phase_min_coherence': 0.5,  # 相位估计的一致性（0~1）低于该值时使用响应时间模型的相位
+    }
+
+
+class DitherTracker:
+    """抖动锁相漂移跟踪器"""
+
+    def __init__(self, hardware_adapter, selected_variables_A: List[str], selected_variables_B: List[str],
+                 search_range_A: Dict, search_range_B: Dict,
+                 center_individual_A: np.ndarray, center_individual_B: np.ndarray,
+                 config: dict = None, progress_callback: Optional[Callable] = None,
+                 fixed_position: Optional[Dict[str, float]] = None):
+        """
+        初始化跟踪器
+
+        参数:
+            hardware_adapter: 硬件适配器（set_position / measure_current_power）
+            selected_variables_A/B: 跟踪的变量
+            search_range_A/B: 搜索范围（用于归一化与边界）
+            center_individual_A/B: 起始中心
+            config: 配置，缺省项使用get_default_dither_config()
+            progress_callback: 每次校正后的进度回调
+            fixed_position: 未跟踪轴的位置（{'A_z': ...}），每次下发指令时一并发送，避免被置零
+        """
+        self.hardware_adapter = hardware_adapter
+        self.selected_variables_A = list(selected_variables_A)
+        self.selected_variables_B = list(selected_variables_B)
+        self.config = get_default_dither_config()
+        if config:
+            self.config.update({k: v for k, v in config.items() if k in self.config})
+        self.progress_callback = progress_callback
+        self.fixed_position = dict(fixed_position or {})
+
+        lower_A, upper_A = get_bounds(self.selected_variables_A, search_range_A)
+        lower_B, upper_B = get_bounds(self.selected_variables_B, search_range_B)
+        self.lower_bounds = np.concatenate([lower_A, lower_B])
+        span = np.concatenate([upper_A, upper_B]) - self.lower_bounds
+        self.span = np.where(span > 0, span, 1.0)
+        self.dimension_A = len(self.selected_variables_A)
+        self.dimension = len(self.lower_bounds)
+
+        center = np.concatenate([np.asarray(center_individual_A, dtype=float),
+                                 np.asarray(center_individual_B, dtype=float)])
+        self.center = np.clip((center - self.lower_bounds) / self.span, 0.0, 1.0)
+
+        base_frequency = float(self.config['dither_base_frequency'])
+        response_time = float(self.config['dither_response_time'])
+        if response_time > 0:
+            # 最高频率 (2n-1)·f0 处的相位滞后不超过 dither_max_phase_lag
+            max_frequency = np.tan(np.radians(self.config['dither_max_phase_lag'])) / (2 * np.pi * response_time)
+            highest_harmonic = 2 * self.dimension - 1
+            if base_frequency * highest_harmonic > max_frequency:
+                print(f"抖动基频 {base_frequency:.3f} Hz 超出执行机构带宽，降低为 {max_frequency / highest_harmonic:.3f} Hz")
+                base_frequency = max_frequency / highest_harmonic
+        self.frequencies = base_frequency * (2 * np.arange(self.dimension) + 1)
+        self.window_length = 1.0 / base_frequency
+        self.amplitude = float(self.config['dither_amplitude'])
+
+        # 响应相位：模型初值 atan(2πfτ)，解调结果按 c² 累计（|c|²加权）在线估计
+        self.model_phases = np.arctan(2 * np.pi * self.frequencies * max(response_time, 0.0))
+        self.phase_estimates = self.model_phases.copy()
+        self._phase_sum = np.zeros(self.dimension, dtype=complex)
+        self._phase_weight = np.zeros(self.dimension)
+        self._phase_windows = 0
+
+        self._thread = None
+        self._running = False
+        self.correction_count = 0
+        self.command_count = 0
+        self.path_length = 0.0        # 指令轨迹总长度（归一化坐标）
+        self.correction_path = 0.0    # 中心移动总长度（归一化坐标）
+        self.last_power = None
+        self.history = []
+        self.start_time = None
+
+    # ------------------------------------------------------------------
+    # 位置换算
+    # ------------------------------------------------------------------
+
+    def _to_individuals(self, point: np.ndarray):
+        values = point * self.span + self.lower_bounds
+        return values[:self.dimension_A], values[self.dimension_A:]
+
+    def _position_dict(self, point: np.ndarray) -> Dict[str, float]:
+        individual_A, individual_B = self._to_individuals(point)
+        position = dict(self.fixed_position)
+        position.update({f'A_{var}': individual_A[i] for i, var in enumerate(self.selected_variables_A)})
+        position.update({f'B_{var}': individual_B[i] for i, var in enumerate(self.selected_variables_B)})
+        return position
+
+    def get_center_individuals(self):
+        """当前中心（A端个体, B端个体）"""
+        return self._to_individuals(self.center)
+
+    # ------------------------------------------------------------------
+    # 跟踪线程
+    # ------------------------------------------------------------------
+
+    @property
+    def is_running(self) -> bool:
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动跟踪线程"""
+        if self.is_running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._tracking_loop, name="dither_tracker", daemon=True)
+        self._thread.start()
+        print(f"抖动跟踪已启动: 抖动幅度 {self.amplitude*100:.2f}% 量程, "
+              f"频率 {self.frequencies[0]:.2f}~{self.frequencies[-1]:.2f} Hz, 校正周期 {self.window_length:.2f}s")
+
+    def stop(self, timeout: float = 2.0):
+        """停止跟踪并把平台停在当前中心"""
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self.hardware_adapter.set_position(self._position_dict(self.center))
+        print(f"抖动跟踪已停止: {self.correction_count} 次校正")
+
+    def _tracking_loop(self):
+        interval = float(self.config['dither_update_interval'])
+        self.start_time = time.perf_counter()
+        window_start = 0.0
+        settling = True   # 第一个窗口包含平台移到起始中心的过渡过程，不用于校正
+        times = []
+        powers = []
+        last_point = self.center.copy()
+        next_tick = self.start_time
+
+        while self._running:
+            t = time.perf_counter() - self.start_time
+            point = np.clip(self.center + self.amplitude * np.sin(2 * np.pi * self.frequencies * t), 0.0, 1.0)
+            try:
+                self.hardware_adapter.set_position(self._position_dict(point))
+                power = self.hardware_adapter.measure_current_power()
+            except Exception as e:
+                print(f"抖动跟踪读写失败: {e}")
+                time.sleep(interval)
+                continue
+
+            self.command_count += 1
+            self.path_length += float(np.linalg.norm(point - last_point))
+            last_point = point
+            times.append(t)
+            powers.append(power)
+
+            if t - window_start >= self.window_length:
+                if not settling:
+                    self._correct(np.array(times), np.array(powers))
+                settling = False
+                times = []
+                powers = []
+                window_start = t
+
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
+
+    def demodulate(self, times: np.ndarray, powers: np.ndarray) -> Optional[np.ndarray]:
+        """
+        正交同步解调：各轴复数幅值 c = I - iQ = G·|H|·e^{iφ}
+        （G为相对梯度，|H|、φ为执行机构在该频率的响应幅度与滞后相位），窗口平均功率过低时返回None
+        """
+        mean_power = float(np.mean(powers))
+        if mean_power <= max(self.config['dither_min_power'], 0.0) or len(powers) < 2 * self.dimension + 4:
+            return None
+        phases = 2 * np.pi * self.frequencies[None, :] * times[:, None]
+        # 常数、线性趋势（漂移本身）与各轴正弦/余弦分量一起最小二乘拟合，
+        # 趋势不会泄漏到低频轴，采样间隔不均匀也不影响
+        design = np.hstack([np.ones((len(times), 1)), (times - times.mean())[:, None],
+                            np.sin(phases), np.cos(phases)])
+        coefficients = np.linalg.lstsq(design, powers, rcond=None)[0]
+        in_phase = coefficients[2:2 + self.dimension]
+        quadrature = coefficients[2 + self.dimension:]
+        return (in_phase - 1j * quadrature) / (self.amplitude * mean_power)
+
+    def _update_phase_estimates(self, demodulated: np.ndarray):
+        """累计 c² 估计响应相位（取值(-90°, 90°]，与梯度符号无关），一致性不足的轴使用模型相位"""
+        self._phase_sum += demodulated ** 2
+        self._phase_weight += np.abs(demodulated) ** 2
+        self._phase_windows += 1
+        coherence = np.divide(np.abs(self._phase_sum), self._phase_weight,
+                              out=np.zeros(self.dimension), where=self._phase_weight > 0)
+        reliable = (coherence >= self.config['dither_phase_min_coherence']) & (self._phase_windows >= 3)
+        self.phase_estimates = np.where(reliable, 0.5 * np.angle(self._phase_sum), self.model_phases)
+
+    def estimate_gradient(self, times: np.ndarray, powers: np.ndarray) -> Optional[np.ndarray]:
+        """
+        相对梯度（每单位归一化坐标的功率相对变化）：解调幅值在估计响应相位方向上的分量
+        窗口平均功率过低时返回None
+        """
+        demodulated = self.demodulate(times, powers)
+        if demodulated is None:
+            return None
+        self._update_phase_estimates(demodulated)
+        return np.real(demodulated * np.exp(-1j * self.phase_estimates))
+
+    def _correct(self, times: np.ndarray, powers: np.ndarray):
+        """用一个窗口的数据校正中心"""
+        mean_power = float(np.mean(powers))
+        self.last_power = mean_power
+        gradient = self.estimate_gradient(times, powers)
+        if gradient is None:
+            return
+
+        max_step = float(self.config['dither_max_step'])
+        step = np.clip(self.config['dither_gain'] * gradient, -max_step, max_step)
+        self.center = np.clip(self.center + step, 0.0, 1.0)
+        self.correction_count += 1
+        self.correction_path += float(np.linalg.norm(step))
+
+        individual_A, individual_B = self.get_center_individuals()
+        record = {
+            'correction': self.correction_count,
+            'time': float(times[-1]),
+            'mean_power': mean_power,
+            'gradient_norm': float(np.linalg.norm(gradient)),
+            'step_norm': float(np.linalg.norm(step)),
+            'samples': len(powers),
+            'phase_estimates_deg': np.degrees(self.phase_estimates).tolist(),
+            'center_A': individual_A.tolist(),
+            'center_B': individual_B.tolist(),
+        }
+        self.history.append(record)
+        if len(self.history) > self.config['dither_history_size']:
+            del self.history[0]
+
+        if self.progress_callback:
+            self.progress_callback({
+                'type': 'dither_tracking',
+                'tracking_data': dict(record, timestamp=datetime.now().isoformat(),
+                                      position_A={f'A_{var}': individual_A[i]
+                                                  for i, var in enumerate(self.selected_variables_A)},
+                                      position_B={f'B_{var}': individual_B[i]
+                                                  for i, var in enumerate(self.selected_variables_B)})
+            })
+
+    def get_status(self) -> dict:
+        """获取跟踪状态"""
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        return {
+            'running': self.is_running,
+            'correction_count': self.correction_count,
+            'command_count': self.command_count,
+            'correction_rate': self.correction_count / elapsed if elapsed > 0 else 0.0,
+            'last_power': self.last_power,
+            'path_length': self.path_length,
+            'correction_path': self.correction_path,
+            'amplitude': self.amplitude,
+            'frequencies': self.frequencies.tolist(),
+            'phase_estimates_deg': np.degrees(self.phase_estimates).tolist(),
+        }
@@ -0,0 +1,169 @@
+# evaluation_scheduler.py
+"""
+评估顺序调度
+在归一化的A+B坐标空间中（按各轴稳定代价加权）为一代种群规划移动路径：
+最近邻构造初始路径，再用2-opt消除交叉，减少压电行程和稳定等待。
+已测量过的精英个体根据当前平台位置放在路径开头或结尾。
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EvaluationScheduler:
+    """评估顺序调度器"""
+
+    def __init__(self, lower_bounds: np.ndarray, upper_bounds: np.ndarray,
+                 axis_weights: Optional[np.ndarray] = None, max_two_opt_passes: int = 20):
+        """
+        初始化调度器
+
+        参数:
+            lower_bounds: 各维下界（A端变量在前，B端变量在后）
+            upper_bounds: 各维上界
+            axis_weights: 各维稳定代价权重（默认全为1）
+            max_two_opt_passes: 2-opt最大迭代轮数
+        """
+        self.lower_bounds = np.asarray(lower_bounds, dtype=np.float64)
+        span = np.asarray(upper_bounds, dtype=np.float64) - self.lower_bounds
+        self.span = np.where(span > 0, span, 1.0)
+        if axis_weights is None:
+            axis_weights = np.ones_like(self.lower_bounds)
+        self.axis_weights = np.asarray(axis_weights, dtype=np.float64)
+        self.max_two_opt_passes = max_two_opt_passes
+
+    def _normalize(self, points: np.ndarray) -> np.ndarray:
+        """归一化并按权重缩放"""
+        return (np.asarray(points, dtype=np.float64) - self.lower_bounds) / self.span * self.axis_weights
+
+    @staticmethod
+    def _distance_matrix(points: np.ndarray) -> np.ndarray:
+        """欧氏距离矩阵"""
+        diff = points[:, None, :] - points[None, :, :]
+        return np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+
+    @staticmethod
+    def _path_length(dist: np.ndarray, path: Sequence[int]) -> float:
+        """路径总长度（path中为距离矩阵索引）"""
+        path = np.asarray(path)
+        if len(path) < 2:
+            return 0.0
+        return float(np.sum(dist[path[:-1], path[1:]]))
+
+    @staticmethod
+    def _nearest_neighbor(dist: np.ndarray, start: int, nodes: Sequence[int]) -> list:
+        """最近邻构造：从start出发依次访问nodes"""
+        remaining = list(nodes)
+        path = [start]
+        current = start
+        while remaining:
+            idx = int(np.argmin(dist[current, remaining]))
+            current = remaining.pop(idx)
+            path.append(current)
+        return path
+
+    def _two_opt(self, dist: np.ndarray, path: list) -> list:
+        """开放路径2-opt（起点固定，终点自由）"""
+        path = np.array(path)
+        n = len(path)
+        if n < 4:
+            return path.tolist()
+
+        for _ in range(self.max_two_opt_passes):
+            improved = False
+            for i in range(1, n - 1):
+                a, b = path[i - 1], path[i]
+                js = np.arange(i + 1, n)
+                c = path[js]
+                # j为最后一个节点时，路径末尾无后继边
+                d_next = np.zeros(len(js))
+                has_next = js < n - 1
+                d_next[has_next] = dist[c[has_next], path[js[has_next] + 1]]
+                new_next = np.zeros(len(js))
+                new_next[has_next] = dist[b, path[js[has_next] + 1]]
+                delta = dist[a, c] + new_next - dist[a, b] - d_next
+                best = int(np.argmin(delta))
+                if delta[best] < -1e-12:
+                    j = js[best]
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+            if not improved:
+                break
+        return path.tolist()
+
+    def _route(self, dist: np.ndarray, start: int, nodes: Sequence[int]) -> list:
+        """规划从start出发访问nodes的路径（不含start）"""
+        if not len(nodes):
+            return []
+        path = self._nearest_neighbor(dist, start, nodes)
+        path = self._two_opt(dist, path)
+        return path[1:]
+
+    def plan(self, points: np.ndarray, start_point: Optional[np.ndarray] = None,
+             elite_indices: Sequence[int] = ()) -> Tuple[np.ndarray, Dict]:
+        """
+        规划评估顺序
+
+        参数:
+            points: 待评估个体（N×D，A端与B端拼接后的坐标）
+            start_point: 当前平台位置（D维，None时从第一个个体出发）
+            elite_indices: 已测量过的精英个体索引
+
+        返回:
+            order: 评估顺序（原始索引）
+            info: 路径信息（path_length、naive_path_length、elites_first）
+        """
+        points = np.asarray(points, dtype=np.float64)
+        n = len(points)
+        normalized = self._normalize(points)
+
+        has_start = start_point is not None
+        if has_start:
+            normalized = np.vstack([self._normalize(np.asarray(start_point)[None, :]), normalized])
+        dist = self._distance_matrix(normalized)
+
+        offset = 1 if has_start else 0
+        naive_path = ([0] if has_start else []) + list(range(offset, n + offset))
+        naive_length = self._path_length(dist, naive_path)
+
+        elite_set = {int(i) for i in elite_indices if 0 <= int(i) < n}
+        elites = [i + offset for i in sorted(elite_set)]
+        others = [i + offset for i in range(n) if i not in elite_set]
+
+        if has_start:
+            start = 0
+        else:
+            # 无当前位置时从第一个普通个体出发
+            first_group = others if others else elites
+            start = first_group[0]
+            if start in others:
+                others.remove(start)
+            else:
+                elites.remove(start)
+
+        # 精英放在开头还是结尾：取决于当前位置离精英群还是离其余个体更近
+        elites_first = False
+        if elites and others:
+            elites_first = bool(np.min(dist[start, elites]) < np.min(dist[start, others]))
+
+        groups = [elites, others] if elites_first else [others, elites]
+        route = [] if has_start else [start]
+        current = start
+        for group in groups:
+            group_route = self._route(dist, current, group)
+            route.extend(group_route)
+            if group_route:
+                current = group_route[-1]
+
+        full_path = ([0] if has_start else []) + route
+        path_length = self._path_length(dist, full_path)
+
+        order = np.array(route, dtype=int) - offset
+        info = {
+            'path_length': path_length,
+            'naive_path_length': naive_length,
+            'path_saving_percent': (1 - path_length / naive_length) * 100 if naive_length > 0 else 0.0,
+            'elites_first': elites_first,
+            'elite_count': len(elite_set),
+        }
+        return order, info
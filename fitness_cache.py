@@ -0,0 +1,167 @@
+# fitness_cache.py
+"""
+适应度缓存
+按执行器分辨率量化A+B位置作为键，缓存已测量的适应度，避免重复测量精英个体和未变异的子代。
+缓存项有存活时间（温漂会使旧测量值失效）；命中时可按比例抽样复测以检测漂移，
+复测偏差超过容差时清空缓存。
+"""
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+class FitnessCache:
+    """基于量化位置的适应度缓存"""
+
+    def __init__(self, lower_bounds: np.ndarray, resolution: np.ndarray, ttl: Optional[float] = 60.0,
+                 drift_check_rate: float = 0.0, drift_tolerance: float = 0.05,
+                 drift_tolerance_absolute: float = 0.0, max_entries: int = 100000, rng: Optional[np.random.Generator] = None):
+        """
+        初始化适应度缓存
+
+        参数:
+            lower_bounds: 各维下界（A端变量在前，B端变量在后）
+            resolution: 各维量化分辨率（执行器分辨率）
+            ttl: 缓存存活时间（秒），None或<=0表示不过期
+            drift_check_rate: 命中时抽样复测的比例（0~1）
+            drift_tolerance: 复测相对偏差容差，超过时判定发生漂移并清空缓存
+            drift_tolerance_absolute: 复测绝对偏差容差（功率单位，避免低功率处噪声误判）
+            max_entries: 最大缓存条目数
+            rng: 随机数生成器（用于抽样复测）
+        """
+        self.lower_bounds = np.asarray(lower_bounds, dtype=np.float64)
+        self.resolution = np.asarray(resolution, dtype=np.float64)
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.drift_check_rate = float(drift_check_rate)
+        self.drift_tolerance = float(drift_tolerance)
+        self.drift_tolerance_absolute = float(drift_tolerance_absolute)
+        self.max_entries = int(max_entries)
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self._entries = {}  # key -> (fitness, 测量时间)
+        self._eval_time_total = 0.0
+        self._eval_time_count = 0
+
+        self.stats = self._empty_stats()
+        self.generation_stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        return {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'drift_checks': 0,
+            'drift_invalidations': 0,
+            'saved_seconds': 0.0,
+        }
+
+    def _count(self, name: str, value=1):
+        self.stats[name] += value
+        self.generation_stats[name] += value
+
+    def make_key(self, point: np.ndarray) -> bytes:
+        """量化位置生成缓存键"""
+        quantized = np.rint((np.asarray(point, dtype=np.float64) - self.lower_bounds) / self.resolution)
+        return quantized.astype(np.int64).tobytes()
+
+    @property
+    def mean_evaluation_time(self) -> float:
+        """平均单次测量耗时（秒）"""
+        if self._eval_time_count == 0:
+            return 0.0
+        return self._eval_time_total / self._eval_time_count
+
+    def lookup(self, point: np.ndarray, now: float = None) -> Tuple[str, Optional[float]]:
+        """
+        查询缓存
+
+        返回:
+            (状态, 缓存适应度)，状态为 'hit' / 'miss' / 'expired' / 'drift_check'
+            'drift_check' 表示命中但被抽中复测，调用方应重新测量并调用 check_drift
+        """
+        if now is None:
+            now = time.monotonic()
+        key = self.make_key(point)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._count('misses')
+            return 'miss', None
+
+        fitness, measured_at = entry
+        if self.ttl is not None and now - measured_at > self.ttl:
+            del self._entries[key]
+            self._count('expired')
+            self._count('misses')
+            return 'expired', None
+
+        if self.drift_check_rate > 0 and self.rng.random() < self.drift_check_rate:
+            self._count('drift_checks')
+            return 'drift_check', fitness
+
+        self._count('hits')
+        self._count('saved_seconds', self.mean_evaluation_time)
+        return 'hit', fitness
+
+    def record_duplicate(self):
+        """记录同一代内重复个体（复用本代首个同位置个体的测量值）"""
+        self._count('hits')
+        self._count('saved_seconds', self.mean_evaluation_time)
+
+    def store(self, point: np.ndarray, fitness: float, evaluation_time: float = None, now: float = None):
+        """写入测量结果"""
+        if now is None:
+            now = time.monotonic()
+        if evaluation_time is not None:
+            self._eval_time_total += evaluation_time
+            self._eval_time_count += 1
+        if len(self._entries) >= self.max_entries:
+            # 删除最早写入的条目
+            oldest_key = next(iter(self._entries))
+            del self._entries[oldest_key]
+        key = self.make_key(point)
+        self._entries.pop(key, None)
+        self._entries[key] = (float(fitness), now)
+
+    def check_drift(self, cached_fitness: float, measured_fitness: float) -> bool:
+        """
+        比较抽样复测值与缓存值
+
+        返回:
+            是否检测到漂移（检测到时清空缓存）
+        """
+        difference = abs(measured_fitness - cached_fitness)
+        reference = max(abs(cached_fitness), abs(measured_fitness))
+        if difference <= self.drift_tolerance_absolute or reference <= 0:
+            return False
+        deviation = difference / reference
+        if deviation > self.drift_tolerance:
+            print(f"适应度缓存：复测偏差 {deviation*100:.2f}% 超过容差，判定发生漂移，清空缓存")
+            self._count('drift_invalidations')
+            self.clear()
+            return True
+        return False
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+
+    def start_generation(self):
+        """开始新一代统计"""
+        self.generation_stats = self._empty_stats()
+
+    def get_statistics(self) -> Dict:
+        """获取缓存统计（本代与累计）"""
+        def with_rate(stats):
+            lookups = stats['hits'] + stats['misses'] + stats['drift_checks']
+            result = dict(stats)
+            result['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+            return result
+
+        return {
+            'generation': with_rate(self.generation_stats),
+            'total': with_rate(self.stats),
+            'entries': len(self._entries),
+            'mean_evaluation_time': self.mean_evaluation_time,
+        }
@@ -0,0 +1,364 @@
+# fly_scan.py
+"""
+飞行扫描（fly-scan）
+逐点"移动—稳定—测量"每个点都要等待压电稳定。飞行扫描让控制器连续线性扫描单轴输出电压，
+同时后台采集服务持续读取功率计快速数组；两路数据都带主机perf_counter时间戳，
+按样本时间（减去响应滞后）在指令时间轴上插值得到每个样本的位置，一次扫描即得到一条稠密的一维功率曲线。
+
+往返扫描的峰位分别偏向运动方向的前后两侧（偏移量为 速度×滞后），取平均即抵消压电响应与采集的滞后，
+两者之差给出滞后的估计值。峰位由峰值附近的对数功率做二次拟合得到（高斯模场在对数坐标下为抛物线）。
+用于逐轴精细对准（refine）和二维功率地形测绘（map_plane）。
+"""
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def get_default_fly_scan_config() -> dict:
+    """获取飞行扫描的默认配置"""
+    return {
+        'fly_scan_half_range': 0.05,       # 第一轮扫描半宽（占各轴搜索量程的比例）
+        'fly_scan_duration': 0.5,          # 单次扫描时长（秒）
+        'fly_scan_step_interval': 0.005,   # 电压指令周期（秒）
+        'fly_scan_settle': 0.2,            # 移动到扫描起点后的等待时间（秒）
+        'fly_scan_lag': 0.0,               # 功率响应相对指令的已知滞后（秒），往返扫描时只影响单程曲线
+        'fly_scan_bidirectional': True,    # 往返扫描，平均两个方向的峰位
+        'fly_scan_bins': 100,              # 每条曲线的位置分箱数
+        'fly_scan_passes': 2,              # 逐轴精细对准的轮数
+        'fly_scan_shrink': 0.4,            # 每轮扫描半宽的缩小系数（峰位落在扫描边缘时不缩小）
+        'fly_scan_peak_fraction': 0.5,     # 峰位拟合使用功率不低于该比例×峰值的相邻分箱
+        'fly_scan_min_power': 0.0,         # 曲线峰值低于该值时不移动该轴
+        'fly_scan_stream_timeout': 0.5,    # 扫描结束后等待功率样本到齐的最长时间（秒）
+    }
+
+
+def bin_profile(positions: np.ndarray, powers: np.ndarray, lower: float, upper: float,
+                bins: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    按位置分箱平均
+
+    返回:
+        (分箱中心, 平均功率, 样本数)，只包含有样本的分箱
+    """
+    edges = np.linspace(lower, upper, bins + 1)
+    index = np.clip(np.searchsorted(edges, positions, side='right') - 1, 0, bins - 1)
+    counts = np.bincount(index, minlength=bins)
+    sums = np.bincount(index, weights=powers, minlength=bins)
+    occupied = counts > 0
+    centers = (edges[:-1] + edges[1:]) / 2
+    return centers[occupied], sums[occupied] / counts[occupied], counts[occupied]
+
+
+def estimate_peak(positions: np.ndarray, powers: np.ndarray, fraction: float = 0.5) -> Tuple[float, float]:
+    """
+    峰位估计：取最大值两侧功率不低于fraction×峰值的连续分箱，对数功率二次拟合求顶点
+    分箱不足或拟合开口向上时返回最大值所在分箱
+
+    返回:
+        (峰位, 峰值功率)
+    """
+    peak_index = int(np.argmax(powers))
+    peak_power = float(powers[peak_index])
+    if peak_power <= 0:
+        return float(positions[peak_index]), peak_power
+
+    left = peak_index
+    while left > 0 and powers[left - 1] >= fraction * peak_power:
+        left -= 1
+    right = peak_index
+    while right < len(powers) - 1 and powers[right + 1] >= fraction * peak_power:
+        right += 1
+    if right - left < 2:
+        return float(positions[peak_index]), peak_power
+
+    x = positions[left:right + 1]
+    y = np.log(np.maximum(powers[left:right + 1], peak_power * 1e-6))
+    a, b, c = np.polyfit(x - x.mean(), y, 2)
+    if a >= 0:
+        return float(positions[peak_index]), peak_power
+    vertex = float(np.clip(-b / (2 * a), x[0] - x.mean(), x[-1] - x.mean()))
+    return vertex + float(x.mean()), float(np.exp(c - b * b / (4 * a)))
+
+
+class FlyScanner:
+    """飞行扫描器"""
+
+    def __init__(self, hardware_adapter, config: dict = None,
+                 should_continue: Optional[Callable[[], bool]] = None,
+                 progress_callback: Optional[Callable] = None):
+        """
+        初始化扫描器
+
+        参数:
+            hardware_adapter: 硬件适配器（set_position / ramp_axis / read_power_stream / start_power_stream）
+            config: 配置，缺省项使用get_default_fly_scan_config()
+            should_continue: 返回False时停止扫描
+            progress_callback: 每个轴扫描完成后的进度回调
+        """
+        self.hardware_adapter = hardware_adapter
+        self.config = get_default_fly_scan_config()
+        if config:
+            self.config.update({k: v for k, v in config.items() if k in self.config})
+        self.should_continue = should_continue
+        self.progress_callback = progress_callback
+        self.profiles = []  # 最近一次refine / map_plane的全部单程曲线
+
+    def is_supported(self) -> bool:
+        """硬件适配器是否支持飞行扫描（电压扫描与带时间戳的功率流）"""
+        return hasattr(self.hardware_adapter, 'ramp_axis') and hasattr(self.hardware_adapter, 'read_power_stream')
+
+    def _continue(self) -> bool:
+        return self.should_continue is None or self.should_continue()
+
+    # ------------------------------------------------------------------
+    # 单次扫描
+    # ------------------------------------------------------------------
+
+    def _collect_samples(self, since: float, until: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """等待采集服务写入until之前的样本，返回since之后的(时间戳, 功率)"""
+        deadline = time.perf_counter() + self.config['fly_scan_stream_timeout']
+        while True:
+            stream = self.hardware_adapter.read_power_stream(since)
+            if stream is None:
+                return None
+            timestamps, values = stream
+            if (len(timestamps) and timestamps[-1] >= until) or time.perf_counter() >= deadline:
+                return timestamps, values
+            time.sleep(0.005)
+
+    def sweep(self, axis_key: str, start: float, end: float, base_position: Dict[str, float]) -> Optional[Dict]:
+        """
+        单程扫描：移动到起点并等待稳定，线性扫描到终点，把功率样本按时间对齐到指令位置
+
+        参数:
+            axis_key: 扫描轴（'A_x'等）
+            start, end: 起止位置
+            base_position: 完整位置字典，其他轴保持不变
+
+        返回:
+            曲线字典：axis、start、end、positions、power、counts（分箱结果）、peak_position、peak_power、
+            samples、commands、sample_rate、duration；扫描或读数失败时返回None
+        """
+        lag = float(self.config['fly_scan_lag'])
+        position = dict(base_position)
+        position[axis_key] = start
+        self.hardware_adapter.set_position(position)
+        time.sleep(self.config['fly_scan_settle'])
+
+        command_log = self.hardware_adapter.ramp_axis(axis_key, start, end, self.config['fly_scan_duration'],
+                                                      self.config['fly_scan_step_interval'])
+        if command_log is None or len(command_log[0]) < 2:
+            return None
+        command_times, command_values = command_log
+        stream = self._collect_samples(command_times[0] + lag, command_times[-1] + lag)
+        if stream is None:
+            return None
+        timestamps, values = stream
+
+        # 样本时间减去滞后后落在指令时间轴内的部分，按指令时间插值得到位置
+        sample_times = timestamps - lag
+        mask = (sample_times >= command_times[0]) & (sample_times <= command_times[-1])
+        if np.count_nonzero(mask) < 3:
+            return None
+        positions = np.interp(sample_times[mask], command_times, command_values)
+        lower, upper = min(start, end), max(start, end)
+        centers, powers, counts = bin_profile(positions, values[mask], lower, upper, int(self.config['fly_scan_bins']))
+        peak_position, peak_power = estimate_peak(centers, powers, self.config['fly_scan_peak_fraction'])
+        duration = float(command_times[-1] - command_times[0])
+
+        profile = {
+            'axis': axis_key,
+            'start': float(start),
+            'end': float(end),
+            'positions': centers,
+            'power': powers,
+            'counts': counts,
+            'peak_position': peak_position,
+            'peak_power': peak_power,
+            'samples': int(np.count_nonzero(mask)),
+            'commands': len(command_times),
+            'sample_rate': np.count_nonzero(mask) / duration if duration > 0 else 0.0,
+            'duration': duration,
+        }
+        self.profiles.append(profile)
+        return profile
+
+    def bidirectional_sweep(self, axis_key: str, lower: float, upper: float,
+                            base_position: Dict[str, float]) -> Optional[Dict]:
+        """
+        往返扫描（关闭fly_scan_bidirectional时只做正向一次）
+
+        返回:
+            结果字典：axis、peak_position、peak_power、estimated_lag（秒，单程时为None）、samples、
+            forward、backward（单程曲线）；扫描失败时返回None
+        """
+        forward = self.sweep(axis_key, lower, upper, base_position)
+        if forward is None:
+            return None
+        backward = None
+        if self.config['fly_scan_bidirectional'] and self._continue():
+            backward = self.sweep(axis_key, upper, lower, base_position)
+
+        result = {
+            'axis': axis_key,
+            'peak_position': forward['peak_position'],
+            'peak_power': forward['peak_power'],
+            'estimated_lag': None,
+            'samples': forward['samples'],
+            'forward': forward,
+            'backward': backward,
+        }
+        if backward is not None:
+            # 滞后使正向峰位偏大、反向峰位偏小，偏移量都是 速度×滞后
+            speed = (upper - lower) / max(forward['duration'], 1e-9)
+            result['peak_position'] = (forward['peak_position'] + backward['peak_position']) / 2
+            result['peak_power'] = max(forward['peak_power'], backward['peak_power'])
+            result['samples'] += backward['samples']
+            if speed > 0:
+                result['estimated_lag'] = (forward['peak_position'] - backward['peak_position']) / (2 * speed) \
+                    + float(self.config['fly_scan_lag'])
+        return result
+
+    # ------------------------------------------------------------------
+    # 逐轴精细对准与地形测绘
+    # ------------------------------------------------------------------
+
+    def refine(self, base_position: Dict[str, float], ranges: Dict[str, Tuple[float, float]]) -> Dict:
+        """
+        逐轴精细对准：每轮依次沿各轴做一次（往返）扫描，把该轴移到峰位，下一轮缩小扫描半宽
+
+        参数:
+            base_position: 起点的完整位置字典
+            ranges: 参与对准的轴及其搜索范围 {'A_x': (下限, 上限), ...}，扫描半宽按该量程计算
+
+        返回:
+            结果字典：position（对准后的完整位置）、peak_power、sweeps（单程扫描次数）、samples、
+            sample_rate（每秒运动得到的样本数）、estimated_lag、axes（各次扫描摘要）、stop_reason、duration
+        """
+        start_time = time.perf_counter()
+        position = dict(base_position)
+        self.profiles = []
+        axes_summary = []
+        stop_reason = 'completed'
+        peak_power = None
+
+        if not self.is_supported():
+            return {'position': position, 'peak_power': None, 'sweeps': 0, 'samples': 0, 'sample_rate': 0.0,
+                    'estimated_lag': None, 'axes': [], 'stop_reason': 'unsupported', 'duration': 0.0}
+
+        started_stream = bool(getattr(self.hardware_adapter, 'start_power_stream', lambda: False)())
+        try:
+            half_ranges = {axis: self.config['fly_scan_half_range'] * (upper - lower)
+                           for axis, (lower, upper) in ranges.items()}
+            for scan_pass in range(int(self.config['fly_scan_passes'])):
+                for axis, (lower, upper) in ranges.items():
+                    if not self._continue():
+                        stop_reason = 'stopped'
+                        break
+                    center = float(np.clip(position[axis], lower, upper))
+                    sweep_lower = max(lower, center - half_ranges[axis])
+                    sweep_upper = min(upper, center + half_ranges[axis])
+                    if sweep_upper <= sweep_lower:
+                        continue
+                    result = self.bidirectional_sweep(axis, sweep_lower, sweep_upper, position)
+                    if result is None:
+                        stop_reason = 'no_stream'
+                        break
+
+                    moved = result['peak_power'] > self.config['fly_scan_min_power']
+                    if moved:
+                        position[axis] = float(np.clip(result['peak_position'], lower, upper))
+                        peak_power = result['peak_power']
+                    # 峰位落在扫描边缘时保持半宽，下一轮以新位置为中心继续扫描
+                    margin = 0.05 * (sweep_upper - sweep_lower)
+                    at_edge = not (sweep_lower + margin < result['peak_position'] < sweep_upper - margin)
+                    if not at_edge:
+                        half_ranges[axis] *= self.config['fly_scan_shrink']
+
+                    summary = {
+                        'pass': scan_pass + 1,
+                        'axis': axis,
+                        'sweep_range': [sweep_lower, sweep_upper],
+                        'peak_position': result['peak_position'],
+                        'peak_power': result['peak_power'],
+                        'estimated_lag': result['estimated_lag'],
+                        'samples': result['samples'],
+                        'moved': moved,
+                        'at_edge': at_edge,
+                    }
+                    axes_summary.append(summary)
+                    if self.progress_callback:
+                        self.progress_callback({
+                            'type': 'fly_scan',
+                            'fly_scan_data': dict(summary, timestamp=datetime.now().isoformat())
+                        })
+                if stop_reason != 'completed':
+                    break
+        finally:
+            if started_stream:
+                self.hardware_adapter.stop_power_stream()
+
+        self.hardware_adapter.set_position(position)
+        samples = sum(profile['samples'] for profile in self.profiles)
+        motion_time = sum(profile['duration'] for profile in self.profiles)
+        lags = [s['estimated_lag'] for s in axes_summary if s['estimated_lag'] is not None]
+        return {
+            'position': position,
+            'peak_power': peak_power,
+            'sweeps': len(self.profiles),
+            'samples': samples,
+            'sample_rate': samples / motion_time if motion_time > 0 else 0.0,
+            'estimated_lag': float(np.median(lags)) if lags else None,
+            'axes': axes_summary,
+            'stop_reason': stop_reason,
+            'duration': time.perf_counter() - start_time,
+        }
+
+    def map_plane(self, base_position: Dict[str, float], fast_axis: str, slow_axis: str,
+                  ranges: Dict[str, Tuple[float, float]], lines: int = 20) -> Dict:
+        """
+        二维功率地形：沿fast_axis蛇形飞行扫描，slow_axis每行步进（滞后按fly_scan_lag补偿）
+
+        返回:
+            结果字典：fast_axis、slow_axis、fast_positions（分箱中心）、slow_positions、
+            power（lines×分箱数，无样本处为NaN）、samples、duration
+        """
+        start_time = time.perf_counter()
+        self.profiles = []
+        fast_lower, fast_upper = ranges[fast_axis]
+        slow_positions = np.linspace(ranges[slow_axis][0], ranges[slow_axis][1], int(lines))
+        bins = int(self.config['fly_scan_bins'])
+        edges = np.linspace(fast_lower, fast_upper, bins + 1)
+        fast_positions = (edges[:-1] + edges[1:]) / 2
+        power = np.full((len(slow_positions), bins), np.nan)
+        samples = 0
+
+        started_stream = bool(getattr(self.hardware_adapter, 'start_power_stream', lambda: False)())
+        try:
+            for row, slow_value in enumerate(slow_positions):
+                if not self._continue():
+                    break
+                position = dict(base_position)
+                position[slow_axis] = float(slow_value)
+                start, end = (fast_lower, fast_upper) if row % 2 == 0 else (fast_upper, fast_lower)
+                profile = self.sweep(fast_axis, start, end, position)
+                if profile is None:
+                    break
+                index = np.clip(np.searchsorted(edges, profile['positions'], side='right') - 1, 0, bins - 1)
+                power[row, index] = profile['power']
+                samples += profile['samples']
+        finally:
+            if started_stream:
+                self.hardware_adapter.stop_power_stream()
+
+        return {
+            'fast_axis': fast_axis,
+            'slow_axis': slow_axis,
+            'fast_positions': fast_positions,
+            'slow_positions': slow_positions,
+            'power': power,
+            'samples': samples,
+            'duration': time.perf_counter() - start_time,
+        }
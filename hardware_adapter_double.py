@@ -1,17 +1,50 @@
-from typing import Dict, List, Callable, Optional
+from typing import Dict, List, Callable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import deque
 from core_abstract import IHardwareController
 from device_manager_double import GlobalDeviceManager
 from thread_manager import ThreadManager
 from PowerMeter import get_power_meter
+from settle_detector import AdaptiveSettleDetector
+from timing_spans import get_span_recorder, timed_span
+from metrics_exporter import get_metrics_registry
 import queue
+import threading
 import time
+import numpy as np
+
+# 各硬件轴的量程（与PiezoController.ranges一致），用于计算归一化步长
+AXIS_RANGES = {
+    'x': (0, 30), 'y': (0, 30), 'z': (0, 30), 'rx': (0, 0.03), 'ry': (0, 0.03),
+    'bx': (0, 30), 'by': (0, 30), 'bz': (0, 30), 'brx': (0, 0.03), 'bry': (0, 0.03)
+}
+
+# 各控制器负责的硬件轴（单端模式只使用A端两个控制器）
+CONTROLLER_AXES = {
+    "A端位置控制器": ['x', 'y', 'z'],
+    "A端角度控制器": ['rx', 'ry'],
+    "B端位置控制器": ['bx', 'by', 'bz'],
+    "B端角度控制器": ['brx', 'bry'],
+}
+
+# 并行移动的默认配置
+DEFAULT_MOVE_CONFIG = {
+    'parallel_move': True,      # 四个控制器并行下发指令
+    'move_workers': 4,          # 常驻工作线程数
+    'move_timeout': 10.0,       # 等待所有控制器完成的超时（秒）
+    'command_ack_timeout': 0.1, # 每个控制器全部通道下发后轮询确认的最长等待（秒）
+    'latency_history_size': 1000,
+}
 
 class HardwareAdapter(IHardwareController):
     """硬件控制适配器"""
     
     def __init__(self, mode="single", thread_manager: ThreadManager = None,
                  progress_callback: Optional[Callable] = None,
-                 finished_callback: Optional[Callable] = None):
+                 finished_callback: Optional[Callable] = None,
+                 settle_config: Optional[Dict] = None,
+                 move_config: Optional[Dict] = None,
+                 acquisition_config: Optional[Dict] = None):
         self.mode = mode
         self.device_manager = GlobalDeviceManager()
         self.thread_manager = thread_manager or ThreadManager()
@@ -21,6 +54,343 @@ class HardwareAdapter(IHardwareController):
         self.progress_callback = progress_callback
         self.finished_callback = finished_callback
         self.debug_mode = False  # 调试模式开关
+        
+        # 自适应稳定检测
+        self.settle_detector = AdaptiveSettleDetector(settle_config)
+        self.settle_signal = (settle_config or {}).get('settle_signal', 'power')  # power / voltage
+        self.last_settle_info = None  # 最近一次评估的稳定信息
+        self.last_step_size = 1.0  # 最近一次移动的归一化步长
+        self._last_position = None  # 最近一次成功下发的硬件位置
+        
+        # 并行移动：常驻线程池向各控制器同时下发指令
+        self.move_config = dict(DEFAULT_MOVE_CONFIG)
+        self._move_executor = None
+        self._move_executor_workers = 0
+        self._latency_lock = threading.Lock()
+        self._command_latencies = {}  # 控制器名 -> 最近的指令耗时（秒）
+        self._outstanding_moves = {}  # 控制器名 -> 超时后仍在执行的指令Future（每个控制器最多一个）
+        self.last_axis_success = {}  # 最近一次移动的各轴结果
+        self.last_move_time = None  # 最近一次移动的总耗时（秒）
+        self.set_move_config(move_config)
+        
+        # 预取移动：测量窗口结束后立即在指令线程中下发下一个目标，评估时直接等待该移动完成
+        self._prefetch_executor = None
+        self._prefetch = None  # (目标位置, Future, 下发时间)，Future结果为(是否成功, 移动完成时间)
+        self._queued_position = None  # 下一次测量结束后立即预取的位置
+        self._last_measure_end = None
+        self.last_command_gap = None  # 上次测量结束到本次指令下发的空闲时间（秒）
+        
+        # 功率计高吞吐块采集（未配置时沿用measure_power逐次采样）
+        self.acquisition_config = {}
+        self.block_acquisition = False
+        self.configure_power_acquisition(acquisition_config)
+    
+    def configure_power_acquisition(self, acquisition_config: Optional[Dict]):
+        """
+        配置功率计块采集（设备端平均/快速数组），功率计已连接时立即下发配置
+        
+        background_service为True时启动后台采集服务，此后评估、稳定检测和GUI监控都从其环形缓冲区读数
+        """
+        if not acquisition_config:
+            return
+        self.acquisition_config.update(acquisition_config)
+        self.block_acquisition = bool(self.acquisition_config.get('enabled', True))
+        power_meter = self.device_manager.get_power_meter()
+        if self.block_acquisition and power_meter is not None and hasattr(power_meter, 'configure_block_acquisition'):
+            service = self._get_power_service()
+            if service is not None:
+                service.call_device(power_meter.configure_block_acquisition, self.acquisition_config)
+            else:
+                power_meter.configure_block_acquisition(self.acquisition_config)
+        if self.acquisition_config.get('background_service') and hasattr(self.device_manager, 'start_power_acquisition'):
+            success, message = self.device_manager.start_power_acquisition(self.acquisition_config)
+            if not success:
+                print(message)
+    
+    def _get_power_service(self):
+        """获取正在运行的后台功率采集服务（未运行时返回None）"""
+        if hasattr(self.device_manager, 'get_power_acquisition_service'):
+            return self.device_manager.get_power_acquisition_service()
+        return None
+    
+    def read_power_stream(self, since: float):
+        """后台采集服务运行时返回since（perf_counter时钟）之后的(时间戳, 功率)样本，未运行时返回None"""
+        service = self._get_power_service()
+        if service is None:
+            return None
+        return service.read_since(since)
+    
+    def start_power_stream(self) -> bool:
+        """
+        确保后台采集服务在运行（飞行扫描需要连续的带时间戳功率流）
+        返回: True表示本次调用启动了服务（调用方用完后应调用stop_power_stream），已在运行或启动失败时返回False
+        """
+        if self._get_power_service() is not None or not hasattr(self.device_manager, 'start_power_acquisition'):
+            return False
+        success, message = self.device_manager.start_power_acquisition(self.acquisition_config)
+        if not success:
+            print(message)
+        return success
+    
+    def stop_power_stream(self):
+        """停止后台采集服务"""
+        if hasattr(self.device_manager, 'stop_power_acquisition'):
+            self.device_manager.stop_power_acquisition()
+    
+    def ramp_axis(self, axis_key: str, start_value: float, end_value: float, duration: float,
+                  step_interval: float = 0.005) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        单轴线性扫描（飞行扫描），其他轴保持不动
+        
+        参数:
+            axis_key: 算法坐标键（'A_x'、'B_ry'等）
+            start_value, end_value: 扫描起止位置
+            duration: 扫描时长（秒）
+            step_interval: 指令周期（秒）
+        
+        返回:
+            (指令时间戳, 指令位置)，时间戳为perf_counter时钟；控制器不支持或未连接时返回None
+        """
+        if axis_key.startswith('A_'):
+            axis = axis_key[2:]
+        elif axis_key.startswith('B_'):
+            axis = 'b' + axis_key[2:]
+        else:
+            axis = axis_key
+        
+        for name, controller in self._get_active_controllers():
+            if axis in CONTROLLER_AXES[name] and hasattr(controller, 'ramp_axis'):
+                times, values = controller.ramp_axis(axis, start_value, end_value, duration, step_interval)
+                if not times:
+                    return None
+                if self._last_position is not None:
+                    self._last_position = dict(self._last_position, **{axis: values[-1]})  # 下一次移动按扫描终点计算步长
+                return np.asarray(times, dtype=np.float64), np.asarray(values, dtype=np.float64)
+        return None
+    
+    def set_move_config(self, move_config: Optional[Dict]):
+        """更新并行移动配置"""
+        if move_config:
+            self.move_config.update(move_config)
+        self.parallel_move = bool(self.move_config['parallel_move'])
+        self.move_timeout = float(self.move_config['move_timeout'])
+        self.command_ack_timeout = float(self.move_config['command_ack_timeout'])
+        if self._move_executor is not None and self._move_executor_workers != int(self.move_config['move_workers']):
+            self._move_executor.shutdown(wait=True)
+            self._move_executor = None
+            self._outstanding_moves.clear()
+    
+    def _get_move_executor(self) -> ThreadPoolExecutor:
+        """获取常驻的移动线程池（首次使用时创建）"""
+        if self._move_executor is None:
+            self._move_executor_workers = int(self.move_config['move_workers'])
+            self._move_executor = ThreadPoolExecutor(
+                max_workers=self._move_executor_workers, thread_name_prefix="pzt_move"
+            )
+        return self._move_executor
+    
+    def queue_next_position(self, position: Optional[Dict[str, float]]):
+        """
+        登记下一个评估位置：下一次measure_power_average的测量窗口一结束就在指令线程中下发，
+        调用方随后的记录、回调与候选生成与该移动重叠（None表示取消）
+        """
+        self._queued_position = dict(position) if position is not None else None
+    
+    def prefetch_position(self, position: Dict[str, float]):
+        """在指令线程中立即下发位置（不等待完成）；之前的预取尚未完成时先等待它，保证指令顺序"""
+        self._finish_prefetch()
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pzt_prefetch")
+        position = dict(position)
+        self._prefetch = (position, self._prefetch_executor.submit(self._prefetch_move, position), time.perf_counter())
+    
+    def _prefetch_move(self, position: Dict[str, float]) -> Tuple[bool, float]:
+        """预取线程中下发位置，返回(是否成功, 移动完成时间)"""
+        success = self.set_position(position)
+        return success, time.perf_counter()
+    
+    def _finish_prefetch(self) -> Optional[Tuple[Dict[str, float], bool, float, float]]:
+        """等待未完成的预取移动，返回(目标位置, 是否成功, 下发时间, 移动完成时间)，没有预取时返回None"""
+        if self._prefetch is None:
+            return None
+        position, future, issued_at = self._prefetch
+        self._prefetch = None
+        try:
+            success, moved_at = future.result(timeout=self.move_timeout + 1.0)
+        except Exception as e:
+            print(f"预取移动失败: {e}")
+            success, moved_at = False, time.perf_counter()
+        return position, success, issued_at, moved_at
+    
+    def _get_active_controllers(self) -> List[Tuple[str, object]]:
+        """获取当前模式下已连接的控制器（名称, 控制器）"""
+        names = list(CONTROLLER_AXES) if self.mode == "dual" else list(CONTROLLER_AXES)[:2]
+        controllers = []
+        for name in names:
+            controller = self.device_manager.get_pzt_controller(name)
+            if controller:
+                controllers.append((name, controller))
+        return controllers
+    
+    def _move_controller(self, name: str, controller, sub_position: Dict[str, float]) -> Dict[str, bool]:
+        """在工作线程中向单个控制器下发位置并记录指令耗时"""
+        start = time.perf_counter()
+        try:
+            if hasattr(controller, 'set_position_batch'):
+                axis_success = controller.set_position_batch(sub_position, self.command_ack_timeout)
+            else:
+                success = controller.set_position(sub_position)
+                axis_success = {axis: success for axis in sub_position}
+        except Exception as e:
+            print(f"{name} 设置位置异常: {e}")
+            axis_success = {axis: False for axis in sub_position}
+        end = time.perf_counter()
+        self._record_command_latency(name, end - start)
+        get_span_recorder().add(f'command.{name}', start, end)
+        return axis_success
+    
+    def _record_command_latency(self, name: str, latency: float):
+        """记录控制器指令耗时"""
+        with self._latency_lock:
+            if name not in self._command_latencies:
+                self._command_latencies[name] = deque(maxlen=int(self.move_config['latency_history_size']))
+            self._command_latencies[name].append(latency)
+    
+    def get_command_latency_statistics(self) -> Dict[str, Dict]:
+        """获取各控制器的指令耗时统计（秒）"""
+        with self._latency_lock:
+            latencies = {name: np.array(values) for name, values in self._command_latencies.items() if values}
+        return {
+            name: {
+                'count': len(values),
+                'last': float(values[-1]),
+                'mean': float(np.mean(values)),
+                'p95': float(np.percentile(values, 95)),
+                'max': float(np.max(values)),
+            }
+            for name, values in latencies.items()
+        }
+    
+    def get_command_statistics(self) -> Dict[str, Dict]:
+        """获取各控制器的电压指令统计（下发/跳过/失败/确认超时）"""
+        return {
+            name: controller.get_command_statistics()
+            for name, controller in self._get_active_controllers()
+            if hasattr(controller, 'get_command_statistics')
+        }
+    
+    def set_position_batch(self, position: Dict[str, float]) -> Dict[str, bool]:
+        """
+        并行设置位置：各控制器在常驻线程池中同时下发本控制器的全部通道指令，
+        所有控制器完成（或超时）后统一返回。
+        超时仍在执行的指令按控制器登记，下次向该控制器下发前先等待它结束，
+        仍未结束时该控制器本次记为失败，不会有两条指令同时操作同一控制器
+
+        返回:
+            各硬件轴是否设置成功的字典
+        """
+        start = time.perf_counter()
+        position_dict = self._convert_state_to_position(position)
+        self.last_step_size = self._compute_step_size(position_dict)
+        
+        sub_positions = {}
+        for name, controller in self._get_active_controllers():
+            sub_position = {k: v for k, v in position_dict.items() if k in CONTROLLER_AXES[name]}
+            if sub_position:
+                sub_positions[name] = (controller, sub_position)
+        
+        # 上次超时的指令：等待其结束
+        outstanding = [self._outstanding_moves[name] for name in sub_positions if name in self._outstanding_moves]
+        if outstanding:
+            wait(outstanding, timeout=self.move_timeout)
+        
+        executor = self._get_move_executor()
+        futures = {}
+        axis_success = {}
+        for name, (controller, sub_position) in sub_positions.items():
+            pending = self._outstanding_moves.get(name)
+            if pending is not None:
+                if not pending.done():
+                    print(f"{name} 上一条指令仍未完成，本次不下发")
+                    axis_success.update({axis: False for axis in sub_position})
+                    continue
+                del self._outstanding_moves[name]
+            futures[executor.submit(self._move_controller, name, controller, sub_position)] = (name, sub_position)
+        
+        # 共同完成屏障：等待所有控制器的指令下发和确认
+        done, _ = wait(futures, timeout=self.move_timeout)
+        for future, (name, sub_position) in futures.items():
+            if future in done:
+                axis_success.update(future.result())
+            else:
+                print(f"{name} 设置位置超时（{self.move_timeout}s）")
+                axis_success.update({axis: False for axis in sub_position})
+                if not future.cancel():
+                    self._outstanding_moves[name] = future
+        
+        self.last_axis_success = axis_success
+        self.last_move_time = time.perf_counter() - start
+        if all(axis_success.values()):
+            self._last_position = position_dict
+        return axis_success
+    
+    def set_settle_config(self, settle_config: Dict):
+        """更新稳定检测配置"""
+        if not settle_config:
+            return
+        self.settle_detector.update_config(settle_config)
+        self.settle_signal = settle_config.get('settle_signal', self.settle_signal)
+    
+    def get_settle_statistics(self) -> Dict:
+        """获取稳定时间统计"""
+        return self.settle_detector.get_statistics()
+    
+    def _compute_step_size(self, position_dict: Dict[str, float]) -> float:
+        """计算相对上一位置的归一化步长（各轴移动量/量程的最大值），参数为硬件坐标"""
+        if self._last_position is None:
+            return 1.0
+        step = 0.0
+        for axis, value in position_dict.items():
+            if axis in AXIS_RANGES and axis in self._last_position:
+                lower, upper = AXIS_RANGES[axis]
+                step = max(step, abs(value - self._last_position[axis]) / (upper - lower))
+        return step
+    
+    def _get_settle_signal_reader(self) -> Optional[Callable]:
+        """获取稳定检测的信号读取函数，无法连续读数时返回None"""
+        if self.settle_signal == 'voltage':
+            controllers = [c for c in self.device_manager.get_all_pzt_controllers().values()
+                           if hasattr(c, 'get_output_voltages')]
+            if not controllers:
+                return None
+            
+            def read_voltages():
+                voltages = []
+                for controller in controllers:
+                    voltages.extend(controller.get_output_voltages().values())
+                return voltages
+            return read_voltages
+        
+        service = self._get_power_service()
+        if service is not None:
+            return service.get_settle_signal_reader()
+        
+        power_meter = self.device_manager.get_power_meter()
+        if power_meter is None or not hasattr(power_meter, 'powertest'):
+            return None
+        return power_meter.powertest
+    
+    @timed_span('settle')
+    def _wait_for_settle(self, step_size: float, fallback_delay: float) -> Dict:
+        """等待位置稳定并记录实际稳定时间"""
+        self.last_settle_info = self.settle_detector.wait_for_settle(
+            self._get_settle_signal_reader(), step_size, fallback_delay
+        )
+        self.last_settle_info['step_size'] = step_size
+        if self.debug_mode:
+            print(f"稳定时间: {self.last_settle_info['settle_time']*1000:.1f} ms "
+                  f"({self.last_settle_info['method']})")
+        return self.last_settle_info
     
     def set_callbacks(self, progress_callback: Callable, finished_callback: Callable):
         """设置回调函数"""
@@ -33,15 +403,23 @@ class HardwareAdapter(IHardwareController):
         print("测量功率，设置位置:", position)
         if not self.set_position(position):
             print("设置位置失败，无法进行功率测量")
+            get_metrics_registry().inc('measurement_failures_total', labels={'stage': 'move'})
             return 0.0
         
-        # 等待位置稳定（根据实际情况调整等待时间）
-        time.sleep(1.2)
+        # 等待位置稳定（自适应检测，无法连续读数时固定等待1.2秒）
+        self._wait_for_settle(self.last_step_size, 1.2)
+        settled_at = time.perf_counter()
         
         try:
-            # 直接调用功率计进行测量
-            power_meter = self.device_manager.get_power_meter()
-            result = power_meter.measure_power_fast()
+            service = self._get_power_service()
+            if service is not None:
+                # 后台采集服务运行时取稳定之后的样本
+                result = service.measure(settled_at)
+            else:
+                # 直接调用功率计进行测量
+                power_meter = self.device_manager.get_power_meter()
+                result = power_meter.measure_power_fast()
+            get_span_recorder().add('measure', settled_at)
             
             # 处理功率计返回的字典格式
             if isinstance(result, dict):
@@ -55,22 +433,46 @@ class HardwareAdapter(IHardwareController):
                 return result
         except Exception as e:
             print(f"功率测量失败: {str(e)}")
+            get_metrics_registry().inc('measurement_failures_total', labels={'stage': 'measure'})
             return 0.0
     
     def measure_power_average(self, position: Dict[str, float]) -> float:
         """测量功率 - 直接调用硬件控制器功能"""
-        # 直接设置位置
-        if not self.set_position(position):
+        # 已预取到该位置时等待预取完成，否则直接设置位置
+        prefetched = self._finish_prefetch()
+        if prefetched is not None and prefetched[0] == position:
+            _, success, issued_at, moved_at = prefetched
+        else:
+            issued_at = time.perf_counter()
+            success = self.set_position(position)
+            moved_at = time.perf_counter()
+        if self._last_measure_end is not None:
+            self.last_command_gap = max(0.0, issued_at - self._last_measure_end)
+        if not success:
             print("设置位置失败，无法进行功率测量")
+            get_metrics_registry().inc('measurement_failures_total', labels={'stage': 'move'})
+            self._queued_position = None
             return 0.0
         
-        # 等待位置稳定（根据实际情况调整等待时间）
-        time.sleep(0.8)
+        # 等待位置稳定（自适应检测，无法连续读数时从移动完成起固定等待0.8秒，预取移动完成后已经过的时间计入其中）
+        self._wait_for_settle(self.last_step_size, max(0.0, 0.8 - (time.perf_counter() - moved_at)))
+        settled_at = time.perf_counter()
         
         try:
-            # 直接调用功率计进行测量
+            # 直接调用功率计进行测量（块采集可用时一次采集整块样本）
             power_meter = self.device_manager.get_power_meter()
-            result = power_meter.measure_power(samples=5)
+            service = self._get_power_service()
+            if service is not None:
+                # 后台采集服务运行时取稳定之后的样本，不再单独调用设备
+                result = service.measure(settled_at)
+            elif self.block_acquisition and hasattr(power_meter, 'measure_power_block'):
+                if power_meter.acquisition_mode is None:
+                    power_meter.configure_block_acquisition(self.acquisition_config)
+                result = power_meter.measure_power_block()
+            else:
+                result = power_meter.measure_power(samples=5)
+            get_span_recorder().add('measure', settled_at)
+            self._release_queued_position()
             
             # 处理功率计返回的字典格式
             if isinstance(result, dict):
@@ -84,8 +486,18 @@ class HardwareAdapter(IHardwareController):
                 return result
         except Exception as e:
             print(f"功率测量失败: {str(e)}")
+            get_metrics_registry().inc('measurement_failures_total', labels={'stage': 'measure'})
+            self._release_queued_position()
             return 0.0
     
+    def _release_queued_position(self):
+        """测量窗口结束：记录时间并下发登记的下一个位置"""
+        self._last_measure_end = time.perf_counter()
+        if self._queued_position is not None:
+            position = self._queued_position
+            self._queued_position = None
+            self.prefetch_position(position)
+    
     def measure_current_power(self):
         """
         测量当前功率（不移动位置）
@@ -94,6 +506,12 @@ class HardwareAdapter(IHardwareController):
             power: 当前功率值
         """
         try:
+            service = self._get_power_service()
+            if service is not None:
+                # 后台采集服务运行时读取环形缓冲区中最近样本的平均值
+                power_value = service.get_latest_power()
+                return power_value if power_value is not None else 0.0
+            
             # 使用功率计测量当前功率
             power_meter = self.device_manager.get_power_meter()
             power_result = power_meter.measure_power_fast()
@@ -182,19 +600,33 @@ class HardwareAdapter(IHardwareController):
         
         return success
     
+    @timed_span('command')
     def set_position(self, position: Dict[str, float]) -> bool:
         """设置位置 - 直接通过PZT控制器实现"""
+        if not threading.current_thread().name.startswith("pzt_prefetch"):
+            self._finish_prefetch()  # 等待未完成的预取移动，保证指令顺序
+        if self.parallel_move:
+            axis_success = self.set_position_batch(position)
+            failed_axes = [axis for axis, success in axis_success.items() if not success]
+            if failed_axes:
+                print(f"设置位置失败的轴: {failed_axes}")
+            return not failed_axes
+        
         # 将位置参数转换为控制器可理解的格式
         position_dict = self._convert_state_to_position(position)
+        self.last_step_size = self._compute_step_size(position_dict)
         
         # 根据控制器类型拆分位置参数
         success = True
+        recorder = get_span_recorder()
         
         # 设置A端位置控制器
         a_pos_controller = self.device_manager.get_pzt_controller("A端位置控制器")
         if a_pos_controller:
             a_pos = {k: v for k, v in position_dict.items() if k in ['x', 'y', 'z']}
-            if a_pos and not a_pos_controller.set_position(a_pos):
+            with recorder.span('command.A端位置控制器'):
+                a_pos_ok = not a_pos or a_pos_controller.set_position(a_pos)
+            if not a_pos_ok:
                 print("设置A端位置失败")
                 success = False
         
@@ -202,7 +634,9 @@ class HardwareAdapter(IHardwareController):
         a_angle_controller = self.device_manager.get_pzt_controller("A端角度控制器")
         if a_angle_controller:
             a_angle = {k: v for k, v in position_dict.items() if k in ['rx', 'ry']}
-            if a_angle and not a_angle_controller.set_position(a_angle):
+            with recorder.span('command.A端角度控制器'):
+                a_angle_ok = not a_angle or a_angle_controller.set_position(a_angle)
+            if not a_angle_ok:
                 print("设置A端角度失败")
                 success = False
         
@@ -213,7 +647,9 @@ class HardwareAdapter(IHardwareController):
             if b_pos_controller:
                 b_pos = {k: v for k, v in position_dict.items() if k in ['bx', 'by', 'bz']}
                 print("设置B端位置:", b_pos)
-                if b_pos and not b_pos_controller.set_position(b_pos):
+                with recorder.span('command.B端位置控制器'):
+                    b_pos_ok = not b_pos or b_pos_controller.set_position(b_pos)
+                if not b_pos_ok:
                     print("设置B端位置失败")
                     success = False
             
@@ -222,10 +658,14 @@ class HardwareAdapter(IHardwareController):
             if b_angle_controller:
                 b_angle = {k: v for k, v in position_dict.items() if k in ['brx', 'bry']}
                 print("设置B端角度:", b_angle)
-                if b_angle and not b_angle_controller.set_position(b_angle):
+                with recorder.span('command.B端角度控制器'):
+                    b_angle_ok = not b_angle or b_angle_controller.set_position(b_angle)
+                if not b_angle_ok:
                     print("设置B端角度失败")
                     success = False
         
+        if success:
+            self._last_position = position_dict
         return success
     
     def set_initial_positions(self, positions):
@@ -358,6 +798,14 @@ class HardwareAdapter(IHardwareController):
     
     def disconnect(self) -> bool:
         """断开连接"""
+        self._finish_prefetch()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=True)
+            self._prefetch_executor = None
+        if self._move_executor is not None:
+            self._move_executor.shutdown(wait=True)
+            self._move_executor = None
+            self._outstanding_moves.clear()
         self.device_manager.disconnect_all()
         return True
     
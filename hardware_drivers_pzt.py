@@ -87,16 +87,47 @@ def mode_change_test(channel,mode) :
     except Exception as e:
         print(f"模式切换测试失败: {e}")
         return False
-def set_piezo_voltage(channel, voltage) -> bool:
+def decimal_to_float(value) -> float:
+    """System.Decimal 通过字符串转换为 Python float"""
+    return float(str(value))
+
+def wait_for_output_voltages(channel_targets, tolerance=0.05, timeout=0.1, poll_interval=0.005) -> bool:
+    """
+    轮询回读输出电压，直到所有通道到达目标电压（指令确认）
+
+    参数:
+        channel_targets: [(通道, 目标电压float)]
+        tolerance: 回读电压容差（V）
+        timeout: 最长等待时间（秒）
+        poll_interval: 轮询间隔（秒）
+
+    返回:
+        True表示全部确认，False表示超时或回读失败（已等待至超时）
+    """
+    deadline = time.perf_counter() + timeout
+    pending = list(channel_targets)
+    while True:
+        try:
+            pending = [(channel, target) for channel, target in pending
+                       if abs(decimal_to_float(channel.GetOutputVoltage()) - target) > tolerance]
+        except Exception as e:
+            print(f"回读输出电压失败: {e}")
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            return False
+        if not pending:
+            return True
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(poll_interval)
+
+def set_piezo_voltage(channel, voltage, ack_timeout=0.1) -> bool:
     """
-    安全快速设置压电通道输出电压
+    安全快速设置压电通道输出电压，下发后轮询回读电压确认（最长等待ack_timeout秒）
     返回: True表示成功，False表示失败
     """
     try:
-        # 动态获取最大允许电压
-        max_voltage = channel.GetMaxOutputVoltage()
-        # print(f"检测到执行器最大允许电压: {max_voltage}V")
-
         # 确保电压是 System.Decimal 类型
         if not isinstance(voltage, Decimal):
             try:
@@ -116,15 +147,40 @@ def set_piezo_voltage(channel, voltage) -> bool:
         #     channel.SetPositionControlMode(PiezoControlModeTypes.OpenLoop)
         #     # time.sleep(0.5)
 
-        # 设置电压
+        # 设置电压，并轮询确认
         channel.SetOutputVoltage(voltage)
-        time.sleep(0.1)  # 确保命令被处理
+        wait_for_output_voltages([(channel, decimal_to_float(voltage))], timeout=ack_timeout)
         print(f"已设置电压: {voltage}V")
         return True  # 成功
 
     except Exception as e:
         print(f"电压设置失败: {e}")
         return False  # 失败
+def write_piezo_voltage(channel, voltage) -> bool:
+    """
+    下发通道输出电压，不等待确认（批量下发时由调用方统一等待）
+    返回: True表示指令已下发，False表示失败
+    """
+    try:
+        if not isinstance(voltage, Decimal):
+            voltage = Decimal(float(voltage))
+        channel.SetOutputVoltage(voltage)
+        return True
+    except Exception as e:
+        print(f"电压设置失败: {e}")
+        return False
+
+# 默认最大输出电压（V），连接时从设备读取实际值
+DEFAULT_MAX_VOLTAGE = 75.0
+
+# 轴名到控制器通道号的映射
+AXIS_CHANNELS = {
+    'x': 1, 'y': 2, 'z': 3,
+    'rx': 1, 'ry': 2,
+    'bx': 1, 'by': 2, 'bz': 3,
+    'brx': 1, 'bry': 2
+}
+
 def map_value_to_voltage(value, val_min, val_max, volt_max=75.0):
     """将输入值线性映射到电压范围，返回 System.Decimal 类型"""
     value_range = val_max - val_min
@@ -169,6 +225,16 @@ class PiezoController:
         self.is_connected = False
         self.is_zeroed = False
         self.initial_positions = {}  # 添加初始位置存储
+        
+        # 通道状态缓存：最大输出电压在连接时读取一次，记录最近下发的电压以跳过重复指令
+        self.max_voltages = {}
+        self.dac_bits = 16  # 输出电压DAC位数，决定"电压未变化"的判定分辨率
+        self.ack_timeout = 0.1  # 指令确认最长等待（秒）
+        self.ack_tolerance = 0.05  # 回读电压确认容差（V）
+        self.ack_poll_interval = 0.005  # 确认轮询间隔（秒）
+        self._last_voltages = {}  # 通道号 -> 最近下发的电压
+        self._decimal_cache = {}  # (分辨率, DAC码) -> System.Decimal
+        self.command_stats = {'issued': 0, 'skipped': 0, 'failed': 0, 'ack_timeouts': 0}
 
     def connect(self):
         """连接压电控制器并初始化通道"""
@@ -214,6 +280,13 @@ class PiezoController:
                     channel.EnableDevice()
                     time.sleep(0.25)
                     logger.info(f"通道 {ch_num} 启用完成")
+                    
+                    # 读取一次最大输出电压并缓存
+                    try:
+                        self.max_voltages[ch_num] = decimal_to_float(channel.GetMaxOutputVoltage())
+                    except Exception as e:
+                        logger.warning(f"通道 {ch_num} 读取最大输出电压失败，使用默认值: {e}")
+                        self.max_voltages[ch_num] = DEFAULT_MAX_VOLTAGE
             
             self.is_connected = True
             logger.info(f"{self.controller_name} ({self.serial_no}) 已连接并初始化")
@@ -233,6 +306,8 @@ class PiezoController:
         try:
             # 传递控制器名称给 zero_channels 函数
             success = zero_channels(self.device, self.controller_name)
+            # 归零后通道输出已改变，清空电压缓存
+            self._last_voltages.clear()
             if success:
                 self.is_zeroed = True
                 print(f"{self.controller_name} 调零成功")
@@ -292,6 +367,8 @@ class PiezoController:
             return False
         
         try:
+            # 控制模式改变后不再跳过重复电压指令
+            self._last_voltages.clear()
             # 仅测试第一个通道的模式切换
             for ch_num in channels:
                 
@@ -310,59 +387,19 @@ class PiezoController:
             print(f"模式切换测试失败: {str(e)}")
             return False
     def set_position(self, position_dict):
-        """设置位置参数到对应的控制器通道，并等待直到到达目标位置"""
+        """设置位置参数到对应的控制器通道，并等待指令确认"""
         if not self.is_connected:
             print("设备未连接，无法设置位置")
             return False
 
-        target_positions = {}
-        success = True  # 跟踪所有设置是否成功
-
+        axis_success = self.set_position_batch(position_dict, self.ack_timeout)
         for axis, value in position_dict.items():
-            if axis not in self.ranges:
-                print(f"警告: 未知轴 '{axis}'，跳过")
-                continue
-                
-            # 获取轴范围
-            val_min, val_max = self.ranges[axis]
-            # print(f"{self.controller_name} 轴 {axis} 范围: {val_min} - {val_max}")
-            # 映射位置值到电压
-            voltage = map_value_to_voltage(value, val_min, val_max)
-            # print(f"{self.controller_name} 轴 {axis} 目标值: {value} 映射电压: {voltage}V")
-            
-            
-            if axis in ['x', 'y', 'z']:
-                ch_num = {'x': 1, 'y': 2, 'z': 3}.get(axis)
-            elif axis in ['rx', 'ry']:
-                ch_num = {'rx': 1, 'ry': 2}.get(axis)
-            elif axis in ['bx', 'by', 'bz']:
-                ch_num = {'bx': 1, 'by': 2, 'bz': 3}.get(axis)
-            elif axis in ['brx', 'bry']:
-                ch_num = {'brx': 1, 'bry': 2}.get(axis)  # 或者您需要的其他通道号
-            else:
-                print(f"错误: 无法为轴 '{axis}' 分配通道")
-                success = False
-                continue
-            channel = self.channels.get(ch_num)
-            
-            if not channel:
-                print(f"错误: {self.controller_name} 通道 {ch_num} 未初始化")
-                success = False
-                continue
-                
-            print(f"{self.controller_name} 设置 {axis} 到 {value} (电压: {voltage}V)")
-            
-            # 设置电压，并检查是否成功
-            if not set_piezo_voltage(channel, voltage):
-                print(f"设置 {axis} 的电压失败")
-                success = False
-                continue
-            
-            # 记录目标位置
-            target_positions[axis] = (value, ch_num, val_min, val_max)
-        
+            if axis in axis_success:
+                print(f"{self.controller_name} 设置 {axis} 到 {value}"
+                      f"{'' if axis_success[axis] else ' 失败'}")
+
         # 如果设置电压时有失败，直接返回False
-        if not success:
+        if not all(axis_success.values()):
             print(f"{self.controller_name} 部分轴设置失败，无法继续")
             return False
         print(f"{self.controller_name} 所有轴已到达目标位置")
@@ -393,6 +430,166 @@ class PiezoController:
         # print(f"{self.controller_name} 部分轴未能在超时时间内到达目标位置")
         # return False
 
+    def _dac_resolution(self, ch_num):
+        """通道输出电压的DAC分辨率（V）"""
+        return self.max_voltages.get(ch_num, DEFAULT_MAX_VOLTAGE) / (2 ** self.dac_bits - 1)
+
+    def _to_decimal(self, voltage, resolution):
+        """按DAC分辨率量化电压并转换为 System.Decimal（缓存转换结果）"""
+        code = int(round(voltage / resolution))
+        key = (resolution, code)
+        decimal_voltage = self._decimal_cache.get(key)
+        if decimal_voltage is None:
+            decimal_voltage = Decimal(code * resolution)
+            self._decimal_cache[key] = decimal_voltage
+        return decimal_voltage
+
+    def get_command_statistics(self):
+        """获取电压指令统计：下发、跳过（电压未变化）、失败、确认超时次数"""
+        return dict(self.command_stats)
+
+    def set_position_batch(self, position_dict, ack_timeout=0.1):
+        """
+        批量设置位置：各通道电压指令连续下发（电压在DAC分辨率内未变化的通道跳过），
+        全部下发后统一轮询回读电压确认
+
+        参数:
+            position_dict: 轴名到位置值的字典
+            ack_timeout: 指令确认最长等待时间（秒）
+
+        返回:
+            各轴是否设置成功的字典
+        """
+        if not self.is_connected:
+            print("设备未连接，无法设置位置")
+            return {axis: False for axis in position_dict}
+
+        axis_success = {}
+        written = []  # [(通道, 目标电压)]
+        written_channels = []  # 与written对应的通道号
+        for axis, value in position_dict.items():
+            if axis not in self.ranges or axis not in AXIS_CHANNELS:
+                print(f"警告: 未知轴 '{axis}'，跳过")
+                continue
+
+            channel = self.channels.get(AXIS_CHANNELS[axis])
+            if not channel:
+                print(f"错误: {self.controller_name} 通道 {AXIS_CHANNELS[axis]} 未初始化")
+                axis_success[axis] = False
+                continue
+
+            ch_num = AXIS_CHANNELS[axis]
+            val_min, val_max = self.ranges[axis]
+            resolution = self._dac_resolution(ch_num)
+            max_voltage = self.max_voltages.get(ch_num, DEFAULT_MAX_VOLTAGE)
+            voltage = (value - val_min) / (val_max - val_min) * DEFAULT_MAX_VOLTAGE
+            voltage = min(max(voltage, 0.0), max_voltage)
+
+            # 电压在DAC分辨率内未变化，跳过指令
+            last_voltage = self._last_voltages.get(ch_num)
+            if last_voltage is not None and abs(voltage - last_voltage) < resolution / 2:
+                self.command_stats['skipped'] += 1
+                axis_success[axis] = True
+                continue
+
+            decimal_voltage = self._to_decimal(voltage, resolution)
+            axis_success[axis] = write_piezo_voltage(channel, decimal_voltage)
+            if axis_success[axis]:
+                self.command_stats['issued'] += 1
+                self._last_voltages[ch_num] = voltage
+                written.append((channel, voltage))
+                written_channels.append(ch_num)
+            else:
+                self.command_stats['failed'] += 1
+                self._last_voltages.pop(ch_num, None)
+
+        # 所有通道指令下发完成后统一轮询确认
+        if written and ack_timeout > 0:
+            if not wait_for_output_voltages(written, self.ack_tolerance, ack_timeout, self.ack_poll_interval):
+                self.command_stats['ack_timeouts'] += 1
+                # 输出未确认到达目标：清除这些通道的缓存，再次下发同一目标时不会被当作"未变化"跳过
+                for ch_num in written_channels:
+                    self._last_voltages.pop(ch_num, None)
+        return axis_success
+
+    def ramp_axis(self, axis, start_value, end_value, duration, step_interval=0.005):
+        """
+        线性扫描单轴输出电压（飞行扫描）：按step_interval连续下发电压指令，不等待确认，
+        每条指令的数值按实际已用时间在start_value~end_value之间线性插值（下发变慢时不会累积滞后）
+
+        参数:
+            axis: 轴名（'x'、'bx'等）
+            start_value, end_value: 扫描起止位置（与set_position相同的单位）
+            duration: 扫描时长（秒）
+            step_interval: 指令周期（秒）
+
+        返回:
+            (指令时间戳列表, 指令位置列表)，时间戳为主机perf_counter时钟（秒），与后台功率采集服务一致；
+            失败时返回([], [])
+        """
+        if not self.is_connected:
+            print("设备未连接，无法扫描")
+            return [], []
+        if axis not in self.ranges or axis not in AXIS_CHANNELS:
+            print(f"警告: 未知轴 '{axis}'，跳过")
+            return [], []
+
+        ch_num = AXIS_CHANNELS[axis]
+        channel = self.channels.get(ch_num)
+        if not channel:
+            print(f"错误: {self.controller_name} 通道 {ch_num} 未初始化")
+            return [], []
+
+        val_min, val_max = self.ranges[axis]
+        resolution = self._dac_resolution(ch_num)
+        max_voltage = self.max_voltages.get(ch_num, DEFAULT_MAX_VOLTAGE)
+        start_value = min(max(start_value, val_min), val_max)
+        end_value = min(max(end_value, val_min), val_max)
+
+        times = []
+        values = []
+        start_time = time.perf_counter()
+        next_tick = start_time
+        while True:
+            now = time.perf_counter()
+            fraction = min(1.0, (now - start_time) / duration) if duration > 0 else 1.0
+            value = start_value + (end_value - start_value) * fraction
+            voltage = (value - val_min) / (val_max - val_min) * DEFAULT_MAX_VOLTAGE
+            voltage = min(max(voltage, 0.0), max_voltage)
+
+            last_voltage = self._last_voltages.get(ch_num)
+            if last_voltage is None or abs(voltage - last_voltage) >= resolution / 2:
+                if not write_piezo_voltage(channel, self._to_decimal(voltage, resolution)):
+                    self.command_stats['failed'] += 1
+                    self._last_voltages.pop(ch_num, None)
+                    break
+                self.command_stats['issued'] += 1
+                self._last_voltages[ch_num] = voltage
+            else:
+                # 电压在DAC分辨率内未变化：输出已在该位置，仍记录到时间轴上
+                self.command_stats['skipped'] += 1
+            times.append(time.perf_counter())
+            values.append(value)
+
+            if fraction >= 1.0:
+                break
+            next_tick += step_interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
+        return times, values
+
+    def get_output_voltages(self):
+        """回读各已初始化通道的输出电压（V），用于稳定检测"""
+        voltages = {}
+        for ch_num, channel in self.channels.items():
+            if channel is not None:
+                # System.Decimal 通过字符串转换为 Python float
+                voltages[ch_num] = float(str(channel.GetOutputVoltage()))
+        return voltages
+
     def disconnect(self):
         """断开设备连接"""
         if not self.is_connected:
@@ -408,6 +605,7 @@ class PiezoController:
                 except Exception as e:
                     print(f"断开 {self.controller_name} 通道 {ch_num} 时出错: {str(e)}")
             
+            self._last_voltages.clear()
             if self.device:
                 self.device.Disconnect()
                 print(f"{self.controller_name} ({self.serial_no}) 已断开")
@@ -0,0 +1,269 @@
+# headless_runner.py
+"""
+无界面运行入口
+读取GUI“保存参数”导出的双端参数文件，通过 GlobalDeviceManager 初始化设备，运行优化并写出结果文件。
+进度每代压缩为一行输出到标准输出，优化器自身的详细打印写入日志文件；
+不经过 Tk 事件循环、图表重绘和日志控件，适合无人值守的工位。
+
+用法:
+    python headless_runner.py params.json --output results.json
+    python headless_runner.py params.json --backend simulated --generations 20
+    python headless_runner.py params.json --output results.json --journal --metrics textfile
+    python headless_runner.py params.json --resume results.journal
+"""
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+from device_manager_double import GlobalDeviceManager
+from hardware_adapter_double import HardwareAdapter
+from GA_double_new_1 import get_dual_end_config, save_dual_end_optimization_results
+from optimizer_engines import create_optimizer, get_available_engines
+from metrics_exporter import stop_metrics_exporter
+
+# 双端模式的控制器及序列号（与GUI初始化设备相同，可用参数文件的 'controller_serials' 覆盖）
+DUAL_END_CONTROLLERS = {
+    "A端位置控制器": "71897156",
+    "A端角度控制器": "71910880",
+    "B端位置控制器": "71897216",
+    "B端角度控制器": "71450124",
+}
+
+# 硬件初始化各步骤的等待时间（秒，与GUI一致；模拟后端不等待）
+HARDWARE_WAITS = {
+    'device_settle': 10.0,      # 连接后等待设备稳定
+    'zero': 40.0,               # 归零完成
+    'mode_switch': 1.0,         # 切换开环模式
+    'initial_position': 10.0,   # 移动到初始位置
+}
+
+AXES = ['x', 'y', 'z', 'rx', 'ry']
+
+# 参数文件中只用于GUI界面的字段，不传给优化器
+_PARAMETER_FILE_ONLY_KEYS = {'optimization_mode', 'saved_time', 'gui_version',
+                             'initial_positions_A', 'initial_positions_B'} | \
+                            {f'optimize_{side}_{axis}' for side in 'AB' for axis in AXES}
+
+
+def load_parameter_file(path: str) -> Tuple[dict, Dict[str, float]]:
+    """
+    读取GUI保存的参数文件（save_parameters格式）
+
+    返回:
+        (优化器配置, 初始位置 {'A_x': 值, ...})，配置以 get_dual_end_config() 为基础，
+        文件中没有的新配置项使用默认值
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        params = json.load(f)
+    if params.get('optimization_mode') == 'single':
+        raise ValueError("无界面运行只支持双端模式的参数文件")
+
+    config = get_dual_end_config()
+    config.update({key: value for key, value in params.items() if key not in _PARAMETER_FILE_ONLY_KEYS})
+
+    for side in 'AB':
+        # 旧参数文件没有selected_variables时按勾选项确定优化变量
+        if not params.get(f'selected_variables_{side}'):
+            config[f'selected_variables_{side}'] = [axis for axis in AXES if params.get(f'optimize_{side}_{axis}')]
+        # JSON把搜索范围的元组保存为列表
+        search_range = config.get(f'search_range_{side}')
+        if search_range:
+            config[f'search_range_{side}'] = {axis: tuple(bounds) for axis, bounds in search_range.items()}
+
+    initial_position = {}
+    for side in 'AB':
+        for key, value in (params.get(f'initial_positions_{side}') or {}).items():
+            initial_position[key[:-len('_initial')]] = float(value)  # 'A_x_initial' -> 'A_x'
+    return config, initial_position
+
+
+def initialize_devices(config: dict, initial_position: Dict[str, float] = None,
+                       skip_motion: bool = False) -> HardwareAdapter:
+    """
+    按配置初始化功率计和四个PZT控制器，归零、切换开环并移动到初始位置（与GUI初始化设备的步骤相同）
+
+    参数:
+        config: 优化器配置（'device_backend'、'simulation'、'controller_serials'、'wavelength'）
+        initial_position: 初始位置，None或空时不移动
+        skip_motion: True时只连接设备，不归零也不移动
+    """
+    device_manager = GlobalDeviceManager()
+    success, message = device_manager.configure_backend(config)
+    if not success:
+        raise RuntimeError(message)
+    simulated = device_manager.get_backend() == "simulated"
+    waits = {key: 0.0 for key in HARDWARE_WAITS} if simulated else HARDWARE_WAITS
+
+    success, message = device_manager.initialize_power_meter(wavelength=config.get('wavelength', 1550))
+    if not success:
+        raise RuntimeError(message)
+
+    controllers = dict(DUAL_END_CONTROLLERS)
+    controllers.update(config.get('controller_serials', {}) or {})
+    for name, serial_no in controllers.items():
+        success, message = device_manager.initialize_pzt_controller(name, serial_no)
+        if not success:
+            raise RuntimeError(f"{name}初始化失败: {message}")
+
+    hardware_adapter = HardwareAdapter(mode="dual")
+    if skip_motion:
+        return hardware_adapter
+
+    time.sleep(waits['device_settle'])
+    hardware_adapter.zero_all()
+    time.sleep(waits['zero'])
+    hardware_adapter.mode_switch(1)  # 1:开环 2:闭环
+    time.sleep(waits['mode_switch'])
+
+    if initial_position:
+        hardware_adapter.set_initial_positions(initial_position)
+        hardware_adapter.back_to_initial_positions()
+        time.sleep(waits['initial_position'])
+    return hardware_adapter
+
+
+class ProgressPrinter:
+    """把优化器进度消息压缩为每代一行（评估消息只计数）"""
+
+    def __init__(self, stream, total_generations: int):
+        self.stream = stream
+        self.total_generations = total_generations
+        self.evaluation_count = 0
+        self._last_count = 0
+        self._last_time = time.perf_counter()
+
+    def write(self, text: str):
+        self.stream.write(text + "\n")
+        self.stream.flush()
+
+    def __call__(self, message: dict):
+        message_type = message.get('type')
+        if message_type == 'evaluation':
+            self.evaluation_count = message['evaluation_data']['evaluation_count']
+        elif message_type == 'generation':
+            self._print_generation(message['generation_data'])
+        else:
+            self.write(f"[{datetime.now():%H:%M:%S}] 事件: {message_type}")
+
+    def _print_generation(self, data: dict):
+        now = time.perf_counter()
+        elapsed = now - self._last_time
+        rate = (self.evaluation_count - self._last_count) / elapsed if elapsed > 0 else 0.0
+        self._last_count, self._last_time = self.evaluation_count, now
+
+        parts = [
+            f"[{datetime.now():%H:%M:%S}] 第{data['iteration']}/{data.get('total_iterations', self.total_generations)}代",
+            f"当前 {data['current_power']:.4e}",
+            f"最佳 {data['best_power']:.4e} mW",
+            f"评估 {self.evaluation_count} ({rate:.1f}/s)",
+            f"阶段 {data['optimization_phase']}",
+        ]
+        if data.get('cache_hit_rate') is not None:
+            parts.append(f"缓存 {data['cache_hit_rate']*100:.0f}%")
+        evaluation_timing = (data.get('timing') or {}).get('evaluation')
+        if evaluation_timing:
+            parts.append(f"单次 {evaluation_timing['p50']*1000:.0f}ms")
+        if data.get('converged'):
+            parts.append("已收敛")
+        if data.get('lock_status', {}).get('lock_mode_activated'):
+            parts.append("锁定")
+        self.write(" | ".join(parts))
+
+
+def run_headless(config: dict, initial_position: Dict[str, float], output: str, stream=None,
+                 resume_journal: str = None, skip_motion: bool = False) -> dict:
+    """初始化设备、运行优化并保存结果，返回run()的结果字典"""
+    stream = stream or sys.stdout
+    printer = ProgressPrinter(stream, config.get('generations', 0))
+
+    hardware_adapter = initialize_devices(config, initial_position, skip_motion)
+    optimizer = create_optimizer(config, hardware_adapter)
+    if resume_journal:
+        summary = optimizer.resume_from_journal(resume_journal)
+        printer.evaluation_count = printer._last_count = summary['evaluation_count']
+        printer.write(f"从运行日志恢复: 已完成{summary['generation']}代, {summary['evaluation_count']}次评估, "
+                      f"最佳 {summary['best_fitness']:.4e} mW")
+    optimizer.set_callbacks(progress_callback=printer)
+
+    # Ctrl+C 只请求停止，当前代结束后照常保存结果
+    def request_stop(signum, frame):
+        printer.write("收到中断信号，当前代结束后停止...")
+        optimizer.stop()
+    previous_handler = signal.signal(signal.SIGINT, request_stop)
+    try:
+        result = optimizer.run()
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+
+    save_dual_end_optimization_results(result, output)
+    stop_metrics_exporter()
+    hardware_adapter.disconnect()
+
+    if result.get('success'):
+        printer.write(f"完成: 最佳功率 {result['best_power']:.4e} mW, {result['total_evaluations']}次评估, "
+                      f"{result['total_generations']}代, 用时 {result['optimization_time']:.1f}s, 结果: {output}")
+    else:
+        printer.write(f"优化失败: {result.get('error')}，结果: {output}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面运行双端优化（参数文件为GUI保存参数的JSON）")
+    parser.add_argument('config', help="参数文件（GUI保存参数导出的JSON）")
+    parser.add_argument('--output', default=None, help="结果JSON文件（默认按时间生成）")
+    parser.add_argument('--log', default=None, help="优化器详细输出的日志文件（默认与结果文件同名.log）")
+    parser.add_argument('--verbose', action='store_true', help="优化器详细输出直接打印到标准输出")
+    parser.add_argument('--engine', choices=get_available_engines(), default=None, help="覆盖参数文件中的优化引擎")
+    parser.add_argument('--generations', type=int, default=None, help="覆盖参数文件中的代数")
+    parser.add_argument('--backend', choices=['hardware', 'simulated'], default=None, help="覆盖设备后端")
+    parser.add_argument('--seed', type=int, default=None, help="随机数种子")
+    parser.add_argument('--journal', action='store_true', help="写运行日志（与结果文件同名.journal），中断后可用--resume恢复")
+    parser.add_argument('--resume', default=None, help="从运行日志恢复中断的运行")
+    parser.add_argument('--metrics', choices=['textfile', 'http', 'both'], default=None,
+                        help="导出Prometheus指标（textfile写到与结果文件同名.prom）")
+    parser.add_argument('--skip-motion', action='store_true', help="只连接设备，不归零也不移动到初始位置")
+    args = parser.parse_args()
+
+    config, initial_position = load_parameter_file(args.config)
+    if args.engine:
+        config['optimizer_engine'] = args.engine
+    if args.generations is not None:
+        config['generations'] = args.generations
+    if args.backend:
+        config['device_backend'] = args.backend
+    if args.seed is not None:
+        config['random_seed'] = args.seed
+
+    output = args.output or f"dual_end_optimization_results_{datetime.now():%Y%m%d_%H%M%S}.json"
+    log_path = args.log or os.path.splitext(output)[0] + '.log'
+    if args.journal:
+        config['run_journal'] = dict(config.get('run_journal') or {}, enabled=True,
+                                     path=os.path.splitext(output)[0] + '.journal')
+    if args.metrics:
+        config['metrics'] = dict(config.get('metrics') or {}, enabled=True, mode=args.metrics,
+                                 textfile_path=os.path.splitext(output)[0] + '.prom')
+    stream = sys.stdout
+    stream.write(f"引擎: {config.get('optimizer_engine', 'ga')}, 代数: {config.get('generations')}, "
+                 f"A端: {config['selected_variables_A']}, B端: {config['selected_variables_B']}, "
+                 f"后端: {config.get('device_backend', 'hardware')}"
+                 + ("" if args.verbose else f", 详细日志: {log_path}") + "\n")
+
+    if args.verbose:
+        result = run_headless(config, initial_position, output, stream,
+                              resume_journal=args.resume, skip_motion=args.skip_motion)
+    else:
+        with open(log_path, 'a', encoding='utf-8', buffering=1) as log_file, \
+                contextlib.redirect_stdout(log_file):
+            result = run_headless(config, initial_position, output, stream,
+                                  resume_journal=args.resume, skip_motion=args.skip_motion)
+    return 0 if result.get('success') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
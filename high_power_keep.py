@@ -3,6 +3,8 @@ import numpy as np
 from datetime import datetime
 from typing import Tuple, Dict, List, Optional
 
+from population_operators import get_bounds, gaussian_perturbation
+
 class HighPowerKeepMode:
     """
     改进的高功率保持模式
@@ -11,7 +13,8 @@ class HighPowerKeepMode:
     
     def __init__(self, config: dict, selected_variables_A: List[str], 
              selected_variables_B: List[str], 
-             search_range_A: Dict, search_range_B: Dict):
+             search_range_A: Dict, search_range_B: Dict,
+             rng: Optional[np.random.Generator] = None):
         """
         初始化高功率保持模式
         
@@ -21,12 +24,18 @@ class HighPowerKeepMode:
             selected_variables_B: B端选择的变量
             search_range_A: A端原始搜索范围
             search_range_B: B端原始搜索范围
+            rng: 随机数生成器（缺省按config中的random_seed创建）
         """
         self.config = config
         self.selected_variables_A = selected_variables_A
         self.selected_variables_B = selected_variables_B
         self.search_range_A = search_range_A
         self.search_range_B = search_range_B
+        self.rng = rng if rng is not None else np.random.default_rng(config.get('random_seed', None))
+        
+        # 预先计算的原始搜索范围上下界向量
+        self.bounds_A = get_bounds(selected_variables_A, search_range_A)
+        self.bounds_B = get_bounds(selected_variables_B, search_range_B)
         
         # 高功率保持模式参数
         self.high_power_population_size = config.get('high_power_population_size', 20)
@@ -344,24 +353,13 @@ class HighPowerKeepMode:
         if self.center_individual_A is None or self.center_individual_B is None:
             raise ValueError("高功率保持模式未初始化，请先调用initialize方法")
         
-        population_A = np.zeros((self.high_power_population_size, len(self.selected_variables_A)))
-        population_B = np.zeros((self.high_power_population_size, len(self.selected_variables_B)))
-        
-        # 获取小范围搜索区间
-        search_range_A, search_range_B = self.get_search_range_around_center()
-        
         # 克隆最佳个体并添加扰动（使用小范围搜索区间）
-        for i in range(self.high_power_population_size):
-            population_A[i] = self._create_near_center_individual_with_range(
-                self.center_individual_A, 
-                self.selected_variables_A, 
-                search_range_A  # ✅ 使用小范围搜索区间
-            )
-            population_B[i] = self._create_near_center_individual_with_range(
-                self.center_individual_B, 
-                self.selected_variables_B, 
-                search_range_B  # ✅ 使用小范围搜索区间
-            )
+        population_A = self._sample_near_center(
+            self.center_individual_A, self.bounds_A, self.high_power_population_size
+        )
+        population_B = self._sample_near_center(
+            self.center_individual_B, self.bounds_B, self.high_power_population_size
+        )
         
         print(f"高功率保持模式：创建初始种群完成")
         print(f"  种群大小: {self.high_power_population_size}")
@@ -383,20 +381,11 @@ class HighPowerKeepMode:
         返回:
             perturbed_individual: 添加扰动后的个体
         """
-        perturbed = individual.copy()
-        
-        for i, var in enumerate(selected_variables):
-            lower, upper = search_range[var]
-            range_size = upper - lower
-            
-            # 计算扰动幅度
-            perturbation = np.random.normal(0, range_size * self.high_power_perturbation_strength)
-            perturbed[i] += perturbation
-            
-            # 确保在搜索范围内
-            perturbed[i] = np.clip(perturbed[i], lower, upper)
-        
-        return perturbed
+        lower_bounds, upper_bounds = get_bounds(selected_variables, search_range)
+        return gaussian_perturbation(
+            self.rng, np.asarray(individual, dtype=float)[None, :], lower_bounds, upper_bounds,
+            self.high_power_perturbation_strength
+        )[0]
     
     def update_search_center(self, best_individual_A: np.ndarray, best_individual_B: np.ndarray, 
                            best_fitness: float):
@@ -485,6 +474,34 @@ class HighPowerKeepMode:
         
         return search_range_A, search_range_B
     
+    def _local_bounds(self, center_individual: np.ndarray,
+                      bounds: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        以中心个体为中心、宽度为原始量程×搜索范围百分比的小范围区间（裁剪到原始范围内）
+        """
+        lower_bounds, upper_bounds = bounds
+        half_width = (upper_bounds - lower_bounds) * self.high_power_search_range_percent / 2
+        center = np.asarray(center_individual, dtype=float)
+        return np.maximum(center - half_width, lower_bounds), np.minimum(center + half_width, upper_bounds)
+
+    def _sample_near_center(self, center_individual: np.ndarray, bounds: Tuple[np.ndarray, np.ndarray],
+                            count: int) -> np.ndarray:
+        """
+        在小范围搜索区间内一次生成count个接近搜索中心的个体
+
+        每个基因为 中心值 + U(-区间宽度/2, 区间宽度/2)，再裁剪到小范围区间内
+        """
+        local_lower, local_upper = self._local_bounds(center_individual, bounds)
+        return self._sample_uniform_around(center_individual, local_lower, local_upper,
+                                           (local_upper - local_lower) / 2, count)
+
+    def _sample_uniform_around(self, center_individual: np.ndarray, lower_bounds: np.ndarray,
+                               upper_bounds: np.ndarray, half_range: np.ndarray, count: int) -> np.ndarray:
+        """中心值加均匀扰动U(-half_range, half_range)并裁剪到[lower_bounds, upper_bounds]"""
+        center = np.asarray(center_individual, dtype=float)
+        perturbation = self.rng.uniform(-half_range, half_range, (count, len(center)))
+        return np.clip(center + perturbation, lower_bounds, upper_bounds)
+
     def create_new_population(self, population_A: np.ndarray, population_B: np.ndarray, 
                         fitness: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -509,21 +526,14 @@ class HighPowerKeepMode:
             new_population_A[0] = population_A[best_idx]
             new_population_B[0] = population_B[best_idx]
         
-        # 2. 获取小范围搜索区间
-        search_range_A, search_range_B = self.get_search_range_around_center()
-        
-        # 3. 基于当前搜索中心创建新个体（使用小范围搜索区间）
-        for i in range(elite_count, len(new_population_A)):
-            # 以当前搜索中心为基础，在小范围内添加随机扰动
-            new_population_A[i] = self._create_near_center_individual_with_range(
-                self.center_individual_A, 
-                self.selected_variables_A, 
-                search_range_A
+        # 2. 基于当前搜索中心创建新个体（在小范围搜索区间内添加随机扰动）
+        new_count = len(new_population_A) - elite_count
+        if new_count > 0:
+            new_population_A[elite_count:] = self._sample_near_center(
+                self.center_individual_A, self.bounds_A, new_count
             )
-            new_population_B[i] = self._create_near_center_individual_with_range(
-                self.center_individual_B, 
-                self.selected_variables_B, 
-                search_range_B
+            new_population_B[elite_count:] = self._sample_near_center(
+                self.center_individual_B, self.bounds_B, new_count
             )
         
         return new_population_A, new_population_B
@@ -534,11 +544,11 @@ class HighPowerKeepMode:
         """
         在小范围搜索区间内创建接近搜索中心的个体
         """
-        individual = center_individual.copy()
-        
+        lower_bounds = np.empty(len(selected_variables))
+        upper_bounds = np.empty(len(selected_variables))
         for i, var in enumerate(selected_variables):
             if var in local_search_range:
-                lower, upper = local_search_range[var]
+                lower_bounds[i], upper_bounds[i] = local_search_range[var]
             else:
                 # 计算动态的小范围搜索区间
                 # 确定原始搜索范围
@@ -550,22 +560,15 @@ class HighPowerKeepMode:
                     raise KeyError(f"变量 {var} 不在任何搜索范围中")
                 
                 center_value = center_individual[i]
-                range_size = original_upper - original_lower
-                search_range = range_size * self.high_power_search_range_percent
+                search_range = (original_upper - original_lower) * self.high_power_search_range_percent
                 
                 # 计算局部搜索范围
-                lower = max(center_value - search_range/2, original_lower)
-                upper = min(center_value + search_range/2, original_upper)
-            
-            # 在小范围内随机扰动
-            perturbation_range = upper - lower
-            perturbation = np.random.uniform(-perturbation_range/2, perturbation_range/2)
-            individual[i] += perturbation
-            
-            # 确保在小范围搜索区间内
-            individual[i] = np.clip(individual[i], lower, upper)
+                lower_bounds[i] = max(center_value - search_range/2, original_lower)
+                upper_bounds[i] = min(center_value + search_range/2, original_upper)
         
-        return individual
+        # 在小范围内随机扰动，并确保在小范围搜索区间内
+        return self._sample_uniform_around(center_individual, lower_bounds, upper_bounds,
+                                           (upper_bounds - lower_bounds) / 2, 1)[0]
     
     def _create_near_center_individual(self, center_individual: np.ndarray, 
                                  selected_variables: List[str], 
@@ -581,26 +584,17 @@ class HighPowerKeepMode:
         返回:
             individual: 新个体
         """
-        individual = center_individual.copy()
-        
-        for i, var in enumerate(selected_variables):
-            if var in search_range:
-                lower, upper = search_range[var]
-            else:
-                # 如果变量不在search_range中，使用默认范围
-                # 这应该是从self.search_range_A或self.search_range_B中获取
-                # 需要根据具体情况确定
-                continue
-                
-            # 在小范围内随机扰动
-            perturbation_range = (upper - lower) * self.high_power_search_range_percent
-            perturbation = np.random.uniform(-perturbation_range/2, perturbation_range/2)
-            individual[i] += perturbation
-            
-            # 确保在搜索范围内
-            individual[i] = np.clip(individual[i], lower, upper)
-        
-        return individual
+        # 不在search_range中的变量保持中心值（扰动和裁剪范围均不生效）
+        in_range = np.array([var in search_range for var in selected_variables])
+        lower_bounds = np.array([search_range[var][0] if var in search_range else -np.inf
+                                 for var in selected_variables], dtype=float)
+        upper_bounds = np.array([search_range[var][1] if var in search_range else np.inf
+                                 for var in selected_variables], dtype=float)
+        span = np.where(in_range, upper_bounds - lower_bounds, 0.0)
+        
+        # 在小范围内随机扰动，并确保在搜索范围内
+        return self._sample_uniform_around(center_individual, lower_bounds, upper_bounds,
+                                           span * self.high_power_search_range_percent / 2, 1)[0]
     
     def get_status(self) -> dict:
         """
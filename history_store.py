@@ -0,0 +1,402 @@
+# history_store.py
+"""
+列式优化历史
+每次评估向 history['search_history'] 追加一个嵌套字典（两个位置字典、完整的power_result、ISO时间字符串），
+保持模式连续运行数小时后内存无限增长。这里改为按列存储在可增长的NumPy数组中：
+位置为浮点矩阵，功率、时间戳为float64，优化阶段等字符串为小整数编码，追加为均摊O(1)。
+
+现有使用方式不变：EvaluationHistory 支持 len()、下标、切片和迭代，按需生成与原来相同格式的记录字典；
+HistorySeries 用于每代一项的历史（best_fitness、best_individual_A等），下标和切片返回Python数值/列表。
+需要批量数据时用 EvaluationHistory.columns() 直接取数组视图。
+"""
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_MISSING_INT = np.iinfo(np.int64).min
+
+
+class GrowableArray:
+    """按行追加的预分配数组，容量不足时翻倍（均摊O(1)）"""
+
+    def __init__(self, width: Optional[int] = None, dtype=np.float64, fill=np.nan, capacity: int = 256):
+        """
+        参数:
+            width: 每行的列数（None表示一维）
+            dtype: 元素类型
+            fill: 未写入位置的填充值（表示缺失）
+            capacity: 初始容量（行数）
+        """
+        self.fill = fill
+        shape = (capacity,) if width is None else (capacity, width)
+        self._data = np.full(shape, fill, dtype=dtype)
+        self._size = 0
+
+    def _reserve(self, size: int):
+        if size <= len(self._data):
+            return
+        capacity = max(size, 2 * len(self._data))
+        data = np.full((capacity,) + self._data.shape[1:], self.fill, dtype=self._data.dtype)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+    def append(self, value):
+        self._reserve(self._size + 1)
+        self._data[self._size] = value
+        self._size += 1
+
+    def pad_to(self, size: int):
+        """用缺失值补齐到size行（中途新增的列）"""
+        self._reserve(size)
+        self._size = max(self._size, size)
+
+    @property
+    def data(self) -> np.ndarray:
+        """已写入部分的视图"""
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class _Categories:
+    """字符串到小整数编码的映射"""
+
+    def __init__(self, limit: int = 256):
+        self.limit = limit
+        self.values = []
+        self._codes = {}
+
+    def encode(self, value) -> int:
+        """返回编码，不同取值超过上限时返回None"""
+        code = self._codes.get(value)
+        if code is None:
+            if len(self.values) >= self.limit:
+                return None
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class HistorySeries:
+    """
+    每代一项的历史列（列表接口）
+    数值列中None存为NaN（nullable=True时读出为None），categorical=True时按字符串编码存储
+    """
+
+    def __init__(self, width: Optional[int] = None, dtype=np.float64, nullable: bool = False,
+                 categorical: bool = False):
+        self.width = width
+        self.nullable = nullable
+        self._categories = _Categories(limit=2 ** 15) if categorical else None
+        if categorical:
+            self._array = GrowableArray(dtype=np.int16, fill=-1)
+        elif np.issubdtype(dtype, np.integer):
+            self._array = GrowableArray(width, dtype=np.int64, fill=_MISSING_INT)
+        else:
+            self._array = GrowableArray(width, dtype=np.float64, fill=np.nan)
+
+    def append(self, value):
+        if self._categories is not None:
+            code = self._categories.encode(value)
+            self._array.append(-1 if code is None else code)
+        elif value is None:
+            self._array.append(self._array.fill)
+        else:
+            self._array.append(value)
+
+    def _to_python(self, value):
+        if self._categories is not None:
+            return self._categories.values[value] if value >= 0 else None
+        if self.width is not None:
+            return value.tolist()
+        if self._array.data.dtype == np.int64:
+            return None if value == _MISSING_INT else int(value)
+        if self.nullable and np.isnan(value):
+            return None
+        return float(value)
+
+    def __getitem__(self, index):
+        data = self._array.data
+        if isinstance(index, slice):
+            return [self._to_python(value) for value in data[index]]
+        return self._to_python(data[index])
+
+    def __len__(self) -> int:
+        return len(self._array)
+
+    def __iter__(self):
+        for value in self._array.data:
+            yield self._to_python(value)
+
+    def __repr__(self) -> str:
+        return f"HistorySeries({self.to_list()!r})"
+
+    @property
+    def array(self) -> np.ndarray:
+        """数组视图（数值列）"""
+        return self._array.data
+
+    @property
+    def nbytes(self) -> int:
+        return self._array.nbytes
+
+    def to_list(self) -> list:
+        return list(self)
+
+
+class _ResultField:
+    """power_result中的一个标量字段：数值存为float64，字符串按编码存储（取值过多时整列丢弃）"""
+
+    def __init__(self, kind: str, rows: int):
+        self.kind = kind
+        self.categories = _Categories() if kind == 'category' else None
+        if kind == 'category':
+            self.array = GrowableArray(dtype=np.int16, fill=-1)
+        elif kind == 'bool':
+            self.array = GrowableArray(dtype=np.int8, fill=-1)
+        else:
+            self.array = GrowableArray(dtype=np.float64, fill=np.nan)
+        self.array.pad_to(rows)
+
+    def store(self, row: int, value) -> bool:
+        """写入第row行，返回False表示该字段需要丢弃"""
+        self.array.pad_to(row + 1)
+        if self.kind == 'category':
+            code = self.categories.encode(value)
+            if code is None:
+                return False
+            value = code
+        self.array.data[row] = value
+        return True
+
+    def load(self, row: int):
+        if row >= len(self.array):
+            return None
+        value = self.array.data[row]
+        if self.kind == 'category':
+            return self.categories.values[value] if value >= 0 else None
+        if self.kind == 'bool':
+            return bool(value) if value >= 0 else None
+        if np.isnan(value):
+            return None
+        return int(value) if self.kind == 'int' else float(value)
+
+
+def _field_kind(value) -> Optional[str]:
+    if isinstance(value, (bool, np.bool_)):
+        return 'bool'
+    if isinstance(value, (int, np.integer)):
+        return 'int'
+    if isinstance(value, (float, np.floating)):
+        return 'float'
+    if isinstance(value, str):
+        return 'category'
+    return None
+
+
+class EvaluationHistory:
+    """
+    列式评估历史（history['search_history']）
+
+    固定列：A端/B端位置矩阵、功率、时间戳（time.time()）、评估序号、优化阶段（编码）、是否通光、稳定时间。
+    power_result按字段拆分为标量列（一层嵌套字典展开为'父键.子键'），字符串取值超过256种的字段
+    （如每次不同的工程单位字符串）整列丢弃并记录在dropped_fields中，其余类型的值不保存。
+    """
+
+    def __init__(self, selected_variables_A: Sequence[str], selected_variables_B: Sequence[str],
+                 capacity: int = 1024):
+        self.selected_variables_A = list(selected_variables_A)
+        self.selected_variables_B = list(selected_variables_B)
+        self._keys_A = [f'A_{var}' for var in self.selected_variables_A]
+        self._keys_B = [f'B_{var}' for var in self.selected_variables_B]
+        self._position_A = GrowableArray(len(self._keys_A), capacity=capacity)
+        self._position_B = GrowableArray(len(self._keys_B), capacity=capacity)
+        self._power = GrowableArray(capacity=capacity)
+        self._timestamp = GrowableArray(capacity=capacity)
+        self._evaluation_index = GrowableArray(dtype=np.int64, fill=_MISSING_INT, capacity=capacity)
+        self._phase = GrowableArray(dtype=np.int16, fill=-1, capacity=capacity)
+        self._light_detected = GrowableArray(dtype=np.int8, fill=-1, capacity=capacity)
+        self._settle_time = GrowableArray(capacity=capacity)
+        self._phases = _Categories(limit=2 ** 15)
+        self._result_fields: Dict[str, _ResultField] = {}
+        self.dropped_fields = set()
+
+    # ------------------------------------------------------------------
+    # 追加
+    # ------------------------------------------------------------------
+
+    def append_evaluation(self, individual_A: np.ndarray, individual_B: np.ndarray, power: float,
+                          evaluation_index: int, optimization_phase: str, light_detected: bool,
+                          settle_time: Optional[float] = None, power_result: Optional[dict] = None,
+                          timestamp: Optional[float] = None):
+        """追加一次评估（个体为数组，时间戳为time.time()，缺省为当前时间）"""
+        row = len(self._power)
+        self._position_A.append(individual_A)
+        self._position_B.append(individual_B)
+        self._power.append(power)
+        self._timestamp.append(time.time() if timestamp is None else timestamp)
+        self._evaluation_index.append(evaluation_index)
+        code = self._phases.encode(optimization_phase)
+        self._phase.append(-1 if code is None else code)
+        self._light_detected.append(-1 if light_detected is None else int(bool(light_detected)))
+        self._settle_time.append(np.nan if settle_time is None else settle_time)
+        if power_result:
+            self._store_result(row, power_result)
+
+    def append(self, record: dict):
+        """追加一条原格式的记录字典（与list.append兼容）"""
+        position_A = record.get('position_A', {})
+        position_B = record.get('position_B', {})
+        timestamp = record.get('timestamp')
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        self.append_evaluation(
+            np.array([position_A.get(key, np.nan) for key in self._keys_A], dtype=float),
+            np.array([position_B.get(key, np.nan) for key in self._keys_B], dtype=float),
+            record.get('power', np.nan),
+            record.get('evaluation_index', len(self) + 1),
+            record.get('optimization_phase'),
+            record.get('light_detected'),
+            record.get('settle_time'),
+            record.get('power_result'),
+            timestamp,
+        )
+
+    def _store_result(self, row: int, power_result: dict, prefix: str = ''):
+        for key, value in power_result.items():
+            name = f'{prefix}{key}'
+            if isinstance(value, dict):
+                if not prefix:
+                    self._store_result(row, value, f'{name}.')
+                continue
+            if name in self.dropped_fields or value is None:
+                continue
+            field = self._result_fields.get(name)
+            if field is None:
+                kind = _field_kind(value)
+                if kind is None:
+                    continue
+                field = self._result_fields[name] = _ResultField(kind, row)
+            elif field.kind == 'int' and _field_kind(value) == 'float':
+                field.kind = 'float'
+            if field.kind == 'category' and not isinstance(value, str):
+                value = str(value)
+            if not field.store(row, value):
+                del self._result_fields[name]
+                self.dropped_fields.add(name)
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._power)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("评估历史下标越界")
+        return self._record(index)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self._record(row)
+
+    def __repr__(self) -> str:
+        return f"EvaluationHistory({len(self)} 条评估)"
+
+    def _power_result(self, row: int) -> dict:
+        result = {}
+        for name, field in self._result_fields.items():
+            value = field.load(row)
+            if value is None:
+                continue
+            parent, _, child = name.partition('.')
+            if child:
+                result.setdefault(parent, {})[child] = value
+            else:
+                result[name] = value
+        return result
+
+    def _record(self, row: int) -> dict:
+        """按原search_history格式生成第row条记录"""
+        position_A = self._position_A.data[row]
+        position_B = self._position_B.data[row]
+        power = float(self._power.data[row])
+        phase = self._phase.data[row]
+        light = self._light_detected.data[row]
+        settle_time = self._settle_time.data[row]
+        evaluation_index = self._evaluation_index.data[row]
+        power_result = self._power_result(row) or {'power': power}
+        return {
+            'position_A': dict(zip(self._keys_A, position_A.tolist())),
+            'position_B': dict(zip(self._keys_B, position_B.tolist())),
+            'power': power,
+            'power_result': power_result,
+            'timestamp': datetime.fromtimestamp(self._timestamp.data[row]).isoformat(),
+            'evaluation_index': None if evaluation_index == _MISSING_INT else int(evaluation_index),
+            'optimization_phase': self._phases.values[phase] if phase >= 0 else None,
+            'light_detected': bool(light) if light >= 0 else None,
+            'settle_time': None if np.isnan(settle_time) else float(settle_time),
+        }
+
+    def columns(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        批量读取[start, stop)行的数组视图（不复制）
+
+        返回:
+            points（A端与B端拼接的位置矩阵）、position_A、position_B、power、timestamp、evaluation_index、settle_time
+        """
+        rows = slice(start, len(self) if stop is None else stop)
+        position_A = self._position_A.data[rows]
+        position_B = self._position_B.data[rows]
+        return {
+            'points': np.hstack([position_A, position_B]),
+            'position_A': position_A,
+            'position_B': position_B,
+            'power': self._power.data[rows],
+            'timestamp': self._timestamp.data[rows],
+            'evaluation_index': self._evaluation_index.data[rows],
+            'settle_time': self._settle_time.data[rows],
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """已分配的数组字节数"""
+        arrays = [self._position_A, self._position_B, self._power, self._timestamp, self._evaluation_index,
+                  self._phase, self._light_detected, self._settle_time]
+        arrays += [field.array for field in self._result_fields.values()]
+        return sum(array.nbytes for array in arrays)
+
+    def to_list(self) -> List[dict]:
+        """全部记录（保存为JSON时使用）"""
+        return list(self)
+
+
+def create_generation_history(dimension_A: int, dimension_B: int) -> Dict[str, HistorySeries]:
+    """每代一项的历史列（与DualEndGeneticAlgorithmOptimizer._update_history写入的键一致）"""
+    return {
+        'generations': HistorySeries(dtype=np.int64),
+        'best_fitness': HistorySeries(),
+        'avg_fitness': HistorySeries(),
+        'best_individual_A': HistorySeries(width=dimension_A),
+        'best_individual_B': HistorySeries(width=dimension_B),
+        'optimization_phase': HistorySeries(categorical=True),
+        'population_diversity_A': HistorySeries(),
+        'population_diversity_B': HistorySeries(),
+        'mutation_rate_history': HistorySeries(),
+        'evaluation_path_length': HistorySeries(nullable=True),
+        'cache_hit_rate': HistorySeries(nullable=True),
+        'surrogate_rmse': HistorySeries(nullable=True),
+    }
@@ -0,0 +1,304 @@
+# light_search.py
+"""
+首次通光扫描
+未通光时功率处处为零，遗传算法在平坦的地形上只能随机搜索。
+本模块在优化之前连续扫描：内层轴（缺省A端x-y）沿螺旋线或光栅线连续运动，
+外层轴（缺省B端x-y）在每条内层路径之间按网格步进；功率计持续采集，
+第一个超过阈值的样本出现时立即停止，并返回该样本对应的指令位置。
+后台功率采集服务运行时检查两次指令之间的全部样本，否则每次指令后读取一次当前功率。
+"""
+import bisect
+import math
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def get_default_first_light_config() -> dict:
+    """获取首次通光扫描的默认配置"""
+    return {
+        'first_light_pattern': 'spiral',               # 'spiral' 螺旋线 / 'raster' 光栅（蛇形）
+        'first_light_inner_axes': ['A_x', 'A_y'],      # 连续扫描的两个轴
+        'first_light_outer_axes': ['B_x', 'B_y'],      # 步进的外层轴（可为空）
+        'first_light_speed': 200.0,                    # 内层扫描速度（µm/s）
+        'first_light_pitch': 4.0,                      # 螺距 / 光栅行距 / 外层网格步长（µm），应小于模场直径
+        'first_light_update_interval': 0.01,           # 指令周期（秒）
+        'first_light_outer_settle': 0.05,              # 外层步进后的等待时间（秒）
+        'first_light_lag': 0.0,                        # 功率响应相对指令的滞后（秒），用于回推命中位置
+        'first_light_max_time': 300.0,                 # 最长扫描时间（秒）
+        'first_light_handoff_range': 8.0,              # 交给优化的搜索范围：命中位置±该值（µm，仅扫描轴）
+        'first_light_threshold_fraction': 0.01,        # 未指定first_light_threshold时，阈值取light_threshold的该比例
+    }
+
+
+def spiral_path(center: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                pitch: float, step: float) -> np.ndarray:
+    """
+    阿基米德螺旋线 r = pitch·θ/2π，沿弧长每step取一点，范围外的点跳过
+
+    返回:
+        (n, 2) 路径点
+    """
+    max_radius = float(np.max(np.linalg.norm(
+        np.array([[lower[0], lower[1]], [lower[0], upper[1]], [upper[0], lower[1]], [upper[0], upper[1]]]) - center,
+        axis=1)))
+    points = [center.copy()]
+    theta = 0.0
+    radius = 0.0
+    while radius <= max_radius:
+        theta += step / max(radius, step)
+        radius = pitch * theta / (2 * math.pi)
+        point = center + radius * np.array([math.cos(theta), math.sin(theta)])
+        if np.all(point >= lower) and np.all(point <= upper):
+            points.append(point)
+    return np.array(points)
+
+
+def raster_path(lower: np.ndarray, upper: np.ndarray, pitch: float, step: float) -> np.ndarray:
+    """蛇形光栅：沿第一轴往返，每行沿第二轴前进pitch"""
+    lines = np.arange(lower[1], upper[1] + 1e-12, pitch)
+    samples = np.linspace(lower[0], upper[0], max(2, int(math.ceil((upper[0] - lower[0]) / step)) + 1))
+    points = []
+    for i, y in enumerate(lines):
+        xs = samples if i % 2 == 0 else samples[::-1]
+        points.extend((x, y) for x in xs)
+    return np.array(points)
+
+
+def grid_points(center: np.ndarray, lower: np.ndarray, upper: np.ndarray, pitch: float,
+                pattern: str) -> np.ndarray:
+    """
+    外层网格（与起点对齐，起点在网格上）
+    螺旋模式按到起点的距离由近到远排列，光栅模式按蛇形排列
+    """
+    if len(center) == 0:
+        return np.zeros((1, 0))
+    axes = [np.concatenate([center[i] - np.arange(pitch, center[i] - lower[i] + 1e-12, pitch)[::-1],
+                            center[i] + np.arange(0, upper[i] - center[i] + 1e-12, pitch)])
+            for i in range(len(center))]
+    mesh = np.array(np.meshgrid(*axes, indexing='ij')).reshape(len(center), -1).T
+    if pattern == 'spiral':
+        return mesh[np.argsort(np.linalg.norm(mesh - center, axis=1), kind='stable')]
+    if len(center) >= 2:
+        # 蛇形：第一轴每前进一格，其余轴的遍历方向反转
+        rows = mesh.reshape(len(axes[0]), -1, len(center))
+        rows[1::2] = rows[1::2, ::-1]
+        mesh = rows.reshape(-1, len(center))
+    return mesh
+
+
+class FirstLightScanner:
+    """首次通光连续扫描"""
+
+    def __init__(self, hardware_adapter, base_position: Dict[str, float], ranges: Dict[str, Tuple[float, float]],
+                 threshold: float, config: dict = None, should_continue: Optional[Callable[[], bool]] = None,
+                 progress_callback: Optional[Callable] = None):
+        """
+        初始化扫描器
+
+        参数:
+            hardware_adapter: 硬件适配器（set_position / measure_current_power / read_power_stream）
+            base_position: 起点的完整位置字典（{'A_x': ..., 'B_z': ...}），扫描轴以外的轴保持不变
+            ranges: 扫描轴的范围 {'A_x': (下限, 上限), ...}
+            threshold: 通光阈值
+            config: 配置，缺省项使用get_default_first_light_config()
+            should_continue: 返回False时停止扫描
+            progress_callback: 每条内层路径结束后的进度回调
+        """
+        self.hardware_adapter = hardware_adapter
+        self.base_position = dict(base_position)
+        self.threshold = float(threshold)
+        self.config = get_default_first_light_config()
+        if config:
+            self.config.update({k: v for k, v in config.items() if k in self.config})
+        self.should_continue = should_continue
+        self.progress_callback = progress_callback
+
+        self.inner_axes = list(self.config['first_light_inner_axes'])
+        self.outer_axes = list(self.config['first_light_outer_axes'])
+        self.pattern = self.config['first_light_pattern']
+        if self.pattern not in ('spiral', 'raster'):
+            raise ValueError(f"未知的扫描模式: {self.pattern}")
+        if len(self.inner_axes) != 2:
+            raise ValueError("内层扫描需要两个轴")
+
+        def axis_bounds(axes: List[str]):
+            lower = np.array([ranges[axis][0] for axis in axes], dtype=float)
+            upper = np.array([ranges[axis][1] for axis in axes], dtype=float)
+            start = np.clip([self.base_position[axis] for axis in axes], lower, upper)
+            return lower, upper, np.asarray(start, dtype=float)
+
+        self.inner_lower, self.inner_upper, self.inner_start = axis_bounds(self.inner_axes)
+        self.outer_lower, self.outer_upper, self.outer_start = axis_bounds(self.outer_axes)
+
+    # ------------------------------------------------------------------
+    # 路径
+    # ------------------------------------------------------------------
+
+    def inner_path(self) -> np.ndarray:
+        step = self.config['first_light_speed'] * self.config['first_light_update_interval']
+        pitch = self.config['first_light_pitch']
+        if self.pattern == 'spiral':
+            return spiral_path(self.inner_start, self.inner_lower, self.inner_upper, pitch, step)
+        return raster_path(self.inner_lower, self.inner_upper, pitch, step)
+
+    def outer_path(self) -> np.ndarray:
+        return grid_points(self.outer_start, self.outer_lower, self.outer_upper,
+                           self.config['first_light_pitch'], self.pattern)
+
+    def _position(self, inner_point: np.ndarray, outer_point: np.ndarray) -> Dict[str, float]:
+        position = dict(self.base_position)
+        position.update({axis: float(inner_point[i]) for i, axis in enumerate(self.inner_axes)})
+        position.update({axis: float(outer_point[i]) for i, axis in enumerate(self.outer_axes)})
+        return position
+
+    # ------------------------------------------------------------------
+    # 扫描
+    # ------------------------------------------------------------------
+
+    def _read_samples(self, since: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """后台采集服务运行时返回since之后的(时间戳, 功率)，否则返回None"""
+        if hasattr(self.hardware_adapter, 'read_power_stream'):
+            return self.hardware_adapter.read_power_stream(since)
+        return None
+
+    def run(self) -> Dict:
+        """
+        执行扫描
+
+        返回:
+            结果字典：found、time_to_first_light、hit_power、hit_position、max_power、max_position、
+            samples、commands、path_length、outer_points_scanned、stop_reason、duration
+        """
+        interval = float(self.config['first_light_update_interval'])
+        lag = float(self.config['first_light_lag'])
+        max_time = float(self.config['first_light_max_time'])
+        inner = self.inner_path()
+        outer = self.outer_path()
+
+        start = time.perf_counter()
+        command_times = []      # 指令时间（用于按样本时间回推位置）
+        command_positions = []
+        samples = 0
+        path_length = 0.0
+        max_power = -math.inf
+        max_position = None
+        hit = None
+        stop_reason = 'completed'
+        outer_scanned = 0
+        last_point = None
+
+        print(f"首次通光扫描: {self.pattern}, 内层 {self.inner_axes} ({len(inner)} 点), "
+              f"外层 {self.outer_axes} ({len(outer)} 点), 阈值 {self.threshold:.3g}")
+
+        for outer_index, outer_point in enumerate(outer):
+            # 外层每步反向走内层路径，避免从路径终点跳回起点
+            path = inner if outer_index % 2 == 0 else inner[::-1]
+            self.hardware_adapter.set_position(self._position(path[0], outer_point))
+            time.sleep(self.config['first_light_outer_settle'])
+            last_read = time.perf_counter()
+            next_tick = last_read
+
+            for inner_point in path:
+                if self.should_continue is not None and not self.should_continue():
+                    stop_reason = 'stopped'
+                    break
+                if time.perf_counter() - start > max_time:
+                    stop_reason = 'timeout'
+                    break
+
+                position = self._position(inner_point, outer_point)
+                self.hardware_adapter.set_position(position)
+                now = time.perf_counter()
+                command_times.append(now)
+                command_positions.append(position)
+                point = np.concatenate([inner_point, outer_point])
+                if last_point is not None:
+                    path_length += float(np.linalg.norm(point - last_point))
+                last_point = point
+
+                stream = self._read_samples(last_read)
+                if stream is not None:
+                    timestamps, values = stream
+                    if len(values):
+                        last_read = float(timestamps[-1]) + 1e-9
+                else:
+                    power = self.hardware_adapter.measure_current_power()
+                    timestamps, values = np.array([time.perf_counter()]), np.array([power])
+                samples += len(values)
+
+                if len(values):
+                    peak = int(np.argmax(values))
+                    sample_position = self._position_at(command_times, command_positions, timestamps[peak] - lag)
+                    if values[peak] > max_power:
+                        max_power = float(values[peak])
+                        max_position = sample_position
+                    above = np.flatnonzero(values >= self.threshold)
+                    if len(above):
+                        first = int(above[0])
+                        hit = {
+                            'power': float(values[first]),
+                            'time': float(timestamps[first] - start),
+                            'position': self._position_at(command_times, command_positions, timestamps[first] - lag),
+                        }
+                        stop_reason = 'found'
+                        break
+
+                next_tick += interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.perf_counter()
+
+            outer_scanned = outer_index + 1
+            if self.progress_callback:
+                self.progress_callback({
+                    'type': 'first_light_scan',
+                    'scan_data': {
+                        'outer_index': outer_scanned,
+                        'outer_total': len(outer),
+                        'elapsed': time.perf_counter() - start,
+                        'max_power': max_power if max_power > -math.inf else None,
+                        'found': hit is not None,
+                    }
+                })
+            if stop_reason != 'completed':
+                break
+
+        if hit is not None:
+            # 停在命中位置，作为后续优化的起点
+            self.hardware_adapter.set_position(dict(self.base_position, **hit['position']))
+
+        duration = time.perf_counter() - start
+        result = {
+            'found': hit is not None,
+            'time_to_first_light': hit['time'] if hit else None,
+            'hit_power': hit['power'] if hit else None,
+            'hit_position': hit['position'] if hit else None,
+            'max_power': max_power if max_power > -math.inf else None,
+            'max_position': max_position,
+            'threshold': self.threshold,
+            'pattern': self.pattern,
+            'samples': samples,
+            'commands': len(command_times),
+            'path_length': path_length,
+            'outer_points_scanned': outer_scanned,
+            'outer_points_total': len(outer),
+            'stop_reason': stop_reason,
+            'duration': duration,
+        }
+        if hit:
+            print(f"首次通光: {hit['time']:.2f}s 后在 "
+                  f"{ {k: round(v, 3) for k, v in hit['position'].items()} } 测得 {hit['power']:.3g}")
+        else:
+            print(f"首次通光扫描未找到光（{stop_reason}），用时 {duration:.1f}s，最大功率 {result['max_power']}")
+        return result
+
+    def _position_at(self, command_times: List[float], command_positions: List[Dict[str, float]],
+                     timestamp: float) -> Dict[str, float]:
+        """时间戳对应的扫描轴指令位置（取该时刻之前的最后一条指令）"""
+        index = max(0, bisect.bisect_right(command_times, timestamp) - 1)
+        position = command_positions[index]
+        return {axis: position[axis] for axis in self.inner_axes + self.outer_axes}
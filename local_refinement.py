@@ -0,0 +1,120 @@
+# local_refinement.py
+"""
+局部精细搜索（坐标模式搜索）
+全局收敛后以最佳个体为起点，在硬件上逐轴试探 ±步长：
+功率提高则移动到新位置，一轮全部失败则步长减半。
+各轴步长按搜索范围的比例设定；一轮的功率相对变化小于容差、所有步长降到下限
+或评估次数用完时停止。
+"""
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+
+class PatternSearch:
+    """有界坐标模式搜索"""
+
+    def __init__(self, lower_bounds: np.ndarray, upper_bounds: np.ndarray,
+                 initial_step: float = 0.02, min_step: float = 5e-4, shrink_factor: float = 0.5,
+                 improvement_threshold: float = 0.001, power_tolerance: float = 0.005,
+                 max_evaluations: int = 200):
+        """
+        初始化模式搜索
+
+        参数:
+            lower_bounds, upper_bounds: 各维上下界
+            initial_step: 初始步长（占各轴量程的比例）
+            min_step: 最小步长（占各轴量程的比例）
+            shrink_factor: 一轮无改进时的步长缩小系数
+            improvement_threshold: 试探点功率相对提高超过该值才接受（抑制噪声）
+            power_tolerance: 一轮的功率相对提高小于该值时停止
+            max_evaluations: 最大评估次数
+        """
+        self.lower_bounds = np.asarray(lower_bounds, dtype=np.float64)
+        self.upper_bounds = np.asarray(upper_bounds, dtype=np.float64)
+        span = self.upper_bounds - self.lower_bounds
+        self.initial_steps = span * initial_step
+        self.min_steps = span * min_step
+        self.shrink_factor = shrink_factor
+        self.improvement_threshold = improvement_threshold
+        self.power_tolerance = power_tolerance
+        self.max_evaluations = int(max_evaluations)
+
+    def run(self, evaluate: Callable[[np.ndarray], float], center: np.ndarray, center_fitness: float,
+            should_continue: Callable[[], bool] = None) -> Dict:
+        """
+        从center开始搜索
+
+        参数:
+            evaluate: 评估函数（位置 -> 功率）
+            center: 起点
+            center_fitness: 起点功率
+            should_continue: 返回False时提前停止（例如优化被停止）
+
+        返回:
+            结果字典：best_point、best_fitness、initial_fitness、evaluations、sweeps、
+            improvements、stop_reason、duration
+        """
+        start = time.perf_counter()
+        center = np.clip(np.asarray(center, dtype=np.float64), self.lower_bounds, self.upper_bounds)
+        initial_fitness = float(center_fitness)
+        best_fitness = initial_fitness
+        steps = self.initial_steps.copy()
+        evaluations = 0
+        sweeps = 0
+        improvements = 0
+        stop_reason = 'max_evaluations'
+
+        while evaluations < self.max_evaluations:
+            active = steps > self.min_steps
+            if not np.any(active):
+                stop_reason = 'min_step'
+                break
+
+            sweep_start_fitness = best_fitness
+            improved = False
+            for axis in np.flatnonzero(active):
+                for sign in (1.0, -1.0):
+                    if evaluations >= self.max_evaluations:
+                        break
+                    if should_continue is not None and not should_continue():
+                        stop_reason = 'stopped'
+                        break
+                    trial = center.copy()
+                    trial[axis] = np.clip(center[axis] + sign * steps[axis],
+                                          self.lower_bounds[axis], self.upper_bounds[axis])
+                    if trial[axis] == center[axis]:
+                        continue
+                    fitness = evaluate(trial)
+                    evaluations += 1
+                    if fitness > best_fitness + abs(best_fitness) * self.improvement_threshold:
+                        center = trial
+                        best_fitness = fitness
+                        improved = True
+                        improvements += 1
+                        break  # 该轴已改进，转到下一轴
+                if stop_reason == 'stopped':
+                    break
+            if stop_reason == 'stopped':
+                break
+            sweeps += 1
+
+            if not improved:
+                steps = np.where(active, steps * self.shrink_factor, steps)
+                continue
+            if sweep_start_fitness > 0 and \
+                    (best_fitness - sweep_start_fitness) / sweep_start_fitness < self.power_tolerance:
+                stop_reason = 'power_tolerance'
+                break
+
+        return {
+            'best_point': center,
+            'best_fitness': best_fitness,
+            'initial_fitness': initial_fitness,
+            'evaluations': evaluations,
+            'sweeps': sweeps,
+            'improvements': improvements,
+            'stop_reason': stop_reason,
+            'duration': time.perf_counter() - start,
+        }
@@ -0,0 +1,297 @@
+# metrics_exporter.py
+"""
+Prometheus 指标导出
+优化器、硬件适配器和 GlobalDeviceManager 把计数器/仪表值写入进程内的 MetricsRegistry
+（只是一次带锁的字典更新），后台线程按 Prometheus 文本格式导出：
+    'textfile'：定期原子写入 .prom 文件（node_exporter textfile collector 可直接读取）
+    'http'    ：本地 HTTP 端点 /metrics（ThreadingHTTPServer，后台线程）
+    'both'    ：两者同时
+需要在导出时才计算的指标（评估速率、功率漂移率、设备连接状态等）登记为采集函数，
+只在导出线程中调用，优化线程从不等待格式化、写盘或网络。
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+# 指标定义：名称（不含前缀） -> (类型, 说明)
+METRICS = {
+    'optimizer_running': ('gauge', '优化是否正在运行（1/0）'),
+    'generation': ('gauge', '当前代数'),
+    'evaluations_total': ('counter', '累计评估次数'),
+    'evaluations_per_second': ('gauge', '最近窗口内的评估速率（次/秒）'),
+    'power_current': ('gauge', '最近一次测量功率（mW）'),
+    'power_best': ('gauge', '最佳功率（mW）'),
+    'power_drift_rate': ('gauge', '保持功率期间的功率漂移率（mW/s，最近窗口线性拟合斜率）'),
+    'light_detected': ('gauge', '是否已检测到通光（1/0）'),
+    'lock_mode_active': ('gauge', '位置锁定模式是否激活（1/0）'),
+    'settle_seconds': ('summary', '每次评估的实际稳定时间（秒）'),
+    'measurement_failures_total': ('counter', '测量失败次数（stage: move / measure / evaluation）'),
+    'fitness_cache_hit_rate': ('gauge', '适应度缓存本代命中率'),
+    'fitness_cache_hits_total': ('counter', '适应度缓存累计命中次数'),
+    'fitness_cache_drift_invalidations_total': ('counter', '适应度缓存因漂移复测清空的次数'),
+    'device_connected': ('gauge', '设备是否已连接（1/0）'),
+    'device_connect_retries_total': ('counter', '设备连接重试次数'),
+    'device_connect_failures_total': ('counter', '设备连接失败次数（所有重试均失败）'),
+    'device_reconnects_total': ('counter', '设备断开后重新连接成功的次数'),
+    'power_acquisition_errors_total': ('counter', '后台功率采集读取错误次数'),
+    'last_update_timestamp_seconds': ('gauge', '最近一次导出的Unix时间戳'),
+}
+
+
+def get_default_metrics_config() -> dict:
+    """获取指标导出的默认配置（缺省关闭，需要接入监控的工位在配置中启用）"""
+    return {
+        'enabled': False,
+        'mode': 'textfile',                 # 'textfile' / 'http' / 'both'
+        'textfile_path': os.path.join('metrics', 'dual_end_optimizer.prom'),
+        'write_interval': 5.0,              # 写文件间隔（秒）
+        'http_host': '127.0.0.1',
+        'http_port': 9108,
+        'labels': {},                       # 附加到每个指标的常量标签，例如 {'station': 'A3'}
+        'rate_window': 30.0,                # 评估速率统计窗口（秒）
+        'drift_window': 60.0,               # 功率漂移率拟合窗口（秒）
+    }
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+class MetricsRegistry:
+    """进程内指标注册表（线程安全，更新操作只做字典读写）"""
+
+    def __init__(self, namespace: str = 'dualend'):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[tuple, float]] = {name: {} for name in METRICS}
+        self._summaries: Dict[str, Dict[tuple, list]] = {
+            name: {} for name, (kind, _) in METRICS.items() if kind == 'summary'
+        }
+        self._collectors: Dict[str, Callable[[], None]] = {}
+
+    @staticmethod
+    def _key(labels: Optional[dict]) -> tuple:
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def inc(self, name: str, value: float = 1.0, labels: dict = None):
+        """计数器加value"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: Optional[float], labels: dict = None):
+        """设置仪表值（None表示删除该序列）"""
+        key = self._key(labels)
+        with self._lock:
+            if value is None:
+                self._values[name].pop(key, None)
+            else:
+                self._values[name][key] = float(value)
+
+    def observe(self, name: str, value: float, labels: dict = None):
+        """记录一次摘要样本（导出 _sum 与 _count）"""
+        key = self._key(labels)
+        with self._lock:
+            summary = self._summaries[name].get(key)
+            if summary is None:
+                summary = self._summaries[name][key] = [0.0, 0]
+            summary[0] += value
+            summary[1] += 1
+
+    def add_collector(self, key: str, collector: Callable[[], None]):
+        """登记导出时调用的采集函数（同名替换），采集函数内部调用set/inc更新指标"""
+        with self._lock:
+            self._collectors[key] = collector
+
+    def remove_collector(self, key: str):
+        """注销采集函数"""
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    def collect(self):
+        """调用所有采集函数（只在导出线程中调用）"""
+        with self._lock:
+            collectors = list(self._collectors.items())
+        for key, collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"指标采集失败 ({key}): {e}")
+
+    def render(self, constant_labels: dict = None) -> str:
+        """按 Prometheus 文本格式输出所有指标"""
+        self.collect()
+        self.set('last_update_timestamp_seconds', time.time())
+        with self._lock:
+            values = {name: dict(series) for name, series in self._values.items()}
+            summaries = {name: {key: tuple(value) for key, value in series.items()}
+                         for name, series in self._summaries.items()}
+
+        constant = tuple(sorted((constant_labels or {}).items()))
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            full_name = f'{self.namespace}_{name}'
+            if kind == 'summary':
+                series = summaries[name]
+            else:
+                series = values[name]
+            if not series:
+                continue
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for key, value in sorted(series.items()):
+                labels = _format_labels(constant + key)
+                if kind == 'summary':
+                    lines.append(f'{full_name}_sum{labels} {_format_value(value[0])}')
+                    lines.append(f'{full_name}_count{labels} {value[1]}')
+                else:
+                    lines.append(f'{full_name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter:
+    """后台导出线程：定期写 .prom 文件和/或提供 HTTP /metrics 端点"""
+
+    def __init__(self, registry: MetricsRegistry, config: dict = None):
+        self.registry = registry
+        self.config = get_default_metrics_config()
+        self.config.update(config or {})
+        self.labels = dict(self.config.get('labels', {}) or {})
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._server = None
+        self._server_thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return (self._thread is not None and self._thread.is_alive()) or self._server is not None
+
+    def start(self) -> bool:
+        """启动导出（HTTP端口被占用时只打印错误，不影响优化）"""
+        mode = self.config.get('mode', 'textfile')
+        self._stop_event.clear()
+        if mode in ('textfile', 'both'):
+            self._thread = threading.Thread(target=self._write_loop, name="metrics_textfile", daemon=True)
+            self._thread.start()
+        if mode in ('http', 'both'):
+            try:
+                self._start_http()
+            except OSError as e:
+                print(f"指标HTTP端点启动失败: {e}")
+        return self.is_running
+
+    def _start_http(self):
+        registry, labels = self.registry, self.labels
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render(labels).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        host = self.config.get('http_host', '127.0.0.1')
+        port = int(self.config.get('http_port', 9108))
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        self._server_thread = threading.Thread(target=self._server.serve_forever, name="metrics_http", daemon=True)
+        self._server_thread.start()
+        print(f"指标HTTP端点: http://{host}:{self._server.server_address[1]}/metrics")
+
+    def _write_loop(self):
+        interval = max(0.1, float(self.config.get('write_interval', 5.0)))
+        while True:
+            self.write_textfile()
+            if self._stop_event.wait(interval):
+                self.write_textfile()
+                break
+
+    def write_textfile(self):
+        """写一次 .prom 文件（先写临时文件再替换，读取方不会看到半个文件）"""
+        path = self.config.get('textfile_path')
+        if not path:
+            return
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.registry.render(self.labels))
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"写入指标文件失败: {e}")
+
+    def stop(self, timeout: float = 2.0):
+        """停止导出（文件模式会在退出前再写一次）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._server_thread = None
+
+
+_registry = MetricsRegistry()
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取进程内共享的指标注册表"""
+    return _registry
+
+
+def start_metrics_exporter(config: dict = None) -> Optional[MetricsExporter]:
+    """启动（或复用配置相同的）进程级导出器，未启用时返回None"""
+    global _exporter
+    merged = get_default_metrics_config()
+    merged.update(config or {})
+    if not merged.get('enabled', False):
+        return None
+    with _exporter_lock:
+        if _exporter is not None and _exporter.is_running and _exporter.config == merged:
+            return _exporter
+        if _exporter is not None:
+            _exporter.stop()
+        _exporter = MetricsExporter(_registry, merged)
+        _exporter.start()
+        return _exporter
+
+
+def stop_metrics_exporter():
+    """停止进程级导出器"""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is not None:
+            _exporter.stop()
+            _exporter = None
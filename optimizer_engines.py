@@ -0,0 +1,47 @@
+# optimizer_engines.py
+"""
+优化引擎注册表
+所有引擎具有相同的构造参数 (config, hardware_adapter)、set_callbacks、进度消息类型和 run() 结果字典，
+GUI 按配置项 'optimizer_engine' 选择引擎。
+"""
+from typing import Dict, List, Type
+
+from GA_double_new_1 import DualEndGeneticAlgorithmOptimizer
+from cma_es_optimizer import CMAESOptimizer
+from spsa_optimizer import SPSAOptimizer
+from bayesian_optimizer import BayesianOptimizer
+from steady_state_ga import SteadyStateGAOptimizer
+
+DEFAULT_ENGINE = 'ga'
+
+_ENGINES: Dict[str, Type[DualEndGeneticAlgorithmOptimizer]] = {
+    'ga': DualEndGeneticAlgorithmOptimizer,
+    'cma_es': CMAESOptimizer,
+    'spsa': SPSAOptimizer,
+    'bayes': BayesianOptimizer,
+    'steady_state': SteadyStateGAOptimizer,
+}
+
+
+def register_engine(name: str, engine_class: Type[DualEndGeneticAlgorithmOptimizer]):
+    """注册优化引擎"""
+    _ENGINES[name] = engine_class
+
+
+def get_available_engines() -> List[str]:
+    """获取已注册的引擎名称"""
+    return list(_ENGINES.keys())
+
+
+def get_engine_class(name: str = None) -> Type[DualEndGeneticAlgorithmOptimizer]:
+    """按名称获取引擎类，未知名称时抛出ValueError"""
+    name = name or DEFAULT_ENGINE
+    if name not in _ENGINES:
+        raise ValueError(f"未知的优化引擎: {name}，可选: {get_available_engines()}")
+    return _ENGINES[name]
+
+
+def create_optimizer(config: dict, hardware_adapter) -> DualEndGeneticAlgorithmOptimizer:
+    """按 config['optimizer_engine'] 创建优化器实例"""
+    engine_class = get_engine_class(config.get('optimizer_engine', DEFAULT_ENGINE))
+    return engine_class(config, hardware_adapter)
@@ -0,0 +1,130 @@
+# population_operators.py
+"""
+向量化种群操作
+以数组运算一次生成整代子代：锦标赛选择、混合交叉、高斯变异和边界裁剪。
+所有随机数来自传入的 numpy.random.Generator，固定种子即可复现整个优化过程。
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def get_bounds(selected_variables: List[str], search_range: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    根据选择的变量和搜索范围生成上下界向量
+
+    返回:
+        (lower_bounds, upper_bounds)
+    """
+    lower_bounds = np.array([search_range[var][0] for var in selected_variables], dtype=np.float64)
+    upper_bounds = np.array([search_range[var][1] for var in selected_variables], dtype=np.float64)
+    return lower_bounds, upper_bounds
+
+
+def uniform_population(rng: np.random.Generator, size: int, lower_bounds: np.ndarray,
+                       upper_bounds: np.ndarray) -> np.ndarray:
+    """在上下界内均匀随机生成种群"""
+    return rng.uniform(lower_bounds, upper_bounds, (size, len(lower_bounds)))
+
+
+def tournament_selection(rng: np.random.Generator, fitness: np.ndarray, count: int,
+                         tournament_size: int) -> np.ndarray:
+    """
+    批量锦标赛选择
+
+    每场锦标赛从种群中不放回地抽取tournament_size个候选，取适应度最高者
+
+    返回:
+        count个被选中个体的索引
+    """
+    population_size = len(fitness)
+    tournament_size = min(tournament_size, population_size)
+    # 对随机键做部分排序，每行前tournament_size列即为不放回抽样
+    keys = rng.random((count, population_size))
+    candidates = np.argpartition(keys, tournament_size - 1, axis=1)[:, :tournament_size]
+    winners = np.argmax(fitness[candidates], axis=1)
+    return candidates[np.arange(count), winners]
+
+
+def blend_crossover(rng: np.random.Generator, parents1: np.ndarray, parents2: np.ndarray,
+                    row_mask: np.ndarray = None, gene_probability: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批量混合交叉
+
+    被选中的行中每个基因以gene_probability的概率交叉：
+    child1 = alpha*p1 + (1-alpha)*p2，child2 = alpha*p2 + (1-alpha)*p1，alpha~U(0,1)
+
+    参数:
+        parents1, parents2: 父代（N×D）
+        row_mask: 进行交叉的行（N，None表示全部）
+        gene_probability: 单个基因的交叉概率
+    """
+    shape = parents1.shape
+    gene_mask = rng.random(shape) < gene_probability
+    alpha = rng.random(shape)
+    if row_mask is not None:
+        gene_mask &= np.asarray(row_mask, dtype=bool)[:, None]
+    children1 = np.where(gene_mask, alpha * parents1 + (1 - alpha) * parents2, parents1)
+    children2 = np.where(gene_mask, alpha * parents2 + (1 - alpha) * parents1, parents2)
+    return children1, children2
+
+
+def gaussian_mutation(rng: np.random.Generator, population: np.ndarray, mutation_rate: float,
+                      lower_bounds: np.ndarray, upper_bounds: np.ndarray,
+                      strength: float = 0.1) -> np.ndarray:
+    """
+    批量高斯变异
+
+    每个基因以mutation_rate的概率加上N(0, (量程*strength)^2)的扰动，变异后的基因裁剪到边界内
+    """
+    shape = population.shape
+    mutation_mask = rng.random(shape) < mutation_rate
+    sigma = (upper_bounds - lower_bounds) * strength
+    mutation = rng.normal(0.0, 1.0, shape) * sigma
+    mutated = np.where(mutation_mask, np.clip(population + mutation, lower_bounds, upper_bounds), population)
+    return mutated
+
+
+def gaussian_perturbation(rng: np.random.Generator, population: np.ndarray, lower_bounds: np.ndarray,
+                          upper_bounds: np.ndarray, strength: float) -> np.ndarray:
+    """对所有基因加上N(0, (量程*strength)^2)的扰动并裁剪到边界内"""
+    sigma = (upper_bounds - lower_bounds) * strength
+    perturbed = population + rng.normal(0.0, 1.0, population.shape) * sigma
+    return np.clip(perturbed, lower_bounds, upper_bounds)
+
+
+def generate_offspring(rng: np.random.Generator, population_A: np.ndarray, population_B: np.ndarray,
+                       fitness: np.ndarray, count: int, tournament_size: int,
+                       chromosome_crossover_rate: float, gene_crossover_rate: float, gene_mutation_rate: float,
+                       bounds_A: Tuple[np.ndarray, np.ndarray],
+                       bounds_B: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次生成count个子代（A端、B端）
+
+    每对父母：
+        - 以chromosome_crossover_rate的概率进行染色体交叉（子代1取父1的A端和父2的B端，子代2相反）
+        - 以gene_crossover_rate的概率对两个子代做基因混合交叉（A端、B端分别交叉）
+        - 所有子代做基因变异
+    子代按(子代1, 子代2)成对排列，超出count的部分丢弃
+    """
+    pair_count = (count + 1) // 2
+    parent1 = tournament_selection(rng, fitness, pair_count, tournament_size)
+    parent2 = tournament_selection(rng, fitness, pair_count, tournament_size)
+
+    chromosome_swap = (rng.random(pair_count) < chromosome_crossover_rate)[:, None]
+    gene_crossover = rng.random(pair_count) < gene_crossover_rate
+
+    child1_A = population_A[parent1]
+    child2_A = population_A[parent2]
+    child1_B = np.where(chromosome_swap, population_B[parent2], population_B[parent1])
+    child2_B = np.where(chromosome_swap, population_B[parent1], population_B[parent2])
+
+    child1_A, child2_A = blend_crossover(rng, child1_A, child2_A, gene_crossover)
+    child1_B, child2_B = blend_crossover(rng, child1_B, child2_B, gene_crossover)
+
+    children_A = np.stack([child1_A, child2_A], axis=1).reshape(-1, population_A.shape[1])[:count]
+    children_B = np.stack([child1_B, child2_B], axis=1).reshape(-1, population_B.shape[1])[:count]
+
+    children_A = gaussian_mutation(rng, children_A, gene_mutation_rate, *bounds_A)
+    children_B = gaussian_mutation(rng, children_B, gene_mutation_rate, *bounds_B)
+    return children_A, children_B
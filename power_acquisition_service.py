@@ -0,0 +1,326 @@
+# power_acquisition_service.py
+"""
+后台功率采集服务
+唯一持有功率计会话的后台线程：以功率计原生速率连续采集样本（块采集），
+连同主机时钟时间戳写入固定大小的NumPy环形缓冲区。
+评估、稳定检测、GUI监控和漂移跟踪都从缓冲区读取时间窗口，不再各自调用设备，
+避免多线程争用USB会话。
+
+环形缓冲区为单写多读：写线程先写数据再发布写入计数，读方无需加锁，
+复制后按写入计数校验并丢弃复制期间可能被覆盖的样本。
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from PowerMeter import reject_outliers
+
+TICK_WRAP = 2 ** 32  # 快速数组设备时间戳为uint32计数，会回绕
+
+
+def get_default_service_config() -> dict:
+    """获取后台采集服务的默认配置"""
+    return {
+        'buffer_capacity': 2 ** 20,     # 环形缓冲区容量（样本数）
+        'evaluation_samples': 200,      # 每次评估使用的样本数
+        'evaluation_timeout': 1.0,      # 等待评估样本的超时（秒）
+        'keep_fraction': 0.6,           # 评估时异常值剔除后保留的样本比例
+        'latest_window_samples': 20,    # 读取“当前功率”时平均的最近样本数
+        'poll_interval': 0.001,         # 读方等待新样本的轮询间隔（秒）
+        'retry_interval': 0.5,          # 采集出错后的重试间隔（秒）
+        # 快速数组设备时间戳的单位：TLPM只说明是原始计数（不是ms），假定为1µs/计数，
+        # 运行中按主机时钟跨块标定，标定值与假定值偏差超过容差时报警并改用标定值
+        'fast_array_tick_period': 1e-6,  # 假定的计数周期（秒）
+        'tick_calibration_time': 2.0,    # 标定所需的最短主机时间基线（秒）
+        'tick_period_tolerance': 0.05,   # 标定值与假定值的相对偏差容差
+    }
+
+
+class PowerAcquisitionService:
+    """后台功率采集服务（环形缓冲区）"""
+
+    def __init__(self, power_meter, config: dict = None):
+        """
+        初始化采集服务
+
+        参数:
+            power_meter: PowerMeter实例（支持acquire_block时使用块采集，否则逐次powertest）
+            config: 配置字典，缺省项使用get_default_service_config()
+        """
+        self.power_meter = power_meter
+        self.config = get_default_service_config()
+        if config:
+            self.config.update({k: v for k, v in config.items() if k in self.config})
+
+        self.capacity = int(self.config['buffer_capacity'])
+        self._values = np.zeros(self.capacity, dtype=np.float64)
+        self._timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self._write_count = 0  # 已发布的样本总数（单调递增）
+        self._max_block = 1  # 单次写入的最大样本数（用于读方校验覆盖范围）
+
+        self._device_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.block_count = 0
+        self.error_count = 0
+        self.last_error = None
+
+        # 快速数组时间戳的计数周期标定（见 _calibrate_tick_period）
+        self.tick_period = float(self.config['fast_array_tick_period'])
+        self.tick_period_calibrated = False
+        self._reset_tick_calibration()
+
+    # ------------------------------------------------------------------
+    # 采集线程
+    # ------------------------------------------------------------------
+
+    @property
+    def is_running(self) -> bool:
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """启动后台采集线程"""
+        if self.is_running:
+            return True
+        if hasattr(self.power_meter, 'acquisition_mode') and self.power_meter.acquisition_mode is None:
+            with self._device_lock:
+                self.power_meter.configure_block_acquisition()
+        self._reset_tick_calibration()
+        self._running = True
+        self._thread = threading.Thread(target=self._acquisition_loop, name="power_acquisition", daemon=True)
+        self._thread.start()
+        print("后台功率采集服务已启动")
+        return True
+
+    def stop(self, timeout: float = 2.0):
+        """停止后台采集线程"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        print("后台功率采集服务已停止")
+
+    def _read_device_block(self) -> Tuple[np.ndarray, np.ndarray]:
+        """从功率计读取一块样本，时间戳统一换算为主机perf_counter时钟（秒）"""
+        with self._device_lock:
+            if hasattr(self.power_meter, 'acquire_block'):
+                values, device_timestamps = self.power_meter.acquire_block()
+                host_end = time.perf_counter()
+                if getattr(self.power_meter, 'acquisition_mode', None) == 'fast_array':
+                    # 设备时间戳为原始计数：按块末样本对齐到主机时钟，计数差（处理回绕）乘以标定的计数周期
+                    ticks = np.asarray(device_timestamps).astype(np.int64)
+                    tick_period = self._calibrate_tick_period(int(ticks[-1]), host_end)
+                    timestamps = host_end - ((ticks[-1] - ticks) % TICK_WRAP) * tick_period
+                else:
+                    # 逐次/设备端平均模式的时间戳由PowerMeter按主机perf_counter记录（µs）
+                    timestamps = device_timestamps * 1e-6
+                return values, timestamps
+            value = self.power_meter.powertest()
+            host_end = time.perf_counter()
+        if value is None:
+            raise RuntimeError("功率计读数失败")
+        return np.array([value], dtype=np.float64), np.array([host_end])
+
+    def _reset_tick_calibration(self):
+        """重新开始计数周期标定的基线（启动或采集出错后，设备计数可能已重置）"""
+        self._tick_reference = None  # (展开后的设备计数, 主机时间)
+        self._last_tick = None
+        self._unwrapped_ticks = 0
+
+    def _calibrate_tick_period(self, last_tick: int, host_end: float) -> float:
+        """
+        用块末样本的设备计数和主机读取时间跨块标定计数周期，返回当前使用的计数周期（秒/计数）
+        主机读取时间含USB延迟抖动，基线不短于tick_calibration_time后才采用标定值，之后基线继续增长
+        """
+        if self._last_tick is not None:
+            self._unwrapped_ticks += (last_tick - self._last_tick) % TICK_WRAP
+        self._last_tick = last_tick
+        if self._tick_reference is None:
+            self._tick_reference = (self._unwrapped_ticks, host_end)
+            return self.tick_period
+
+        elapsed = host_end - self._tick_reference[1]
+        if elapsed < self.config['tick_calibration_time']:
+            return self.tick_period
+        ticks = self._unwrapped_ticks - self._tick_reference[0]
+        if ticks <= 0:
+            raise RuntimeError(f"功率计快速数组时间戳在 {elapsed:.1f} 秒内没有递增，无法换算样本时间")
+
+        measured = elapsed / ticks
+        if not self.tick_period_calibrated:
+            nominal = float(self.config['fast_array_tick_period'])
+            deviation = abs(measured / nominal - 1.0)
+            if deviation > self.config['tick_period_tolerance']:
+                print(f"警告: 功率计快速数组时间戳周期标定为 {measured*1e6:.4g} µs/计数，"
+                      f"与假定的 {nominal*1e6:.4g} µs/计数相差 {deviation*100:.0f}%，改用标定值")
+            self.tick_period_calibrated = True
+        self.tick_period = measured
+        return measured
+
+    def _acquisition_loop(self):
+        """采集线程主循环"""
+        while self._running:
+            try:
+                values, timestamps = self._read_device_block()
+                self._append(values, timestamps)
+                self.block_count += 1
+            except Exception as e:
+                self.error_count += 1
+                self.last_error = str(e)
+                self._reset_tick_calibration()
+                print(f"后台功率采集失败: {e}")
+                time.sleep(self.config['retry_interval'])
+
+    def _append(self, values: np.ndarray, timestamps: np.ndarray):
+        """写入环形缓冲区（先写数据，再发布写入计数）"""
+        count = len(values)
+        if count > self.capacity:
+            values = values[-self.capacity:]
+            timestamps = timestamps[-self.capacity:]
+            count = self.capacity
+        self._max_block = max(self._max_block, count)
+        start = self._write_count % self.capacity
+        first = min(count, self.capacity - start)
+        self._values[start:start + first] = values[:first]
+        self._timestamps[start:start + first] = timestamps[:first]
+        if first < count:
+            self._values[:count - first] = values[first:]
+            self._timestamps[:count - first] = timestamps[first:]
+        self._write_count += count
+
+    # ------------------------------------------------------------------
+    # 读取（无锁）
+    # ------------------------------------------------------------------
+
+    def _read_range(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """复制样本序号[start, end)，并丢弃复制期间可能被覆盖的样本"""
+        count = end - start
+        if count <= 0:
+            return np.empty(0), np.empty(0)
+        index = start % self.capacity
+        if index + count <= self.capacity:
+            values = self._values[index:index + count].copy()
+            timestamps = self._timestamps[index:index + count].copy()
+        else:
+            first = self.capacity - index
+            values = np.concatenate([self._values[index:], self._values[:count - first]])
+            timestamps = np.concatenate([self._timestamps[index:], self._timestamps[:count - first]])
+        # 写线程可能正在写入下一块：序号小于(当前计数+最大块-容量)的样本不可信
+        overwritten = self._write_count + self._max_block - self.capacity - start
+        if overwritten > 0:
+            values = values[overwritten:]
+            timestamps = timestamps[overwritten:]
+        return timestamps, values
+
+    @property
+    def sample_count(self) -> int:
+        """已采集的样本总数"""
+        return self._write_count
+
+    def read_latest(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """读取最近count个样本，返回(时间戳, 功率)"""
+        end = self._write_count
+        start = max(0, end - min(count, self.capacity - self._max_block))
+        return self._read_range(start, end)
+
+    def read_since(self, since: float) -> Tuple[np.ndarray, np.ndarray]:
+        """读取时间戳不早于since（perf_counter时钟，秒）的所有样本"""
+        end = self._write_count
+        available = min(end, self.capacity - self._max_block)
+        count = min(available, 256)
+        while True:
+            timestamps, values = self._read_range(end - count, end)
+            if count >= available or (len(timestamps) and timestamps[0] < since):
+                break
+            count = min(available, count * 4)
+        mask = timestamps >= since
+        return timestamps[mask], values[mask]
+
+    def wait_for_samples(self, since: float, count: int, timeout: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        等待并读取since之后的count个样本（超时则返回已有样本）
+
+        返回:
+            (时间戳, 功率)，最多count个（取最早的count个）
+        """
+        if timeout is None:
+            timeout = self.config['evaluation_timeout']
+        deadline = time.perf_counter() + timeout
+        while True:
+            timestamps, values = self.read_since(since)
+            if len(values) >= count or time.perf_counter() >= deadline or not self.is_running:
+                return timestamps[:count], values[:count]
+            time.sleep(self.config['poll_interval'])
+
+    def get_latest_power(self, window_samples: int = None) -> Optional[float]:
+        """当前功率：最近window_samples个样本的平均值（无样本时返回None）"""
+        if window_samples is None:
+            window_samples = self.config['latest_window_samples']
+        _, values = self.read_latest(window_samples)
+        if len(values) == 0:
+            return None
+        return float(np.mean(values))
+
+    def get_settle_signal_reader(self) -> Callable[[], Optional[float]]:
+        """稳定检测使用的信号读取函数"""
+        return self.get_latest_power
+
+    def measure(self, since: float = None, samples: int = None) -> Dict:
+        """
+        评估测量：取since之后的samples个样本做中位数偏差异常值剔除
+
+        返回:
+            与PowerMeter.measure_power_block格式一致的结果字典
+        """
+        if since is None:
+            since = time.perf_counter()
+        if samples is None:
+            samples = int(self.config['evaluation_samples'])
+        start = time.perf_counter()
+        timestamps, values = self.wait_for_samples(since, samples)
+        if len(values) == 0:
+            raise TimeoutError("后台采集服务在超时时间内没有新样本")
+        power, mask = reject_outliers(values, self.config['keep_fraction'])
+        valid_count = int(np.count_nonzero(mask))
+        return {
+            "power": power,
+            "statistics": {
+                'mean': power,
+                'median': float(np.median(values)),
+                'std': float(np.std(values)),
+                'min': float(np.min(values)),
+                'max': float(np.max(values)),
+                'range': float(np.ptp(values)),
+                'valid_samples': valid_count,
+                'removed_samples': len(values) - valid_count
+            },
+            "acquisition_mode": 'service',
+            "sample_count": len(values),
+            "sample_span_us": float(timestamps[-1] - timestamps[0]) * 1e6,
+            "acquisition_time": time.perf_counter() - start,
+        }
+
+    def call_device(self, func: Callable, *args, **kwargs):
+        """在两次块采集之间独占调用功率计（例如修改波长）"""
+        with self._device_lock:
+            return func(*args, **kwargs)
+
+    def get_statistics(self) -> Dict:
+        """获取采集统计"""
+        timestamps, _ = self.read_latest(min(self.capacity // 2, 100000))
+        sample_rate = None
+        if len(timestamps) > 1 and timestamps[-1] > timestamps[0]:
+            sample_rate = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+        return {
+            'running': self.is_running,
+            'sample_count': self._write_count,
+            'block_count': self.block_count,
+            'sample_rate': sample_rate,
+            'error_count': self.error_count,
+            'last_error': self.last_error,
+            'capacity': self.capacity,
+            'tick_period': self.tick_period,
+            'tick_period_calibrated': self.tick_period_calibrated,
+        }
@@ -0,0 +1,425 @@
+# record_archive.py
+"""
+记录列式二进制归档（.npcol）
+gui_data 的 evaluation_records / generation_records / power_monitoring_records 以及优化结果的 search_history
+原来只能保存为缩进JSON或逐行CSV，保持模式运行数小时后写入和读取都很慢。
+这里把记录列表按列存为一个二进制文件，一个文件可以包含多张表：
+
+    b'NPCOL001' | 模式长度(uint64) | 模式JSON | 按64字节对齐的各列数据块
+
+模式JSON记录每列的路径（嵌套字典展开为键路径）、类型、dtype、形状和偏移，读取时各列直接用np.memmap映射，
+不解析文本，载入一天的数据只需读取模式头。列类型：
+    bool / int / float  数值列
+    datetime            ISO时间字符串，存为Unix时间戳（float64）
+    category            取值较少的字符串，存为int32编码 + 取值表
+    string              其余字符串，存为UTF-8定长字节
+    vector              数值列表，存为二维float64（长度不一时以NaN补齐并记录长度）
+    dict                空字典（非空字典展开为各自的列）
+有缺失值（键不存在或为None）的列另存一个有效标记列。
+
+命令行把已有的JSON文件（保存的优化数据、功率监测数据或优化结果）转换为归档：
+    python record_archive.py 优化数据.json [输出.npcol]
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b'NPCOL001'
+ARCHIVE_EXTENSION = '.npcol'
+_ALIGNMENT = 64
+_MAX_CATEGORIES = 4096
+
+# JSON文件中可转换为表的记录列表：表名 -> 候选键路径
+KNOWN_TABLES = {
+    'evaluation_records': (('evaluation_records',),),
+    'generation_records': (('generation_records',),),
+    # save_power_monitoring_data 的JSON中为 'power_data'
+    'power_monitoring_records': (('power_monitoring_records',), ('power_data',)),
+    # save_optimization_results 的JSON
+    'search_history': (('history', 'search_history'),),
+}
+
+
+# =============================================================================
+# 写入
+# =============================================================================
+
+_ABSENT = object()  # 记录中不存在该键
+
+
+def _value_type(value_type: type) -> str:
+    if issubclass(value_type, (bool, np.bool_)):
+        return 'bool'
+    if issubclass(value_type, (int, np.integer)):
+        return 'int'
+    if issubclass(value_type, (float, np.floating)):
+        return 'float'
+    if issubclass(value_type, (list, tuple)):
+        return 'list'
+    if issubclass(value_type, dict):
+        return 'dict'
+    if issubclass(value_type, str):
+        return 'str'
+    return 'other'
+
+
+def _parse_datetimes(values: list) -> Optional[list]:
+    """全部为ISO时间字符串时返回Unix时间戳列表，否则返回None"""
+    try:
+        return [datetime.fromisoformat(value).timestamp() for value in values]
+    except (TypeError, ValueError):
+        return None
+
+
+def _encode_column(values: list, valid: np.ndarray) -> dict:
+    """把一列值（缺失处为None）编码为 {'kind', 'data', ...}"""
+    present = values if valid.all() else [v for v, ok in zip(values, valid) if ok]
+    types = {_value_type(t) for t in set(map(type, present))}
+    count = len(values)
+    column = {}
+    if not types or types <= {'int', 'float'} or types == {'bool'}:
+        kind = 'float' if not types or 'float' in types else types.pop()
+        dtype = {'bool': np.bool_, 'int': np.int64, 'float': np.float64}[kind]
+        fill = np.nan if kind == 'float' else 0
+        column['data'] = np.array([v if ok else fill for v, ok in zip(values, valid)], dtype=dtype)
+    elif types == {'dict'}:
+        kind = 'dict'
+        column['data'] = valid.copy()
+    elif types == {'list'} and {_value_type(t) for t in {type(x) for v in present for x in v}} <= {'int', 'float'}:
+        kind = 'vector'
+        lengths = np.array([len(v) if ok else 0 for v, ok in zip(values, valid)], dtype=np.int32)
+        data = np.full((count, int(lengths.max())), np.nan)
+        if np.all(lengths == lengths[0]) and lengths[0]:
+            data[valid] = present
+        else:
+            for i, (v, ok) in enumerate(zip(values, valid)):
+                if ok and len(v):
+                    data[i, :len(v)] = v
+            column['lengths'] = lengths
+        column['data'] = data
+    else:
+        timestamps = _parse_datetimes(present) if types == {'str'} else None
+        if timestamps is not None:
+            kind = 'datetime'
+            data = np.full(count, np.nan)
+            data[valid] = timestamps
+            column['data'] = data
+        elif types == {'str'} and len(set(present)) <= min(_MAX_CATEGORIES, max(16, len(present) // 4)):
+            kind = 'category'
+            categories = list(dict.fromkeys(present))
+            lookup = {value: code for code, value in enumerate(categories)}
+            column['data'] = np.array([lookup[v] if ok else -1 for v, ok in zip(values, valid)], dtype=np.int32)
+            column['categories'] = categories
+        else:
+            kind = 'string'  # 其余字符串及混合类型（按str()保存）
+            encoded = [str(v).encode('utf-8') if ok else b'' for v, ok in zip(values, valid)]
+            column['data'] = np.array(encoded, dtype=f'S{max(1, max((len(e) for e in encoded), default=1))}')
+    column['kind'] = kind
+    return column
+
+
+def _collect_columns(rows: list, prefix: tuple, columns: Dict[tuple, dict]):
+    """逐键提取列；非空字典的值递归展开为子键列（rows中不含该层字典的行为None）"""
+    complete = all(row is not None for row in rows)
+    keys = dict.fromkeys(itertools.chain.from_iterable(rows if complete else (row for row in rows if row is not None)))
+    for key in keys:
+        path = prefix + (str(key),)
+        if complete:
+            values = [row.get(key, _ABSENT) for row in rows]
+        else:
+            values = [row.get(key, _ABSENT) if row is not None else _ABSENT for row in rows]
+        value_types = set(map(type, values))
+        has_nested = any(issubclass(t, dict) for t in value_types) and any(isinstance(v, dict) and v for v in values)
+        if has_nested:
+            nested = [v if isinstance(v, dict) and v else None for v in values]
+            values = [_ABSENT if n is not None else v for v, n in zip(values, nested)]
+            value_types = set(map(type, values))
+        if type(_ABSENT) in value_types or type(None) in value_types:
+            valid = np.array([v is not _ABSENT and v is not None for v in values], dtype=np.bool_)
+        else:
+            valid = np.ones(len(values), dtype=np.bool_)
+        if valid.any() or not has_nested:
+            column = _encode_column(values, valid)
+            if not valid.all():
+                column['valid'] = valid
+                # 键存在且值为None的列，还原记录时写回None
+                column['keep_none'] = any(v is None for v in values)
+            columns[path] = column
+        if has_nested:
+            _collect_columns(nested, path, columns)
+
+
+def records_to_columns(records: Sequence[dict]) -> Dict[tuple, dict]:
+    """把记录字典列表转为列（键路径 -> 编码后的列），列顺序为键首次出现的顺序"""
+    columns = {}
+    _collect_columns(list(records), (), columns)
+    return columns
+
+
+def export_records(path: str, tables: Dict[str, Sequence[dict]], metadata: Optional[dict] = None) -> dict:
+    """
+    把若干张记录表写入一个归档文件
+
+    参数:
+        path: 输出文件路径（建议扩展名 .npcol）
+        tables: {表名: 记录字典列表}，记录可以是任意一层或多层嵌套的字典
+        metadata: 附加的元数据（保存时间、会话ID等），原样写入模式头
+
+    返回:
+        {'tables': {表名: 行数}, 'bytes': 文件大小}
+    """
+    blocks = []
+    offset = 0
+    schema = {'version': 1, 'metadata': metadata or {}, 'tables': {}}
+
+    def add_block(array: np.ndarray) -> dict:
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+        spec = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        blocks.append((offset, array))
+        offset += array.nbytes
+        return spec
+
+    for name, records in tables.items():
+        records = list(records)
+        table = {'rows': len(records), 'columns': []}
+        for column_path, column in records_to_columns(records).items():
+            spec = {'path': list(column_path), 'kind': column['kind'], 'data': add_block(column['data'])}
+            if 'categories' in column:
+                spec['categories'] = column['categories']
+            if 'lengths' in column:
+                spec['lengths'] = add_block(column['lengths'])
+            if 'valid' in column:
+                spec['valid'] = add_block(column['valid'])
+                spec['keep_none'] = column['keep_none']
+            table['columns'].append(spec)
+        schema['tables'][name] = table
+
+    header = json.dumps(schema, ensure_ascii=False, default=str).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // _ALIGNMENT) * _ALIGNMENT
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for block_offset, array in blocks:
+            f.seek(data_start + block_offset)
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    return {'tables': {name: table['rows'] for name, table in schema['tables'].items()},
+            'bytes': os.path.getsize(path)}
+
+
+# =============================================================================
+# 读取
+# =============================================================================
+
+class RecordTable:
+    """
+    归档中的一张表（各列为内存映射数组）
+
+    table['power']、table['position.A_x'] 返回数组（category列返回取值数组，datetime列为Unix时间戳），
+    table.valid(name) 返回有效标记（没有缺失值时为None），table.to_records() 还原为记录字典列表。
+    """
+
+    def __init__(self, name: str, rows: int, columns: Dict[str, dict], arrays: Dict[str, np.ndarray]):
+        self.name = name
+        self.rows = rows
+        self._columns = columns
+        self._arrays = arrays
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __repr__(self) -> str:
+        return f"RecordTable({self.name}: {self.rows} 行, {len(self._columns)} 列)"
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def kind(self, name: str) -> str:
+        return self._columns[name]['kind']
+
+    def raw(self, name: str) -> np.ndarray:
+        """列的存储数组（category列为编码，string列为UTF-8字节）"""
+        return self._arrays[name]
+
+    def valid(self, name: str) -> Optional[np.ndarray]:
+        return self._arrays.get(f'{name}#valid')
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        spec = self._columns[name]
+        data = self._arrays[name]
+        if spec['kind'] == 'category':
+            categories = np.array(spec['categories'] + [None], dtype=object)
+            return categories[data]  # 编码-1对应None
+        if spec['kind'] == 'string':
+            return np.char.decode(data, 'utf-8')
+        return data
+
+    def to_records(self) -> List[dict]:
+        """还原为记录字典列表（与写入前的记录相同，datetime列还原为ISO字符串）"""
+        records = [{} for _ in range(self.rows)]
+        for name, spec in self._columns.items():
+            path = spec['path']
+            valid = self.valid(name)
+            lengths = self._arrays.get(f'{name}#lengths')
+            kind = spec['kind']
+            if kind == 'category':
+                values = self[name].tolist()
+            elif kind == 'string':
+                values = [v.decode('utf-8') for v in self._arrays[name].tolist()]
+            elif kind == 'datetime':
+                values = [datetime.fromtimestamp(v).isoformat() if not np.isnan(v) else None
+                          for v in self._arrays[name].tolist()]
+            elif kind == 'dict':
+                values = [{} for _ in range(self.rows)]
+            else:
+                values = self._arrays[name].tolist()
+            for row, value in enumerate(values):
+                if valid is not None and not valid[row]:
+                    if not spec.get('keep_none'):
+                        continue
+                    value = None
+                elif kind == 'vector' and lengths is not None:
+                    value = value[:lengths[row]]
+                target = records[row]
+                for key in path[:-1]:
+                    target = target.setdefault(key, {})
+                if kind == 'dict':
+                    target.setdefault(path[-1], value)
+                else:
+                    target[path[-1]] = value
+        return records
+
+
+class RecordArchive:
+    """读取 export_records() 写出的归档；archive['power_monitoring_records'] 为 RecordTable"""
+
+    def __init__(self, path: str, mmap: bool = True):
+        """
+        参数:
+            path: 归档文件
+            mmap: True时各列内存映射（按需从磁盘读取），False时一次读入内存
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"不是列式记录归档: {path}")
+            header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            schema = json.loads(f.read(header_length).decode('utf-8'))
+        data_start = -(-(len(MAGIC) + 8 + header_length) // _ALIGNMENT) * _ALIGNMENT
+        self.metadata = schema.get('metadata', {})
+        self.tables = {}
+        buffer = None if mmap else np.fromfile(path, dtype=np.uint8)
+
+        def load(spec: dict) -> np.ndarray:
+            dtype = np.dtype(spec['dtype'])
+            shape = tuple(spec['shape'])
+            if int(np.prod(shape)) == 0:
+                return np.zeros(shape, dtype=dtype)
+            if buffer is not None:
+                start = data_start + spec['offset']
+                return buffer[start:start + int(np.prod(shape)) * dtype.itemsize].view(dtype).reshape(shape)
+            return np.memmap(path, dtype=dtype, mode='r', offset=data_start + spec['offset'], shape=shape)
+
+        for name, table in schema['tables'].items():
+            columns = {}
+            arrays = {}
+            for spec in table['columns']:
+                column_name = '.'.join(spec['path'])
+                columns[column_name] = spec
+                arrays[column_name] = load(spec['data'])
+                if 'valid' in spec:
+                    arrays[f'{column_name}#valid'] = load(spec['valid'])
+                if 'lengths' in spec:
+                    arrays[f'{column_name}#lengths'] = load(spec['lengths'])
+            self.tables[name] = RecordTable(name, table['rows'], columns, arrays)
+
+    def __getitem__(self, name: str) -> RecordTable:
+        return self.tables[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tables
+
+    def __repr__(self) -> str:
+        return f"RecordArchive({self.path}: {', '.join(repr(t) for t in self.tables.values())})"
+
+
+def load_records(path: str, mmap: bool = True) -> RecordArchive:
+    """打开归档文件（缺省内存映射）"""
+    return RecordArchive(path, mmap=mmap)
+
+
+# =============================================================================
+# JSON转换
+# =============================================================================
+
+def _find_tables(data: dict) -> Dict[str, list]:
+    tables = {}
+    for name, key_paths in KNOWN_TABLES.items():
+        for key_path in key_paths:
+            value = data
+            for key in key_path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if isinstance(value, list) and value:
+                tables[name] = value
+                break
+    return tables
+
+
+def convert_json(json_path: str, output_path: Optional[str] = None) -> dict:
+    """
+    把保存的JSON文件转换为归档
+
+    支持 save_optimization_data（gui_data）、save_power_monitoring_data 和 save_optimization_results 的输出，
+    文件中存在的记录列表各成一张表，其余字段作为元数据。
+
+    返回:
+        export_records() 的统计，另含 'output' 输出路径
+    """
+    if output_path is None:
+        output_path = os.path.splitext(json_path)[0] + ARCHIVE_EXTENSION
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        tables = {'records': data}
+        metadata = {}
+    else:
+        tables = _find_tables(data)
+        if not tables:
+            raise ValueError(f"JSON文件中没有可转换的记录列表: {json_path}")
+        source_keys = {key_path[0] for key_paths in KNOWN_TABLES.values() for key_path in key_paths}
+        metadata = {key: value for key, value in data.items()
+                    if key not in source_keys and not isinstance(value, list)}
+    metadata['source'] = os.path.basename(json_path)
+    stats = export_records(output_path, tables, metadata)
+    stats['output'] = output_path
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把保存的优化/功率监测JSON转换为列式二进制归档")
+    parser.add_argument('input', help="JSON文件")
+    parser.add_argument('output', nargs='?', default=None, help=f"输出文件（缺省为同名{ARCHIVE_EXTENSION}）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = convert_json(args.input, args.output)
+    print(f"已转换: {args.output or stats['output']}，"
+          + ", ".join(f"{name} {rows} 行" for name, rows in stats['tables'].items())
+          + f"，{stats['bytes'] / 1e6:.1f} MB，用时 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+# run_journal.py
+"""
+优化运行日志（追加写入的二进制日志）
+save_optimization_results 在运行结束时才一次性写出JSON，运行中途崩溃或断电会丢失全部数据。
+运行日志在每次评估、每代结束时追加一条记录，由后台线程写盘，优化线程只做编码和入队：
+
+    文件头  b'DEGAJNL1'
+    记录    类型(uint8) | 负载长度(uint32) | 负载CRC32(uint32) | 负载
+
+    HEADER      JSON：优化变量、引擎、开始时间、配置
+    EVALUATION  定长二进制：评估序号、时间戳、功率、稳定时间、是否通光、优化阶段、A端/B端位置（float64）
+    GENERATION  JSON状态（代数、计数器、随机数生成器状态等）+ 原始数组（下一代种群、最佳个体等）
+    EVENT       JSON：恢复、运行结束等事件
+
+断电时最后一条记录可能不完整，读取时以长度和CRC校验，遇到第一条损坏的记录即停止；
+继续写入已有日志前先截掉损坏的尾部。fsync策略：
+    'always'      每条记录后fsync
+    'generation'  每代记录（以及文件头、事件）后fsync，评估记录只刷新到操作系统（缺省）
+    'interval'    距上次fsync超过fsync_interval秒时fsync
+    'none'        只刷新到操作系统，不fsync
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from enum import Enum
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b'DEGAJNL1'
+RECORD_HEADER = 1
+RECORD_EVALUATION = 2
+RECORD_GENERATION = 3
+RECORD_EVENT = 4
+
+_FRAME = struct.Struct('<BII')
+_EVALUATION = struct.Struct('<qdddbB')
+_JSON_LENGTH = struct.Struct('<I')
+
+FSYNC_POLICIES = ('always', 'generation', 'interval', 'none')
+
+
+def get_default_run_journal_config() -> dict:
+    """运行日志的默认配置（缺省关闭，与结果文件一样由调用方决定写到哪里）"""
+    return {
+        'enabled': False,
+        'directory': 'run_journals',  # 日志目录（path为None时在此目录下按时间生成文件名）
+        'path': None,
+        'fsync_policy': 'generation',
+        'fsync_interval': 1.0,  # 秒，仅用于'interval'策略
+    }
+
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    return str(obj)
+
+
+def _encode_json(data: dict) -> bytes:
+    return json.dumps(data, default=_json_default, ensure_ascii=False).encode('utf-8')
+
+
+def encode_generation(state: dict, arrays: Dict[str, Optional[np.ndarray]]) -> bytes:
+    """编码代记录：JSON状态 + 数组（None的数组不写入）"""
+    blobs = []
+    layout = {}
+    for name, array in arrays.items():
+        if array is None:
+            continue
+        array = np.ascontiguousarray(array)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+        blobs.append(array.tobytes())
+    meta = _encode_json(dict(state, arrays=layout))
+    return _JSON_LENGTH.pack(len(meta)) + meta + b''.join(blobs)
+
+
+def decode_generation(payload: bytes) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """解码代记录，返回(状态字典, 数组字典)"""
+    (length,) = _JSON_LENGTH.unpack_from(payload)
+    state = json.loads(payload[_JSON_LENGTH.size:_JSON_LENGTH.size + length].decode('utf-8'))
+    offset = _JSON_LENGTH.size + length
+    arrays = {}
+    for name, spec in state.pop('arrays', {}).items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+        arrays[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(spec['shape']).copy()
+        offset += count * dtype.itemsize
+    return state, arrays
+
+
+def read_records(path: str) -> Iterator[Tuple[int, bytes, int]]:
+    """
+    逐条读取日志记录，产生 (记录类型, 负载, 该记录结束处的文件偏移)
+    遇到不完整或CRC不符的记录即停止（断电造成的残缺尾部）
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"不是运行日志文件: {path}")
+        offset = len(MAGIC)
+        while True:
+            frame = f.read(_FRAME.size)
+            if len(frame) < _FRAME.size:
+                return
+            record_type, length, checksum = _FRAME.unpack(frame)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                return
+            offset += _FRAME.size + length
+            yield record_type, payload, offset
+
+
+def load_journal(path: str) -> dict:
+    """
+    读取整个运行日志
+
+    返回:
+        header: 文件头JSON
+        evaluations: 列式评估数据（evaluation_index、timestamp、power、settle_time、light_detected、
+                     optimization_phase、position_A、position_B）
+        generations: 每代状态字典的列表（不含数组）
+        last_generation: 最后一代的(状态, 数组)，没有代记录时为None
+        events: 事件列表
+        valid_size: 最后一条完整记录结束处的字节数
+        truncated: 文件是否带有残缺尾部
+    """
+    header = None
+    rows = []
+    generations = []
+    last_generation = None
+    events = []
+    valid_size = len(MAGIC)
+    for record_type, payload, offset in read_records(path):
+        valid_size = offset
+        if record_type == RECORD_HEADER:
+            header = json.loads(payload.decode('utf-8'))
+        elif record_type == RECORD_EVALUATION:
+            rows.append(payload)
+        elif record_type == RECORD_GENERATION:
+            state, arrays = decode_generation(payload)
+            generations.append(state)
+            last_generation = (state, arrays)
+        elif record_type == RECORD_EVENT:
+            events.append(json.loads(payload.decode('utf-8')))
+    if header is None:
+        raise ValueError(f"运行日志缺少文件头: {path}")
+
+    dimension_A = len(header['selected_variables_A'])
+    dimension_B = len(header['selected_variables_B'])
+    count = len(rows)
+    evaluations = {
+        'evaluation_index': np.empty(count, dtype=np.int64),
+        'timestamp': np.empty(count),
+        'power': np.empty(count),
+        'settle_time': np.empty(count),
+        'light_detected': np.empty(count, dtype=np.int8),
+        'optimization_phase': [],
+        'position_A': np.empty((count, dimension_A)),
+        'position_B': np.empty((count, dimension_B)),
+    }
+    for i, payload in enumerate(rows):
+        index, timestamp, power, settle_time, light, phase_length = _EVALUATION.unpack_from(payload)
+        offset = _EVALUATION.size
+        evaluations['evaluation_index'][i] = index
+        evaluations['timestamp'][i] = timestamp
+        evaluations['power'][i] = power
+        evaluations['settle_time'][i] = settle_time
+        evaluations['light_detected'][i] = light
+        evaluations['optimization_phase'].append(payload[offset:offset + phase_length].decode('utf-8') or None)
+        offset += phase_length
+        positions = np.frombuffer(payload, dtype='<f8', count=dimension_A + dimension_B, offset=offset)
+        evaluations['position_A'][i] = positions[:dimension_A]
+        evaluations['position_B'][i] = positions[dimension_A:]
+
+    return {
+        'header': header,
+        'evaluations': evaluations,
+        'generations': generations,
+        'last_generation': last_generation,
+        'events': events,
+        'valid_size': valid_size,
+        'truncated': valid_size < os.path.getsize(path),
+    }
+
+
+class RunJournal:
+    """后台线程写盘的追加式运行日志（写入接口只编码并入队，不阻塞优化线程）"""
+
+    def __init__(self, path: str, selected_variables_A: Sequence[str], selected_variables_B: Sequence[str],
+                 fsync_policy: str = 'generation', fsync_interval: float = 1.0):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"未知的fsync策略: {fsync_policy}，可选 {FSYNC_POLICIES}")
+        self.path = path
+        self.dimension_A = len(selected_variables_A)
+        self.dimension_B = len(selected_variables_B)
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.records_written = 0
+        self.bytes_written = 0
+        self.fsync_count = 0
+        self.error = None
+        self._queue = queue.Queue()
+        self._file = None
+        self._thread = None
+        self._last_fsync = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # 打开与关闭
+    # ------------------------------------------------------------------
+
+    def open(self, header: Optional[dict] = None) -> 'RunJournal':
+        """
+        打开日志并启动写盘线程
+        文件已存在时截掉残缺尾部后继续追加（恢复运行），否则新建并写入文件头
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            valid_size = len(MAGIC)
+            for _, _, offset in read_records(self.path):
+                valid_size = offset
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(valid_size)
+            self._file.seek(valid_size)
+        else:
+            self._file = open(self.path, 'wb')
+            self._file.write(MAGIC)
+            if header is not None:
+                self._queue.put((RECORD_HEADER, _encode_json(header)))
+        self._thread = threading.Thread(target=self._writer_loop, name="run_journal", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self, timeout: float = 5.0):
+        """写完队列中的记录、fsync并关闭文件"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def pending(self) -> int:
+        """尚未写盘的记录数"""
+        return self._queue.qsize()
+
+    # ------------------------------------------------------------------
+    # 写入（优化线程调用）
+    # ------------------------------------------------------------------
+
+    def write_evaluation(self, individual_A: np.ndarray, individual_B: np.ndarray, power: float,
+                         evaluation_index: int, optimization_phase: Optional[str], light_detected: Optional[bool],
+                         settle_time: Optional[float] = None, timestamp: Optional[float] = None):
+        """记录一次评估（时间戳为time.time()，缺省为当前时间）"""
+        phase = (optimization_phase or '').encode('utf-8')[:255]
+        payload = _EVALUATION.pack(
+            int(evaluation_index),
+            time.time() if timestamp is None else float(timestamp),
+            float(power),
+            np.nan if settle_time is None else float(settle_time),
+            -1 if light_detected is None else int(bool(light_detected)),
+            len(phase),
+        ) + phase + np.asarray(individual_A, dtype='<f8').tobytes() + np.asarray(individual_B, dtype='<f8').tobytes()
+        self._queue.put((RECORD_EVALUATION, payload))
+
+    def write_generation(self, state: dict, arrays: Dict[str, Optional[np.ndarray]]):
+        """记录一代结束时的优化状态（数组在此复制编码，之后原数组可被修改）"""
+        self._queue.put((RECORD_GENERATION, encode_generation(state, arrays)))
+
+    def write_event(self, event_type: str, data: Optional[dict] = None):
+        """记录事件（恢复、运行结束等）"""
+        self._queue.put((RECORD_EVENT, _encode_json({'event_type': event_type, 'timestamp': time.time(),
+                                                     **(data or {})})))
+
+    # ------------------------------------------------------------------
+    # 写盘线程
+    # ------------------------------------------------------------------
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsync_count += 1
+        self._last_fsync = time.monotonic()
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue  # 写盘失败后丢弃后续记录，不影响优化
+            record_type, payload = item
+            try:
+                self._file.write(_FRAME.pack(record_type, len(payload), zlib.crc32(payload)))
+                self._file.write(payload)
+                self.records_written += 1
+                self.bytes_written += _FRAME.size + len(payload)
+                if self.fsync_policy == 'always' \
+                        or (self.fsync_policy == 'generation' and record_type != RECORD_EVALUATION) \
+                        or (self.fsync_policy == 'interval'
+                            and time.monotonic() - self._last_fsync >= self.fsync_interval):
+                    self._sync()
+                elif self._queue.empty():
+                    self._file.flush()
+            except OSError as e:
+                self.error = e
+                print(f"运行日志写入失败，停止记录: {e}")
+        try:
+            if self.error is None:
+                self._sync()
+            self._file.close()
+        except OSError as e:
+            self.error = self.error or e
+            print(f"关闭运行日志失败: {e}")
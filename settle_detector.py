@@ -0,0 +1,149 @@
+# settle_detector.py
+"""
+自适应稳定检测
+位置指令下发后高速轮询功率（或PZT回读电压），当最近一个窗口内的信号波动
+小于容差时判定稳定；等待上限随移动步长增大（小步移动稳定更快）。
+信号源不可用（功率计无法连续读数）时回退到固定延时。
+"""
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+def get_default_settle_config() -> dict:
+    """获取稳定检测的默认配置"""
+    return {
+        'adaptive_settle': True,        # False时始终使用固定延时
+        'poll_interval': 0.005,         # 轮询间隔（秒）
+        'stable_window': 5,             # 判定稳定所需的连续样本数
+        'tolerance_relative': 0.01,     # 窗口内峰峰值相对容差
+        'tolerance_absolute': 1e-9,     # 窗口内峰峰值绝对容差（信号单位）
+        'min_settle_time': 0.02,        # 最短等待时间（秒）
+        'small_step_max_settle': 0.3,   # 极小步长时的等待上限（秒）
+        'full_step_max_settle': 1.2,    # 满量程步长时的等待上限（秒）
+        'history_size': 1000,           # 保留的稳定时间记录数
+    }
+
+
+class AdaptiveSettleDetector:
+    """自适应稳定检测器"""
+
+    def __init__(self, config: dict = None):
+        """
+        初始化稳定检测器
+
+        参数:
+            config: 配置字典，缺省项使用get_default_settle_config()
+        """
+        self.config = get_default_settle_config()
+        self.update_config(config)
+        self._settle_times = []
+        self._method_counts = {'adaptive': 0, 'timeout': 0, 'fallback': 0, 'fixed': 0}
+
+    def update_config(self, config: dict = None):
+        """更新配置"""
+        if config:
+            self.config.update(config)
+        self.adaptive_settle = bool(self.config['adaptive_settle'])
+        self.poll_interval = float(self.config['poll_interval'])
+        self.stable_window = max(2, int(self.config['stable_window']))
+        self.tolerance_relative = float(self.config['tolerance_relative'])
+        self.tolerance_absolute = float(self.config['tolerance_absolute'])
+        self.min_settle_time = float(self.config['min_settle_time'])
+        self.small_step_max_settle = float(self.config['small_step_max_settle'])
+        self.full_step_max_settle = float(self.config['full_step_max_settle'])
+        self.history_size = int(self.config['history_size'])
+
+    def max_settle_time(self, step_size: float) -> float:
+        """
+        根据归一化步长计算等待上限
+
+        参数:
+            step_size: 归一化步长（0~1，各轴移动量/量程的最大值）
+        """
+        step = float(np.clip(step_size, 0.0, 1.0))
+        return self.small_step_max_settle + (self.full_step_max_settle - self.small_step_max_settle) * step
+
+    def _is_stable(self, window: np.ndarray) -> bool:
+        """判断窗口内信号是否稳定（逐分量比较峰峰值与容差）"""
+        span = np.ptp(window, axis=0)
+        tolerance = self.tolerance_absolute + self.tolerance_relative * np.abs(np.mean(window, axis=0))
+        return bool(np.all(span <= tolerance))
+
+    def wait_for_settle(self, read_signal: Optional[Callable[[], object]], step_size: float,
+                        fallback_delay: float) -> Dict:
+        """
+        等待位置稳定
+
+        参数:
+            read_signal: 读取信号的函数（返回标量或数组；返回None或抛出异常表示无法连续读数）
+            step_size: 归一化步长
+            fallback_delay: 无法自适应检测时的固定延时（秒）
+
+        返回:
+            稳定信息字典：settle_time、settled、method、samples、max_settle_time
+        """
+        start = time.perf_counter()
+
+        if not self.adaptive_settle or read_signal is None:
+            time.sleep(fallback_delay)
+            return self._record(start, True, 'fixed', 0, fallback_delay)
+
+        max_wait = min(self.max_settle_time(step_size), max(fallback_delay, self.min_settle_time))
+        samples = []
+
+        while True:
+            try:
+                value = read_signal()
+            except Exception as e:
+                print(f"稳定检测读数失败，回退到固定延时: {e}")
+                value = None
+
+            if value is None:
+                # 无法连续读数：补足剩余的固定延时
+                remaining = fallback_delay - (time.perf_counter() - start)
+                if remaining > 0:
+                    time.sleep(remaining)
+                return self._record(start, True, 'fallback', len(samples), fallback_delay)
+
+            samples.append(np.atleast_1d(np.asarray(value, dtype=np.float64)))
+            elapsed = time.perf_counter() - start
+
+            if elapsed >= self.min_settle_time and len(samples) >= self.stable_window:
+                if self._is_stable(np.array(samples[-self.stable_window:])):
+                    return self._record(start, True, 'adaptive', len(samples), max_wait)
+
+            if elapsed >= max_wait:
+                return self._record(start, False, 'timeout', len(samples), max_wait)
+
+            time.sleep(self.poll_interval)
+
+    def _record(self, start: float, settled: bool, method: str, samples: int, max_wait: float) -> Dict:
+        """记录一次稳定等待"""
+        settle_time = time.perf_counter() - start
+        self._settle_times.append(settle_time)
+        if len(self._settle_times) > self.history_size:
+            del self._settle_times[:len(self._settle_times) - self.history_size]
+        self._method_counts[method] += 1
+        return {
+            'settle_time': settle_time,
+            'settled': settled,
+            'method': method,
+            'samples': samples,
+            'max_settle_time': max_wait,
+        }
+
+    def get_statistics(self) -> Dict:
+        """获取稳定时间统计（用于调参）"""
+        if not self._settle_times:
+            return {'count': 0, 'method_counts': dict(self._method_counts)}
+        times = np.array(self._settle_times)
+        return {
+            'count': len(times),
+            'mean': float(np.mean(times)),
+            'p50': float(np.percentile(times, 50)),
+            'p95': float(np.percentile(times, 95)),
+            'max': float(np.max(times)),
+            'method_counts': dict(self._method_counts),
+        }
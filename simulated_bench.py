@@ -0,0 +1,544 @@
+# simulated_bench.py
+"""
+模拟光学平台后端
+在没有Thorlabs硬件（TLPM功率计DLL、Kinesis压电控制器）的环境中，
+提供与PowerMeter / PiezoController相同接口的模拟设备，用于算法基准测试和CI吞吐量测量。
+
+耦合模型：A、B两端分别按高斯模场重叠计算耦合效率（横向偏移、轴向离焦、角度偏差），
+总功率 = 峰值功率 × η_A × η_B，并叠加可配置的测量噪声、指令延迟、测量延迟、
+一阶位置响应（用于测试稳定检测）以及温漂。
+"""
+import threading
+import time
+from ctypes import byref
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from hardware_abstract import IPowerMeter, IPZTController
+from PowerMeter import PowerMeter
+
+# 与PiezoController一致的轴范围（硬件坐标键）
+DEFAULT_AXIS_RANGES = {
+    'x': (0, 30), 'y': (0, 30), 'z': (0, 30), 'rx': (0, 0.03), 'ry': (0, 0.03),
+    'bx': (0, 30), 'by': (0, 30), 'bz': (0, 30), 'brx': (0, 0.03), 'bry': (0, 0.03)
+}
+
+# 压电控制器最大输出电压（V），与map_value_to_voltage一致
+MAX_OUTPUT_VOLTAGE = 75.0
+
+# 每端的轴：(横向x, 横向y, 轴向z, 角度rx, 角度ry)
+END_AXES = {
+    'A': ('x', 'y', 'z', 'rx', 'ry'),
+    'B': ('bx', 'by', 'bz', 'brx', 'bry'),
+}
+
+
+def get_default_simulation_config() -> dict:
+    """获取模拟平台的默认配置"""
+    return {
+        'random_seed': None,            # 随机种子（None表示不固定）
+        'peak_power': 1.0e-3,           # 完全对准时的功率（W）
+        'wavelength_nm': 1550,          # 波长（nm），用于计算瑞利长度
+        'mode_field_radius_um': 5.2,    # 模场半径（µm），SMF-28 @1550nm
+        'angular_tolerance': 0.006,     # 角度容差（与rx/ry同单位），功率下降到1/e时的角度偏差
+        'optimum': None,                # 最佳位置 {硬件轴: 值}，None时在范围中部随机生成
+        'noise_relative': 0.002,        # 相对噪声（标准差/功率）
+        'noise_floor': 1.0e-9,          # 本底噪声（W）
+        'command_latency': 0.01,        # 每次SetOutputVoltage的延迟（秒）
+        'measure_latency': 0.003,       # 每次measPower的延迟（秒）
+        'average_sample_period': 3.0e-4,  # 设备端平均时每个原始样本的耗时（秒）
+        'fast_array_sample_rate': 1.0e5,  # 快速数组采集的采样率（Hz）
+        'settle_time_constant': 0.05,   # 压电一阶响应时间常数（秒），0表示瞬时到位
+        'drift_rate_um_per_s': 0.0,     # 温漂速度（µm/s），沿随机方向平移最佳位置
+    }
+
+
+class SimulatedOpticalBench:
+    """
+    模拟光学平台
+    保存所有压电轴的指令与实际位置，按高斯模场重叠模型计算耦合功率。
+    同一平台实例由模拟功率计和所有模拟PZT控制器共享，线程安全。
+    """
+
+    def __init__(self, config: dict = None):
+        """
+        初始化模拟平台
+
+        参数:
+            config: 模拟配置，缺省项使用get_default_simulation_config()
+        """
+        self.config = get_default_simulation_config()
+        if config:
+            self.config.update(config)
+
+        self.rng = np.random.default_rng(self.config.get('random_seed'))
+        self.axis_ranges = dict(DEFAULT_AXIS_RANGES)
+
+        self.peak_power = float(self.config['peak_power'])
+        self.mode_field_radius = float(self.config['mode_field_radius_um'])
+        wavelength_um = float(self.config['wavelength_nm']) * 1e-3
+        # 瑞利长度 zR = π·w0²/λ
+        self.rayleigh_range = np.pi * self.mode_field_radius ** 2 / wavelength_um
+        self.angular_tolerance = float(self.config['angular_tolerance'])
+        self.noise_relative = float(self.config['noise_relative'])
+        self.noise_floor = float(self.config['noise_floor'])
+        self.command_latency = float(self.config['command_latency'])
+        self.measure_latency = float(self.config['measure_latency'])
+        self.average_sample_period = float(self.config['average_sample_period'])
+        self.fast_array_sample_rate = float(self.config['fast_array_sample_rate'])
+        self.settle_time_constant = float(self.config['settle_time_constant'])
+        self.drift_rate = float(self.config['drift_rate_um_per_s'])
+
+        # 最佳位置
+        self.optimum = {}
+        configured_optimum = self.config.get('optimum') or {}
+        for axis, (lower, upper) in self.axis_ranges.items():
+            if axis in configured_optimum:
+                self.optimum[axis] = float(configured_optimum[axis])
+            else:
+                self.optimum[axis] = float(self.rng.uniform(lower + 0.2 * (upper - lower),
+                                                            upper - 0.2 * (upper - lower)))
+
+        # 温漂方向（仅位置轴）
+        drift_direction = self.rng.normal(size=6)
+        self._drift_direction = drift_direction / np.linalg.norm(drift_direction)
+        self._start_time = time.perf_counter()
+
+        # 各轴状态：起点位置、目标位置、指令时间
+        self._start_positions = {axis: 0.0 for axis in self.axis_ranges}
+        self._target_positions = {axis: 0.0 for axis in self.axis_ranges}
+        self._command_times = {axis: self._start_time for axis in self.axis_ranges}
+
+        self._lock = threading.RLock()
+
+        # 统计
+        self.command_count = 0
+        self.measure_count = 0
+
+    # ------------------------------------------------------------------
+    # 轴状态
+    # ------------------------------------------------------------------
+
+    def _actual_position_locked(self, axis: str, now: float) -> float:
+        """计算一阶响应下的实际位置（调用方需持有锁）"""
+        target = self._target_positions[axis]
+        if self.settle_time_constant <= 0:
+            return target
+        elapsed = max(0.0, now - self._command_times[axis])
+        start = self._start_positions[axis]
+        return target + (start - target) * np.exp(-elapsed / self.settle_time_constant)
+
+    def command_axis(self, axis: str, value: float):
+        """下发单轴位置指令（包含指令延迟）"""
+        if self.command_latency > 0:
+            time.sleep(self.command_latency)
+        with self._lock:
+            now = time.perf_counter()
+            self._start_positions[axis] = self._actual_position_locked(axis, now)
+            self._target_positions[axis] = float(value)
+            self._command_times[axis] = now
+            self.command_count += 1
+
+    def get_target_position(self, axis: str) -> float:
+        """获取轴的指令位置"""
+        with self._lock:
+            return self._target_positions[axis]
+
+    def get_actual_positions(self, now: float = None) -> Dict[str, float]:
+        """获取所有轴的实际位置"""
+        if now is None:
+            now = time.perf_counter()
+        with self._lock:
+            return {axis: self._actual_position_locked(axis, now) for axis in self.axis_ranges}
+
+    def zero_axes(self, axes: List[str]):
+        """轴归零（立即回到0位置）"""
+        with self._lock:
+            now = time.perf_counter()
+            for axis in axes:
+                self._start_positions[axis] = 0.0
+                self._target_positions[axis] = 0.0
+                self._command_times[axis] = now
+
+    # ------------------------------------------------------------------
+    # 耦合模型
+    # ------------------------------------------------------------------
+
+    def get_optimum(self, now: float = None) -> Dict[str, float]:
+        """获取当前最佳位置（包含温漂）"""
+        if self.drift_rate == 0:
+            return dict(self.optimum)
+        if now is None:
+            now = time.perf_counter()
+        shift = self._drift_direction * self.drift_rate * (now - self._start_time)
+        optimum = dict(self.optimum)
+        for offset, axis in zip(shift, ('x', 'y', 'z', 'bx', 'by', 'bz')):
+            optimum[axis] += offset
+        return optimum
+
+    def coupling_efficiency(self, positions: Dict[str, float], optimum: Dict[str, float] = None) -> float:
+        """
+        计算耦合效率（0~1）
+
+        每端：η = η_z · exp(-(Δx²+Δy²)/w(Δz)²) · exp(-(Δθx²+Δθy²)/θt²)
+        其中 w(Δz)² = w0²·(1+(Δz/2zR)²)，η_z = 1/(1+(Δz/2zR)²)
+        """
+        if optimum is None:
+            optimum = self.get_optimum()
+
+        efficiency = 1.0
+        for axis_x, axis_y, axis_z, axis_rx, axis_ry in END_AXES.values():
+            dx = positions[axis_x] - optimum[axis_x]
+            dy = positions[axis_y] - optimum[axis_y]
+            dz = positions[axis_z] - optimum[axis_z]
+            drx = positions[axis_rx] - optimum[axis_rx]
+            dry = positions[axis_ry] - optimum[axis_ry]
+
+            defocus = 1.0 + (dz / (2.0 * self.rayleigh_range)) ** 2
+            w_squared = self.mode_field_radius ** 2 * defocus
+            lateral = np.exp(-(dx * dx + dy * dy) / w_squared)
+            angular = np.exp(-(drx * drx + dry * dry) / self.angular_tolerance ** 2)
+            efficiency *= lateral * angular / defocus
+
+        return float(efficiency)
+
+    def true_power(self, now: float = None) -> float:
+        """当前无噪声功率（W）"""
+        if now is None:
+            now = time.perf_counter()
+        positions = self.get_actual_positions(now)
+        return self.peak_power * self.coupling_efficiency(positions, self.get_optimum(now))
+
+    def sample_power(self, average_count: int = 1) -> float:
+        """
+        采样一次带噪声的功率（包含测量延迟）
+
+        参数:
+            average_count: 设备端平均次数（噪声按1/sqrt(n)减小，耗时按n增加）
+        """
+        average_count = max(1, int(average_count))
+        latency = self.measure_latency + (average_count - 1) * self.average_sample_period
+        if latency > 0:
+            time.sleep(latency)
+        now = time.perf_counter()
+        power = self.true_power(now)
+        with self._lock:
+            noise = self.rng.normal(0.0, 1.0, 2) / np.sqrt(average_count)
+            self.measure_count += 1
+        power = power * (1.0 + self.noise_relative * noise[0]) + self.noise_floor * noise[1]
+        return max(power, 0.0)
+
+    def sample_power_block(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按快速数组采样率采集一块带噪声的功率样本
+
+        返回:
+            (功率数组W, 时间戳数组µs，相对平台启动时间)
+        """
+        duration = count / self.fast_array_sample_rate
+        time.sleep(self.measure_latency + duration)
+        end = time.perf_counter()
+        times = end - duration + np.arange(count) / self.fast_array_sample_rate
+        power = self.true_power(end - duration / 2)
+        with self._lock:
+            noise = self.rng.normal(0.0, 1.0, (2, count))
+            self.measure_count += count
+        powers = power * (1.0 + self.noise_relative * noise[0]) + self.noise_floor * noise[1]
+        return np.maximum(powers, 0.0), (times - self._start_time) * 1e6
+
+    def get_statistics(self) -> dict:
+        """获取模拟平台统计信息"""
+        return {
+            'command_count': self.command_count,
+            'measure_count': self.measure_count,
+            'peak_power': self.peak_power,
+            'optimum': self.get_optimum(),
+        }
+
+
+# =============================================================================
+# 模拟功率计
+# =============================================================================
+
+class SimulatedTLPM:
+    """
+    模拟TLPM驱动对象
+    实现PowerMeter使用到的TLPM方法，使PowerMeter的测量逻辑可以原样运行在模拟平台上。
+    """
+
+    def __init__(self, bench: SimulatedOpticalBench):
+        self.bench = bench
+        self._wavelength = 1550.0
+        self._auto_range = 1
+        self._average_count = 1
+        self._fast_array_configured = False
+
+    @staticmethod
+    def _write(ref, value):
+        """写入byref()传入的ctypes对象"""
+        ref._obj.value = value
+
+    def findRsrc(self, resourceCount):
+        self._write(resourceCount, 1)
+        return 0
+
+    def getRsrcName(self, index, resourceName):
+        name = b"SIM::PM100::INSTR"
+        resourceName.value = name
+        return 0
+
+    def open(self, resourceName, IDQuery, resetDevice):
+        return 0
+
+    def close(self):
+        return 0
+
+    def setPowerAutoRange(self, powerAutorangeMode):
+        self._auto_range = powerAutorangeMode.value
+        return 0
+
+    def setWavelength(self, wavelength):
+        self._wavelength = wavelength.value
+        return 0
+
+    def getWavelength(self, attribute, wavelength):
+        self._write(wavelength, self._wavelength)
+        return 0
+
+    def getPowerRange(self, attribute, powerValue):
+        self._write(powerValue, self.bench.peak_power * 1.2)
+        return 0
+
+    def getCalibrationMsg(self, message):
+        message.value = b"Simulated sensor"
+        return 0
+
+    def measPower(self, power):
+        self._write(power, self.bench.sample_power(self._average_count))
+        return 0
+
+    def setAvgCnt(self, averageCount):
+        self._average_count = max(1, int(averageCount.value))
+        return 0
+
+    def setAvgTime(self, avgTime):
+        self._average_count = max(1, int(round(avgTime.value / self.bench.average_sample_period)))
+        return 0
+
+    def confPowerFastArrayMeasurement(self):
+        self._fast_array_configured = True
+        return 0
+
+    def getNextFastArrayMeasurement(self, count, timestamps, values):
+        if not self._fast_array_configured:
+            raise RuntimeError("快速数组采集未配置")
+        n = min(len(values), PowerMeter.FAST_ARRAY_MAX_SAMPLES)
+        powers, times = self.bench.sample_power_block(n)
+        np.frombuffer(values, dtype=np.float32)[:n] = powers
+        np.frombuffer(timestamps, dtype=np.uint32)[:n] = times.astype(np.uint32)
+        self._write(count, n)
+        return 0
+
+
+class SimulatedPowerMeter(PowerMeter, IPowerMeter):
+    """模拟功率计：复用PowerMeter的测量与数据处理逻辑，底层使用SimulatedTLPM"""
+
+    def __init__(self, bench: SimulatedOpticalBench, wavelength=PowerMeter.DEFAULT_WAVELENGTH):
+        self.bench = bench
+        super().__init__(wavelength=wavelength)
+
+    def _find_device(self):
+        """搜索模拟功率计"""
+        self.tlPM = SimulatedTLPM(self.bench)
+        self.tlPM.findRsrc(byref(self.device_count))
+
+
+# =============================================================================
+# 模拟PZT控制器
+# =============================================================================
+
+class SimulatedPiezoController(IPZTController):
+    """模拟压电控制器，接口与PiezoController一致"""
+
+    def __init__(self, controller_name: str, serial_no: str, bench: SimulatedOpticalBench):
+        self.controller_name = controller_name
+        self.serial_no = serial_no
+        self.bench = bench
+        self.device = None
+        self.channels = {1: None, 2: None, 3: None}
+        self.ranges = dict(DEFAULT_AXIS_RANGES)
+        self.is_connected = False
+        self.is_zeroed = False
+        self.initial_positions = {}
+        self.control_mode = 1
+        self.dac_bits = 16
+        self._last_voltages = {}  # 轴 -> 最近下发的电压
+        self.command_stats = {'issued': 0, 'skipped': 0, 'failed': 0, 'ack_timeouts': 0}
+
+    def _controller_axes(self) -> List[str]:
+        """获取控制器负责的轴"""
+        if "A端" in self.controller_name:
+            return ['x', 'y', 'z'] if "位置" in self.controller_name else ['rx', 'ry']
+        return ['bx', 'by', 'bz'] if "位置" in self.controller_name else ['brx', 'bry']
+
+    def connect(self) -> bool:
+        """连接模拟控制器"""
+        self.device = self.serial_no
+        for ch_num, axis in enumerate(self._controller_axes(), start=1):
+            self.channels[ch_num] = axis
+        self.is_connected = True
+        print(f"{self.controller_name} ({self.serial_no}) 模拟设备已连接")
+        return True
+
+    def disconnect(self) -> bool:
+        """断开模拟控制器"""
+        self.is_connected = False
+        return True
+
+    def zero(self) -> bool:
+        """调零"""
+        if not self.is_connected:
+            print("设备未连接，无法调零")
+            return False
+        self.bench.zero_axes(self._controller_axes())
+        self._last_voltages.clear()
+        self.is_zeroed = True
+        return True
+
+    def mode_change(self, mode, channels) -> bool:
+        """切换开环/闭环模式（模拟设备仅记录模式）"""
+        if not self.is_connected:
+            print("设备未连接，无法切换模式")
+            return False
+        self.control_mode = mode
+        return True
+
+    def set_position(self, position_dict: Dict[str, float]) -> bool:
+        """设置位置：按通道依次下发指令"""
+        if not self.is_connected:
+            print("设备未连接，无法设置位置")
+            return False
+
+        controller_axes = self._controller_axes()
+        for axis, value in position_dict.items():
+            if axis not in self.ranges:
+                print(f"警告: 未知轴 '{axis}'，跳过")
+                continue
+            if axis not in controller_axes:
+                print(f"错误: {self.controller_name} 不负责轴 '{axis}'")
+                return False
+            lower, upper = self.ranges[axis]
+            self.bench.command_axis(axis, float(np.clip(value, lower, upper)))
+        return True
+
+    def get_command_statistics(self) -> dict:
+        """获取电压指令统计：下发、跳过（电压未变化）、失败、确认超时次数"""
+        return dict(self.command_stats)
+
+    def set_position_batch(self, position_dict: Dict[str, float], ack_timeout: float = 0.0) -> Dict[str, bool]:
+        """
+        批量设置位置：各通道指令连续下发，电压在DAC分辨率内未变化的通道跳过，返回各轴是否成功
+        （模拟设备回读即为指令值，无需等待确认）
+        """
+        if not self.is_connected:
+            print("设备未连接，无法设置位置")
+            return {axis: False for axis in position_dict}
+
+        controller_axes = self._controller_axes()
+        axis_success = {}
+        for axis, value in position_dict.items():
+            if axis not in self.ranges:
+                print(f"警告: 未知轴 '{axis}'，跳过")
+                continue
+            if axis not in controller_axes:
+                print(f"错误: {self.controller_name} 不负责轴 '{axis}'")
+                axis_success[axis] = False
+                continue
+            lower, upper = self.ranges[axis]
+            value = float(np.clip(value, lower, upper))
+            voltage = (value - lower) / (upper - lower) * MAX_OUTPUT_VOLTAGE
+            last_voltage = self._last_voltages.get(axis)
+            if last_voltage is not None and abs(voltage - last_voltage) < MAX_OUTPUT_VOLTAGE / (2 ** self.dac_bits - 1) / 2:
+                self.command_stats['skipped'] += 1
+                axis_success[axis] = True
+                continue
+            self.bench.command_axis(axis, value)
+            self._last_voltages[axis] = voltage
+            self.command_stats['issued'] += 1
+            axis_success[axis] = True
+        return axis_success
+
+    def ramp_axis(self, axis: str, start_value: float, end_value: float, duration: float,
+                  step_interval: float = 0.005) -> Tuple[List[float], List[float]]:
+        """
+        线性扫描单轴（飞行扫描），接口与PiezoController.ramp_axis一致
+        返回: (指令时间戳列表（perf_counter，秒）, 指令位置列表)
+        """
+        if not self.is_connected:
+            print("设备未连接，无法扫描")
+            return [], []
+        if axis not in self._controller_axes():
+            print(f"错误: {self.controller_name} 不负责轴 '{axis}'")
+            return [], []
+
+        lower, upper = self.ranges[axis]
+        start_value = float(np.clip(start_value, lower, upper))
+        end_value = float(np.clip(end_value, lower, upper))
+        times = []
+        values = []
+        start_time = time.perf_counter()
+        next_tick = start_time
+        while True:
+            fraction = min(1.0, (time.perf_counter() - start_time) / duration) if duration > 0 else 1.0
+            value = start_value + (end_value - start_value) * fraction
+            self.bench.command_axis(axis, value)
+            self._last_voltages[axis] = (value - lower) / (upper - lower) * MAX_OUTPUT_VOLTAGE
+            self.command_stats['issued'] += 1
+            times.append(time.perf_counter())
+            values.append(value)
+
+            if fraction >= 1.0:
+                break
+            next_tick += step_interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
+        return times, values
+
+    def get_current_position(self) -> Dict[str, float]:
+        """获取当前指令位置（返回与PiezoController相同的无前缀键名）"""
+        position = {}
+        for axis in self._controller_axes():
+            key = axis[1:] if axis.startswith('b') else axis
+            position[key] = self.bench.get_target_position(axis)
+        return position
+
+    def get_output_voltages(self) -> Dict[int, float]:
+        """回读各通道的输出电压（按实际位置换算，包含一阶响应过程）"""
+        actual_positions = self.bench.get_actual_positions()
+        voltages = {}
+        for ch_num, axis in enumerate(self._controller_axes(), start=1):
+            lower, upper = self.ranges[axis]
+            voltages[ch_num] = (actual_positions[axis] - lower) / (upper - lower) * MAX_OUTPUT_VOLTAGE
+        return voltages
+
+    def set_initial_position(self, position_dict):
+        """设置初始位置"""
+        self.initial_positions = position_dict.copy()
+
+    def back_to_initial_position(self) -> bool:
+        """回归初始位置"""
+        if not self.is_connected:
+            print("设备未连接，无法回归初始位置")
+            return False
+        if not self.initial_positions:
+            print("未设置初始位置，无法回归")
+            return False
+        controller_initial_pos = {axis: self.initial_positions[axis]
+                                  for axis in self._controller_axes() if axis in self.initial_positions}
+        if controller_initial_pos:
+            return self.set_position(controller_initial_pos)
+        return True
@@ -0,0 +1,217 @@
+# spsa_optimizer.py
+"""
+SPSA（同时扰动随机逼近）快速重新对准引擎
+用于小扰动后的重新耦合：从上次锁定位置（或保存的初始位置）出发爬坡，而不是在整个搜索范围内重新随机初始化。
+每次迭代沿随机 ±1 方向测量 x+c·Δ 与 x-c·Δ 两个点，与维度无关地估计全部轴的梯度；
+增益按 a_k = a/(k+1+A)^α、c_k = c/(k+1)^γ 衰减（Spall, 1998）。
+
+与 DualEndGeneticAlgorithmOptimizer 相同的构造参数、回调、进度消息和 run() 结果字典，
+可通过配置 'optimizer_engine': 'spsa' 选择（见 optimizer_engines.py），GUI 的"快速重新对准"使用该引擎。
+坐标按 search_range_A/B 归一化到[0,1]；梯度按两点平均功率归一化，与功率绝对量级无关。
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from GA_double_new_1 import DualEndGeneticAlgorithmOptimizer
+
+
+class SPSAOptimizer(DualEndGeneticAlgorithmOptimizer):
+    """双端SPSA爬山优化器"""
+
+    SURROGATE_SCREENING = False
+
+    def __init__(self, config: dict, hardware_adapter):
+        super().__init__(config, hardware_adapter)
+
+        self.dimension_A = len(self.selected_variables_A)
+        self.dimension = self.dimension_A + len(self.selected_variables_B)
+
+        # 每次迭代只测量两个点
+        self.population_size = 2
+        self.normal_population_size = 2
+
+        self.initial_step = config.get('spsa_initial_step', 0.02)    # 第一步的归一化步长（用于标定增益a）
+        self.perturbation = config.get('spsa_perturbation', 0.01)    # 扰动幅度c（归一化坐标）
+        self.alpha = config.get('spsa_alpha', 0.602)
+        self.gamma = config.get('spsa_gamma', 0.101)
+        stability = config.get('spsa_stability', None)               # 稳定常数A，缺省为迭代次数的10%
+        self.stability = float(stability) if stability is not None else 0.1 * self.generations
+        self.max_step = config.get('spsa_max_step', 0.05)            # 单次迭代最大归一化步长
+        self.spsa_patience = config.get('spsa_patience', 15)
+        self.spsa_convergence_threshold = config.get('spsa_convergence_threshold', 0.01)
+
+        self.first_light_scan = False  # 从已知位置出发，不做首次通光扫描
+
+        start, source = self._resolve_start_point(config)
+        self.center = np.clip(self._normalize(start), 0.0, 1.0)
+        self.start_source = source
+        self.gain = None  # 首次得到非零梯度时标定
+        self.iteration = 0
+        self.delta = None
+        self.perturbation_span = None
+
+        self.history['optimizer_engine'] = 'spsa'
+        self.history['spsa_start'] = {
+            'source': source,
+            'position_A': {f'A_{var}': start[i] for i, var in enumerate(self.selected_variables_A)},
+            'position_B': {f'B_{var}': start[self.dimension_A + i] for i, var in enumerate(self.selected_variables_B)},
+        }
+        self.history['spsa_step'] = []
+
+        print(f"SPSA引擎: 维度 {self.dimension}, 起点来源 {source}, "
+              f"初始步长 {self.initial_step}, 扰动幅度 {self.perturbation}")
+
+    # =============================================================================
+    # 起点
+    # =============================================================================
+
+    def _resolve_start_point(self, config: dict) -> Tuple[np.ndarray, str]:
+        """
+        确定起点，优先级：
+        config['spsa_start_A'/'spsa_start_B']（上次锁定位置）> 硬件适配器保存的初始位置 > 搜索范围中心
+        起点可以是数组或 {'A_x': ...} / {'x': ...} 形式的字典
+        """
+        start_A = config.get('spsa_start_A', None)
+        start_B = config.get('spsa_start_B', None)
+        if start_A is not None and start_B is not None:
+            return np.concatenate([self._to_vector(start_A, self.selected_variables_A, 'A'),
+                                   self._to_vector(start_B, self.selected_variables_B, 'B')]), 'lock_position'
+
+        initial_positions = getattr(self.hardware_adapter, 'initial_positions', None)
+        if initial_positions:
+            # 硬件坐标：A端 x/y/z/rx/ry，B端 bx/by/bz/brx/bry
+            values = [initial_positions.get(var, None) for var in self.selected_variables_A]
+            values += [initial_positions.get(f'b{var}', None) for var in self.selected_variables_B]
+            if all(v is not None for v in values):
+                return np.array(values, dtype=float), 'initial_positions'
+
+        return self._denormalize(np.full(self.dimension, 0.5)), 'range_center'
+
+    @staticmethod
+    def _to_vector(position, selected_variables, side: str) -> np.ndarray:
+        if isinstance(position, dict):
+            return np.array([position.get(f'{side}_{var}', position.get(var, 0.0))
+                             for var in selected_variables], dtype=float)
+        return np.asarray(position, dtype=float)
+
+    def set_search_ranges(self, search_range_A, search_range_B):
+        """更新搜索范围后重新归一化，中心保持在原来的绝对位置（超出新范围时裁剪）"""
+        center = self._denormalize(self.center)
+        super().set_search_ranges(search_range_A, search_range_B)
+        self.center = np.clip(self._normalize(center), 0.0, 1.0)
+
+    # =============================================================================
+    # 增益序列与扰动
+    # =============================================================================
+
+    def _perturbation_size(self) -> float:
+        return self.perturbation / (self.iteration + 1) ** self.gamma
+
+    def _gain_size(self) -> float:
+        return self.gain / (self.iteration + 1 + self.stability) ** self.alpha
+
+    def _perturb(self) -> Tuple[np.ndarray, np.ndarray]:
+        """生成本次迭代的两个测量点 x+c·Δ、x-c·Δ，返回(A端种群, B端种群)"""
+        self.delta = self.rng.choice([-1.0, 1.0], size=self.dimension)
+        c = self._perturbation_size()
+        plus = np.clip(self.center + c * self.delta, 0.0, 1.0)
+        minus = np.clip(self.center - c * self.delta, 0.0, 1.0)
+        self.perturbation_span = plus - minus  # 边界处被裁剪时按实际间距计算梯度
+        points = self._denormalize(np.vstack([plus, minus]))
+        self.elite_rows = 0
+        return points[:, :self.dimension_A].copy(), points[:, self.dimension_A:].copy()
+
+    def estimate_gradient(self, power_plus: float, power_minus: float) -> Optional[np.ndarray]:
+        """两点梯度估计（相对功率 / 归一化坐标），两点都无光时返回None"""
+        mean_power = (power_plus + power_minus) / 2
+        if mean_power <= 0:
+            return None
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gradient = np.where(self.perturbation_span != 0,
+                                (power_plus - power_minus) / mean_power / self.perturbation_span, 0.0)
+        return gradient
+
+    # =============================================================================
+    # 覆盖遗传算法的种群生成与收敛检测
+    # =============================================================================
+
+    def initialize_populations(self):
+        """在起点两侧生成第一对测量点"""
+        self.iteration = 0
+        self.population_A, self.population_B = self._perturb()
+        print(f"SPSA初始测量点: A端 {self.population_A.shape}, B端 {self.population_B.shape}")
+
+    def create_new_population_enhanced(self, population_A: np.ndarray, population_B: np.ndarray,
+                                       fitness: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """用两点功率估计梯度、沿梯度移动中心，并生成下一对测量点"""
+        gradient = self.estimate_gradient(float(fitness[0]), float(fitness[1]))
+        step_norm = 0.0
+        if gradient is not None and np.any(gradient):
+            if self.gain is None:
+                # 标定a，使第一步的归一化步长为initial_step
+                self.gain = self.initial_step * (1 + self.stability) ** self.alpha / np.linalg.norm(gradient)
+            step = self._gain_size() * gradient
+            step_norm = float(np.linalg.norm(step))
+            if step_norm > self.max_step:
+                step *= self.max_step / step_norm
+                step_norm = self.max_step
+            self.center = np.clip(self.center + step, 0.0, 1.0)
+        self.history['spsa_step'].append(step_norm)
+
+        self.iteration += 1
+        return self._perturb()
+
+    def enhanced_convergence_check(self, current_best_fitness: float,
+                                   population_A: np.ndarray, population_B: np.ndarray,
+                                   current_fitness: np.ndarray, generation: int) -> Tuple[bool, bool]:
+        """
+        SPSA收敛检测
+        最近spsa_patience次迭代的最佳功率变化小于spsa_convergence_threshold时判定全局收敛
+        返回: (是否检测到收敛, 是否全局收敛)
+        """
+        recent_fitness = self.history['best_fitness'][-self.spsa_patience:]
+        change_percent = 1.0
+        if len(recent_fitness) >= self.spsa_patience and max(recent_fitness) > 0:
+            change_percent = (max(recent_fitness) - min(recent_fitness)) / max(recent_fitness)
+
+        converged = change_percent < self.spsa_convergence_threshold
+        self.history['convergence_status'].append({
+            'generation': generation,
+            'recent_fitness': recent_fitness[-3:],
+            'change_percent': change_percent,
+            'spsa_iteration': self.iteration,
+            'convergence_detected': converged,
+            'timestamp': datetime.now().isoformat()
+        })
+
+        if converged:
+            print(f"第{generation}代: SPSA收敛（最近{self.spsa_patience}次迭代变化 {change_percent*100:.2f}%）")
+            return True, True
+        return False, False
+
+    # =============================================================================
+    # 运行日志状态
+    # =============================================================================
+
+    def _journal_state(self, generation: int, fitness: np.ndarray) -> Tuple[Dict, Dict]:
+        """在遗传算法的可恢复状态上追加中心、增益和当前这对测量点的扰动方向"""
+        state, arrays = super()._journal_state(generation, fitness)
+        state.update({'spsa_gain': self.gain, 'spsa_iteration': self.iteration})
+        arrays.update({'spsa_center': self.center, 'spsa_delta': self.delta,
+                       'spsa_perturbation_span': self.perturbation_span})
+        return state, arrays
+
+    def _restore_journal_state(self, state: Dict, arrays: Dict):
+        super()._restore_journal_state(state, arrays)
+        self.gain = state['spsa_gain']
+        self.iteration = int(state['spsa_iteration'])
+        self.center = arrays['spsa_center']
+        self.delta = arrays.get('spsa_delta')
+        self.perturbation_span = arrays.get('spsa_perturbation_span')
+
+    def get_center_position(self) -> Dict[str, float]:
+        """当前中心位置（{'A_x': ..., 'B_x': ...}）"""
+        center = self._denormalize(self.center)
+        return self.get_full_position_dict(center[:self.dimension_A], center[self.dimension_A:])
@@ -0,0 +1,162 @@
+# steady_state_ga.py
+"""
+稳态异步遗传算法
+分代遗传算法每代先测完N个个体，再生成下一代、记录历史并发送generation回调，这段时间压电平台空闲。
+稳态版本每次评估后立即用子代替换种群中最差的个体，并把硬件时间线流水化：
+    1. 当前候选的移动已在指令线程中进行时，用现有种群生成下一个候选；
+    2. 当前候选的测量窗口一结束，适配器立即把下一个候选下发到指令线程（queue_next_position）；
+    3. 评估记录、GUI回调和替换最差个体都与下一次移动、稳定重叠。
+因此下一个候选生成时还不知道当前候选的功率（滞后一次评估），这是流水化的代价。
+
+与 DualEndGeneticAlgorithmOptimizer 相同的构造参数、回调、进度消息和 run() 结果字典，
+可通过配置 'optimizer_engine': 'steady_state' 选择（见 optimizer_engines.py）。
+每"代"为N次稳态评估，收敛检测、位置锁定、历史记录与generation回调沿用遗传算法的实现。
+"""
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from GA_double_new_1 import DualEndGeneticAlgorithmOptimizer
+from population_operators import generate_offspring
+
+
+class SteadyStateGAOptimizer(DualEndGeneticAlgorithmOptimizer):
+    """双端稳态异步遗传算法优化器"""
+
+    SURROGATE_SCREENING = False
+
+    def __init__(self, config: dict, hardware_adapter):
+        super().__init__(config, hardware_adapter)
+
+        self.steady_state_prefetch = config.get('steady_state_prefetch', True)  # 测量结束后立即预取下一个候选
+        self.population_fitness = None
+        self._evaluated_A = None  # 已评估的种群（run()传入其他数组时重新评估整个种群）
+        self._evaluated_B = None
+        self._pending = None  # 已生成、已下发（或即将下发）的下一个候选 (A端个体, B端个体)
+
+        self.history['optimizer_engine'] = 'steady_state'
+        self.history['steady_state'] = []
+
+        print(f"稳态遗传算法: 种群大小 {self.population_size}, "
+              f"预取移动 {'开启' if self.steady_state_prefetch else '关闭'}")
+
+    # =============================================================================
+    # 候选生成与替换
+    # =============================================================================
+
+    def initialize_populations(self):
+        """随机初始化种群，首次评估时测量全部个体"""
+        super().initialize_populations()
+        self.population_fitness = None
+        self._pending = None
+
+    def _make_child(self) -> Tuple[np.ndarray, np.ndarray]:
+        """从当前种群中锦标赛选择父母，交叉变异生成一个子代"""
+        child_A, child_B = generate_offspring(
+            self.rng, self.population_A, self.population_B, self.population_fitness, 1,
+            self.tournament_size, self.chromosome_crossover_rate,
+            self.gene_crossover_rate, self.gene_mutation_rate,
+            self.bounds_A, self.bounds_B
+        )
+        return child_A[0], child_B[0]
+
+    def _replace_worst(self, individual_A: np.ndarray, individual_B: np.ndarray, fitness: float) -> bool:
+        """子代优于最差个体时替换它，返回是否替换"""
+        worst = int(np.argmin(self.population_fitness))
+        if fitness <= self.population_fitness[worst]:
+            return False
+        self.population_A[worst] = individual_A
+        self.population_B[worst] = individual_B
+        self.population_fitness[worst] = fitness
+        return True
+
+    def _queue(self, candidate: Optional[Tuple[np.ndarray, np.ndarray]]):
+        """登记下一个候选：当前测量结束后由适配器立即下发（锁定模式下任何一次评估都可能锁定，不预取）"""
+        if not self.steady_state_prefetch or not hasattr(self.hardware_adapter, 'queue_next_position'):
+            return
+        if candidate is None or self.lock_mode_activated:
+            self.hardware_adapter.queue_next_position(None)
+            return
+        self.hardware_adapter.queue_next_position(self.get_full_position_dict(*candidate))
+
+    # =============================================================================
+    # 覆盖遗传算法的评估与种群生成
+    # =============================================================================
+
+    def evaluate_population_pair(self, population_A: np.ndarray, population_B: np.ndarray) -> np.ndarray:
+        """
+        一"代"：首次（或种群被替换后）测量全部个体，之后做N次稳态评估
+        返回当前种群的适应度（与self.population_A/B逐行对应）
+        """
+        start = time.perf_counter()
+        gaps = []
+        replacements = 0
+        # 最后一代结束后不再预取，平台停在最后一个评估位置
+        last_generation = len(self.history['generations']) + 1 >= self.generations
+
+        if self.population_fitness is None or population_A is not self._evaluated_A \
+                or population_B is not self._evaluated_B:
+            self.population_A = np.array(population_A, dtype=float)
+            self.population_B = np.array(population_B, dtype=float)
+            self.population_fitness = np.zeros(len(self.population_A))
+            self._pending = None
+            for i in range(len(self.population_A)):
+                if not self.is_running:
+                    break
+                if i + 1 < len(self.population_A):
+                    self._queue((self.population_A[i + 1], self.population_B[i + 1]))
+                self.population_fitness[i] = self.evaluate_dual_fitness(self.population_A[i], self.population_B[i])
+                gaps.append(getattr(self.hardware_adapter, 'last_command_gap', None))
+            self._evaluated_A = self.population_A
+            self._evaluated_B = self.population_B
+            if self.is_running and not last_generation:
+                self._pending = self._make_child()
+                if self.steady_state_prefetch and not self.lock_mode_activated \
+                        and hasattr(self.hardware_adapter, 'prefetch_position'):
+                    self.hardware_adapter.prefetch_position(self.get_full_position_dict(*self._pending))
+        else:
+            for step in range(len(self.population_A)):
+                if not self.is_running:
+                    break
+                candidate = self._pending if self._pending is not None else self._make_child()
+                # 当前候选移动、稳定期间生成下一个候选，测量窗口结束后立即下发
+                final_step = last_generation and step == len(self.population_A) - 1
+                next_candidate = None if final_step else self._make_child()
+                self._queue(next_candidate)
+                fitness = self.evaluate_dual_fitness(*candidate)
+                gaps.append(getattr(self.hardware_adapter, 'last_command_gap', None))
+                if not self.last_evaluation_failed and self._replace_worst(*candidate, fitness):
+                    replacements += 1
+                self._pending = next_candidate
+
+        self.last_schedule_info = None
+        self.last_cache_stats = None
+        self.last_surrogate_stats = None
+        self._record_steady_state(start, gaps, replacements)
+        return self.population_fitness.copy()
+
+    def create_new_population_enhanced(self, population_A: np.ndarray, population_B: np.ndarray,
+                                       fitness: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """种群已在评估过程中逐个替换，保持不变"""
+        self.elite_rows = 0
+        return self.population_A, self.population_B
+
+    def _record_steady_state(self, start: float, gaps, replacements: int):
+        """记录本代的替换次数与硬件空闲时间（测量结束到下一次指令下发）"""
+        duration = time.perf_counter() - start
+        gaps = [gap for gap in gaps if gap is not None]
+        idle = float(np.sum(gaps)) if gaps else 0.0
+        record = {
+            'generation': len(self.history['generations']) + 1,
+            'evaluations': len(gaps),
+            'replacements': replacements,
+            'duration': duration,
+            'command_gap_mean': float(np.mean(gaps)) if gaps else None,
+            'command_gap_max': float(np.max(gaps)) if gaps else None,
+            'hardware_busy_fraction': 1.0 - idle / duration if duration > 0 else None,
+        }
+        self.history['steady_state'].append(record)
+        print(f"稳态评估: {record['evaluations']} 次, 替换 {replacements} 次, "
+              f"指令间隙均值 {(record['command_gap_mean'] or 0.0)*1000:.2f}ms, "
+              f"硬件占用 {(record['hardware_busy_fraction'] or 0.0)*100:.1f}%")
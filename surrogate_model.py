@@ -0,0 +1,316 @@
+# surrogate_model.py
+"""
+代理模型预筛选
+用高斯过程回归拟合已测量的(A端位置, B端位置, 功率)，每代从大量候选子代中
+按预测功率或期望改进挑选少数个体送去硬件测量。
+输入按搜索范围归一化到[0,1]，输出标准化；核长度和噪声按边缘似然在网格上选择，
+新数据到来时只重新分解（增量重拟合），超参数每隔若干次重新选择。
+ard=True 时每维使用独立核长度（ARD），在网格结果基础上逐维缩放搜索边缘似然。
+"""
+import math
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+_erf = np.vectorize(math.erf, otypes=[np.float64])
+
+
+def _normal_cdf(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + _erf(z / math.sqrt(2.0)))
+
+
+def _normal_pdf(z: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * z * z) / math.sqrt(2.0 * math.pi)
+
+
+class GaussianProcessSurrogate:
+    """高斯过程代理模型（RBF核，各向同性或ARD）"""
+
+    def __init__(self, lower_bounds: np.ndarray, upper_bounds: np.ndarray,
+                 length_scales: Sequence[float] = (0.05, 0.1, 0.2, 0.4),
+                 noise_levels: Sequence[float] = (1e-3, 1e-2, 1e-1),
+                 max_points: int = 400, min_points: int = 20,
+                 hyperparameter_interval: int = 5, log_size: int = 5000,
+                 ard: bool = False, ard_passes: int = 2):
+        """
+        初始化代理模型
+
+        参数:
+            lower_bounds, upper_bounds: 各维上下界（A端变量在前，B端变量在后）
+            length_scales: 归一化坐标下的候选核长度
+            noise_levels: 候选噪声方差（相对标准化后的功率方差）
+            max_points: 参与拟合的最大样本数（超过时保留最近的样本）
+            min_points: 开始预测所需的最少样本数
+            hyperparameter_interval: 每隔多少次拟合重新选择超参数
+            log_size: 预测误差日志最大条数
+            ard: 是否每维使用独立核长度
+            ard_passes: ARD核长度逐维搜索的轮数
+        """
+        self.lower_bounds = np.asarray(lower_bounds, dtype=np.float64)
+        span = np.asarray(upper_bounds, dtype=np.float64) - self.lower_bounds
+        self.span = np.where(span > 0, span, 1.0)
+        self.length_scales = tuple(length_scales)
+        self.noise_levels = tuple(noise_levels)
+        self.max_points = int(max_points)
+        self.min_points = int(min_points)
+        self.hyperparameter_interval = max(1, int(hyperparameter_interval))
+        self.log_size = int(log_size)
+        self.ard = bool(ard)
+        self.ard_passes = int(ard_passes)
+
+        self._X = np.empty((0, len(self.lower_bounds)))
+        self._y = np.empty(0)
+        self._dirty = False
+        self._fit_count = 0
+
+        self.length_scale = self.length_scales[len(self.length_scales) // 2]
+        self.noise = self.noise_levels[0]
+        self._train_X = None
+        self._alpha = None
+        self._L_inv = None
+        self._y_mean = 0.0
+        self._y_std = 1.0
+        self.last_fit_time = 0.0
+
+        self.prediction_log = []  # 预测与实测对比记录
+
+    # ------------------------------------------------------------------
+    # 拟合
+    # ------------------------------------------------------------------
+
+    @property
+    def point_count(self) -> int:
+        return len(self._y)
+
+    @property
+    def is_ready(self) -> bool:
+        """样本数是否足够进行预测"""
+        return self.point_count >= self.min_points
+
+    def _normalize(self, points: np.ndarray) -> np.ndarray:
+        return (np.atleast_2d(np.asarray(points, dtype=np.float64)) - self.lower_bounds) / self.span
+
+    def add(self, points: np.ndarray, values: np.ndarray):
+        """加入新的测量样本"""
+        points = self._normalize(points)
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        self._X = np.vstack([self._X, points])[-self.max_points:]
+        self._y = np.concatenate([self._y, values])[-self.max_points:]
+        self._dirty = True
+
+    def _kernel(self, A: np.ndarray, B: np.ndarray, length_scale) -> np.ndarray:
+        """RBF核，length_scale为标量或每维一个值的数组"""
+        A = A / length_scale
+        B = B / length_scale
+        sq = (np.sum(A * A, axis=1)[:, None] + np.sum(B * B, axis=1)[None, :] - 2.0 * A @ B.T)
+        return np.exp(-0.5 * np.maximum(sq, 0.0))
+
+    def _factorize(self, y: np.ndarray, length_scale: float, noise: float):
+        """Cholesky分解，返回(L, alpha, 对数边缘似然)"""
+        K = self._kernel(self._X, self._X, length_scale)
+        K[np.diag_indices_from(K)] += noise
+        L = np.linalg.cholesky(K)
+        alpha = np.linalg.solve(L.T, np.linalg.solve(L, y))
+        log_likelihood = -0.5 * y @ alpha - np.sum(np.log(np.diag(L))) - 0.5 * len(y) * math.log(2 * math.pi)
+        return L, alpha, log_likelihood
+
+    def fit(self) -> bool:
+        """有新样本时重新拟合（超参数按间隔重新选择）"""
+        if not self._dirty or not self.is_ready:
+            return self._alpha is not None
+        start = time.perf_counter()
+        self._y_mean = float(np.mean(self._y))
+        self._y_std = float(np.std(self._y)) or 1.0
+        y = (self._y - self._y_mean) / self._y_std
+
+        reselect = self._fit_count % self.hyperparameter_interval == 0
+        if reselect:
+            candidates = [(l, n) for l in self.length_scales for n in self.noise_levels]
+            if self.ard and np.ndim(self.length_scale) > 0:
+                candidates.append((self.length_scale, self.noise))
+        else:
+            candidates = [(self.length_scale, self.noise)]
+
+        best = None
+        for length_scale, noise in candidates:
+            try:
+                L, alpha, log_likelihood = self._factorize(y, length_scale, noise)
+            except np.linalg.LinAlgError:
+                continue
+            if best is None or log_likelihood > best[0]:
+                best = (log_likelihood, length_scale, noise, L, alpha)
+        if best is None:
+            return False
+        if self.ard and reselect:
+            best = self._refine_ard(y, best)
+
+        _, self.length_scale, self.noise, L, self._alpha = best
+        self._L_inv = np.linalg.inv(L)
+        self._train_X = self._X.copy()
+        self._dirty = False
+        self._fit_count += 1
+        self.last_fit_time = time.perf_counter() - start
+        return True
+
+    def _refine_ard(self, y: np.ndarray, best: tuple) -> tuple:
+        """从最佳网格结果出发，逐维把核长度乘/除2，保留边缘似然更高的值"""
+        log_likelihood, length_scale, noise, L, alpha = best
+        length_scale = np.broadcast_to(np.asarray(length_scale, dtype=np.float64), (self._X.shape[1],)).copy()
+        lower, upper = min(self.length_scales) / 4, max(self.length_scales) * 8
+        for _ in range(self.ard_passes):
+            changed = False
+            for dim in range(len(length_scale)):
+                for factor in (2.0, 0.5):
+                    trial = length_scale.copy()
+                    trial[dim] = np.clip(trial[dim] * factor, lower, upper)
+                    if trial[dim] == length_scale[dim]:
+                        continue
+                    try:
+                        trial_L, trial_alpha, trial_likelihood = self._factorize(y, trial, noise)
+                    except np.linalg.LinAlgError:
+                        continue
+                    if trial_likelihood > log_likelihood:
+                        log_likelihood, length_scale, L, alpha = trial_likelihood, trial, trial_L, trial_alpha
+                        changed = True
+                        break
+            if not changed:
+                break
+        return log_likelihood, length_scale, noise, L, alpha
+
+    # ------------------------------------------------------------------
+    # 预测
+    # ------------------------------------------------------------------
+
+    def predict(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """预测功率均值和标准差"""
+        Xs = self._normalize(points)
+        Ks = self._kernel(Xs, self._train_X, self.length_scale)
+        mean = Ks @ self._alpha
+        v = self._L_inv @ Ks.T
+        variance = np.maximum(1.0 - np.sum(v * v, axis=0), 1e-12)
+        return mean * self._y_std + self._y_mean, np.sqrt(variance) * self._y_std
+
+    def expected_improvement(self, mean: np.ndarray, std: np.ndarray, best: float,
+                             xi: float = 0.01) -> np.ndarray:
+        """期望改进（xi为相对功率标准差的探索裕量）"""
+        improvement = mean - best - xi * self._y_std
+        z = improvement / std
+        return improvement * _normal_cdf(z) + std * _normal_pdf(z)
+
+    def select(self, points: np.ndarray, count: int, acquisition: str = 'ei',
+               best: float = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        从候选中选出采集函数最高的count个
+
+        返回:
+            (索引, 预测均值, 预测标准差)
+        """
+        mean, std = self.predict(points)
+        if acquisition == 'ei':
+            if best is None:
+                best = float(np.max(self._y))
+            score = self.expected_improvement(mean, std, best)
+        else:
+            score = mean
+        count = min(count, len(points))
+        indices = np.argsort(score)[::-1][:count]
+        return indices, mean[indices], std[indices]
+
+    def select_batch(self, points: np.ndarray, count: int, best: float = None,
+                     xi: float = 0.01) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        按期望改进贪心选出一批点（Kriging believer）：
+        每选中一个点，把它的预测均值当作观测，更新其余候选的后验方差后再选下一个，
+        使同一批的点不会挤在同一个峰上
+
+        返回:
+            (索引, 预测均值, 预测标准差, 选中时的期望改进)
+        """
+        Xs = self._normalize(points)
+        Ks = self._kernel(Xs, self._train_X, self.length_scale)
+        mean = Ks @ self._alpha
+        V = self._L_inv @ Ks.T
+        variance = np.maximum(1.0 - np.sum(V * V, axis=0), 1e-12)
+        if best is None:
+            best = float(np.max(self._y))
+        best = (best - self._y_mean) / self._y_std
+        noise = self.noise
+
+        count = min(count, len(points))
+        selected = []
+        acquisition = []
+        conditioned = []  # 已选点对候选协方差的修正向量
+        for _ in range(count):
+            std = np.sqrt(np.maximum(variance, 1e-12))
+            improvement = mean - best - xi
+            z = improvement / std
+            score = improvement * _normal_cdf(z) + std * _normal_pdf(z)
+            score[selected] = -np.inf
+            index = int(np.argmax(score))
+            selected.append(index)
+            acquisition.append(float(score[index]) * self._y_std)
+
+            # 以index为观测点更新后验协方差：Σ' = Σ - Σ[:,s]Σ[s,:]/(Σ[s,s]+noise)
+            covariance = self._kernel(Xs, Xs[index:index + 1], self.length_scale)[:, 0] - V.T @ V[:, index]
+            for g in conditioned:
+                covariance -= g * g[index]
+            g = covariance / math.sqrt(max(covariance[index], 0.0) + noise)
+            conditioned.append(g)
+            variance = variance - g * g
+
+        indices = np.array(selected, dtype=int)
+        _, std = self.predict(points[indices])
+        return indices, mean[indices] * self._y_std + self._y_mean, std, np.array(acquisition)
+
+    # ------------------------------------------------------------------
+    # 预测误差日志
+    # ------------------------------------------------------------------
+
+    def record_prediction(self, predicted: float, std: float, measured: float, generation: int = None,
+                          screened: bool = True):
+        """记录一次预测与实测的对比（screened表示该个体由代理模型挑选，否则为随机抽取）"""
+        self.prediction_log.append({
+            'generation': generation,
+            'screened': bool(screened),
+            'predicted': float(predicted),
+            'predicted_std': float(std),
+            'measured': float(measured),
+            'error': float(measured - predicted),
+        })
+        if len(self.prediction_log) > self.log_size:
+            del self.prediction_log[:len(self.prediction_log) - self.log_size]
+
+    def get_prediction_statistics(self, generation: int = None) -> Optional[Dict]:
+        """预测误差统计（指定generation时只统计该代）"""
+        records = self.prediction_log
+        if generation is not None:
+            records = [r for r in records if r['generation'] == generation]
+        if not records:
+            return None
+        predicted = np.array([r['predicted'] for r in records])
+        measured = np.array([r['measured'] for r in records])
+        std = np.array([r['predicted_std'] for r in records])
+        errors = measured - predicted
+        correlation = None
+        if len(records) > 2 and np.std(predicted) > 0 and np.std(measured) > 0:
+            correlation = float(np.corrcoef(predicted, measured)[0, 1])
+        return {
+            'count': len(records),
+            'rmse': float(np.sqrt(np.mean(errors ** 2))),
+            'mae': float(np.mean(np.abs(errors))),
+            'bias': float(np.mean(errors)),
+            'within_2_sigma': float(np.mean(np.abs(errors) <= 2 * std)),
+            'correlation': correlation,
+        }
+
+    def get_statistics(self) -> Dict:
+        """模型状态"""
+        return {
+            'points': self.point_count,
+            'length_scale': np.asarray(self.length_scale).tolist(),
+            'noise': self.noise,
+            'fit_time': self.last_fit_time,
+            'fit_count': self._fit_count,
+        }
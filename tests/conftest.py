@@ -0,0 +1,6 @@
+# conftest.py
+"""测试公共设置：把仓库根目录加入模块搜索路径（各模块均位于根目录）"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
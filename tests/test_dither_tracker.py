@@ -0,0 +1,93 @@
+# test_dither_tracker.py
+"""抖动锁相跟踪：执行机构有响应滞后时的解调与跟踪收敛"""
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from dither_tracker import DitherTracker
+
+# 与双端默认配置相同的搜索范围
+SEARCH_RANGE = {'x': (0.0, 30.0), 'y': (0.0, 30.0), 'z': (0.0, 30.0), 'rx': (-0.02, 0.02), 'ry': (-0.02, 0.02)}
+VARIABLES = ['x', 'y', 'z', 'rx', 'ry']
+
+
+def _create_tracker(variables_A, variables_B, center_A, center_B, config):
+    return DitherTracker(None, variables_A, variables_B, SEARCH_RANGE, SEARCH_RANGE,
+                         np.asarray(center_A, dtype=float), np.asarray(center_B, dtype=float), config=config)
+
+
+def _lagged_window(tracker, gradient, phase, start, mean_power=1.0e-3, samples=200):
+    """一个解调窗口的功率：各轴抖动经相位滞后phase后按相对梯度gradient调制功率"""
+    times = start + np.linspace(0.0, tracker.window_length, samples, endpoint=False)
+    response = tracker.amplitude * np.sin(2 * np.pi * tracker.frequencies[None, :] * times[:, None] - phase)
+    return times, mean_power * (1.0 + response @ gradient)
+
+
+def test_gradient_sign_recovered_beyond_in_phase_limit():
+    """相位滞后接近90°时只用正弦参考几乎解调不出梯度，正交解调在线估计相位后应恢复梯度"""
+    tracker = _create_tracker(['x', 'y'], ['rx', 'ry'], [0.0, 0.0], [0.0, 0.0], {'dither_response_time': 0.0})
+    gradient = np.array([2.0, -1.5, 0.8, -3.0])
+    phase = np.radians([80.0, 85.0, 70.0, 88.0])
+
+    for window in range(5):
+        times, powers = _lagged_window(tracker, gradient, phase, start=window * tracker.window_length)
+        estimate = tracker.estimate_gradient(times, powers)
+
+    np.testing.assert_allclose(np.degrees(tracker.phase_estimates), np.degrees(phase), atol=1.0)
+    np.testing.assert_allclose(estimate, gradient, rtol=0.02)
+    # 只取同相分量时幅度只剩 cos(φ)
+    in_phase = np.real(tracker.demodulate(times, powers))
+    np.testing.assert_allclose(in_phase, gradient * np.cos(phase), atol=1e-6)
+
+
+def test_frequencies_limited_by_response_time():
+    """最高抖动频率处的一阶响应相位滞后不超过 dither_max_phase_lag"""
+    tracker = _create_tracker(VARIABLES, VARIABLES, np.zeros(5), np.zeros(5),
+                              {'dither_response_time': 0.05, 'dither_max_phase_lag': 60.0})
+    highest_lag = np.degrees(np.arctan(2 * np.pi * tracker.frequencies[-1] * 0.05))
+    assert highest_lag == pytest.approx(60.0)
+    assert tracker.window_length == pytest.approx(1.0 / tracker.frequencies[0])
+
+
+def _run_lagged_loop(tracker, optimum, width, time_constant, windows, noise=1e-3, seed=3):
+    """
+    按模拟时间驱动跟踪：与_tracking_loop相同的指令节拍，执行机构为一阶滞后，
+    功率为以optimum为峰值的高斯型耦合（归一化坐标），每个窗口调用一次_correct（第一个窗口作为过渡丢弃）
+    """
+    rng = np.random.default_rng(seed)
+    interval = float(tracker.config['dither_update_interval'])
+    follow = 1.0 - np.exp(-interval / time_constant)
+    actual = tracker.center.copy()
+    t = 0.0
+    for window in range(windows + 1):
+        times, powers = [], []
+        window_start = t
+        while t - window_start < tracker.window_length:
+            point = np.clip(tracker.center + tracker.amplitude * np.sin(2 * np.pi * tracker.frequencies * t), 0.0, 1.0)
+            actual += (point - actual) * follow
+            coupling = np.exp(-np.sum(((actual - optimum) / width) ** 2))
+            times.append(t)
+            powers.append(1.0e-3 * coupling * (1.0 + noise * rng.standard_normal()))
+            t += interval
+        if window > 0:
+            tracker._correct(np.array(times), np.array(powers))
+
+
+def test_tracking_converges_with_response_lag():
+    """一阶响应滞后（τ=0.05秒）下，10轴从偏离峰值的位置开始跟踪应收敛到峰值附近"""
+    mid_range = [sum(SEARCH_RANGE[var]) / 2 for var in VARIABLES]
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker = _create_tracker(VARIABLES, VARIABLES, mid_range, mid_range, {})
+    offsets = 0.08 * np.array([1.0, -1.0, 0.7, -0.7, 1.0, -0.7, 1.0, -1.0, 0.7, 1.0])
+    optimum = tracker.center + offsets
+    width = 0.2
+
+    start_coupling = np.exp(-np.sum((offsets / width) ** 2))
+    _run_lagged_loop(tracker, optimum, width, time_constant=0.05, windows=30)
+
+    assert start_coupling < 0.3
+    assert tracker.correction_count == 30
+    np.testing.assert_allclose(tracker.center, optimum, atol=0.002)
+    assert np.exp(-np.sum(((tracker.center - optimum) / width) ** 2)) > 0.999
@@ -0,0 +1,118 @@
+# test_high_power_keep.py
+"""高功率保持模式：整体数组采样与原逐个体循环采样的统计一致性（固定种子）"""
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from high_power_keep import HighPowerKeepMode
+
+SAMPLES = 4000
+VARIABLES_A = ['x', 'y', 'rx']
+VARIABLES_B = ['x', 'ry']
+SEARCH_RANGE_A = {'x': (0.0, 30.0), 'y': (0.0, 30.0), 'rx': (-0.02, 0.02)}
+SEARCH_RANGE_B = {'x': (0.0, 30.0), 'ry': (-0.02, 0.02)}
+# 中心分别靠近上界、下界和位于中部，小范围区间在边界处不对称，裁剪比例不为零
+CENTER_A = np.array([29.8, 0.3, 0.0])
+CENTER_B = np.array([15.0, -0.0195])
+
+
+def _create_mode(seed: int, **config) -> HighPowerKeepMode:
+    config = dict({'high_power_search_range_percent': 0.05, 'high_power_perturbation_strength': 0.05,
+                   'high_power_population_size': SAMPLES + 1}, **config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        mode = HighPowerKeepMode(config, VARIABLES_A, VARIABLES_B, SEARCH_RANGE_A, SEARCH_RANGE_B,
+                                 rng=np.random.default_rng(seed))
+        mode.initialize(CENTER_A, CENTER_B, 1.0)
+    return mode
+
+
+def _loop_near_center(random_state, mode, center, variables, local_range):
+    """原实现：逐个体逐基因 中心值 + U(-区间宽度/2, 区间宽度/2)，裁剪到小范围区间"""
+    individual = center.copy()
+    for i, var in enumerate(variables):
+        lower, upper = local_range[var]
+        perturbation_range = upper - lower
+        individual[i] += random_state.uniform(-perturbation_range / 2, perturbation_range / 2)
+        individual[i] = np.clip(individual[i], lower, upper)
+    return individual
+
+
+def _loop_clone(random_state, mode, individual, variables, search_range):
+    """原实现：逐基因加 N(0, (量程·扰动强度)²) 并裁剪到搜索范围"""
+    perturbed = individual.copy()
+    for i, var in enumerate(variables):
+        lower, upper = search_range[var]
+        perturbed[i] += random_state.normal(0, (upper - lower) * mode.high_power_perturbation_strength)
+        perturbed[i] = np.clip(perturbed[i], lower, upper)
+    return perturbed
+
+
+def _assert_same_distribution(reference: np.ndarray, sample: np.ndarray, lower: np.ndarray, upper: np.ndarray):
+    """逐基因比较均值、标准差和落在边界上的比例（约4倍标准误差以内）"""
+    n = len(sample)
+    span = upper - lower
+    mean_tolerance = 4 * np.sqrt(2.0 / n) * np.maximum(reference.std(axis=0), 1e-12)
+    np.testing.assert_array_less(np.abs(sample.mean(axis=0) - reference.mean(axis=0)), mean_tolerance)
+    np.testing.assert_allclose(sample.std(axis=0), reference.std(axis=0), rtol=0.1, atol=1e-12)
+    for bound in (lower, upper):
+        at_bound_reference = np.mean(np.isclose(reference, bound, rtol=0.0, atol=1e-12 * span), axis=0)
+        at_bound_sample = np.mean(np.isclose(sample, bound, rtol=0.0, atol=1e-12 * span), axis=0)
+        p = (at_bound_reference + at_bound_sample) / 2
+        np.testing.assert_array_less(np.abs(at_bound_sample - at_bound_reference),
+                                     4 * np.sqrt(2 * p * (1 - p) / n) + 1e-12)
+    # 所有样本都在区间内
+    assert np.all(sample >= lower) and np.all(sample <= upper)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_new_population_matches_per_individual_sampling(seed):
+    mode = _create_mode(seed)
+    local_range_A, local_range_B = mode.get_search_range_around_center()
+    random_state = np.random.RandomState(seed)
+    reference_A = np.array([_loop_near_center(random_state, mode, CENTER_A, VARIABLES_A, local_range_A)
+                            for _ in range(SAMPLES)])
+    reference_B = np.array([_loop_near_center(random_state, mode, CENTER_B, VARIABLES_B, local_range_B)
+                            for _ in range(SAMPLES)])
+
+    population_A = np.zeros((SAMPLES + 1, len(VARIABLES_A)))
+    population_B = np.zeros((SAMPLES + 1, len(VARIABLES_B)))
+    fitness = np.zeros(SAMPLES + 1)
+    new_A, new_B = mode.create_new_population(population_A, population_B, fitness)
+
+    local_bounds_A = [np.array([local_range_A[var][k] for var in VARIABLES_A]) for k in (0, 1)]
+    local_bounds_B = [np.array([local_range_B[var][k] for var in VARIABLES_B]) for k in (0, 1)]
+    # 第0个是精英
+    _assert_same_distribution(reference_A, new_A[1:], *local_bounds_A)
+    _assert_same_distribution(reference_B, new_B[1:], *local_bounds_B)
+    # 靠近边界的基因确实发生了裁剪
+    assert np.mean(new_A[1:, 0] == local_bounds_A[1][0]) > 0.1
+    assert np.mean(new_B[1:, 1] == local_bounds_B[0][1]) > 0.1
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_initial_population_matches_per_individual_sampling(seed):
+    mode = _create_mode(seed, high_power_population_size=SAMPLES)
+    local_range_A, _ = mode.get_search_range_around_center()
+    random_state = np.random.RandomState(seed)
+    reference_A = np.array([_loop_near_center(random_state, mode, CENTER_A, VARIABLES_A, local_range_A)
+                            for _ in range(SAMPLES)])
+    with contextlib.redirect_stdout(io.StringIO()):
+        population_A, _ = mode.create_initial_population()
+    _assert_same_distribution(reference_A, population_A,
+                              *[np.array([local_range_A[var][k] for var in VARIABLES_A]) for k in (0, 1)])
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_clone_perturbation_matches_per_gene_sampling(seed):
+    mode = _create_mode(seed)
+    random_state = np.random.RandomState(seed)
+    reference = np.array([_loop_clone(random_state, mode, CENTER_A, VARIABLES_A, SEARCH_RANGE_A)
+                          for _ in range(SAMPLES)])
+    sample = np.array([mode._clone_with_perturbation(CENTER_A, VARIABLES_A, SEARCH_RANGE_A)
+                       for _ in range(SAMPLES)])
+    lower = np.array([SEARCH_RANGE_A[var][0] for var in VARIABLES_A])
+    upper = np.array([SEARCH_RANGE_A[var][1] for var in VARIABLES_A])
+    _assert_same_distribution(reference, sample, lower, upper)
+    assert np.mean(sample[:, 0] == upper[0]) > 0.3
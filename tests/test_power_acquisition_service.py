@@ -0,0 +1,77 @@
+# test_power_acquisition_service.py
+"""后台功率采集服务：快速数组设备时间戳（原始计数）的计数周期标定与回绕处理"""
+import numpy as np
+import pytest
+
+import power_acquisition_service
+from power_acquisition_service import TICK_WRAP, PowerAcquisitionService
+
+BLOCK_SAMPLES = 200
+SAMPLE_INTERVAL = 1e-4  # 设备采样间隔（秒）
+USB_LATENCY = 2e-3      # 块末样本到主机读取返回的延迟（秒）
+
+
+class FakeFastArrayMeter:
+    """按真实计数周期tick_period产生uint32时间戳的快速数组功率计，主机时钟随采集推进"""
+    acquisition_mode = 'fast_array'
+
+    def __init__(self, clock, tick_period, start_tick):
+        self.clock = clock
+        self.tick_period = tick_period
+        self.next_tick = start_tick
+        self.sample_times = None
+
+    def acquire_block(self):
+        offsets = np.arange(BLOCK_SAMPLES) * SAMPLE_INTERVAL
+        ticks = (self.next_tick + np.round(offsets / self.tick_period).astype(np.int64)) % TICK_WRAP
+        self.next_tick += int(round(BLOCK_SAMPLES * SAMPLE_INTERVAL / self.tick_period))
+        self.sample_times = self.clock.now + offsets
+        self.clock.now += BLOCK_SAMPLES * SAMPLE_INTERVAL
+        self.clock.pending_latency = USB_LATENCY
+        return np.ones(BLOCK_SAMPLES), ticks.astype(np.float64)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.pending_latency = 0.0
+
+    def __call__(self):
+        # 块末样本之后经过USB延迟才返回到主机
+        return self.now - SAMPLE_INTERVAL + self.pending_latency
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(power_acquisition_service.time, 'perf_counter', fake)
+    return fake
+
+
+def test_tick_period_calibrated_across_wrap(clock, capsys):
+    """计数周期与假定的1µs不同且计数跨越32位回绕时，标定后样本时间间隔与真实采样间隔一致"""
+    meter = FakeFastArrayMeter(clock, tick_period=0.25e-6, start_tick=TICK_WRAP - 3_000_000)
+    service = PowerAcquisitionService(meter, {'tick_calibration_time': 0.5})
+
+    timestamps = None
+    for _ in range(60):  # 1.2秒，期间计数回绕
+        _, timestamps = service._read_device_block()
+
+    assert service.tick_period_calibrated
+    assert service.tick_period == pytest.approx(0.25e-6, rel=1e-3)
+    np.testing.assert_allclose(np.diff(timestamps), SAMPLE_INTERVAL, rtol=1e-3)
+    # 块内样本时间与真实采样时间只差一个固定的读取延迟
+    np.testing.assert_allclose(timestamps - meter.sample_times, USB_LATENCY, atol=1e-6)
+    assert "改用标定值" in capsys.readouterr().out
+
+
+def test_assumed_period_kept_when_consistent(clock, capsys):
+    """设备计数确为1µs时标定值与假定值一致，不报警"""
+    meter = FakeFastArrayMeter(clock, tick_period=1e-6, start_tick=0)
+    service = PowerAcquisitionService(meter, {'tick_calibration_time': 0.5})
+    for _ in range(60):
+        service._read_device_block()
+
+    assert service.tick_period_calibrated
+    assert service.tick_period == pytest.approx(1e-6, rel=1e-3)
+    assert "警告" not in capsys.readouterr().out
@@ -0,0 +1,174 @@
+# timing_spans.py
+"""
+评估耗时分段统计
+每次评估拆成若干命名耗时段（指令下发、稳定等待、功率测量、历史记录、GUI回调），
+各段在发生处用 perf_counter 计时并累计到进程内的记录器，优化器每代结束时取出
+p50/p95/最大值汇总，附加到generation进度消息并随结果文件保存。
+
+记录一次耗时只是两次 perf_counter 加一次带锁的 deque 追加（约1微秒），可常开。
+每段只保留最近 max_samples 个样本，无人取出汇总时内存也不会增长。
+
+功率计、适配器等处的计时写入进程内共享的记录器；优化器使用自己的记录器，运行期间用 attach()
+挂到共享记录器上并按线程筛选，GUI功率监控等其他线程的耗时不会计入优化器的每代统计，
+各优化器的开关和汇总也互不影响。
+"""
+import functools
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class _Span:
+    """耗时段上下文管理器"""
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name: str):
+        self.recorder = recorder
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.add(self.name, self.start)
+        return False
+
+
+class SpanRecorder:
+    """命名耗时段记录器（线程安全）"""
+
+    def __init__(self, enabled: bool = True, max_samples: int = 10000):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._totals: Dict[str, float] = {}
+        self._maxima: Dict[str, float] = {}
+        self._listeners: Tuple[Tuple['SpanRecorder', Optional[Callable[[threading.Thread], bool]]], ...] = ()
+
+    def attach(self, recorder: 'SpanRecorder', thread_filter: Optional[Callable[[threading.Thread], bool]] = None):
+        """
+        把本记录器收到的耗时段同时转发给recorder（与本记录器的enabled无关）
+
+        参数:
+            recorder: 接收转发的记录器
+            thread_filter: 线程筛选函数，返回True的线程中记录的耗时段才转发，None表示全部转发
+        """
+        with self._lock:
+            self._listeners = tuple(item for item in self._listeners if item[0] is not recorder) + \
+                ((recorder, thread_filter),)
+
+    def detach(self, recorder: 'SpanRecorder'):
+        """停止向recorder转发"""
+        with self._lock:
+            self._listeners = tuple(item for item in self._listeners if item[0] is not recorder)
+
+    def add(self, name: str, start: float, end: Optional[float] = None):
+        """记录一段耗时，start/end 为 time.perf_counter() 的读数（end缺省为当前时间）"""
+        listeners = self._listeners
+        if not self.enabled and not listeners:
+            return
+        if end is None:
+            end = time.perf_counter()
+        if listeners:
+            thread = threading.current_thread()
+            for recorder, thread_filter in listeners:
+                if thread_filter is None or thread_filter(thread):
+                    recorder.add(name, start, end)
+        if not self.enabled:
+            return
+        duration = end - start
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+                self._counts[name] = 0
+                self._totals[name] = 0.0
+                self._maxima[name] = 0.0
+            samples.append(duration)
+            self._counts[name] += 1
+            self._totals[name] += duration
+            if duration > self._maxima[name]:
+                self._maxima[name] = duration
+
+    def span(self, name: str) -> _Span:
+        """with recorder.span('measure'): ... 记录代码块耗时"""
+        return _Span(self, name)
+
+    def summary(self, reset: bool = True) -> Dict[str, Dict]:
+        """
+        汇总各耗时段（秒）：{名称: {'count', 'total', 'mean', 'p50', 'p95', 'max'}}
+        reset=True 时清空已汇总的样本（每代取一次即得到该代的分布）
+        """
+        with self._lock:
+            snapshot = {
+                name: (np.fromiter(samples, dtype=float, count=len(samples)),
+                       self._counts[name], self._totals[name], self._maxima[name])
+                for name, samples in self._samples.items() if samples
+            }
+            if reset:
+                self._clear()
+
+        result = {}
+        for name, (values, count, total, maximum) in sorted(snapshot.items()):
+            p50, p95 = np.percentile(values, [50, 95])
+            result[name] = {
+                'count': count,
+                'total': total,
+                'mean': total / count,
+                'p50': float(p50),
+                'p95': float(p95),
+                'max': maximum,
+            }
+        return result
+
+    def _clear(self):
+        """清空样本（调用方已持有锁）"""
+        self._samples.clear()
+        self._counts.clear()
+        self._totals.clear()
+        self._maxima.clear()
+
+    def reset(self):
+        """清空样本"""
+        with self._lock:
+            self._clear()
+
+
+_recorder = SpanRecorder()
+
+
+def get_span_recorder() -> SpanRecorder:
+    """获取进程内共享的耗时段记录器"""
+    return _recorder
+
+
+def timed_span(name: str):
+    """装饰器：把函数调用耗时记录为名为name的耗时段"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _recorder.add(name, start)
+        return wrapper
+    return decorator
+
+
+def format_span_summary(summary: Dict[str, Dict], names=None) -> str:
+    """格式化为一行文本：名称 p50/p95/max（毫秒）"""
+    names = names if names is not None else list(summary)
+    parts = []
+    for name in names:
+        stats = summary.get(name)
+        if stats:
+            parts.append(f"{name} {stats['p50']*1000:.1f}/{stats['p95']*1000:.1f}/{stats['max']*1000:.1f}")
+    return ", ".join(parts)